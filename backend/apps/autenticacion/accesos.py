@@ -0,0 +1,56 @@
+"""Registro diferido de inicios de sesión.
+
+El login no escribe en la base de datos durante la petición: `last_login` y la
+asignación del rol por defecto a usuarios sin rol se acumulan y se aplican en
+lote (dos UPDATE por lote) a través de `backend.escritura`. Con el escritor
+serializado activo, los logins que llegan mientras hay un volcado pendiente se
+suman a él; sin él, el volcado se ejecuta en línea.
+"""
+import threading
+
+from django.utils import timezone
+
+from backend import escritura
+
+from . import cache, roles
+from .models import Usuario
+
+ROL_POR_DEFECTO = 'Usuario'
+
+_lock = threading.Lock()
+_logins = set()
+_sin_rol = set()
+_programado = False
+
+
+def rol_por_defecto():
+    """Rol asignado a los usuarios que inician sesión sin rol."""
+    return roles.obtener(ROL_POR_DEFECTO)
+
+
+def registrar_login(usuario, asignar_rol=False):
+    global _programado
+    with _lock:
+        _logins.add(usuario.pk)
+        if asignar_rol:
+            _sin_rol.add(usuario.pk)
+        programar = not _programado
+        _programado = True
+    if programar:
+        escritura.encolar(volcar)
+
+
+def volcar():
+    global _programado
+    with _lock:
+        logins, sin_rol = set(_logins), set(_sin_rol)
+        _logins.clear()
+        _sin_rol.clear()
+        _programado = False
+    if logins:
+        Usuario.objects.filter(pk__in=logins).update(last_login=timezone.now())
+    if sin_rol:
+        Usuario.objects.filter(pk__in=sin_rol, rol__isnull=True).update(rol=rol_por_defecto())
+    # update() no emite señales
+    for pk in logins | sin_rol:
+        cache.usuarios.invalidar(pk)
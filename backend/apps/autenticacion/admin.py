@@ -60,3 +60,15 @@ class UsuarioRolAdmin(admin.ModelAdmin):
 	list_filter = ('rol', 'usuario')
 
 admin.site.unregister(Group)
+
+@admin.register(TokenRevocado)
+class TokenRevocadoAdmin(admin.ModelAdmin):
+	list_display = ('jti', 'usuario', 'emitidos_antes', 'solo_acceso', 'expira_en', 'revocado_en')
+	search_fields = ('jti', 'usuario__username')
+	raw_id_fields = ('usuario',)
+
+@admin.register(ImportacionUsuarios)
+class ImportacionUsuariosAdmin(admin.ModelAdmin):
+	list_display = ('id', 'formato', 'estado', 'procesadas', 'creadas', 'omitidas', 'creado_por', 'creado_en')
+	list_filter = ('estado', 'formato')
+	readonly_fields = ('procesadas', 'creadas', 'omitidas', 'errores', 'mensaje')
@@ -0,0 +1,50 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication, JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from . import cache, revocacion
+from .tokens import ROL_CLAIM
+
+
+class _ValidacionRolMixin:
+    def get_validated_token(self, raw_token):
+        token = super().get_validated_token(raw_token)
+        # Tokens emitidos antes de incluir el rol, o anteriores a un cambio de rol
+        if ROL_CLAIM not in token or revocacion.requiere_renovacion(token):
+            raise InvalidToken(_('El token debe renovarse'))
+        if revocacion.revocado(token):
+            raise InvalidToken(_('El token ha sido revocado'))
+        return token
+
+
+class JWTRolAuthentication(_ValidacionRolMixin, JWTStatelessUserAuthentication):
+    """Autenticación sin consultas: request.user es un UsuarioToken con el rol del token."""
+
+
+class JWTUsuarioAuthentication(_ValidacionRolMixin, JWTAuthentication):
+    """Autenticación que carga la instancia de Usuario, para vistas que la modifican.
+
+    La instancia (con su rol) se sirve desde `cache.usuarios` mientras no caduque
+    ni se invalide.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            usuario_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        usuario = cache.usuarios.obtener(usuario_id)
+        if usuario is None:
+            try:
+                usuario = self.user_model.objects.select_related('rol').get(
+                    **{api_settings.USER_ID_FIELD: usuario_id}
+                )
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found')
+            cache.usuarios.guardar(usuario)
+
+        if not usuario.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        return usuario
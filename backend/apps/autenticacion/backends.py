@@ -0,0 +1,22 @@
+from django.contrib.auth.backends import ModelBackend
+
+from .models import Usuario
+
+
+class EmailBackend(ModelBackend):
+    """Autentica por email (sin distinguir mayúsculas) con una sola consulta.
+
+    Carga el usuario junto con su rol, de modo que emitir los tokens no requiere
+    más consultas. El login de administración por username sigue en ModelBackend.
+    """
+
+    def authenticate(self, request, email=None, password=None, **kwargs):
+        if not email or password is None:
+            return None
+        try:
+            usuario = Usuario.objects.por_email(email).select_related('rol').get()
+        except (Usuario.DoesNotExist, Usuario.MultipleObjectsReturned):
+            return None
+        if usuario.check_password(password) and self.user_can_authenticate(usuario):
+            return usuario
+        return None
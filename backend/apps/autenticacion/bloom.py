@@ -0,0 +1,32 @@
+"""Filtro de Bloom para pertenencia aproximada sin falsos negativos."""
+import hashlib
+import math
+
+
+class FiltroBloom:
+    def __init__(self, capacidad=100000, error=0.001):
+        capacidad = max(1, capacidad)
+        self.capacidad = capacidad
+        self.num_bits = max(8, int(-capacidad * math.log(error) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacidad * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.elementos = 0
+
+    def _posiciones(self, valor):
+        # Doble hashing (Kirsch-Mitzenmacher) a partir de un único blake2b
+        digest = hashlib.blake2b(valor.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def agregar(self, valor):
+        for pos in self._posiciones(valor):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.elementos += 1
+
+    def __contains__(self, valor):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._posiciones(valor))
+
+    @property
+    def saturado(self):
+        return self.elementos > self.capacidad
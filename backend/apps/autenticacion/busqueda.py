@@ -0,0 +1,81 @@
+"""Listado y búsqueda de usuarios para la administración.
+
+- Paginación por cursor (keyset) sobre `-id`: cada página es un rango del
+  índice, sin OFFSET, y el coste no crece al avanzar páginas.
+- En lugar de un `COUNT(*)` exacto por petición se devuelve `total_estimado`:
+    * sin filtros, las filas según las estadísticas del planificador
+      (`pg_class.reltuples`, `sqlite_stat1`) o un conteo guardado en la caché;
+    * filtrado solo por rol, un conteo guardado en la caché `TTL_CONTEO` segundos;
+    * con búsqueda, un conteo limitado a `LIMITE_CONTEO` filas; si se alcanza,
+      `total_minimo` indica que hay al menos ese número.
+"""
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+from .models import Usuario
+
+LIMITE_CONTEO = 1000
+TTL_CONTEO = 300
+_CLAVE_CONTEO = 'usuarios:conteo:{}'
+
+
+def _filas_segun_estadisticas(modelo):
+    tabla = modelo._meta.db_table
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [tabla])
+            elif connection.vendor == 'sqlite':
+                # Solo existe tras ANALYZE; el primer número de `stat` es el total de filas
+                cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [tabla])
+            else:
+                return None
+            fila = cursor.fetchone()
+    except DatabaseError:
+        return None
+    if not fila or fila[0] is None:
+        return None
+    filas = int(str(fila[0]).split()[0])
+    return filas if filas >= 0 else None  # reltuples = -1: tabla nunca analizada
+
+
+def listado(texto='', rol_id=None):
+    """Usuarios del listado (búsqueda por prefijo y rol), en el orden de la paginación."""
+    queryset = Usuario.objects.buscar(texto) if texto else Usuario.objects.all()
+    if rol_id is not None:
+        queryset = queryset.filter(rol_id=rol_id)
+    return queryset.select_related('rol').order_by(PaginacionUsuarios.ordering)
+
+
+def total_estimado(queryset, clave=None, busqueda=False):
+    """(total, minimo) del listado; `clave` identifica el filtro para la caché de conteos."""
+    if busqueda:
+        total = queryset.order_by()[:LIMITE_CONTEO].count()
+        return total, total >= LIMITE_CONTEO
+    if clave is None:
+        filas = _filas_segun_estadisticas(queryset.model)
+        if filas is not None:
+            return filas, False
+    total = cache.get_or_set(
+        _CLAVE_CONTEO.format(clave or 'todos'), lambda: queryset.order_by().count(), TTL_CONTEO
+    )
+    return total, False
+
+
+class PaginacionUsuarios(CursorPagination):
+    ordering = '-id'
+    page_size = 50
+    page_size_query_param = 'limite'
+    max_page_size = 200
+
+    def get_paginated_response(self, data, total=None):
+        cuerpo = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+        if total is not None:
+            cuerpo['total_estimado'], cuerpo['total_minimo'] = total
+        return Response(cuerpo)
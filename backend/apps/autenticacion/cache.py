@@ -0,0 +1,79 @@
+"""Caché en memoria de usuarios autenticados.
+
+`JWTUsuarioAuthentication` resuelve el `Usuario` del token en cada petición.
+Esta caché LRU con caducidad guarda la instancia ya cargada (con su `Rol`)
+por id de usuario (compartida por todos los tokens del usuario). Se invalida
+al guardar o eliminar el usuario (señales) y al cambiar de contraseña; la
+caducidad acota el tiempo que un cambio hecho en otro proceso tarda en verse.
+
+Cada petición recibe una copia, de modo que las vistas pueden modificar
+`request.user` sin alterar la entrada compartida.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+MAX_ENTRADAS = 1024
+TTL_SEGUNDOS = 60
+
+
+class CacheUsuarios:
+    def __init__(self, max_entradas=MAX_ENTRADAS, ttl=TTL_SEGUNDOS):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, usuario_id):
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._entradas.get(usuario_id)
+            if entrada is None or entrada[0] <= ahora:
+                if entrada is not None:
+                    del self._entradas[usuario_id]
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(usuario_id)
+            self.aciertos += 1
+            usuario = entrada[1]
+        return _copiar(usuario)
+
+    def guardar(self, usuario):
+        if self.ttl <= 0 or self.max_entradas <= 0:
+            return
+        entrada = (time.monotonic() + self.ttl, _copiar(usuario))
+        with self._lock:
+            self._entradas[usuario.pk] = entrada
+            self._entradas.move_to_end(usuario.pk)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def invalidar(self, usuario_id):
+        with self._lock:
+            self._entradas.pop(usuario_id, None)
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def __len__(self):
+        return len(self._entradas)
+
+
+def _copiar(usuario):
+    copia = copy.copy(usuario)
+    copia._state = copy.copy(usuario._state)
+    copia._state.fields_cache = dict(usuario._state.fields_cache)
+    return copia
+
+
+_config = getattr(settings, 'CACHE_USUARIOS', {})
+usuarios = CacheUsuarios(
+    max_entradas=_config.get('MAX_ENTRADAS', MAX_ENTRADAS),
+    ttl=_config.get('TTL', TTL_SEGUNDOS),
+)
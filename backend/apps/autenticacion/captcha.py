@@ -0,0 +1,200 @@
+"""Verificación de reCAPTCHA para el registro.
+
+- Conexiones HTTP keep-alive reutilizadas (pool por proceso) con un timeout
+  corto (`RECAPTCHA_TIMEOUT`), en lugar de abrir una conexión TLS por registro.
+- Los tokens ya verificados se guardan en la caché `RECAPTCHA_CACHE_TTL`
+  segundos: si el cliente reintenta el registro con el mismo token (p. ej. tras
+  un error de validación) no se vuelve a verificar; Google rechazaría el token
+  por duplicado. Al crearse la cuenta el token se consume (`consumir`), así
+  que no sirve para registrar otra.
+- Circuit breaker: tras `RECAPTCHA_CIRCUITO_FALLOS` fallos seguidos del
+  verificador (red, timeout, 5xx) no se le llama durante
+  `RECAPTCHA_CIRCUITO_ESPERA` segundos; en ese tiempo se aplica
+  `RECAPTCHA_FAIL_OPEN`: aceptar el registro o rechazarlo con
+  `CaptchaNoDisponible`. Después se deja pasar una petición de prueba.
+
+`RECAPTCHA_VERIFY_URL` permite apuntar a un verificador local
+(`manage.py stub_recaptcha`).
+"""
+import hashlib
+import http.client
+import json
+import logging
+import queue
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+URL_POR_DEFECTO = 'https://www.google.com/recaptcha/api/siteverify'
+MAX_CONEXIONES = 8
+_CLAVE_CACHE = 'captcha:verificado:{}'
+
+
+class CaptchaNoDisponible(Exception):
+    """El verificador no responde y la política es fail-closed."""
+
+
+class _ErrorVerificador(Exception):
+    pass
+
+
+class _PoolHTTP:
+    """Conexiones keep-alive a un único host, reutilizadas entre peticiones."""
+
+    def __init__(self, url, max_conexiones=MAX_CONEXIONES):
+        partes = urlsplit(url)
+        self.url = url
+        self.ruta = partes.path or '/'
+        if partes.query:
+            self.ruta += f'?{partes.query}'
+        self._clase = http.client.HTTPSConnection if partes.scheme == 'https' else http.client.HTTPConnection
+        self._host = partes.hostname
+        self._puerto = partes.port
+        self._libres = queue.LifoQueue(maxsize=max_conexiones)
+
+    def _tomar(self, timeout):
+        try:
+            conexion = self._libres.get_nowait()
+            conexion.timeout = timeout
+            if conexion.sock is not None:
+                conexion.sock.settimeout(timeout)
+            return conexion
+        except queue.Empty:
+            return self._clase(self._host, self._puerto, timeout=timeout)
+
+    def _devolver(self, conexion):
+        try:
+            self._libres.put_nowait(conexion)
+        except queue.Full:
+            conexion.close()
+
+    def post(self, datos, timeout):
+        cuerpo = urlencode(datos).encode()
+        cabeceras = {'Content-Type': 'application/x-www-form-urlencoded', 'Connection': 'keep-alive'}
+        # Un segundo intento cubre conexiones keep-alive cerradas por el servidor
+        for intento in range(2):
+            conexion = self._tomar(timeout)
+            reutilizada = conexion.sock is not None
+            try:
+                conexion.request('POST', self.ruta, body=cuerpo, headers=cabeceras)
+                respuesta = conexion.getresponse()
+                contenido = respuesta.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conexion.close()
+                if reutilizada and intento == 0:
+                    continue
+                raise
+            except Exception:
+                conexion.close()
+                raise
+            if respuesta.will_close:
+                conexion.close()
+            else:
+                self._devolver(conexion)
+            return respuesta.status, contenido
+
+
+class _Circuito:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.fallos = 0
+        self.abierto_hasta = 0.0
+
+    def permite(self):
+        with self._lock:
+            if self.abierto_hasta and time.monotonic() < self.abierto_hasta:
+                return False
+            if self.abierto_hasta:
+                # Semiabierto: una petición de prueba; si falla se vuelve a abrir
+                self.abierto_hasta = time.monotonic() + _ajuste('RECAPTCHA_CIRCUITO_ESPERA', 30)
+            return True
+
+    def exito(self):
+        with self._lock:
+            self.fallos = 0
+            self.abierto_hasta = 0.0
+
+    def fallo(self):
+        with self._lock:
+            self.fallos += 1
+            if self.fallos >= _ajuste('RECAPTCHA_CIRCUITO_FALLOS', 5):
+                self.abierto_hasta = time.monotonic() + _ajuste('RECAPTCHA_CIRCUITO_ESPERA', 30)
+                logger.warning('Verificador reCAPTCHA no disponible; circuito abierto')
+
+
+def _ajuste(nombre, defecto):
+    return getattr(settings, nombre, defecto)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+circuito = _Circuito()
+
+
+def _obtener_pool():
+    global _pool
+    url = _ajuste('RECAPTCHA_VERIFY_URL', URL_POR_DEFECTO)
+    with _pool_lock:
+        if _pool is None or _pool.url != url:
+            _pool = _PoolHTTP(url)
+        return _pool
+
+
+def _consultar(token, ip):
+    datos = {'secret': settings.RECAPTCHA_SECRET_KEY or '', 'response': token}
+    if ip:
+        datos['remoteip'] = ip
+    try:
+        estado, contenido = _obtener_pool().post(datos, _ajuste('RECAPTCHA_TIMEOUT', 3))
+    except (OSError, http.client.HTTPException) as exc:
+        raise _ErrorVerificador(str(exc)) from exc
+    if estado >= 500:
+        raise _ErrorVerificador(f'HTTP {estado}')
+    try:
+        return bool(json.loads(contenido).get('success'))
+    except ValueError as exc:
+        raise _ErrorVerificador('Respuesta no válida') from exc
+
+
+def verificar(token, ip=None):
+    """True si el token es válido. Lanza CaptchaNoDisponible si el verificador falla en modo fail-closed."""
+    if not token:
+        return False
+    clave = _CLAVE_CACHE.format(hashlib.sha256(token.encode()).hexdigest())
+    if cache.get(clave):
+        return True
+    if not circuito.permite():
+        return _sin_verificador()
+    try:
+        valido = _consultar(token, ip)
+    except _ErrorVerificador as exc:
+        logger.warning('Fallo al verificar reCAPTCHA: %s', exc)
+        circuito.fallo()
+        return _sin_verificador()
+    circuito.exito()
+    if valido:
+        cache.set(clave, True, _ajuste('RECAPTCHA_CACHE_TTL', 120))
+    return valido
+
+
+def consumir(token):
+    """Olvida un token verificado: los reintentos tras un error ya no lo aceptarán desde la caché."""
+    if token:
+        cache.delete(_CLAVE_CACHE.format(hashlib.sha256(token.encode()).hexdigest()))
+
+
+def _sin_verificador():
+    if _ajuste('RECAPTCHA_FAIL_OPEN', False):
+        return True
+    raise CaptchaNoDisponible()
+
+
+# Variante para vistas async (ASGI): la petición bloqueante corre en un hilo
+# aparte sin ocupar el bucle de eventos.
+verificar_async = sync_to_async(verificar, thread_sensitive=False)
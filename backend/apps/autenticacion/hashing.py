@@ -0,0 +1,19 @@
+"""Funciones para el pool de procesos de hashing.
+
+Este módulo no importa modelos: los procesos hijos lo cargan antes de que
+`django.setup()` haya registrado las apps.
+"""
+import os
+
+
+def iniciar_proceso():
+    import django
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+    django.setup()
+
+
+def hashear(password):
+    from django.contrib.auth.hashers import make_password
+
+    return make_password(password)
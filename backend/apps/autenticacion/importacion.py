@@ -0,0 +1,264 @@
+"""Importación masiva de usuarios y artistas desde CSV o JSON Lines.
+
+Columnas reconocidas: email (obligatoria), username, password o password_hash
+(hash en formato Django, para migraciones desde otra plataforma), nombres,
+apellidos, nombre_artistico, telefono, direccion, rol (listener/artist/admin o
+el nombre del rol).
+
+Frente a registrar usuario por usuario:
+- los usernames se asignan en memoria (mismas reglas que el registro) a partir
+  de los existentes, leídos una sola vez;
+- las contraseñas se hashean en paralelo en un pool de procesos;
+- los usuarios y sus `UsuarioRol` se escriben con `bulk_create` por lotes.
+
+Cada lote se confirma junto con el avance de la `ImportacionUsuarios`, de modo
+que si la importación falla se puede reanudar desde la última fila confirmada.
+Las filas con email ya existente (o repetido en el archivo) se omiten, lo que
+hace segura también una reimportación completa.
+
+Los archivos subidos por la API pueden llevar contraseñas en claro: se guardan
+en IMPORTACIONES_DIR (fuera de MEDIA_ROOT, con nombre aleatorio y permisos
+0600) y se borran cuando la importación termina, bien o con error. Una
+importación interrumpida (proceso caído) conserva el archivo para reanudarla.
+"""
+import csv
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.hashers import identify_hasher
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import connection, transaction
+from django.db.models.functions import Lower
+
+from . import hashing, roles
+from .models import ImportacionUsuarios, Rol, Usuario, UsuarioRol, normalizar_email
+
+logger = logging.getLogger(__name__)
+
+TAMANO_LOTE = 500
+MAX_ERRORES = 100
+
+ROLES_IMPORTACION = {
+    'listener': Rol.LISTENER,
+    'artist': Rol.ARTIST,
+    'admin': Rol.ADMIN,
+}
+
+
+def leer_filas(ruta, formato):
+    """Itera las filas del archivo como diccionarios."""
+    if formato == 'csv':
+        with open(ruta, newline='', encoding='utf-8-sig') as archivo:
+            yield from csv.DictReader(archivo)
+    else:
+        with open(ruta, encoding='utf-8') as archivo:
+            for linea in archivo:
+                if linea.strip():
+                    yield json.loads(linea)
+
+
+class _AsignadorUsernames:
+    """Usernames únicos en memoria: base, base1, base2... ('Nombre 2' para artistas)."""
+
+    def __init__(self, existentes):
+        self.ocupados = existentes
+        self.siguiente = {}
+
+    def asignar(self, base, separador=''):
+        base = base[:140]
+        if base not in self.ocupados:
+            self.ocupados.add(base)
+            return base
+        n = self.siguiente.get((base, separador), 1)
+        while f'{base}{separador}{n}' in self.ocupados:
+            n += 1
+        self.siguiente[(base, separador)] = n + 1
+        username = f'{base}{separador}{n}'
+        self.ocupados.add(username)
+        return username
+
+
+class Importador:
+    def __init__(self, importacion, procesos=None, tamano_lote=TAMANO_LOTE, progreso=None):
+        self.importacion = importacion
+        self.procesos = procesos or os.cpu_count() or 1
+        self.tamano_lote = tamano_lote
+        self.progreso = progreso
+
+    def ejecutar(self):
+        imp = self.importacion
+        imp.estado = ImportacionUsuarios.EN_CURSO
+        imp.mensaje = ''
+        imp.save(update_fields=['estado', 'mensaje', 'actualizado_en'])
+        pool = None
+        try:
+            self.usernames = _AsignadorUsernames(set(Usuario.objects.values_list('username', flat=True)))
+            self.emails = set(
+                Usuario.objects.exclude(email='').annotate(e=Lower('email')).values_list('e', flat=True)
+            )
+            if self.procesos > 1:
+                pool = ProcessPoolExecutor(
+                    max_workers=self.procesos,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=hashing.iniciar_proceso,
+                )
+            filas = itertools.islice(leer_filas(imp.ruta, imp.formato), imp.procesadas, None)
+            while True:
+                lote = list(itertools.islice(filas, self.tamano_lote))
+                if not lote:
+                    break
+                self._procesar_lote(lote, pool)
+                if self.progreso:
+                    self.progreso(imp)
+            imp.estado = ImportacionUsuarios.COMPLETADA
+        except Exception as exc:
+            logger.exception('Importación de usuarios %s fallida', imp.pk)
+            # El avance en memoria puede incluir el lote revertido
+            imp.refresh_from_db(fields=['procesadas', 'creadas', 'omitidas', 'errores'])
+            imp.estado = ImportacionUsuarios.ERROR
+            imp.mensaje = str(exc)
+            raise
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+            imp.save(update_fields=['estado', 'mensaje', 'actualizado_en'])
+            descartar_subida(imp)
+        return imp
+
+    def _procesar_lote(self, lote, pool):
+        imp = self.importacion
+        usuarios, roles_usuario, por_hashear, errores = [], [], [], []
+        for numero, fila in enumerate(lote, start=imp.procesadas + 1):
+            try:
+                usuario, rol = self._preparar(fila)
+            except ValidationError as exc:
+                errores.append({'fila': numero, 'error': '; '.join(exc.messages)})
+                continue
+            usuarios.append(usuario)
+            roles_usuario.append(rol)
+            password = (fila.get('password') or '').strip()
+            if usuario.password is None and password:
+                por_hashear.append((len(usuarios) - 1, password))
+            elif usuario.password is None:
+                usuario.set_unusable_password()
+
+        if por_hashear:
+            claves = [p for _, p in por_hashear]
+            if pool is not None and len(claves) > 1:
+                hashes = pool.map(hashing.hashear, claves, chunksize=max(1, len(claves) // (self.procesos * 4)))
+            else:
+                hashes = map(hashing.hashear, claves)
+            for (indice, _), hash_ in zip(por_hashear, hashes):
+                usuarios[indice].password = hash_
+
+        with transaction.atomic():
+            creados = Usuario.objects.bulk_create(usuarios, batch_size=self.tamano_lote)
+            if creados and creados[0].pk is None:
+                # Backends sin RETURNING en bulk_create
+                ids = dict(Usuario.objects.filter(
+                    username__in=[u.username for u in creados]
+                ).values_list('username', 'pk'))
+                for u in creados:
+                    u.pk = ids[u.username]
+            UsuarioRol.objects.bulk_create(
+                [UsuarioRol(usuario_id=u.pk, rol=rol) for u, rol in zip(creados, roles_usuario)],
+                ignore_conflicts=True,
+            )
+            imp.procesadas += len(lote)
+            imp.creadas += len(creados)
+            imp.omitidas += len(lote) - len(creados)
+            imp.errores = (imp.errores + errores)[:MAX_ERRORES]
+            imp.save(update_fields=['procesadas', 'creadas', 'omitidas', 'errores', 'actualizado_en'])
+
+    def _preparar(self, fila):
+        email = normalizar_email(fila.get('email'))
+        validate_email(email)
+        if email in self.emails:
+            raise ValidationError('Ya existe un usuario con ese correo.')
+
+        rol_origen = (fila.get('rol') or fila.get('role') or 'listener').strip()
+        rol_nombre = ROLES_IMPORTACION.get(rol_origen.lower(), rol_origen)
+        if rol_nombre not in Rol.DEFAULTS:
+            raise ValidationError(f'Rol desconocido: {rol_origen}')
+        rol = roles.obtener(rol_nombre)
+
+        password_hash = (fila.get('password_hash') or '').strip() or None
+        if password_hash:
+            try:
+                identify_hasher(password_hash)
+            except ValueError:
+                raise ValidationError('password_hash no tiene un formato reconocido.')
+
+        nombre_artistico = (fila.get('nombre_artistico') or '').strip() or None
+        username = (fila.get('username') or '').strip()
+        if username:
+            if username in self.usernames.ocupados:
+                raise ValidationError('Ya existe un usuario con ese nombre de usuario.')
+            self.usernames.ocupados.add(username)
+        elif rol_nombre == Rol.ARTIST and nombre_artistico:
+            username = self.usernames.asignar(nombre_artistico, ' ')
+        else:
+            username = self.usernames.asignar(email.split('@')[0])
+
+        self.emails.add(email)
+        usuario = Usuario(
+            username=username,
+            email=email,
+            password=password_hash,
+            rol=rol,
+            nombres=(fila.get('nombres') or '')[:45],
+            apellidos=(fila.get('apellidos') or '')[:45],
+            nombre_artistico=nombre_artistico,
+            telefono=(fila.get('telefono') or '')[:15] or None,
+            direccion=(fila.get('direccion') or '')[:255] or None,
+        )
+        usuario.normalizar_busqueda()
+        return usuario, rol
+
+
+def guardar_subida(archivo, formato):
+    """Copia un archivo subido a IMPORTACIONES_DIR con nombre aleatorio; devuelve su ruta."""
+    directorio = Path(settings.IMPORTACIONES_DIR)
+    directorio.mkdir(parents=True, exist_ok=True, mode=0o700)
+    descriptor, ruta = tempfile.mkstemp(prefix='importacion-', suffix=f'.{formato}', dir=directorio)
+    with os.fdopen(descriptor, 'wb') as destino:
+        for trozo in archivo.chunks():
+            destino.write(trozo)
+    return ruta
+
+
+def descartar_subida(importacion):
+    """Borra el archivo de una importación terminada si vino de la API (los de la línea de comandos no se tocan)."""
+    if importacion.estado not in (ImportacionUsuarios.COMPLETADA, ImportacionUsuarios.ERROR):
+        return
+    ruta = Path(importacion.ruta)
+    if ruta.resolve().parent == Path(settings.IMPORTACIONES_DIR).resolve():
+        ruta.unlink(missing_ok=True)
+
+
+def importar(importacion, **kwargs):
+    return Importador(importacion, **kwargs).ejecutar()
+
+
+def importar_en_segundo_plano(importacion, **kwargs):
+    """Lanza la importación en un hilo (endpoint de administración); el avance se consulta en el modelo."""
+    def trabajo():
+        try:
+            importar(importacion, **kwargs)
+        except Exception:
+            pass  # ya registrado y guardado como estado ERROR
+        finally:
+            connection.close()
+
+    hilo = threading.Thread(target=trabajo, name=f'importacion-usuarios-{importacion.pk}', daemon=True)
+    hilo.start()
+    return hilo
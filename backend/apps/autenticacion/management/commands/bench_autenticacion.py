@@ -0,0 +1,78 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+from apps.autenticacion import cache
+from apps.autenticacion.models import Rol, Usuario
+from apps.autenticacion.tokens import RefreshConRol
+from apps.autenticacion.views import ProfileView
+from apps.reports.views import resumen_artista
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide consultas y latencia por petición autenticada (perfil y resumen de artista) '
+        'con la caché de usuarios desactivada y activada. Los datos se crean en una transacción que se revierte.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=50)
+        parser.add_argument('--peticiones', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                tokens = self._sembrar(options['usuarios'])
+                # resumen_artista usa la autenticación sin estado: sirve de referencia
+                for nombre, vista, ruta, ttls in (
+                    ('perfil', ProfileView.as_view(), '/api/auth/profile/', (0, cache.TTL_SEGUNDOS)),
+                    ('resumen artista', resumen_artista, '/api/reports/artista/resumen/', (0,)),
+                ):
+                    self.stdout.write(self.style.MIGRATE_HEADING(nombre))
+                    for ttl in ttls:
+                        self._escenario(vista, ruta, tokens, ttl, options['peticiones'])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _sembrar(self, total):
+        artista, _ = Rol.objects.get_or_create(nombre='Artista')
+        usuarios = Usuario.objects.bulk_create(
+            Usuario(username=f'bench_auth_{i}', email=f'bench_auth_{i}@example.com', rol=artista)
+            for i in range(total)
+        )
+        usuarios = Usuario.objects.select_related('rol').filter(pk__in=[u.pk for u in usuarios])
+        return [str(RefreshConRol.for_user(u).access_token) for u in usuarios]
+
+    def _escenario(self, vista, ruta, tokens, ttl, peticiones):
+        factory = APIRequestFactory()
+        rng = random.Random(0)
+        ttl_anterior = cache.usuarios.ttl
+        cache.usuarios.ttl = ttl
+        cache.usuarios.limpiar()
+        try:
+            with CaptureQueriesContext(connection) as consultas:
+                inicio = time.perf_counter()
+                for _ in range(peticiones):
+                    request = factory.get(ruta, HTTP_AUTHORIZATION=f'Bearer {rng.choice(tokens)}')
+                    respuesta = vista(request)
+                    if respuesta.status_code != 200:
+                        self.stderr.write(f'Respuesta inesperada {respuesta.status_code}: {respuesta.data}')
+                        return
+                transcurrido = time.perf_counter() - inicio
+        finally:
+            cache.usuarios.ttl = ttl_anterior
+            cache.usuarios.limpiar()
+        nombre = f'caché de usuarios (ttl={ttl}s)' if ttl else 'sin caché'
+        self.stdout.write(
+            f'  {nombre:<28} consultas/petición={len(consultas) / peticiones:5.2f} '
+            f'media={transcurrido / peticiones * 1000:6.3f} ms'
+        )
@@ -0,0 +1,152 @@
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import update_last_login
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings, setup_databases, teardown_databases
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+from rest_framework.response import Response
+
+from backend import escritura
+
+from apps.autenticacion.models import Rol, Usuario
+from apps.autenticacion.tokens import RefreshConRol
+from apps.autenticacion.views import CookieLoginView
+
+CONTRASENA = 'bench-login-123'
+HASHER_RAPIDO = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+class _LoginAnterior(APIView):
+    """Camino de login previo: búsqueda por email, authenticate por username, rol y last_login en la petición."""
+
+    def post(self, request):
+        email = request.data.get('email')
+        try:
+            usuario = Usuario.objects.por_email(email).get()
+            user = authenticate(username=usuario.username, password=request.data.get('password'))
+        except Usuario.DoesNotExist:
+            return Response(status=401)
+        if user is None:
+            return Response(status=401)
+        refresh = RefreshConRol.for_user(user)
+        str(refresh.access_token)
+        if not user.rol:
+            user.rol, _ = Rol.objects.get_or_create(nombre='Usuario')
+            user.save()
+        update_last_login(None, user)
+        return Response({'refresh': str(refresh)})
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide el rendimiento del login bajo concurrencia (camino anterior vs EmailBackend con escrituras en lote) '
+        'sobre una base de datos temporal.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=200)
+        parser.add_argument('--hilos', type=int, default=8)
+        parser.add_argument('--logins', type=int, default=50, help='Logins por hilo.')
+        parser.add_argument(
+            '--hasher-real', action='store_true',
+            help='Usa los PASSWORD_HASHERS configurados (por defecto MD5, para que domine el coste de BD).',
+        )
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directorio:
+            connection.settings_dict.setdefault('TEST', {})['NAME'] = str(Path(directorio) / 'bench_login.sqlite3')
+            anteriores = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+            try:
+                if options['hasher_real']:
+                    self._ejecutar(options)
+                else:
+                    with override_settings(PASSWORD_HASHERS=HASHER_RAPIDO):
+                        self._ejecutar(options)
+            finally:
+                escritura.esperar(10)
+                teardown_databases(anteriores, verbosity=0)
+
+    def _ejecutar(self, options):
+        escenarios = (
+            ('anterior', _LoginAnterior.as_view(), False),
+            ('EmailBackend, escrituras en línea', CookieLoginView.as_view(), False),
+            ('EmailBackend, escritor serializado', CookieLoginView.as_view(), True),
+        )
+        for indice, (nombre, vista, serializada) in enumerate(escenarios):
+            emails = self._sembrar(f'b{indice}', options['usuarios'])
+            with override_settings(ESCRITURA_SERIALIZADA=serializada):
+                consultas = self._consultas_por_login(vista, emails[:20])
+                latencias, errores, total = self._carga(vista, emails, options)
+                escritura.esperar(10)
+            self.stdout.write(self.style.MIGRATE_HEADING(nombre))
+            self.stdout.write(
+                f'  logins/s={len(latencias) / total:8.1f} consultas/login={consultas:5.2f} errores={errores} '
+                f'p50={_percentil(latencias, 0.5) * 1000:7.2f} ms p99={_percentil(latencias, 0.99) * 1000:8.2f} ms'
+            )
+        pendientes = Usuario.objects.filter(email__startswith='b', rol__isnull=True).count()
+        self.stdout.write(f'Usuarios sin rol tras la carga: {pendientes}')
+
+    def _sembrar(self, prefijo, total):
+        hash_ = make_password(CONTRASENA)
+        Usuario.objects.bulk_create(
+            Usuario(username=f'{prefijo}_{i}', email=f'{prefijo}_{i}@bench.local', password=hash_)
+            for i in range(total)
+        )
+        return [f'{prefijo}_{i}@bench.local' for i in range(total)]
+
+    def _consultas_por_login(self, vista, emails):
+        factory = APIRequestFactory()
+        with CaptureQueriesContext(connection) as consultas:
+            for email in emails:
+                vista(factory.post('/api/auth/login/', {'email': email, 'password': CONTRASENA}, format='json'))
+        return len(consultas) / len(emails)
+
+    def _carga(self, vista, emails, options):
+        factory = APIRequestFactory()
+        latencias, errores = [], [0]
+        lock = threading.Lock()
+        inicio = threading.Barrier(options['hilos'])
+
+        def hilo(n):
+            propios = []
+            inicio.wait()
+            try:
+                for i in range(options['logins']):
+                    email = emails[(n * options['logins'] + i) % len(emails)]
+                    request = factory.post('/api/auth/login/', {'email': email, 'password': CONTRASENA}, format='json')
+                    t0 = time.perf_counter()
+                    try:
+                        ok = vista(request).status_code == 200
+                    except Exception:
+                        ok = False
+                    if ok:
+                        propios.append(time.perf_counter() - t0)
+                    else:
+                        with lock:
+                            errores[0] += 1
+            finally:
+                connection.close()
+            with lock:
+                latencias.extend(propios)
+
+        t0 = time.perf_counter()
+        hilos = [threading.Thread(target=hilo, args=(n,)) for n in range(options['hilos'])]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+        return latencias, errores[0], time.perf_counter() - t0
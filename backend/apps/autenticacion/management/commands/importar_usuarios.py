@@ -0,0 +1,63 @@
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.autenticacion.importacion import TAMANO_LOTE, importar
+from apps.autenticacion.models import ImportacionUsuarios
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa usuarios y artistas desde CSV o JSONL con hashing en paralelo y bulk_create. '
+        'Si falla, se reanuda con --reanudar <id>.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', nargs='?', help='Ruta del CSV/JSONL (no necesaria con --reanudar).')
+        parser.add_argument('--formato', choices=['csv', 'jsonl'], help='Por defecto, según la extensión.')
+        parser.add_argument('--reanudar', type=int, metavar='ID', help='Continúa una importación fallida.')
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE)
+        parser.add_argument('--procesos', type=int, default=None, help='Procesos para hashear (por defecto, CPUs).')
+
+    def handle(self, *args, **options):
+        if options['reanudar']:
+            try:
+                importacion = ImportacionUsuarios.objects.get(pk=options['reanudar'])
+            except ImportacionUsuarios.DoesNotExist:
+                raise CommandError(f'No existe la importación {options["reanudar"]}')
+            if importacion.estado == ImportacionUsuarios.COMPLETADA:
+                raise CommandError('La importación ya está completada')
+            if not Path(importacion.ruta).exists():
+                raise CommandError(f'El archivo de la importación ya no existe: {importacion.ruta}')
+            self.stdout.write(f'Reanudando importación {importacion.pk} desde la fila {importacion.procesadas + 1}')
+        else:
+            if not options['archivo']:
+                raise CommandError('Indica el archivo a importar o --reanudar <id>')
+            ruta = Path(options['archivo']).resolve()
+            if not ruta.exists():
+                raise CommandError(f'No existe {ruta}')
+            formato = options['formato'] or ('jsonl' if ruta.suffix.lower() in ('.jsonl', '.ndjson') else 'csv')
+            importacion = ImportacionUsuarios.objects.create(ruta=str(ruta), formato=formato)
+            self.stdout.write(f'Importación {importacion.pk}: {ruta}')
+
+        inicio = time.monotonic()
+
+        def progreso(imp):
+            ritmo = imp.creadas / max(time.monotonic() - inicio, 1e-6)
+            self.stdout.write(
+                f'  filas={imp.procesadas} creadas={imp.creadas} omitidas={imp.omitidas} ({ritmo:.0f} usuarios/s)'
+            )
+
+        try:
+            importar(importacion, procesos=options['procesos'], tamano_lote=options['lote'], progreso=progreso)
+        except Exception as exc:
+            raise CommandError(
+                f'Importación {importacion.pk} interrumpida en la fila {importacion.procesadas + 1}: {exc}. '
+                f'Reanudar con: manage.py importar_usuarios --reanudar {importacion.pk}'
+            )
+        for error in importacion.errores[:20]:
+            self.stdout.write(self.style.WARNING(f'  fila {error["fila"]}: {error["error"]}'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Importación {importacion.pk} completada: {importacion.creadas} creados, {importacion.omitidas} omitidos'
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apps.autenticacion import revocacion
+
+
+class Command(BaseCommand):
+    help = 'Elimina las revocaciones de tokens que ya han caducado (programar periódicamente, p. ej. con cron).'
+
+    def handle(self, *args, **options):
+        borrados = revocacion.purgar()
+        self.stdout.write(self.style.SUCCESS(f'{borrados} revocaciones caducadas eliminadas'))
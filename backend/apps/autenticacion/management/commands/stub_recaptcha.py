@@ -0,0 +1,66 @@
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from django.core.management.base import BaseCommand
+
+
+class _Verificador(BaseHTTPRequestHandler):
+    """Imita siteverify: los tokens que empiezan por 'ok' son válidos."""
+
+    protocol_version = 'HTTP/1.1'  # keep-alive, como el servicio real
+    disable_nagle_algorithm = True
+    latencia = 0.0
+    tasa_error = 0.0
+
+    def do_POST(self):
+        longitud = int(self.headers.get('Content-Length') or 0)
+        datos = parse_qs(self.rfile.read(longitud).decode())
+        if self.latencia:
+            time.sleep(self.latencia)
+        if random.random() < self.tasa_error:
+            self._responder(500, {'success': False})
+            return
+        token = (datos.get('response') or [''])[0]
+        exito = token.startswith('ok')
+        self._responder(200, {'success': exito} if exito else {'success': False, 'error-codes': ['invalid-input-response']})
+
+    def _responder(self, estado, cuerpo):
+        contenido = json.dumps(cuerpo).encode()
+        self.send_response(estado)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(contenido)))
+        self.end_headers()
+        self.wfile.write(contenido)
+
+    def log_message(self, formato, *args):
+        pass
+
+
+def crear_servidor(puerto=0, latencia=0.0, tasa_error=0.0):
+    manejador = type('Verificador', (_Verificador,), {'latencia': latencia, 'tasa_error': tasa_error})
+    return ThreadingHTTPServer(('127.0.0.1', puerto), manejador)
+
+
+class Command(BaseCommand):
+    help = (
+        'Verificador reCAPTCHA local para desarrollo y pruebas. Usar con '
+        'RECAPTCHA_VERIFY_URL=http://127.0.0.1:<puerto>/siteverify; los tokens "ok..." son válidos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--puerto', type=int, default=8765)
+        parser.add_argument('--latencia', type=float, default=0.0, help='Segundos de espera por respuesta.')
+        parser.add_argument('--tasa-error', type=float, default=0.0, help='Fracción de respuestas 500.')
+
+    def handle(self, *args, **options):
+        servidor = crear_servidor(options['puerto'], options['latencia'], options['tasa_error'])
+        self.stdout.write(f'Verificador en http://127.0.0.1:{servidor.server_address[1]}/siteverify')
+        try:
+            servidor.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            servidor.server_close()
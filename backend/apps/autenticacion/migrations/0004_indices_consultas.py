@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:32
+
+import apps.autenticacion.models
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('autenticacion', '0003_usuario_nombre_artistico_alter_usuario_username'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='usuario',
+            managers=[
+                ('objects', apps.autenticacion.models.UsuarioManager()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='usuario_email_lower_idx'),
+        ),
+    ]
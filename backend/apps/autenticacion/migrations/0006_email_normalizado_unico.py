@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:42
+
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models.functions import Lower, Trim
+
+
+def normalizar_emails(apps, schema_editor):
+    Usuario = apps.get_model('autenticacion', 'Usuario')
+    Usuario.objects.exclude(email='').update(email=Lower(Trim('email')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('autenticacion', '0005_tokens_revocados'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalizar_emails, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='usuario',
+            name='usuario_email_lower_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='usuario',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), condition=models.Q(('email', ''), _negated=True), name='usuario_email_lower_uniq'),
+        ),
+    ]
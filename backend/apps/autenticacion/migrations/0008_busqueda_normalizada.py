@@ -0,0 +1,68 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:54
+
+from django.db import migrations, models
+
+from apps.autenticacion.models import normalizar_texto
+
+CAMPOS = {
+    'username_normalizado': ('username', 150),
+    'nombres_normalizado': ('nombres', 45),
+    'apellidos_normalizado': ('apellidos', 45),
+}
+
+
+def rellenar_normalizados(apps, schema_editor):
+    Usuario = apps.get_model('autenticacion', 'Usuario')
+    lote = []
+    for usuario in Usuario.objects.only('id', 'username', 'nombres', 'apellidos').iterator(chunk_size=2000):
+        for campo, (origen, limite) in CAMPOS.items():
+            setattr(usuario, campo, normalizar_texto(getattr(usuario, origen))[:limite])
+        lote.append(usuario)
+        if len(lote) >= 2000:
+            Usuario.objects.bulk_update(lote, list(CAMPOS))
+            lote = []
+    if lote:
+        Usuario.objects.bulk_update(lote, list(CAMPOS))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('autenticacion', '0007_importacion_usuarios'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usuario',
+            name='apellidos_normalizado',
+            field=models.CharField(default='', editable=False, max_length=45),
+        ),
+        migrations.AddField(
+            model_name='usuario',
+            name='nombres_normalizado',
+            field=models.CharField(default='', editable=False, max_length=45),
+        ),
+        migrations.AddField(
+            model_name='usuario',
+            name='username_normalizado',
+            field=models.CharField(default='', editable=False, max_length=150),
+        ),
+        migrations.RunPython(rellenar_normalizados, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(fields=['username_normalizado'], name='usuario_username_norm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(fields=['nombres_normalizado'], name='usuario_nombres_norm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(fields=['apellidos_normalizado'], name='usuario_apellidos_norm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(fields=['rol', '-id'], name='usuario_rol_id_idx'),
+        ),
+    ]
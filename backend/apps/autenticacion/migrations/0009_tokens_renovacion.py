@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 19:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('autenticacion', '0008_busqueda_normalizada'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tokenrevocado',
+            name='solo_acceso',
+            field=models.BooleanField(default=False),
+        ),
+    ]
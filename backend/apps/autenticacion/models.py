@@ -1,5 +1,9 @@
+import re
+import unicodedata
+
 from django.db import models
-from django.contrib.auth.models import AbstractUser
+from django.db.models.functions import Cast, Lower, Substr
+from django.contrib.auth.models import AbstractUser, UserManager
 
 
 class TimeStampedModel(models.Model):
@@ -36,16 +40,16 @@ class Rol(models.Model):
     def __str__(self):
         return f"{self.nombre} (Nivel {self.nivel})"
 
+    DEFAULTS = {
+        ADMIN: {'nivel': 3, 'default': False},
+        ARTIST: {'nivel': 2, 'default': False},
+        LISTENER: {'nivel': 1, 'default': True},
+    }
+
     @classmethod
     def create_default_roles(cls):
         """Crea los roles por defecto si no existen"""
-        roles = {
-            cls.ADMIN: {'nivel': 3, 'default': False},
-            cls.ARTIST: {'nivel': 2, 'default': False},
-            cls.LISTENER: {'nivel': 1, 'default': True},
-        }
-        
-        for nombre, data in roles.items():
+        for nombre, data in cls.DEFAULTS.items():
             cls.objects.get_or_create(
                 nombre=nombre,
                 defaults={'nivel': data['nivel'], 'default': data['default']}
@@ -84,6 +88,68 @@ class RecursoRol(models.Model):
         return f"{self.rol} → {self.recurso}"
 
 
+def normalizar_email(email):
+    return (email or '').strip().lower()
+
+
+def normalizar_texto(texto):
+    """Forma de búsqueda: sin acentos, en minúsculas y con los espacios colapsados."""
+    descompuesto = unicodedata.normalize('NFKD', texto or '')
+    sin_acentos = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    return ' '.join(sin_acentos.casefold().split())
+
+
+def _rango_prefijo(campo, prefijo):
+    # Rango en lugar de LIKE/icontains: usa el índice B-tree en cualquier base de datos
+    return models.Q(**{f'{campo}__gte': prefijo, f'{campo}__lt': prefijo + '\uffff'})
+
+
+class UsuarioManager(UserManager):
+    def por_email(self, email):
+        """Búsqueda por email sin distinguir mayúsculas que usa el índice único LOWER(email)."""
+        # La exclusión de vacíos repite la condición del índice parcial para que SQLite lo use
+        return self.alias(email_normalizado=Lower('email')).filter(
+            email_normalizado=normalizar_email(email)
+        ).exclude(email='')
+
+    def username_disponible(self, base, separador=''):
+        """Primer username libre de la forma `base`, `base<sep>N`, resuelto con una consulta.
+
+        Busca el mayor sufijo numérico existente con un rango sobre el índice
+        único de username (base<sep>0 .. base<sep>9) en lugar de probar uno a uno.
+        """
+        prefijo = f'{base}{separador}'
+        sufijo = Cast(Substr('username', len(prefijo) + 1), models.IntegerField())
+        resultado = self.filter(
+            models.Q(username=base)
+            | models.Q(
+                username__gte=f'{prefijo}0',
+                username__lt=f'{prefijo}:',  # ':' sigue a '9' en ASCII
+                username__regex=rf'^{re.escape(prefijo)}[0-9]+$',
+            )
+        ).aggregate(
+            base_ocupado=models.Count('pk', filter=models.Q(username=base)),
+            maximo=models.Max(sufijo, filter=~models.Q(username=base)),
+        )
+        if not resultado['base_ocupado']:
+            return base
+        return f'{prefijo}{(resultado["maximo"] or 0) + 1}'
+
+    def buscar(self, texto):
+        """Usuarios cuyo username, email, nombres o apellidos empiezan por cada palabra de `texto`.
+
+        Sin distinguir mayúsculas ni acentos; cada palabra puede coincidir con un
+        campo distinto ("ana gom" encuentra a Ana Gómez).
+        """
+        queryset = self.alias(email_normalizado=Lower('email'))
+        for palabra in normalizar_texto(texto).split():
+            condicion = models.Q(_rango_prefijo('email_normalizado', palabra), ~models.Q(email=''))
+            for campo in Usuario.CAMPOS_NORMALIZADOS:
+                condicion |= _rango_prefijo(campo, palabra)
+            queryset = queryset.filter(condicion)
+        return queryset
+
+
 class Usuario(AbstractUser):
     # Sobrescribir username para permitir espacios y caracteres especiales para artistas
     username = models.CharField(
@@ -105,6 +171,16 @@ class Usuario(AbstractUser):
     fecha_nacimiento = models.DateField(verbose_name="Fecha de nacimiento", null=True, blank=True)
     cedula = models.CharField(max_length=20, verbose_name="Cédula", blank=True, null=True)
     emergencyContact = models.CharField(max_length=100, verbose_name="Contacto de emergencia", blank=True, null=True)
+
+    # Copias normalizadas (normalizar_texto) para la búsqueda por prefijo; se rellenan al guardar
+    username_normalizado = models.CharField(max_length=150, default='', editable=False)
+    nombres_normalizado = models.CharField(max_length=45, default='', editable=False)
+    apellidos_normalizado = models.CharField(max_length=45, default='', editable=False)
+    CAMPOS_NORMALIZADOS = {
+        'username_normalizado': 'username',
+        'nombres_normalizado': 'nombres',
+        'apellidos_normalizado': 'apellidos',
+    }
     
     # Sobrescribir las relaciones de grupos y permisos para evitar conflictos
     groups = models.ManyToManyField(
@@ -122,13 +198,52 @@ class Usuario(AbstractUser):
         related_query_name='custom_user'
     )
 
+    objects = UsuarioManager()
+
     class Meta:
         verbose_name = "Perfil de usuario"
         verbose_name_plural = "Perfiles de usuarios"
+        constraints = [
+            # Email único sin distinguir mayúsculas; los usuarios sin email quedan fuera
+            models.UniqueConstraint(Lower('email'), condition=~models.Q(email=''), name='usuario_email_lower_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['username_normalizado'], name='usuario_username_norm_idx'),
+            models.Index(fields=['nombres_normalizado'], name='usuario_nombres_norm_idx'),
+            models.Index(fields=['apellidos_normalizado'], name='usuario_apellidos_norm_idx'),
+            # Listado por rol paginado por id (más recientes primero)
+            models.Index(fields=['rol', '-id'], name='usuario_rol_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.nombres} {self.apellidos}" if self.nombres and self.apellidos else self.username
 
+    def save(self, *args, **kwargs):
+        diferidos = self.get_deferred_fields()
+        if 'email' not in diferidos:
+            self.email = normalizar_email(self.email)
+        self.normalizar_busqueda(diferidos)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, *(
+                campo for campo, origen in self.CAMPOS_NORMALIZADOS.items() if origen in update_fields
+            )}
+        super().save(*args, **kwargs)
+
+    def normalizar_busqueda(self, diferidos=()):
+        """Rellena los campos *_normalizado; bulk_create no pasa por save() y debe llamarlo."""
+        for campo, origen in self.CAMPOS_NORMALIZADOS.items():
+            if origen not in diferidos:
+                limite = self._meta.get_field(campo).max_length
+                setattr(self, campo, normalizar_texto(getattr(self, origen))[:limite])
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Valores con los que se emitieron los claims del token, para detectar cambios al guardar
+        instancia._claims_cargados = (instancia.__dict__.get('rol_id'), instancia.__dict__.get('is_staff'))
+        return instancia
+
 
 class UsuarioRol(models.Model):
     usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='roles_asignados')
@@ -142,3 +257,63 @@ class UsuarioRol(models.Model):
 
     def __str__(self):
         return f"{self.usuario} → {self.rol}"
+
+
+class TokenRevocado(models.Model):
+    """Tokens revocados antes de caducar (logout, rotación, cambio de contraseña).
+
+    Las filas con `emitidos_antes` revocan todos los tokens del usuario emitidos
+    antes de ese instante; su `jti` es `usuario:<id>:<marca>`. Con `solo_acceso`
+    (cambio de rol, `jti` `renovar:<id>:<marca>`) solo afectan a los tokens de
+    acceso: el refresh sigue sirviendo para obtener uno con el rol nuevo.
+    """
+    jti = models.CharField(max_length=255, unique=True)
+    usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE, null=True, blank=True, related_name='tokens_revocados')
+    emitidos_antes = models.DateTimeField(null=True, blank=True)
+    solo_acceso = models.BooleanField(default=False)
+    expira_en = models.DateTimeField(db_index=True)
+    revocado_en = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Token revocado"
+        verbose_name_plural = "Tokens revocados"
+
+    def __str__(self):
+        return self.jti
+
+
+class ImportacionUsuarios(TimeStampedModel):
+    """Importación masiva de usuarios desde CSV/JSONL (ver apps.autenticacion.importacion).
+
+    `procesadas` cuenta las filas del archivo ya confirmadas; se actualiza en la
+    misma transacción que cada lote, así que una importación fallida se reanuda
+    exactamente desde ahí.
+    """
+    PENDIENTE = 'pendiente'
+    EN_CURSO = 'en_curso'
+    COMPLETADA = 'completada'
+    ERROR = 'error'
+    ESTADOS = [
+        (PENDIENTE, 'Pendiente'),
+        (EN_CURSO, 'En curso'),
+        (COMPLETADA, 'Completada'),
+        (ERROR, 'Error'),
+    ]
+    FORMATOS = [('csv', 'CSV'), ('jsonl', 'JSON Lines')]
+
+    ruta = models.CharField(max_length=500)
+    formato = models.CharField(max_length=10, choices=FORMATOS)
+    estado = models.CharField(max_length=20, choices=ESTADOS, default=PENDIENTE)
+    procesadas = models.PositiveIntegerField(default=0)
+    creadas = models.PositiveIntegerField(default=0)
+    omitidas = models.PositiveIntegerField(default=0)
+    errores = models.JSONField(default=list, blank=True)
+    mensaje = models.TextField(blank=True)
+    creado_por = models.ForeignKey(Usuario, on_delete=models.SET_NULL, null=True, blank=True, related_name='importaciones')
+
+    class Meta:
+        verbose_name = "Importación de usuarios"
+        verbose_name_plural = "Importaciones de usuarios"
+
+    def __str__(self):
+        return f"Importación {self.pk} ({self.estado})"
@@ -0,0 +1,81 @@
+"""Árbol de navegación por rol a partir de `Recurso` / `RecursoRol`.
+
+El árbol se construye con una sola consulta: todos los recursos con los
+permisos del rol unidos mediante un LEFT JOIN filtrado, y se ensambla en
+memoria. Se guarda en la caché por rol; cualquier cambio en `Recurso` o
+`RecursoRol` (señales) incrementa la versión de la caché y deja obsoletos los
+árboles de todos los roles.
+
+Un recurso aparece si el rol tiene `view`; un recurso sin `view` solo aparece
+como agrupador cuando alguno de sus descendientes es visible.
+"""
+from django.core.cache import cache
+from django.db.models import FilteredRelation, Q
+
+from .models import Recurso
+
+TTL = 3600
+_CLAVE_VERSION = 'navegacion:version'
+_CLAVE_ARBOL = 'navegacion:v{}:rol:{}'
+
+_CAMPOS = ('id', 'nombre', 'icono', 'path_frontend', 'path_backend', 'metodo_http', 'orden', 'padre_id')
+_PERMISOS = ('view', 'create', 'update', 'delete')
+
+
+def _version():
+    version = cache.get(_CLAVE_VERSION)
+    if version is None:
+        cache.add(_CLAVE_VERSION, 1, None)
+        version = cache.get(_CLAVE_VERSION, 1)
+    return version
+
+
+def invalidar():
+    try:
+        cache.incr(_CLAVE_VERSION)
+    except ValueError:
+        cache.set(_CLAVE_VERSION, 1, None)
+
+
+def construir(rol_id):
+    filas = (
+        Recurso.objects
+        .annotate(permiso=FilteredRelation('roles', condition=Q(roles__rol_id=rol_id)))
+        .values(*_CAMPOS, *(f'permiso__{p}' for p in _PERMISOS))
+    )
+    nodos = {}
+    for fila in filas:
+        nodo = {campo: fila[campo] for campo in _CAMPOS if campo != 'padre_id'}
+        nodo['permisos'] = {p: bool(fila[f'permiso__{p}']) for p in _PERMISOS}
+        nodo['hijos'] = []
+        nodos[fila['id']] = (nodo, fila['padre_id'])
+
+    raices = []
+    for nodo, padre_id in nodos.values():
+        if padre_id is None:
+            raices.append(nodo)
+        elif padre_id in nodos:
+            nodos[padre_id][0]['hijos'].append(nodo)
+    # Los recursos en un ciclo de `padre` no cuelgan de ninguna raíz y quedan fuera
+    return _podar(raices)
+
+
+def _podar(nodos):
+    visibles = []
+    for nodo in sorted(nodos, key=lambda n: (n['orden'], n['nombre'])):
+        nodo['hijos'] = _podar(nodo['hijos'])
+        if nodo['permisos']['view'] or nodo['hijos']:
+            visibles.append(nodo)
+    return visibles
+
+
+def arbol(rol_id):
+    """Árbol de navegación del rol, desde la caché si está disponible."""
+    if rol_id is None:
+        return []
+    clave = _CLAVE_ARBOL.format(_version(), rol_id)
+    resultado = cache.get(clave)
+    if resultado is None:
+        resultado = construir(rol_id)
+        cache.set(clave, resultado, TTL)
+    return resultado
@@ -1,26 +1,37 @@
 from rest_framework.permissions import BasePermission
 
+from .tokens import ROL_CLAIM
+
+
+def rol_de(request):
+    """Nombre del rol en minúsculas.
+
+    Se lee del claim del token validado, sin consultas. Las peticiones sin
+    token JWT (p. ej. sesión del admin de Django) recurren al rol del usuario.
+    """
+    token = getattr(request, 'auth', None)
+    if token is not None and hasattr(token, 'get'):
+        return (token.get(ROL_CLAIM) or '').lower()
+    user = getattr(request, 'user', None)
+    rol = getattr(user, 'rol', None)
+    if rol is not None and getattr(rol, 'nombre', None):
+        return rol.nombre.lower()
+    return ''
+
+
 class IsAdminRole(BasePermission):
 
     ADMIN_NAMES = ['administrador', 'admin']
 
     def has_permission(self, request, view):
-        user = request.user
-        # Verifica el campo rol directamente en el usuario
-        if hasattr(user, 'rol') and user.rol and hasattr(user.rol, 'nombre'):
-            return user.rol.nombre.lower() in self.ADMIN_NAMES
-        return False
+        return rol_de(request) in self.ADMIN_NAMES
 
 class IsUserRole(BasePermission):
 
     USER_NAMES = ['Usuario', 'usuario', 'user', 'User']
-    
+
     def has_permission(self, request, view):
-        user = request.user
-        perfil = getattr(user, 'perfil', None)
-        if perfil and perfil.rol and perfil.rol.nombre:
-            return perfil.rol.nombre.lower() in self.USER_NAMES
-        return False
+        return rol_de(request) in [n.lower() for n in self.USER_NAMES]
 
 
 class IsArtistaOrAdmin(BasePermission):
@@ -40,14 +51,5 @@ class IsArtistaOrAdmin(BasePermission):
         if not user or not getattr(user, 'is_authenticated', False):
             return False
 
-        # intentamos leer rol de forma robusta
-        rol_nombre = ''
-        if hasattr(user, 'rol') and user.rol and getattr(user.rol, 'nombre', None):
-            rol_nombre = user.rol.nombre.lower()
-        else:
-            # fallback: algunos modelos usan perfil.rol
-            perfil = getattr(user, 'perfil', None)
-            if perfil and getattr(perfil, 'rol', None) and getattr(perfil.rol, 'nombre', None):
-                rol_nombre = perfil.rol.nombre.lower()
-
+        rol_nombre = rol_de(request)
         return rol_nombre in self.ARTIST_NAMES or rol_nombre in self.ADMIN_NAMES
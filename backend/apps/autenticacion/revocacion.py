@@ -0,0 +1,174 @@
+"""Revocación de tokens JWT.
+
+Los `jti` revocados se guardan en `TokenRevocado` hasta que el token caduca
+(`purgar_tokens_revocados` elimina los vencidos). Para no consultar la base de
+datos en cada petición, cada proceso mantiene un filtro de Bloom con los `jti`
+revocados: si el `jti` no está en el filtro, el token no está revocado y no hay
+E/S. Solo los aciertos del filtro (revocados reales o falsos positivos) se
+confirman con una consulta.
+
+Las revocaciones por usuario (cambio de contraseña) se guardan como filas con
+`emitidos_antes` y se mantienen en memoria como marca por usuario. Las marcas
+de renovación (cambio de rol) son filas iguales con `solo_acceso`: invalidan
+los tokens de acceso anteriores pero no los refresh, con los que el cliente
+obtiene un acceso con el rol nuevo.
+
+El filtro se sincroniza de forma incremental (filas con id mayor que la última
+vista) como mucho cada `INTERVALO` segundos, y se reconstruye por completo cada
+`RECONSTRUCCION` segundos o al saturarse, para descartar lo ya purgado. Una
+revocación hecha en otro proceso tarda como máximo `INTERVALO` segundos en
+aplicarse aquí; en el proceso que revoca es inmediata.
+"""
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+
+from .bloom import FiltroBloom
+from .models import TokenRevocado
+
+INTERVALO = 5
+RECONSTRUCCION = 3600
+CAPACIDAD = 100000
+ERROR = 0.001
+
+_config = getattr(settings, 'REVOCACION_TOKENS', {})
+
+
+def _desde_epoch(segundos):
+    return datetime.fromtimestamp(segundos, tz=dt_timezone.utc)
+
+
+class _Frente:
+    """Estado en memoria del proceso: filtro de `jti`, marcas de revocación y de renovación por usuario."""
+
+    def __init__(self):
+        self.intervalo = _config.get('INTERVALO', INTERVALO)
+        self.reconstruccion = _config.get('RECONSTRUCCION', RECONSTRUCCION)
+        self.capacidad = _config.get('CAPACIDAD', CAPACIDAD)
+        self.error = _config.get('ERROR', ERROR)
+        self._lock = threading.Lock()
+        self._reiniciar(self.capacidad)
+        self.reconstruido_en = None
+
+    def _reiniciar(self, capacidad):
+        self.filtro = FiltroBloom(capacidad, self.error)
+        self.marcas = {}
+        self.renovaciones = {}
+        self.ultimo_id = 0
+        self.sincronizado_en = 0.0
+
+    def _cargar(self, filas):
+        for id_, jti, usuario_id, emitidos_antes, solo_acceso in filas:
+            self.ultimo_id = max(self.ultimo_id, id_)
+            self.anotar(jti, usuario_id, emitidos_antes, solo_acceso)
+
+    def anotar(self, jti, usuario_id=None, emitidos_antes=None, solo_acceso=False):
+        if emitidos_antes is None:
+            self.filtro.agregar(jti)
+        else:
+            marcas = self.renovaciones if solo_acceso else self.marcas
+            marca = int(emitidos_antes.timestamp())
+            marcas[usuario_id] = max(marca, marcas.get(usuario_id, 0))
+
+    def sincronizar(self, forzar=False):
+        ahora = time.monotonic()
+        if not forzar and ahora - self.sincronizado_en < self.intervalo:
+            return
+        with self._lock:
+            if not forzar and ahora - self.sincronizado_en < self.intervalo:
+                return
+            campos = ('id', 'jti', 'usuario_id', 'emitidos_antes', 'solo_acceso')
+            if (
+                self.reconstruido_en is None
+                or ahora - self.reconstruido_en >= self.reconstruccion
+                or self.filtro.saturado
+            ):
+                vigentes = TokenRevocado.objects.filter(expira_en__gt=timezone.now())
+                self._reiniciar(max(self.capacidad, 2 * vigentes.count()))
+                self._cargar(vigentes.values_list(*campos).iterator())
+                self.reconstruido_en = ahora
+            else:
+                self._cargar(TokenRevocado.objects.filter(id__gt=self.ultimo_id).values_list(*campos))
+            self.sincronizado_en = ahora
+
+
+_frente = _Frente()
+
+
+def revocado(token):
+    """True si el token fue revocado. Sin E/S en el caso habitual (no revocado)."""
+    _frente.sincronizar()
+    marca = _frente.marcas.get(token.get(api_settings.USER_ID_CLAIM))
+    if marca is not None and token.get('iat', 0) < marca:
+        return True
+    jti = token.get(api_settings.JTI_CLAIM)
+    if not jti or jti not in _frente.filtro:
+        return False
+    return TokenRevocado.objects.filter(jti=jti).exists()
+
+
+def revocar(token):
+    """Revoca un token concreto (access o refresh) hasta su caducidad."""
+    jti = token.get(api_settings.JTI_CLAIM)
+    if not jti:
+        return
+    TokenRevocado.objects.get_or_create(
+        jti=jti,
+        defaults={
+            'usuario_id': token.get(api_settings.USER_ID_CLAIM),
+            'expira_en': _desde_epoch(token['exp']),
+        },
+    )
+    _frente.anotar(jti)
+
+
+def revocar_usuario(usuario_id):
+    """Revoca todos los tokens del usuario emitidos hasta ahora.
+
+    La marca tiene resolución de segundos, igual que el claim `iat`: los tokens
+    emitidos a continuación, en el mismo segundo, siguen siendo válidos.
+    """
+    marca = _desde_epoch(int(time.time()))
+    TokenRevocado.objects.get_or_create(
+        jti=f'usuario:{usuario_id}:{int(marca.timestamp())}',
+        defaults={
+            'usuario_id': usuario_id,
+            'emitidos_antes': marca,
+            # Pasado este plazo ya no queda ningún refresh anterior a la marca
+            'expira_en': marca + api_settings.REFRESH_TOKEN_LIFETIME,
+        },
+    )
+    _frente.anotar(None, usuario_id, marca)
+
+
+def forzar_renovacion(usuario_id):
+    """Obliga a renovar los tokens de acceso emitidos hasta ahora (el rol del token quedó obsoleto)."""
+    marca = _desde_epoch(int(time.time()))
+    TokenRevocado.objects.get_or_create(
+        jti=f'renovar:{usuario_id}:{int(marca.timestamp())}',
+        defaults={
+            'usuario_id': usuario_id,
+            'emitidos_antes': marca,
+            'solo_acceso': True,
+            # Solo necesita vivir lo que dura un token de acceso
+            'expira_en': marca + api_settings.ACCESS_TOKEN_LIFETIME,
+        },
+    )
+    _frente.anotar(None, usuario_id, marca, solo_acceso=True)
+
+
+def requiere_renovacion(token):
+    """True si el token de acceso es anterior a un cambio de rol del usuario. Sin E/S en el caso habitual."""
+    _frente.sincronizar()
+    marca = _frente.renovaciones.get(token.get(api_settings.USER_ID_CLAIM))
+    return marca is not None and token.get('iat', 0) < marca
+
+
+def purgar():
+    """Elimina las revocaciones de tokens ya caducados. Devuelve cuántas se borraron."""
+    borrados, _ = TokenRevocado.objects.filter(expira_en__lte=timezone.now()).delete()
+    return borrados
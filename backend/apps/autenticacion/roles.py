@@ -0,0 +1,31 @@
+"""Roles cacheados en memoria del proceso.
+
+Los roles por defecto se crean en `post_migrate`; aquí se cargan todos con una
+sola consulta la primera vez que se piden y se reutilizan después. Las señales
+de `Rol` vacían la caché cuando se crea, modifica o elimina un rol.
+"""
+import threading
+
+from .models import Rol
+
+_roles = {}
+_lock = threading.Lock()
+
+
+def obtener(nombre):
+    """Instancia de `Rol` por nombre; la crea si aún no existe (p. ej. 'Usuario')."""
+    rol = _roles.get(nombre)
+    if rol is not None:
+        return rol
+    with _lock:
+        if not _roles:
+            _roles.update((r.nombre, r) for r in Rol.objects.all())
+        rol = _roles.get(nombre)
+        if rol is None:
+            rol, _ = Rol.objects.get_or_create(nombre=nombre, defaults=Rol.DEFAULTS.get(nombre, {}))
+            _roles[nombre] = rol
+    return rol
+
+
+def olvidar():
+    _roles.clear()
@@ -1,5 +1,11 @@
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
-from .models import Usuario, Rol, UsuarioRol
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from .models import ImportacionUsuarios, Usuario, Rol, UsuarioRol
+from . import revocacion, roles
+from .tokens import RefreshConRol, aplicar_claims
 
 class RolSerializer(serializers.ModelSerializer):
     class Meta:
@@ -26,14 +32,14 @@ class RegisterSerializer(serializers.ModelSerializer):
             'username': {'required': False},
         }
 
+    REINTENTOS_USERNAME = 5
+
     def create(self, validated_data):
         try:
             # Validaciones de unicidad amigables
             email = validated_data.get('email', '').strip().lower()
             if not email:
                 raise serializers.ValidationError({'email': 'El correo es obligatorio.'})
-            if Usuario.objects.filter(email__iexact=email).exists():
-                raise serializers.ValidationError({'email': 'Ya existe un usuario con ese correo.'})
 
             # Extraer la contraseña y el rol del diccionario
             password = validated_data.pop('password')
@@ -46,57 +52,38 @@ class RegisterSerializer(serializers.ModelSerializer):
                 'admin': 'Administrador'
             }
             rol_nombre = role_mapping.get(role_frontend, 'Oyente')
-            
+
             # Si no se proporcionó username, generarlo
-            if 'username' not in validated_data or not validated_data.get('username'):
-                # Para artistas, usar nombre artístico directamente (con espacios y todo)
+            generar_username = not validated_data.get('username')
+            if generar_username:
+                # Para artistas, usar nombre artístico directamente (con espacios y todo);
+                # los duplicados se numeran con espacio ("DJ 2"). Para oyentes, el email
+                # sin dominio con el número pegado ("juan2").
                 if role_frontend == 'artist' and validated_data.get('nombre_artistico'):
                     base_username = validated_data['nombre_artistico']
+                    separador = ' '
                 else:
-                    # Para oyentes, usar email sin espacios
                     base_username = validated_data['email'].split('@')[0]
-                
-                # Asegurar que el username sea único
-                username = base_username
-                counter = 1
-                while Usuario.objects.filter(username=username).exists():
-                    if role_frontend == 'artist':
-                        # Para artistas, agregar número al final
-                        username = f"{base_username} {counter}"
-                    else:
-                        # Para oyentes, agregar número pegado
-                        username = f"{base_username}{counter}"
-                    counter += 1
-                validated_data['username'] = username
-            else:
-                # Si viene username, validar unicidad amigable
-                username = validated_data['username']
-                if Usuario.objects.filter(username=username).exists():
-                    raise serializers.ValidationError({'username': 'Ya existe un usuario con ese nombre de usuario.'})
+                    separador = ''
 
-            # Crear el usuario
-            user = Usuario.objects.create(**validated_data)
+            # Crear el usuario con rol y contraseña en un único INSERT. La unicidad
+            # la garantizan los índices: ante una colisión concurrente se recalcula
+            # el username generado y se reintenta.
+            user = Usuario(**validated_data)
             user.set_password(password)
-
-            # Crear los roles por defecto si no existen
-            roles_default = {
-                'Administrador': {'nivel': 3, 'default': False},
-                'Artista': {'nivel': 2, 'default': False},
-                'Oyente': {'nivel': 1, 'default': True}
-            }
-            
-            for nombre, datos in roles_default.items():
-                Rol.objects.get_or_create(
-                    nombre=nombre,
-                    defaults=datos
-                )
-
-            # Asignar el rol seleccionado
-            rol = Rol.objects.get(nombre=rol_nombre)
-            user.rol = rol
-            user.save()
-
-            return user
+            user.rol = roles.obtener(rol_nombre)
+            for intento in range(self.REINTENTOS_USERNAME):
+                if generar_username:
+                    user.username = Usuario.objects.username_disponible(base_username, separador)
+                try:
+                    with transaction.atomic():
+                        user.save()
+                    return user
+                except IntegrityError:
+                    if Usuario.objects.por_email(email).exists():
+                        raise serializers.ValidationError({'email': 'Ya existe un usuario con ese correo.'})
+                    if not generar_username or intento == self.REINTENTOS_USERNAME - 1:
+                        raise serializers.ValidationError({'username': 'Ya existe un usuario con ese nombre de usuario.'})
         except Exception as e:
             raise serializers.ValidationError(str(e))
 
@@ -131,7 +118,7 @@ class UsuarioSerializer(serializers.ModelSerializer):
         instance = getattr(self, 'instance', None)
 
         if email:
-            qs = Usuario.objects.filter(email__iexact=email)
+            qs = Usuario.objects.por_email(email)
             if instance:
                 qs = qs.exclude(pk=instance.pk)
             if qs.exists():
@@ -149,4 +136,37 @@ class UsuarioSerializer(serializers.ModelSerializer):
 class UsuarioRolSerializer(serializers.ModelSerializer):
     class Meta:
         model = UsuarioRol
-        fields = ['id', 'usuario', 'rol', 'asignado_en']
\ No newline at end of file
+        fields = ['id', 'usuario', 'rol', 'asignado_en']
+
+class ImportacionUsuariosSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ImportacionUsuarios
+        fields = ['id', 'formato', 'estado', 'procesadas', 'creadas', 'omitidas', 'errores', 'mensaje', 'creado_en', 'actualizado_en']
+        read_only_fields = fields
+
+class TokenRefreshConRolSerializer(TokenRefreshSerializer):
+    """Renueva los tokens releyendo el rol del usuario (una consulta por renovación, no por petición)."""
+    token_class = RefreshConRol
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        if revocacion.revocado(refresh):
+            raise InvalidToken('El token ha sido revocado')
+        usuario = (
+            Usuario.objects.filter(pk=refresh[api_settings.USER_ID_CLAIM], is_active=True)
+            .values('username', 'rol_id', 'rol__nombre', 'is_staff')
+            .first()
+        )
+        if usuario is None:
+            raise InvalidToken('Usuario inactivo o inexistente')
+        aplicar_claims(refresh, usuario['username'], usuario['rol_id'], usuario['rol__nombre'], usuario['is_staff'])
+
+        data = {'access': str(refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                revocacion.revocar(refresh)
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data['refresh'] = str(refresh)
+        return data
@@ -0,0 +1,51 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import cache, navegacion, revocacion, roles
+from .models import Recurso, RecursoRol, Rol, Usuario
+
+
+@receiver(post_save, sender=Usuario)
+def renovar_tokens_si_cambia_rol(sender, instance, created, **kwargs):
+    """Los tokens llevan el rol como claim: si cambia, el cliente debe renovarlos."""
+    if created:
+        return
+    cargados = getattr(instance, '_claims_cargados', None)
+    actuales = (instance.rol_id, instance.is_staff)
+    if cargados is not None and cargados != actuales:
+        revocacion.forzar_renovacion(instance.pk)
+    instance._claims_cargados = actuales
+
+
+@receiver(post_save, sender=Usuario)
+@receiver(post_delete, sender=Usuario)
+def invalidar_usuario_en_cache(sender, instance, **kwargs):
+    # Cubre también el cambio de contraseña, que se persiste con save()
+    cache.usuarios.invalidar(instance.pk)
+
+
+@receiver(post_save, sender=Rol)
+@receiver(post_delete, sender=Rol)
+def invalidar_roles_en_cache(sender, instance, **kwargs):
+    # Las instancias en caché llevan su Rol cargado
+    cache.usuarios.limpiar()
+    roles.olvidar()
+
+
+@receiver(post_save, sender=Recurso)
+@receiver(post_delete, sender=Recurso)
+@receiver(post_save, sender=RecursoRol)
+@receiver(post_delete, sender=RecursoRol)
+def invalidar_navegacion(sender, instance, **kwargs):
+    navegacion.invalidar()
+
+
+def crear_roles_por_defecto(sender, apps, using, **kwargs):
+    """Conectada a post_migrate de la app: garantiza los roles por defecto una sola vez."""
+    try:
+        RolHistorico = apps.get_model('autenticacion', 'Rol')
+    except LookupError:
+        return
+    for nombre, datos in Rol.DEFAULTS.items():
+        RolHistorico.objects.using(using).get_or_create(nombre=nombre, defaults=datos)
+    roles.olvidar()
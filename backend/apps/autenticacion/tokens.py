@@ -0,0 +1,60 @@
+"""Tokens JWT con el rol del usuario como claim.
+
+Los permisos leen el rol del token validado en lugar de consultar `Usuario` y
+`Rol` en cada petición. Cuando el rol de un usuario cambia se registra una
+marca de renovación en `TokenRevocado` (ver `revocacion.forzar_renovacion`),
+compartida por todos los procesos; los tokens de acceso emitidos antes de esa
+marca se rechazan con `token_not_valid`, lo que obliga al cliente a pasar por
+`/api/auth/token/refresh/`, que vuelve a leer el rol de la base de datos.
+"""
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.tokens import RefreshToken
+
+ROL_CLAIM = 'rol'
+ROL_ID_CLAIM = 'rol_id'
+
+
+def aplicar_claims(token, username=None, rol_id=None, rol_nombre=None, is_staff=False):
+    token[ROL_CLAIM] = rol_nombre
+    token[ROL_ID_CLAIM] = rol_id
+    # TokenUser expone username e is_staff desde estos claims (IsAdminUser usa is_staff)
+    token['is_staff'] = bool(is_staff)
+    if username is not None:
+        token['username'] = username
+    return token
+
+
+class RefreshConRol(RefreshToken):
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        rol = user.rol if user.rol_id else None
+        return aplicar_claims(
+            token,
+            username=user.username,
+            rol_id=user.rol_id,
+            rol_nombre=rol.nombre if rol else None,
+            is_staff=user.is_staff,
+        )
+
+    @property
+    def access_token(self):
+        access = super().access_token
+        # simplejwt copia el `iat` del refresh; el acceso nuevo debe quedar
+        # posterior a una marca de renovación
+        access.set_iat()
+        return access
+
+
+class UsuarioToken(TokenUser):
+    """Usuario sin estado respaldado por el token, con acceso al rol."""
+
+    @cached_property
+    def rol_nombre(self):
+        return self.token.get(ROL_CLAIM) or ''
+
+    @cached_property
+    def rol_id(self):
+        return self.token.get(ROL_ID_CLAIM)
+
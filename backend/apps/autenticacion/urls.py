@@ -3,7 +3,9 @@ from .views import (
     CookieLoginView, RegisterView, LogoutView, ProfileView,
     ChangePasswordView, RolListCreateView, RolRetrieveUpdateDestroyView,
     UsuarioRolCreateView, HelloFromCookieView, UsuarioListView,
-    UsuarioRetrieveUpdateDestroyView, AdminSetUserPasswordView
+    UsuarioRetrieveUpdateDestroyView, AdminSetUserPasswordView,
+    ImportarUsuariosView, ImportacionUsuariosDetailView, ReanudarImportacionView,
+    NavegacionView,
 )
 from rest_framework_simplejwt.views import TokenRefreshView
 
@@ -14,10 +16,14 @@ urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('logout/', LogoutView.as_view(), name='logout'),
+    path('navegacion/', NavegacionView.as_view(), name='navegacion'),
     path('roles/', RolListCreateView.as_view(), name='rol_list_create'),
     path('roles/<int:pk>/', RolRetrieveUpdateDestroyView.as_view(), name='rol_detail'),
     path('roles/asignar-rol/', UsuarioRolCreateView.as_view(), name='usuario_rol_create'),
     path('usuarios/', UsuarioListView.as_view(), name='usuario_list'),
     path('usuarios/<int:pk>/', UsuarioRetrieveUpdateDestroyView.as_view(), name='usuario_detail'),
     path('usuarios/<int:pk>/set-password/', AdminSetUserPasswordView.as_view(), name='usuario_set_password'),
+    path('usuarios/importar/', ImportarUsuariosView.as_view(), name='usuario_importar'),
+    path('usuarios/importar/<int:pk>/', ImportacionUsuariosDetailView.as_view(), name='usuario_importacion_detalle'),
+    path('usuarios/importar/<int:pk>/reanudar/', ReanudarImportacionView.as_view(), name='usuario_importacion_reanudar'),
 ]
@@ -1,30 +1,32 @@
 from django.contrib.auth.hashers import check_password
-from django.db.models import Q
 from rest_framework import generics, permissions, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.parsers import JSONParser
-from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
+from rest_framework.exceptions import ValidationError
 from django.contrib.auth import authenticate
 
-from .models import Usuario, Rol, UsuarioRol
-from .serializers import RegisterSerializer, UsuarioSerializer, RolSerializer, UsuarioRolSerializer
+from .models import ImportacionUsuarios, Usuario, Rol, UsuarioRol
+from .serializers import (
+    ImportacionUsuariosSerializer, RegisterSerializer, UsuarioSerializer, RolSerializer, UsuarioRolSerializer,
+)
 from .permissions import IsAdminRole
+from .authentication import JWTUsuarioAuthentication
+from .tokens import RefreshConRol
+from . import accesos, busqueda, captcha, navegacion, revocacion, roles
+from . import importacion as importacion_usuarios
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
 from django.conf import settings
+from django.utils import timezone
+from datetime import timedelta
 import json
-from urllib import request as urlrequest, parse as urlparse
-from rest_framework.views import APIView
-from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework_simplejwt.tokens import RefreshToken
-from django.contrib.auth import authenticate
-from .permissions import IsAdminRole
+import os
 
 # CAMBIAR CONTRASEÑA DE USUARIO AUTENTICADO
 class ChangePasswordView(APIView):
+    authentication_classes = [JWTUsuarioAuthentication]
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
@@ -40,11 +42,19 @@ class ChangePasswordView(APIView):
             return Response({'detail': 'La nueva contraseña debe ser diferente a la actual.'}, status=400)
         user.set_password(new_password)
         user.save()
-        return Response({'detail': 'Contraseña actualizada correctamente.'}, status=200)
+        # Cierra las demás sesiones y entrega tokens nuevos para la actual
+        revocacion.revocar_usuario(user.pk)
+        refresh = RefreshConRol.for_user(user)
+        return Response({
+            'detail': 'Contraseña actualizada correctamente.',
+            'access': str(refresh.access_token),
+            'refresh': str(refresh),
+        }, status=200)
 
 
 # ENDPOINT DE PERFIL DE USUARIO AUTENTICADO
 class ProfileView(APIView):
+    authentication_classes = [JWTUsuarioAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
@@ -52,7 +62,8 @@ class ProfileView(APIView):
             user = request.user
             if not user or not user.is_authenticated:
                 return Response({'detail': 'Usuario no autenticado'}, status=401)
-            usuario = Usuario.objects.filter(username=user.username).first()
+            # La autenticación ya cargó la instancia (con su rol); no se vuelve a consultar
+            usuario = user
             if usuario:
                 role_name = usuario.rol.nombre.lower() if usuario.rol and usuario.rol.nombre else "user"
                 role = "admin" if role_name in ["admin", "administrador"] else "user"
@@ -78,16 +89,15 @@ class ProfileView(APIView):
             user = request.user
             if not user or not user.is_authenticated:
                 return Response({'detail': 'Usuario no autenticado'}, status=401)
-            usuario = Usuario.objects.filter(username=user.username).first()
+            usuario = user
             if not usuario:
                 return Response({'detail': 'No se encontró el usuario'}, status=404)
             data = request.data
             # Actualizar campos editables
-            # Actualizar campos tanto en el objeto usuario como en el objeto user
             usuario.nombres = data.get('firstName', data.get('nombres', usuario.nombres))
             usuario.apellidos = data.get('lastName', data.get('apellidos', usuario.apellidos))
-            user.first_name = usuario.nombres
-            user.last_name = usuario.apellidos
+            usuario.first_name = usuario.nombres
+            usuario.last_name = usuario.apellidos
             usuario.telefono = data.get('phone', data.get('telefono', usuario.telefono))
             usuario.direccion = data.get('address', data.get('direccion', usuario.direccion))
             birth_date = data.get('birthDate', data.get('fecha_nacimiento', None))
@@ -101,9 +111,7 @@ class ProfileView(APIView):
             if 'emergencyContact' in data and hasattr(usuario, 'emergencyContact'):
                 usuario.emergencyContact = data['emergencyContact']
             if 'email' in data:
-                user.email = data['email']
                 usuario.email = data['email']
-            user.save()
             usuario.save()
             role_name = usuario.rol.nombre.lower() if usuario.rol and usuario.rol.nombre else "user"
             role = "admin" if role_name in ["admin", "administrador"] else "user"
@@ -130,26 +138,18 @@ class RegisterView(generics.CreateAPIView):
     def create(self, request, *args, **kwargs):
         try:
             data = request.data.copy()
+            captcha_token = None
             # Validar CAPTCHA si está habilitado
             if getattr(settings, 'RECAPTCHA_ENABLED', False):
                 captcha_token = data.get('captcha_token') or data.get('recaptchaToken')
                 if not captcha_token:
                     return Response({'detail': 'Validación CAPTCHA requerida.'}, status=status.HTTP_400_BAD_REQUEST)
 
-                payload = {
-                    'secret': settings.RECAPTCHA_SECRET_KEY,
-                    'response': captcha_token,
-                    'remoteip': request.META.get('REMOTE_ADDR'),
-                }
-                verify_req = urlrequest.Request(
-                    'https://www.google.com/recaptcha/api/siteverify',
-                    data=urlparse.urlencode(payload).encode('utf-8'),
-                    headers={'Content-Type': 'application/x-www-form-urlencoded'}
-                )
-                with urlrequest.urlopen(verify_req, timeout=10) as resp:
-                    body = resp.read().decode('utf-8')
-                    result = json.loads(body)
-                if not result.get('success'):
+                try:
+                    valido = captcha.verificar(captcha_token, request.META.get('REMOTE_ADDR'))
+                except captcha.CaptchaNoDisponible:
+                    return Response({'detail': 'No se pudo verificar el CAPTCHA. Inténtalo de nuevo en unos minutos.'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+                if not valido:
                     return Response({'detail': 'CAPTCHA inválido.'}, status=status.HTTP_400_BAD_REQUEST)
 
                 # Eliminar campos de captcha antes de validar serializer
@@ -161,9 +161,11 @@ class RegisterView(generics.CreateAPIView):
             serializer = self.get_serializer(data=data)
             serializer.is_valid(raise_exception=True)
             user = serializer.save()
+            # Un token verificado registra una sola cuenta
+            captcha.consumir(captcha_token)
 
             # Generar token de acceso y refresco
-            refresh = RefreshToken.for_user(user)
+            refresh = RefreshConRol.for_user(user)
             access_token = refresh.access_token
             
             # Ajustar tiempo de expiración (opcional)
@@ -222,20 +224,41 @@ class RegisterView(generics.CreateAPIView):
 
 # VISTAS DE USUARIOS
 class UsuarioListView(generics.ListAPIView):
+    """Listado de administración: ?search= (prefijo, sin acentos), ?rol=<id|admin|artist|listener>, ?limite=.
+
+    Paginado por cursor; la primera página incluye `total_estimado` (ver busqueda.py).
+    """
     serializer_class = UsuarioSerializer
     permission_classes = [IsAuthenticated, IsAdminRole]
+    pagination_class = busqueda.PaginacionUsuarios
 
     def get_queryset(self):
-        queryset = Usuario.objects.all()
-        search = self.request.query_params.get('search', None)
-        if search:
-            queryset = queryset.filter(
-                Q(username__icontains=search) |
-                Q(email__icontains=search) |
-                Q(nombres__icontains=search) |
-                Q(apellidos__icontains=search)
+        return busqueda.listado(self.request.query_params.get('search', '').strip(), self._rol_id())
+
+    def _rol_id(self):
+        rol = self.request.query_params.get('rol', '').strip()
+        if not rol:
+            return None
+        if rol.isdigit():
+            return int(rol)
+        nombre = importacion_usuarios.ROLES_IMPORTACION.get(rol.lower())
+        if nombre is None:
+            raise ValidationError({'rol': 'Rol inválido.'})
+        return roles.obtener(nombre).pk
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        total = None
+        if self.paginator.cursor_query_param not in request.query_params:
+            rol_id = self._rol_id()
+            total = busqueda.total_estimado(
+                queryset,
+                clave=None if rol_id is None else f'rol:{rol_id}',
+                busqueda=bool(request.query_params.get('search', '').strip()),
             )
-        return queryset
+        return self.paginator.get_paginated_response(serializer.data, total=total)
 
 class UsuarioRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Usuario.objects.all()
@@ -259,55 +282,96 @@ class AdminSetUserPasswordView(APIView):
 
             user.set_password(new_password)
             user.save()
+            revocacion.revocar_usuario(user.pk)
             return Response({'detail': 'Contraseña actualizada correctamente'}, status=200)
         except Exception as e:
             return Response({'detail': f'Error interno: {str(e)}'}, status=500)
 
+# ADMIN: Importación masiva de usuarios (CSV/JSONL)
+class ImportarUsuariosView(APIView):
+    permission_classes = [IsAuthenticated, IsAdminRole]
+    parser_classes = [MultiPartParser, FormParser]
+
+    def post(self, request):
+        archivo = request.FILES.get('archivo')
+        if not archivo:
+            return Response({'detail': 'Debes adjuntar el archivo a importar.'}, status=400)
+        formato = request.data.get('formato') or (
+            'jsonl' if archivo.name.lower().endswith(('.jsonl', '.ndjson')) else 'csv'
+        )
+        if formato not in ('csv', 'jsonl'):
+            return Response({'detail': 'Formato no soportado (csv o jsonl).'}, status=400)
+        importacion = ImportacionUsuarios.objects.create(
+            ruta=importacion_usuarios.guardar_subida(archivo, formato), formato=formato, creado_por_id=request.user.id
+        )
+        importacion_usuarios.importar_en_segundo_plano(importacion)
+        return Response(ImportacionUsuariosSerializer(importacion).data, status=status.HTTP_202_ACCEPTED)
+
+
+class ImportacionUsuariosDetailView(generics.RetrieveAPIView):
+    queryset = ImportacionUsuarios.objects.all()
+    serializer_class = ImportacionUsuariosSerializer
+    permission_classes = [IsAuthenticated, IsAdminRole]
+
+
+class ReanudarImportacionView(APIView):
+    permission_classes = [IsAuthenticated, IsAdminRole]
+    # Una importación "en curso" sin avances en este tiempo se da por interrumpida
+    INACTIVIDAD = timedelta(minutes=10)
+
+    def post(self, request, pk: int):
+        try:
+            importacion = ImportacionUsuarios.objects.get(pk=pk)
+        except ImportacionUsuarios.DoesNotExist:
+            return Response({'detail': 'Importación no encontrada'}, status=404)
+        if importacion.estado == ImportacionUsuarios.COMPLETADA:
+            return Response({'detail': 'La importación ya está completada.'}, status=409)
+        if (
+            importacion.estado == ImportacionUsuarios.EN_CURSO
+            and timezone.now() - importacion.actualizado_en < self.INACTIVIDAD
+        ):
+            return Response({'detail': 'La importación sigue en curso.'}, status=409)
+        if not os.path.exists(importacion.ruta):
+            return Response(
+                {'detail': 'El archivo de la importación ya no está disponible; vuelve a subirlo.'}, status=410
+            )
+        importacion_usuarios.importar_en_segundo_plano(importacion)
+        return Response(ImportacionUsuariosSerializer(importacion).data, status=status.HTTP_202_ACCEPTED)
+
 # INICIAR SESION
 class CookieLoginView(APIView):
     parser_classes = [JSONParser]
     
     def post(self, request):
-        # Debug logging
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.error(f"request.data type: {type(request.data)}")
-        logger.error(f"request.data content: {request.data}")
-        logger.error(f"request.content_type: {request.content_type}")
-        
         # Asegurar que request.data es un diccionario
         try:
             if isinstance(request.data, str):
-                import json
                 data = json.loads(request.data)
             else:
                 data = request.data
         except (json.JSONDecodeError, AttributeError) as e:
-            logger.error(f"Error parsing data: {e}")
             return Response({"detail": f"Formato de datos inválido: {str(e)}"}, status=status.HTTP_400_BAD_REQUEST)
         
         email = data.get("email")
         password = data.get("password")
 
-        # Primero buscamos al usuario por email
-        try:
-            user_by_email = Usuario.objects.get(email=email)
-            user = authenticate(username=user_by_email.username, password=password)
-        except Usuario.DoesNotExist:
-            return Response({"detail": "No existe un usuario con ese email"}, status=status.HTTP_401_UNAUTHORIZED)
-
+        # EmailBackend: una consulta (usuario + rol) y una verificación de contraseña
+        user = authenticate(request, email=email, password=password)
         if user is None:
+            # Solo en el camino de error se distingue el motivo
+            if not Usuario.objects.por_email(email).exists():
+                return Response({"detail": "No existe un usuario con ese email"}, status=status.HTTP_401_UNAUTHORIZED)
             return Response({"detail": "Contraseña incorrecta"}, status=status.HTTP_401_UNAUTHORIZED)
 
-        refresh = RefreshToken.for_user(user)
+        # Rol por defecto y last_login se persisten en lote, fuera de la petición
+        sin_rol = user.rol_id is None
+        if sin_rol:
+            user.rol = accesos.rol_por_defecto()
+        accesos.registrar_login(user, asignar_rol=sin_rol)
+
+        refresh = RefreshConRol.for_user(user)
         access_token = str(refresh.access_token)
         refresh_token = str(refresh)
-
-        if not user.rol:
-            # Asignar rol 'Usuario' si no tiene
-            rol_usuario, _ = Rol.objects.get_or_create(nombre="Usuario")
-            user.rol = rol_usuario
-            user.save()
         
         # Mapear los roles del backend a los roles del frontend
         role_mapping = {
@@ -340,7 +404,7 @@ class HelloFromCookieView(APIView):
         if not access_token:
             return Response({"detail": "No se encontró el token en cookies"}, status=401)
         
-        jwt_authenticator = JWTAuthentication()
+        jwt_authenticator = JWTUsuarioAuthentication()
         try:
             validated_user, token = jwt_authenticator.authenticate(request._request)
         except Exception as e:
@@ -352,7 +416,21 @@ class HelloFromCookieView(APIView):
 
 # CERRAR SESION
 class LogoutView(APIView):
+    # Sin autenticación: un token caducado o ya revocado no debe impedir cerrar sesión
+    authentication_classes = []
+
     def post(self, request):
+        # Revocar los tokens de la sesión (cabecera/cookie y refresh del cuerpo o cookie)
+        acceso = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')[2] or request.COOKIES.get('access_token')
+        refresh = (request.data.get('refresh') if hasattr(request.data, 'get') else None) or request.COOKIES.get('refresh_token')
+        for clase, crudo in ((AccessToken, acceso), (RefreshToken, refresh)):
+            if not crudo:
+                continue
+            try:
+                revocacion.revocar(clase(crudo))
+            except TokenError:
+                pass
+
         response = Response({"message": "Sesión cerrada correctamente."})
         
         response.delete_cookie("access_token")
@@ -360,6 +438,23 @@ class LogoutView(APIView):
         
         return response
     
+# NAVEGACION POR ROL
+class NavegacionView(APIView):
+    """Árbol de recursos visibles para el rol del usuario (un admin puede pedir otro con ?rol=<id>)."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        rol_id = getattr(request.user, 'rol_id', None)
+        otro_rol = request.query_params.get('rol')
+        if otro_rol:
+            if not IsAdminRole().has_permission(request, self):
+                return Response({'detail': 'Solo un administrador puede consultar otro rol.'}, status=403)
+            try:
+                rol_id = int(otro_rol)
+            except ValueError:
+                return Response({'detail': 'Rol inválido.'}, status=400)
+        return Response(navegacion.arbol(rol_id))
+
 # ROLES
 class RolListCreateView(generics.ListCreateAPIView):
     queryset = Rol.objects.all()
@@ -1,16 +1,42 @@
 from django.contrib import admin
-from .models import Album, Cancion, Genero, CancionFavorita, HistorialReproduccion
+
+from backend.admin_escala import AdminEscalable, filtro_fecha
+
+from .models import Album, ArchivoMedia, Cancion, Genero, CancionFavorita, HistorialReproduccion, IngestaAlbum, SesionEscucha, SubidaCancion
 
 
 @admin.register(Genero)
 class GeneroAdmin(admin.ModelAdmin):
     list_display = ('id', 'name')
+    search_fields = ('name',)
+
+class AdminBorradoSuave(AdminEscalable):
+    """Muestra también las filas eliminadas (hasta que purgar_eliminados las borra) y permite restaurarlas."""
+    actions = ('eliminar', 'restaurar')
+
+    def get_queryset(self, request):
+        consulta = self.model.todos.get_queryset()
+        ordering = self.get_ordering(request)
+        return consulta.order_by(*ordering) if ordering else consulta
+
+    @admin.action(description='Eliminar (borrado suave) los elementos seleccionados')
+    def eliminar(self, request, queryset):
+        eliminadas = queryset.filter(eliminado_en__isnull=True).eliminar()
+        self.message_user(request, f'{eliminadas} elementos eliminados; purgar_eliminados los borrará definitivamente.')
+
+    @admin.action(description='Restaurar los elementos eliminados seleccionados')
+    def restaurar(self, request, queryset):
+        restauradas = queryset.filter(eliminado_en__isnull=False).update(eliminado_en=None)
+        self.message_user(request, f'{restauradas} elementos restaurados.')
+
 
 @admin.register(Album)
-class AlbumAdmin(admin.ModelAdmin):
-    list_display = ('id', 'title', 'get_artist_name', 'release_date', 'created_at')
+class AlbumAdmin(AdminBorradoSuave):
+    list_display = ('id', 'title', 'get_artist_name', 'release_date', 'created_at', 'eliminado_en')
+    list_select_related = ('artist',)
     search_fields = ('title', 'artist__nombres', 'artist__apellidos', 'artist__email')
-    list_filter = ('release_date', 'created_at')
+    list_filter = (filtro_fecha('release_date'), filtro_fecha('created_at'), ('eliminado_en', admin.EmptyFieldListFilter))
+    autocomplete_fields = ('artist',)
 
     def get_artist_name(self, obj):
         if not obj.artist:
@@ -21,9 +47,15 @@ class AlbumAdmin(admin.ModelAdmin):
 
 
 @admin.register(Cancion)
-class CancionAdmin(admin.ModelAdmin):
-    list_display = ('id', 'title', 'get_artista_nombre', 'get_album_title', 'genre', 'duration', 'play_count', 'created_at')
-    list_filter = ('genre', 'created_at')
+class CancionAdmin(AdminBorradoSuave):
+    list_display = (
+        'id', 'title', 'get_artista_nombre', 'get_album_title', 'genre', 'duration', 'play_count', 'created_at',
+        'eliminado_en',
+    )
+    list_select_related = ('uploaded_by', 'album', 'genre')
+    list_filter = ('genre', filtro_fecha('created_at'), ('eliminado_en', admin.EmptyFieldListFilter))
+    # Recorre el índice de created_at y se detiene en la página, también al filtrar por fecha
+    ordering = ('-created_at',)
     search_fields = (
         'title',
         'album__title',
@@ -32,7 +64,8 @@ class CancionAdmin(admin.ModelAdmin):
         'uploaded_by__email',
     )
     readonly_fields = ('play_count', 'created_at')
-    
+    autocomplete_fields = ('uploaded_by', 'album', 'genre')
+
     def get_artista_nombre(self, obj):
         return f"{obj.uploaded_by.nombres} {obj.uploaded_by.apellidos}" if obj.uploaded_by else "Sin artista"
     get_artista_nombre.short_description = 'Artista'
@@ -44,16 +77,78 @@ class CancionAdmin(admin.ModelAdmin):
 
 
 @admin.register(CancionFavorita)
-class CancionFavoritaAdmin(admin.ModelAdmin):
-    list_display = ('id', 'usuario', 'cancion', 'agregada_en')
-    list_filter = ('agregada_en',)
+class CancionFavoritaAdmin(AdminEscalable):
+    list_display = ('id', 'get_usuario_email', 'get_cancion_title', 'agregada_en')
+    list_select_related = ('usuario', 'cancion')
+    list_filter = (filtro_fecha('agregada_en'),)
     search_fields = ('usuario__email', 'cancion__title')
     readonly_fields = ('agregada_en',)
+    autocomplete_fields = ('usuario', 'cancion')
+
+    def get_usuario_email(self, obj):
+        return obj.usuario.email
+
+    get_usuario_email.short_description = 'Usuario'
+
+    def get_cancion_title(self, obj):
+        return obj.cancion.title
+
+    get_cancion_title.short_description = 'Canción'
 
 
 @admin.register(HistorialReproduccion)
-class HistorialReproduccionAdmin(admin.ModelAdmin):
-    list_display = ('id', 'usuario', 'cancion', 'played_at')
-    list_filter = ('played_at',)
+class HistorialReproduccionAdmin(AdminEscalable):
+    list_display = ('id', 'get_usuario_email', 'get_cancion_title', 'played_at')
+    list_select_related = ('usuario', 'cancion')
+    list_filter = (filtro_fecha('played_at'),)
     search_fields = ('usuario__email', 'cancion__title')
     readonly_fields = ('played_at',)
+    autocomplete_fields = ('usuario', 'cancion')
+
+    def get_usuario_email(self, obj):
+        return obj.usuario.email
+
+    get_usuario_email.short_description = 'Usuario'
+
+    def get_cancion_title(self, obj):
+        return obj.cancion.title
+
+    get_cancion_title.short_description = 'Canción'
+
+
+@admin.register(SesionEscucha)
+class SesionEscuchaAdmin(AdminEscalable):
+    list_display = ('id', 'usuario', 'get_cancion_title', 'segundos_escuchados', 'posicion_maxima', 'acreditada', 'iniciada_en')
+    list_select_related = ('usuario', 'cancion')
+    list_filter = ('acreditada',)
+    autocomplete_fields = ('usuario', 'cancion')
+
+    def get_cancion_title(self, obj):
+        return obj.cancion.title
+
+    get_cancion_title.short_description = 'Canción'
+
+
+@admin.register(SubidaCancion)
+class SubidaCancionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'usuario', 'nombre_archivo', 'recibido', 'tamano', 'estado', 'expira_en')
+    list_select_related = ('usuario',)
+    list_filter = ('estado',)
+    autocomplete_fields = ('usuario',)
+    readonly_fields = ('ruta', 'recibido', 'sha256', 'cancion', 'creado_en', 'actualizado_en')
+
+
+@admin.register(IngestaAlbum)
+class IngestaAlbumAdmin(admin.ModelAdmin):
+    list_display = ('id', 'usuario', 'estado', 'procesadas', 'total', 'album', 'creado_en')
+    list_select_related = ('usuario', 'album__artist')
+    list_filter = ('estado',)
+    autocomplete_fields = ('usuario',)
+    readonly_fields = ('directorio', 'manifiesto', 'total', 'procesadas', 'album', 'errores', 'mensaje', 'creado_en', 'actualizado_en')
+
+
+@admin.register(ArchivoMedia)
+class ArchivoMediaAdmin(AdminEscalable):
+    list_display = ('id', 'ruta', 'tamano', 'referencias', 'actualizado_en')
+    search_fields = ('sha256',)
+    readonly_fields = ('ruta', 'sha256', 'tamano', 'referencias', 'creado_en', 'actualizado_en')
@@ -0,0 +1,161 @@
+"""Almacenamiento direccionado por contenido para audio y portadas.
+
+Cada archivo se guarda con el SHA-256 de su contenido como nombre, repartido
+en dos niveles de directorios por prefijo del hash:
+
+    canciones/3f/a2/3fa2...e9.mp3
+    portadas/07/c1/07c1...42.jpg
+
+El primer segmento de la ruta que propone `upload_to` ("canciones",
+"portadas") se conserva como espacio de nombres. Con 65.536 directorios por
+espacio, cada uno guarda unas decenas de archivos incluso con millones de
+canciones, y dos subidas idénticas comparten un único archivo. El hash se
+calcula mientras se copia la subida a un temporal en el mismo volumen, que
+luego se mueve a su sitio (o se descarta si el contenido ya existía).
+
+Quién usa cada archivo se cuenta en `ArchivoMedia` (señales de los modelos);
+los archivos sin referencias los borra `manage.py purgar_media`. Reutilizar un
+archivo existente le actualiza la fecha de modificación: recolectar() lo
+aparta primero a la papelera y, si ve que se tocó dentro de su margen, lo
+devuelve, así que una subida concurrente nunca se queda sin su archivo.
+"""
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import uuid
+from pathlib import Path
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+
+_TEMPORALES = '.tmp'
+_PAPELERA = '.papelera'
+_RUTA_CONTENIDO = re.compile(r'^[\w-]+/([0-9a-f]{2})/([0-9a-f]{2})/([0-9a-f]{64})(\.\w{1,10})?$')
+
+
+def ruta_contenido(espacio, sha256, extension=''):
+    return f'{espacio}/{sha256[:2]}/{sha256[2:4]}/{sha256}{extension}'
+
+
+def sha256_de_ruta(ruta):
+    """Hash de una ruta direccionada por contenido, o None si la ruta es de otro tipo."""
+    coincidencia = _RUTA_CONTENIDO.match(ruta or '')
+    return coincidencia.group(3) if coincidencia else None
+
+
+def extension_de(nombre):
+    extension = Path(nombre).suffix.lower()
+    return extension if re.fullmatch(r'\.\w{1,10}', extension) else ''
+
+
+class AlmacenamientoContenido(FileSystemStorage):
+    def _directorio_temporal(self):
+        # En el mismo volumen que los archivos, para que mover sea un rename
+        directorio = Path(self.location) / _TEMPORALES
+        directorio.mkdir(parents=True, exist_ok=True)
+        return directorio
+
+    def get_available_name(self, name, max_length=None):
+        # El nombre definitivo lo decide el contenido en _save(); nunca se añaden sufijos
+        return name
+
+    def _save(self, name, content):
+        espacio = name.split('/', 1)[0]
+        digest = hashlib.sha256()
+        if hasattr(content, 'temporary_file_path'):
+            # Subida ya volcada a disco por Django: se hashea y se mueve sin copiarla
+            origen = content.temporary_file_path()
+            with open(origen, 'rb') as archivo:
+                for bloque in iter(lambda: archivo.read(1024 * 1024), b''):
+                    digest.update(bloque)
+            return self.ubicar(origen, espacio, digest.hexdigest(), extension_de(name), mover=file_move_safe)
+
+        descriptor, temporal = tempfile.mkstemp(dir=self._directorio_temporal())
+        try:
+            with os.fdopen(descriptor, 'wb') as archivo:
+                for bloque in content.chunks():
+                    digest.update(bloque)
+                    archivo.write(bloque)
+            return self.ubicar(temporal, espacio, digest.hexdigest(), extension_de(name))
+        finally:
+            if os.path.exists(temporal):
+                os.unlink(temporal)
+
+    def ubicar(self, origen, espacio, sha256, extension='', mover=os.replace):
+        """Mueve el archivo local `origen` a su ruta por contenido; si ya existe, lo descarta."""
+        nombre = ruta_contenido(espacio, sha256, extension)
+        if not self._colocar(origen, nombre, mover):
+            os.unlink(origen)
+        return nombre
+
+    def enlazar(self, origen, espacio, sha256, extension=''):
+        """Como ubicar(), pero conserva `origen` (enlace duro o, entre volúmenes, copia)."""
+        nombre = ruta_contenido(espacio, sha256, extension)
+        self._colocar(origen, nombre, _enlazar_o_copiar)
+        return nombre
+
+    def borrar_con_derivados(self, nombre):
+        """Borra el archivo y los derivados que comparten su hash (p. ej. variantes de portada)."""
+        self.delete(nombre)
+        self.borrar_derivados(nombre)
+
+    def borrar_derivados(self, nombre):
+        ruta = Path(self.path(nombre))
+        base = ruta.name.split('.', 1)[0]
+        for derivado in ruta.parent.glob(f'{base}-*'):
+            derivado.unlink(missing_ok=True)
+
+    def retirar(self, nombre):
+        """Mueve el archivo a la papelera (rename atómico); devuelve su ruta allí, o None si no existía."""
+        papelera = Path(self.location) / _PAPELERA
+        papelera.mkdir(parents=True, exist_ok=True)
+        destino = papelera / f'{uuid.uuid4().hex}-{Path(nombre).name}'
+        try:
+            os.rename(self.path(nombre), destino)
+        except FileNotFoundError:
+            return None
+        return destino
+
+    def restaurar(self, retirado, nombre):
+        """Devuelve un archivo retirado a su sitio (o lo descarta si ya se volvió a subir)."""
+        if not self._colocar(retirado, nombre, os.rename):
+            os.unlink(retirado)
+
+    def _colocar(self, origen, nombre, mover):
+        destino = Path(self.path(nombre))
+        try:
+            # Reutilización: la fecha nueva impide que recolectar() lo borre (ver el docstring del módulo)
+            os.utime(destino)
+            return False
+        except FileNotFoundError:
+            pass
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            mover(origen, destino)
+        except FileExistsError:
+            return False  # otra subida idéntica llegó a la vez
+        if self.file_permissions_mode is not None:
+            os.chmod(destino, self.file_permissions_mode)
+        return True
+
+
+def _enlazar_o_copiar(origen, destino):
+    try:
+        os.link(origen, destino)
+    except FileExistsError:
+        raise
+    except OSError:
+        shutil.copyfile(origen, destino)
+
+
+_almacenamiento = None
+
+
+def almacenamiento_media():
+    """Almacenamiento de Cancion.file, Cancion.cover y Album.cover (callable para las migraciones)."""
+    global _almacenamiento
+    if _almacenamiento is None:
+        _almacenamiento = AlmacenamientoContenido()
+    return _almacenamiento
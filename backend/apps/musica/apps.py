@@ -5,3 +5,6 @@ class MusicaConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.musica'
     verbose_name = 'Música'
+
+    def ready(self):
+        from . import signals
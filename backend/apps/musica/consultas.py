@@ -0,0 +1,45 @@
+"""Forma de las consultas calientes de música.
+
+Las vistas y los módulos (oyentes, radio, recomendaciones, reports) las
+construyen con estas funciones, y `apps.reports.indices` comprueba con EXPLAIN
+las mismas funciones: si cambia la forma de una consulta, la verificación de
+índices (comando verificar_indices y tests de reports) cambia con ella.
+"""
+from .models import Cancion, CancionFavorita, CancionSimilar, HistorialReproduccion, OyentesCancion, PoolRadio
+
+
+def canciones_recientes():
+    return Cancion.objects.order_by('-created_at')
+
+
+def mas_reproducidas():
+    return Cancion.objects.order_by('-play_count')
+
+
+def canciones_de_artista(artista_id):
+    return Cancion.objects.filter(uploaded_by_id=artista_id).order_by('-play_count')
+
+
+def historial(usuario_id):
+    # select_related no pasa por el manager de Cancion: hay que excluir a mano las eliminadas
+    return HistorialReproduccion.objects.filter(
+        usuario_id=usuario_id, cancion__eliminado_en__isnull=True
+    ).select_related('cancion')
+
+
+def favoritos(usuario_id):
+    return CancionFavorita.objects.filter(
+        usuario_id=usuario_id, cancion__eliminado_en__isnull=True
+    ).select_related('cancion')
+
+
+def oyentes_historicos(ids):
+    return OyentesCancion.objects.filter(cancion_id__in=ids, dia__isnull=True)
+
+
+def similares(cancion_id):
+    return CancionSimilar.objects.filter(cancion_id=cancion_id).order_by('-puntaje')
+
+
+def pool_radio(tipo, semilla_id):
+    return PoolRadio.objects.filter(tipo=tipo, semilla_id=semilla_id)
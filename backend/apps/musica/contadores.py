@@ -0,0 +1,168 @@
+"""Contadores de reproducciones repartidos en fragmentos para canciones muy escuchadas.
+
+Sumar en `Cancion.play_count` bloquea la fila de la canción: con una canción
+viral todas las reproducciones esperan a ese mismo bloqueo. Cuando una
+canción supera CONTADORES['UMBRAL'] reproducciones en VENTANA segundos se
+reparte: cada reproducción suma en una de sus FRAGMENTOS filas de
+`ContadorFragmento`, elegida al azar, y los escritores dejan de competir.
+
+`plegar()` (manage.py plegar_contadores, periódico) pasa lo acumulado en los
+fragmentos a `play_count`; `reproducciones()` suma los fragmentos pendientes
+al leer, así que los contadores de la API no esperan al pliegue. Una canción
+repartida sin reproducciones entre dos pliegues vuelve a sumar en su fila.
+"""
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+
+from .models import Cancion, ContadorFragmento
+
+CONFIG = {
+    'FRAGMENTOS': 16,
+    'UMBRAL': 50,
+    'VENTANA': 10,
+    'REFRESCO': 30,
+}
+
+
+def config():
+    return {**CONFIG, **getattr(settings, 'CONTADORES', {})}
+
+
+class _Tasa:
+    """Reproducciones por canción en la ventana actual (de este proceso)."""
+
+    MAX_CANCIONES = 10000
+
+    def __init__(self):
+        self._ventanas = {}
+        self._lock = threading.Lock()
+
+    def sumar(self, cancion_id, ventana, ahora=None):
+        """Cuenta una reproducción y devuelve las acumuladas en la ventana en curso."""
+        ahora = time.monotonic() if ahora is None else ahora
+        with self._lock:
+            inicio, cuenta = self._ventanas.get(cancion_id, (ahora, 0))
+            if ahora - inicio >= ventana:
+                inicio, cuenta = ahora, 0
+            self._ventanas[cancion_id] = (inicio, cuenta + 1)
+            if len(self._ventanas) > self.MAX_CANCIONES:
+                self._ventanas = {k: v for k, v in self._ventanas.items() if ahora - v[0] < ventana}
+            return cuenta + 1
+
+    def olvidar(self, cancion_id):
+        with self._lock:
+            self._ventanas.pop(cancion_id, None)
+
+
+class _Repartidas:
+    """Canciones repartidas y su número de fragmentos, releídas cada REFRESCO segundos."""
+
+    def __init__(self):
+        self._fragmentos = {}
+        self._leido = None
+        self._lock = threading.Lock()
+
+    def fragmentos(self, cancion_id, refresco):
+        with self._lock:
+            if self._leido is None or time.monotonic() - self._leido >= refresco:
+                self._fragmentos = dict(
+                    Cancion.objects.filter(fragmentos_contador__gt=0).values_list('id', 'fragmentos_contador')
+                )
+                self._leido = time.monotonic()
+            return self._fragmentos.get(cancion_id, 0)
+
+    def marcar(self, cancion_id, fragmentos):
+        with self._lock:
+            if fragmentos:
+                self._fragmentos[cancion_id] = fragmentos
+            else:
+                self._fragmentos.pop(cancion_id, None)
+
+    def invalidar(self):
+        with self._lock:
+            self._leido = None
+
+
+_tasa = _Tasa()
+_repartidas = _Repartidas()
+
+
+def repartir(cancion_id, fragmentos=None):
+    """Pasa una canción a contar en fragmentos (crea las filas para que sumar sea un UPDATE)."""
+    fragmentos = fragmentos or config()['FRAGMENTOS']
+    with transaction.atomic():
+        ContadorFragmento.objects.bulk_create(
+            [ContadorFragmento(cancion_id=cancion_id, fragmento=i) for i in range(fragmentos)],
+            ignore_conflicts=True,
+        )
+        Cancion.objects.filter(pk=cancion_id).update(fragmentos_contador=fragmentos)
+    _repartidas.marcar(cancion_id, fragmentos)
+    _tasa.olvidar(cancion_id)
+
+
+def sumar(cancion_id, cantidad=1):
+    """Suma reproducciones a la canción: en su fila o, si está repartida, en un fragmento al azar."""
+    ajustes = config()
+    fragmentos = _repartidas.fragmentos(cancion_id, ajustes['REFRESCO'])
+    if fragmentos:
+        fragmento = random.randrange(fragmentos)
+        filtro = ContadorFragmento.objects.filter(cancion_id=cancion_id, fragmento=fragmento)
+        if not filtro.update(cuenta=F('cuenta') + cantidad):
+            # El fragmento se borró al volver a contar en la fila (otro proceso)
+            ContadorFragmento.objects.bulk_create(
+                [ContadorFragmento(cancion_id=cancion_id, fragmento=fragmento)], ignore_conflicts=True
+            )
+            filtro.update(cuenta=F('cuenta') + cantidad)
+        return
+    Cancion.objects.filter(pk=cancion_id).update(play_count=F('play_count') + cantidad)
+    if _tasa.sumar(cancion_id, ajustes['VENTANA']) >= ajustes['UMBRAL']:
+        repartir(cancion_id, ajustes['FRAGMENTOS'])
+
+
+def plegar():
+    """Pasa los fragmentos a play_count. Devuelve (canciones plegadas, reproducciones, canciones devueltas a su fila)."""
+    plegadas = reproducciones = devueltas = 0
+    pendientes = set(
+        ContadorFragmento.objects.filter(cuenta__gt=0).values_list('cancion_id', flat=True).distinct()
+    )
+    for cancion_id in pendientes:
+        with transaction.atomic():
+            filas = list(
+                ContadorFragmento.objects.select_for_update()
+                .filter(cancion_id=cancion_id, cuenta__gt=0).values_list('pk', 'cuenta')
+            )
+            total = sum(cuenta for _, cuenta in filas)
+            if not total:
+                continue
+            Cancion.objects.filter(pk=cancion_id).update(play_count=F('play_count') + total)
+            for pk, cuenta in filas:
+                # Restar lo leído (no poner a cero): las filas están bloqueadas, pero es lo robusto
+                ContadorFragmento.objects.filter(pk=pk).update(cuenta=F('cuenta') - cuenta)
+        plegadas += 1
+        reproducciones += total
+
+    # Repartidas que no han sumado nada desde el pliegue anterior: vuelven a su fila
+    for cancion_id in Cancion.objects.filter(fragmentos_contador__gt=0).exclude(pk__in=pendientes).values_list('pk', flat=True):
+        with transaction.atomic():
+            Cancion.objects.filter(pk=cancion_id).update(fragmentos_contador=0)
+            ContadorFragmento.objects.filter(cancion_id=cancion_id, cuenta=0).delete()
+        _repartidas.marcar(cancion_id, 0)
+        devueltas += 1
+    return plegadas, reproducciones, devueltas
+
+
+def reproducciones(ids):
+    """{id: play_count + lo pendiente en fragmentos} de las canciones existentes en `ids`."""
+    totales = dict(Cancion.objects.filter(id__in=ids).values_list('id', 'play_count'))
+    pendientes = (
+        ContadorFragmento.objects.filter(cancion_id__in=list(totales), cuenta__gt=0)
+        .values('cancion_id').annotate(total=Sum('cuenta')).values_list('cancion_id', 'total')
+    )
+    for cancion_id, total in pendientes:
+        totales[cancion_id] += total
+    return totales
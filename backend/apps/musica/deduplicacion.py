@@ -0,0 +1,96 @@
+"""Ventana de deduplicación de inicios de reproducción.
+
+Una sola escucha suele traer varias peticiones `bytes=0-` (sondeo del
+navegador, reinicios, recargas del elemento <audio>) y varias llamadas de
+registro. `nueva()` deja pasar la primera de cada (oyente, canción) dentro de
+DEDUPLICACION['VENTANA'] segundos, de modo que una escucha suma una sola
+reproducción y una sola fila de historial.
+
+El oyente es el usuario autenticado o, si no lo hay, una huella de la IP y el
+User-Agent. Las claves se guardan como enteros de 64 bits con su caducidad en
+un dict por proceso (en orden de inserción, así que caducar es sacar del
+principio). Con varios procesos, DEDUPLICACION['CACHE'] nombra una caché de
+Django compartida (Redis, Memcached...) y se usa su `add()` atómico.
+"""
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+CONFIG = {
+    'VENTANA': 300,
+    'MAX_ENTRADAS': 200000,
+    'CACHE': None,
+}
+
+
+def config():
+    return {**CONFIG, **getattr(settings, 'DEDUPLICACION', {})}
+
+
+class VentanaLocal:
+    """Conjunto de claves con caducidad común; acotado a `max_entradas` (descarta las más antiguas)."""
+
+    def __init__(self, max_entradas):
+        self.max_entradas = max_entradas
+        self._expira = {}
+        self._lock = threading.Lock()
+
+    def agregar(self, clave, ventana, ahora=None):
+        """True si `clave` no estaba vigente (y la registra durante `ventana` segundos)."""
+        ahora = time.monotonic() if ahora is None else ahora
+        with self._lock:
+            while self._expira:
+                primera = next(iter(self._expira))
+                if self._expira[primera] > ahora and len(self._expira) < self.max_entradas:
+                    break
+                del self._expira[primera]
+            if self._expira.get(clave, 0) > ahora:
+                return False
+            # Reinsertar al final para mantener el orden por caducidad
+            self._expira.pop(clave, None)
+            self._expira[clave] = ahora + ventana
+            return True
+
+    def __len__(self):
+        return len(self._expira)
+
+
+_local = None
+_local_lock = threading.Lock()
+
+
+def _ventana_local(max_entradas):
+    global _local
+    with _local_lock:
+        if _local is None or _local.max_entradas != max_entradas:
+            _local = VentanaLocal(max_entradas)
+        return _local
+
+
+def oyente(request, usuario_id=None):
+    """Identificador del oyente: el usuario o una huella de IP + User-Agent."""
+    usuario_id = usuario_id or getattr(getattr(request, 'user', None), 'id', None)
+    if usuario_id:
+        return f'u{usuario_id}'
+    return 'h' + hashlib.blake2b(
+        f'{request.META.get("REMOTE_ADDR", "")}\n{request.META.get("HTTP_USER_AGENT", "")}'.encode(), digest_size=8
+    ).hexdigest()
+
+
+def nueva(espacio, cancion_id, request, usuario_id=None):
+    """True si es la primera vez que el oyente inicia `cancion_id` en la ventana (por `espacio`)."""
+    return nueva_de(espacio, cancion_id, oyente(request, usuario_id))
+
+
+def nueva_de(espacio, cancion_id, oyente_id):
+    """Como nueva(), con el identificador de oyente ya calculado (fuera de la petición)."""
+    ajustes = config()
+    clave = hashlib.blake2b(f'{espacio}\n{oyente_id}\n{cancion_id}'.encode(), digest_size=8)
+    if ajustes['CACHE']:
+        return caches[ajustes['CACHE']].add(f'dedup:{clave.hexdigest()}', 1, ajustes['VENTANA'])
+    return _ventana_local(ajustes['MAX_ENTRADAS']).agregar(
+        int.from_bytes(clave.digest(), 'big'), ajustes['VENTANA']
+    )
@@ -0,0 +1,261 @@
+"""Seguimiento de escuchas a partir de latidos del reproductor.
+
+El cliente envía cada pocos segundos (y al pausar o terminar) un latido con la
+sesión, la posición y el estado. Los latidos se acumulan en memoria por
+sesión: solo cuenta como escuchado el avance de la posición mientras se
+reproducía y que cabe en el tiempo real transcurrido (los saltos hacia
+delante no suman). Al recibir `fin`, o tras ESCUCHAS['INACTIVIDAD'] segundos
+sin latidos, la sesión se escribe como una fila de `SesionEscucha`, en lotes
+desde un hilo de barrido.
+
+Una sesión acredita una reproducción (contadores.sumar) al superar
+UMBRAL_SEGUNDOS escuchados, o UMBRAL_FRACCION de la duración si la canción
+es más corta; los saltos tempranos no cuentan. Registrar un latido no toca la
+base de datos: la sesión se identifica la primera vez con la URL de audio
+firmada (firmas.py), que ya prueba canción y usuario.
+
+Como el cliente elige el id de sesión, una misma URL podría abrir muchas
+sesiones en paralelo: la acreditación pasa por la misma ventana de
+deduplicación que los inicios de reproducción (deduplicacion.py, por
+oyente y canción), consultada tras el commit de las sesiones (la ventana no
+se deshace si el lote se revierte y se reintenta), y las sesiones abiertas por proceso se limitan a
+MAX_SESIONES (las nuevas se rechazan con `Saturado` hasta que se liberen).
+"""
+import atexit
+import logging
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections, transaction
+
+from backend import escritura
+
+from . import contadores, deduplicacion
+from .models import Cancion, SesionEscucha
+
+logger = logging.getLogger(__name__)
+
+REPRODUCIENDO = 'reproduciendo'
+PAUSA = 'pausa'
+FIN = 'fin'
+ESTADOS = (REPRODUCIENDO, PAUSA, FIN)
+
+CONFIG = {
+    'UMBRAL_SEGUNDOS': 30,
+    'UMBRAL_FRACCION': 0.5,
+    'INACTIVIDAD': 120,
+    'BARRIDO': 10,
+    'ACREDITAR': True,
+    'MAX_SESIONES': 200000,
+}
+# Margen sobre el tiempo real para aceptar un avance (latidos retrasados, velocidad > 1)
+HOLGURA = 1.5
+PARTICIONES = 16
+
+
+def config():
+    return {**CONFIG, **getattr(settings, 'ESCUCHAS', {})}
+
+
+class Saturado(Exception):
+    """El coalescedor tiene el máximo de sesiones abiertas."""
+
+
+class _Sesion:
+    __slots__ = ('cancion', 'usuario', 'oyente', 'inicio', 'ultimo', 'posicion', 'maxima', 'escuchado', 'reproduciendo')
+
+    def __init__(self, cancion, usuario, oyente, ahora, posicion):
+        self.cancion = cancion
+        self.usuario = usuario
+        self.oyente = oyente
+        self.inicio = self.ultimo = ahora
+        self.posicion = self.maxima = posicion
+        self.escuchado = 0.0
+        self.reproduciendo = False
+
+    def fila(self, sesion_id):
+        return (
+            sesion_id, self.cancion, self.usuario, self.inicio, self.ultimo, int(self.escuchado), int(self.maxima),
+            self.oyente,
+        )
+
+
+class Coalescedor:
+    """Sesiones abiertas en memoria, repartidas en particiones con su propio lock."""
+
+    def __init__(self, particiones=PARTICIONES):
+        self._particiones = [({}, threading.Lock()) for _ in range(particiones)]
+        self._terminadas = []
+        self._terminadas_lock = threading.Lock()
+
+    def conocida(self, sesion_id):
+        return sesion_id in self._particiones[hash(sesion_id) % len(self._particiones)][0]
+
+    def registrar(self, sesion_id, posicion, estado, identificar, ahora=None, maximo=None):
+        """Aplica un latido. `identificar()` da (cancion, usuario, oyente) si la sesión es nueva.
+
+        Con `maximo` (sesiones abiertas en total) lanza Saturado antes de abrir una más.
+        """
+        ahora = time.time() if ahora is None else ahora
+        sesiones, lock = self._particiones[hash(sesion_id) % len(self._particiones)]
+        nueva = None if sesion_id in sesiones else _Sesion(*identificar(), ahora, posicion)
+        with lock:
+            sesion = sesiones.get(sesion_id)
+            if sesion is None:
+                if maximo is not None and len(sesiones) >= max(1, maximo // len(self._particiones)):
+                    raise Saturado
+                sesion = sesiones[sesion_id] = nueva or _Sesion(*identificar(), ahora, posicion)
+            else:
+                avance = posicion - sesion.posicion
+                if sesion.reproduciendo and 0 < avance <= (ahora - sesion.ultimo) * HOLGURA + 1:
+                    sesion.escuchado += avance
+                sesion.posicion = posicion
+                sesion.maxima = max(sesion.maxima, posicion)
+                sesion.ultimo = ahora
+            sesion.reproduciendo = estado == REPRODUCIENDO
+            if estado == FIN:
+                del sesiones[sesion_id]
+        if estado == FIN:
+            with self._terminadas_lock:
+                self._terminadas.append(sesion.fila(sesion_id))
+
+    def extraer(self, inactividad, ahora=None):
+        """Saca las sesiones terminadas y las inactivas más de `inactividad` segundos (todas si es None)."""
+        ahora = time.time() if ahora is None else ahora
+        with self._terminadas_lock:
+            filas, self._terminadas = self._terminadas, []
+        for sesiones, lock in self._particiones:
+            with lock:
+                caducadas = [
+                    sesion_id for sesion_id, sesion in sesiones.items()
+                    if inactividad is None or ahora - sesion.ultimo >= inactividad
+                ]
+                filas.extend(sesiones.pop(sesion_id).fila(sesion_id) for sesion_id in caducadas)
+        return filas
+
+    def __len__(self):
+        return sum(len(sesiones) for sesiones, _ in self._particiones)
+
+
+def umbral(duracion, ajustes=None):
+    """Segundos escuchados a partir de los que se acredita una reproducción."""
+    ajustes = ajustes or config()
+    if duracion and ajustes['UMBRAL_FRACCION']:
+        return min(ajustes['UMBRAL_SEGUNDOS'], duracion * ajustes['UMBRAL_FRACCION'])
+    return ajustes['UMBRAL_SEGUNDOS']
+
+
+def _fecha(marca):
+    return datetime.fromtimestamp(marca, tz=dt_timezone.utc)
+
+
+def guardar(filas):
+    """Escribe sesiones extraídas: crea las nuevas, acumula en las ya guardadas y acredita reproducciones.
+
+    Devuelve (sesiones escritas, sesiones que superaron el umbral).
+    """
+    ajustes = config()
+    duraciones = dict(
+        Cancion.objects.filter(id__in={f[1] for f in filas}).values_list('id', 'duration')
+    )
+    usuarios = set(
+        get_user_model().objects.filter(id__in={f[2] for f in filas if f[2]}).values_list('id', flat=True)
+    )
+    existentes = SesionEscucha.objects.in_bulk([f[0] for f in filas])
+    nuevas, cambiadas, candidatas = {}, {}, []
+    for sesion_id, cancion, usuario, inicio, ultimo, escuchado, maxima, oyente in filas:
+        if cancion not in duraciones:
+            continue
+        fila = existentes.get(sesion_id) or nuevas.get(sesion_id)
+        if fila is None:
+            fila = nuevas[sesion_id] = SesionEscucha(
+                id=sesion_id, cancion_id=cancion, usuario_id=usuario if usuario in usuarios else None,
+                iniciada_en=_fecha(inicio), terminada_en=_fecha(ultimo),
+                segundos_escuchados=escuchado, posicion_maxima=maxima,
+            )
+        else:
+            # La sesión se reanudó tras caducar, o sus latidos llegaron a otro proceso
+            fila.segundos_escuchados += escuchado
+            fila.posicion_maxima = max(fila.posicion_maxima, maxima)
+            fila.terminada_en = max(fila.terminada_en, _fecha(ultimo))
+            if sesion_id in existentes:
+                cambiadas[sesion_id] = fila
+        if not fila.acreditada and fila.segundos_escuchados >= umbral(duraciones[fila.cancion_id], ajustes):
+            fila.acreditada = True
+            candidatas.append((fila.cancion_id, oyente))
+    SesionEscucha.objects.bulk_create(nuevas.values(), batch_size=500)
+    SesionEscucha.objects.bulk_update(
+        cambiadas.values(), ['segundos_escuchados', 'posicion_maxima', 'terminada_en', 'acreditada'], batch_size=500
+    )
+    if ajustes['ACREDITAR'] and candidatas:
+        transaction.on_commit(lambda: _acreditar(candidatas))
+    return len(nuevas) + len(cambiadas), len(candidatas)
+
+
+def _acreditar(candidatas):
+    # Varias sesiones del mismo oyente y canción en la ventana acreditan una sola reproducción
+    acreditar = Counter(
+        cancion_id for cancion_id, oyente in candidatas
+        if deduplicacion.nueva_de('reproduccion', cancion_id, oyente)
+    )
+    if acreditar:
+        escritura.encolar(_sumar, acreditar)
+
+
+def _sumar(acreditar):
+    for cancion_id, cantidad in acreditar.items():
+        contadores.sumar(cancion_id, cantidad)
+
+
+_coalescedor = Coalescedor()
+_barrido = None
+_barrido_lock = threading.Lock()
+
+
+def _barrer():
+    while True:
+        time.sleep(config()['BARRIDO'])
+        try:
+            vaciar(config()['INACTIVIDAD'])
+        except Exception:  # pragma: no cover - que un fallo no detenga el barrido
+            logger.exception('Error al guardar sesiones de escucha')
+        close_old_connections()
+
+
+def _iniciar_barrido():
+    global _barrido
+    if _barrido is not None and _barrido.is_alive():
+        return
+    with _barrido_lock:
+        if _barrido is None or not _barrido.is_alive():
+            _barrido = threading.Thread(target=_barrer, name='barrido-escuchas', daemon=True)
+            _barrido.start()
+
+
+def registrar(sesion, posicion, estado, identificar):
+    """Aplica un latido al coalescedor del proceso.
+
+    Lanza ValueError si el latido no es válido y Saturado si no caben más sesiones.
+    """
+    sesion_id = uuid.UUID(str(sesion))
+    posicion = float(posicion)
+    if estado not in ESTADOS or not 0 <= posicion < 86400:
+        raise ValueError('Latido no válido')
+    _iniciar_barrido()
+    _coalescedor.registrar(sesion_id, posicion, estado, identificar, maximo=config()['MAX_SESIONES'])
+
+
+def vaciar(inactividad=None):
+    """Guarda las sesiones terminadas e inactivas (todas si `inactividad` es None)."""
+    filas = _coalescedor.extraer(inactividad)
+    if filas:
+        return escritura.encolar(guardar, filas)
+    return None
+
+
+atexit.register(vaciar)
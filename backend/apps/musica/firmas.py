@@ -0,0 +1,67 @@
+"""URLs de audio firmadas (HMAC-SHA256) y con caducidad.
+
+    <base>/canciones/3f/a2/3fa2...e9.mp3?c=42&e=1767225600&u=7&s=<firma>
+
+La firma cubre la ruta del archivo, la canción (`c`), la caducidad (`e`,
+segundos Unix) y el usuario al que se emitió (`u`, vacío si no se atribuye).
+`u` solo atribuye la escucha (baliza y latidos): quien sirve el audio no lo
+compara con nadie, así que una URL filtrada se reproduce para cualquiera hasta
+que caduca; lo que limita una filtración es la caducidad.
+
+Comprobarla solo requiere la clave compartida: ni base de datos ni Django,
+así que la puede hacer un servidor de estáticos (servidor_audio.py) y el audio
+deja de pasar por los workers de la aplicación.
+
+Este módulo no importa Django para poder usarse desde ese servidor.
+"""
+import base64
+import hashlib
+import hmac
+import time
+from urllib.parse import parse_qs, unquote, urlencode, urlsplit
+
+
+class FirmaInvalida(Exception):
+    pass
+
+
+def _firma(clave, ruta, cancion, expira, usuario):
+    mensaje = f'{ruta}\n{cancion}\n{expira}\n{usuario}'.encode()
+    digest = hmac.new(clave, mensaje, hashlib.sha256).digest()[:18]
+    return base64.urlsafe_b64encode(digest).decode()
+
+
+def parametros(clave, ruta, cancion, expira, usuario=''):
+    """Query string firmada para servir `ruta`."""
+    usuario = '' if usuario is None else str(usuario)
+    return urlencode({
+        'c': cancion, 'e': int(expira), 'u': usuario, 's': _firma(clave, ruta, cancion, int(expira), usuario),
+    })
+
+
+def verificar(clave, ruta, consulta, ahora=None, gracia=0):
+    """Comprueba la firma de `ruta` con los parámetros `consulta` (dict o query string).
+
+    Devuelve (cancion, usuario) (usuario '' si la URL no está atribuida) o lanza
+    FirmaInvalida. `gracia` admite URLs caducadas hace menos de esos segundos.
+    """
+    if isinstance(consulta, str):
+        consulta = {k: v[0] for k, v in parse_qs(consulta).items()}
+    try:
+        cancion, expira, usuario, firma = consulta['c'], int(consulta['e']), consulta.get('u', ''), consulta['s']
+    except (KeyError, ValueError, TypeError):
+        raise FirmaInvalida('Faltan parámetros de firma')
+    if not hmac.compare_digest(firma, _firma(clave, ruta, cancion, expira, usuario)):
+        raise FirmaInvalida('Firma incorrecta')
+    if (ahora if ahora is not None else time.time()) > expira + gracia:
+        raise FirmaInvalida('URL caducada')
+    return cancion, usuario
+
+
+def verificar_url(clave, url, prefijo, **kwargs):
+    """Como verificar(), a partir de la URL completa y el prefijo bajo el que se sirven los archivos."""
+    partes = urlsplit(url)
+    ruta = unquote(partes.path)
+    if not ruta.startswith(prefijo):
+        raise FirmaInvalida('Ruta fuera del prefijo de audio')
+    return verificar(clave, ruta[len(prefijo):], partes.query, **kwargs)
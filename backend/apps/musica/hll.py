@@ -0,0 +1,77 @@
+"""HyperLogLog compacto para estimar oyentes únicos.
+
+Con precisión p=12 (4096 registros de un byte) el error estándar de la
+estimación es 1.04 / sqrt(4096) ≈ 1.6 %: en ~95 % de los casos el valor real
+está dentro de ±3.3 % del estimado. Los registros se guardan comprimidos con
+zlib, por lo que un sketch con pocos oyentes ocupa unas decenas de bytes y uno
+saturado no pasa de 4 KiB.
+
+Dos sketches se fusionan tomando el máximo registro a registro, lo que permite
+combinar sketches diarios para consultar cualquier ventana de días.
+"""
+import hashlib
+import math
+import zlib
+
+PRECISION = 12
+REGISTROS = 1 << PRECISION
+ERROR_ESTANDAR = 1.04 / math.sqrt(REGISTROS)
+
+_BITS_RESTO = 64 - PRECISION
+_MASCARA_RESTO = (1 << _BITS_RESTO) - 1
+_ALPHA = 0.7213 / (1 + 1.079 / REGISTROS)
+_POTENCIAS = [2.0 ** -r for r in range(_BITS_RESTO + 2)]
+
+
+def _hash64(valor):
+    digest = hashlib.blake2b(str(valor).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+class HyperLogLog:
+    __slots__ = ('registros',)
+
+    def __init__(self, registros=None):
+        if registros is None:
+            self.registros = bytearray(REGISTROS)
+        else:
+            if len(registros) != REGISTROS:
+                raise ValueError('Tamaño de registros inválido para el sketch')
+            self.registros = bytearray(registros)
+
+    @classmethod
+    def desde_bytes(cls, data):
+        if not data:
+            return cls()
+        return cls(zlib.decompress(bytes(data)))
+
+    def a_bytes(self):
+        return zlib.compress(bytes(self.registros), 9)
+
+    def agregar(self, valor):
+        """Añade un elemento. Devuelve True si el sketch cambió."""
+        h = _hash64(valor)
+        indice = h >> _BITS_RESTO
+        resto = h & _MASCARA_RESTO
+        rango = _BITS_RESTO - resto.bit_length() + 1
+        if rango > self.registros[indice]:
+            self.registros[indice] = rango
+            return True
+        return False
+
+    def fusionar(self, otro):
+        self.registros = bytearray(map(max, self.registros, otro.registros))
+        return self
+
+    def estimar(self):
+        suma = 0.0
+        ceros = 0
+        for r in self.registros:
+            suma += _POTENCIAS[r]
+            if not r:
+                ceros += 1
+        estimacion = _ALPHA * REGISTROS * REGISTROS / suma
+        # Corrección para cardinalidades pequeñas (linear counting)
+        if estimacion <= 2.5 * REGISTROS and ceros:
+            estimacion = REGISTROS * math.log(REGISTROS / ceros)
+        return int(round(estimacion))
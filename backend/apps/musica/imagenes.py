@@ -0,0 +1,56 @@
+"""Generación de variantes de portada para el pool de procesos.
+
+Este módulo no importa Django: los procesos hijos (spawn) solo necesitan
+Pillow. Cada variante se escribe en un temporal y se renombra, de modo que un
+lector nunca ve un archivo a medias.
+"""
+import os
+
+from PIL import Image, ImageOps, features
+
+FORMATOS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+
+
+def formatos_disponibles():
+    return [f for f in FORMATOS if f != 'webp' or features.check('webp')]
+
+
+def _preparar(ruta):
+    with Image.open(ruta) as imagen:
+        imagen = ImageOps.exif_transpose(imagen)
+        if imagen.mode in ('RGBA', 'LA', 'P'):
+            imagen = imagen.convert('RGBA')
+            fondo = Image.new('RGB', imagen.size, (0, 0, 0))
+            fondo.paste(imagen, mask=imagen.getchannel('A'))
+            return fondo
+        return imagen.convert('RGB')
+
+
+def generar_variantes(origen, destinos, calidad=82):
+    """Genera las variantes cuadradas de `origen`.
+
+    `destinos` es una lista de (tamaño, formato, ruta absoluta); las que ya
+    existen se omiten (portadas idénticas comparten variantes). Las imágenes
+    más pequeñas que el tamaño pedido no se amplían.
+    """
+    pendientes = [d for d in destinos if not os.path.exists(d[2])]
+    if not pendientes:
+        return
+    imagen = _preparar(origen)
+    lado = min(imagen.size)
+    cuadrada = ImageOps.fit(imagen, (lado, lado), Image.Resampling.LANCZOS)
+    escaladas = {}
+    for tamano, formato, ruta in pendientes:
+        if tamano not in escaladas:
+            escaladas[tamano] = cuadrada if lado <= tamano else cuadrada.resize(
+                (tamano, tamano), Image.Resampling.LANCZOS
+            )
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        temporal = f'{ruta}.{os.getpid()}.tmp'
+        opciones = {'quality': calidad}
+        if formato == 'jpeg':
+            opciones.update(optimize=True, progressive=True)
+        else:
+            opciones.update(method=4)
+        escaladas[tamano].save(temporal, FORMATOS[formato], **opciones)
+        os.replace(temporal, ruta)
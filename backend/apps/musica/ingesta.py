@@ -0,0 +1,338 @@
+"""Ingesta de un álbum completo en una sola petición.
+
+El artista envía un ZIP o varios archivos de audio y un manifiesto JSON:
+
+    {"title": "Álbum", "release_date": "2024-05-01", "genre": "Rock",
+     "canciones": [{"archivo": "01 intro.mp3", "title": "Intro", "numero_pista": 1}]}
+
+Todo menos `title` es opcional: lo que falte en el manifiesto se toma de las
+etiquetas del archivo (título, número de pista, género) y, en último caso, del
+nombre del archivo y del orden. La portada del álbum es la enviada aparte, un
+`cover.*`/`folder.*` dentro del ZIP o la primera portada incrustada.
+
+Frente a N subidas sueltas:
+- el hash, la duración, las etiquetas y la portada incrustada de cada archivo
+  se leen en paralelo en un pool de procesos (sondeo.py);
+- los géneros se resuelven con una consulta y un `bulk_create`;
+- el rol del artista se comprueba una vez y las canciones se escriben con
+  `bulk_create` en la misma transacción que el álbum.
+
+La petición solo deja los archivos en `ingestas/<id>/` y devuelve la
+`IngestaAlbum`; el trabajo corre en un hilo y el avance se consulta en ella.
+"""
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import threading
+import uuid
+import zipfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path, PurePosixPath
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.text import get_valid_filename
+
+from . import portadas, sondeo
+from .almacenamiento import almacenamiento_media, extension_de
+from .models import Album, ArchivoMedia, Cancion, Genero, IngestaAlbum
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONES_AUDIO = {'.mp3', '.flac', '.ogg', '.oga', '.opus', '.m4a', '.mp4', '.aac', '.wav'}
+EXTENSIONES_IMAGEN = {'.jpg', '.jpeg', '.png', '.webp'}
+NOMBRES_PORTADA = {'cover', 'folder', 'front', 'portada'}
+MAX_ERRORES = 100
+
+
+class ErrorIngesta(Exception):
+    pass
+
+
+def _config(clave):
+    valores = {'MAX_PISTAS': 100, 'TAMANO_MAXIMO': 2 * 1024 * 1024 * 1024, 'PROCESOS': os.cpu_count() or 1}
+    valores.update(getattr(settings, 'INGESTA_ALBUMES', {}))
+    return valores[clave]
+
+
+def _nombre_pista(nombre):
+    """Nombre con el que se guarda (y se busca en el manifiesto) un archivo."""
+    return get_valid_filename(PurePosixPath(nombre.replace('\\', '/')).name)
+
+
+def _es_portada(nombre):
+    ruta = PurePosixPath(nombre)
+    return ruta.stem.lower() in NOMBRES_PORTADA and ruta.suffix.lower() in EXTENSIONES_IMAGEN
+
+
+def _leer_manifiesto(manifiesto):
+    if isinstance(manifiesto, str):
+        try:
+            manifiesto = json.loads(manifiesto or '{}')
+        except ValueError:
+            raise ErrorIngesta('El manifiesto no es JSON válido.')
+    if not isinstance(manifiesto, dict):
+        raise ErrorIngesta('El manifiesto debe ser un objeto JSON.')
+    if not isinstance(manifiesto.get('title'), str) or not manifiesto['title'].strip():
+        raise ErrorIngesta('El manifiesto necesita el título del álbum (title).')
+    if manifiesto.get('release_date') and not parse_date(str(manifiesto['release_date'])):
+        raise ErrorIngesta('release_date debe tener el formato AAAA-MM-DD.')
+    canciones = manifiesto.get('canciones', [])
+    if not isinstance(canciones, list) or not all(isinstance(c, dict) and c.get('archivo') for c in canciones):
+        raise ErrorIngesta('canciones debe ser una lista de objetos con "archivo".')
+    return manifiesto
+
+
+def _guardar(subido, destino):
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    with open(destino, 'wb') as archivo:
+        for bloque in subido.chunks():
+            archivo.write(bloque)
+
+
+def preparar(usuario_id, manifiesto, archivo_zip=None, archivos=(), portada=None):
+    """Valida la petición, deja los archivos en `ingestas/<id>/` y crea la `IngestaAlbum`."""
+    manifiesto = _leer_manifiesto(manifiesto)
+    if bool(archivo_zip) == bool(archivos):
+        raise ErrorIngesta('Envía un ZIP (archivo) o los archivos de audio (archivos), no ambos.')
+    if len(archivos) > _config('MAX_PISTAS'):
+        raise ErrorIngesta(f'Como máximo {_config("MAX_PISTAS")} archivos por álbum.')
+    if sum(a.size for a in archivos) + (archivo_zip.size if archivo_zip else 0) > _config('TAMANO_MAXIMO'):
+        raise ErrorIngesta('El álbum supera el tamaño máximo permitido.')
+    if portada is not None and extension_de(portada.name) not in EXTENSIONES_IMAGEN:
+        raise ErrorIngesta('La portada debe ser JPEG, PNG o WebP.')
+
+    id_ingesta = uuid.uuid4()
+    relativo = f'ingestas/{id_ingesta.hex}'
+    directorio = Path(settings.MEDIA_ROOT) / relativo
+    try:
+        nombres = set()
+        for subido in archivos:
+            nombre = _nombre_pista(subido.name)
+            if Path(nombre).suffix.lower() not in EXTENSIONES_AUDIO:
+                raise ErrorIngesta(f'{subido.name}: formato de audio no soportado.')
+            if nombre in nombres:
+                raise ErrorIngesta(f'Archivo repetido: {subido.name}')
+            nombres.add(nombre)
+            _guardar(subido, directorio / 'pistas' / nombre)
+        if archivo_zip:
+            _guardar(archivo_zip, directorio / 'album.zip')
+        if portada is not None:
+            _guardar(portada, directorio / f'portada{extension_de(portada.name)}')
+    except BaseException:
+        shutil.rmtree(directorio, ignore_errors=True)
+        raise
+    return IngestaAlbum.objects.create(id=id_ingesta, usuario_id=usuario_id, directorio=relativo, manifiesto=manifiesto)
+
+
+class Ingestor:
+    def __init__(self, ingesta, procesos=None):
+        self.ingesta = ingesta
+        self.procesos = procesos or _config('PROCESOS')
+        self.directorio = Path(settings.MEDIA_ROOT) / ingesta.directorio
+        self.colocadas = []  # rutas escritas en el almacenamiento por contenido
+
+    def ejecutar(self):
+        ingesta = self.ingesta
+        ingesta.estado = IngestaAlbum.EN_CURSO
+        ingesta.save(update_fields=['estado', 'actualizado_en'])
+        try:
+            usuario = get_user_model().objects.select_related('rol').get(pk=ingesta.usuario_id)
+            if not Cancion.puede_subir(usuario):
+                raise ErrorIngesta('Solo usuarios con rol de artista pueden subir canciones')
+            pistas, portada = self._archivos()
+            if not pistas:
+                raise ErrorIngesta('No se encontró ningún archivo de audio.')
+            ingesta.total = len(pistas)
+            ingesta.save(update_fields=['total', 'actualizado_en'])
+            datos = self._sondear(pistas)
+            with transaction.atomic():
+                self._crear(usuario, datos, portada)
+            ingesta.estado = IngestaAlbum.COMPLETADA
+        except Exception as exc:
+            if not isinstance(exc, ErrorIngesta):
+                logger.exception('Ingesta de álbum %s fallida', ingesta.pk)
+            for ruta in self.colocadas:
+                ArchivoMedia.objects.registrar_sin_uso(ruta)
+            ingesta.album = None  # revertido con la transacción
+            ingesta.estado = IngestaAlbum.ERROR
+            ingesta.mensaje = str(exc)
+            raise
+        finally:
+            ingesta.save(update_fields=['estado', 'mensaje', 'album', 'errores', 'actualizado_en'])
+            shutil.rmtree(self.directorio, ignore_errors=True)
+        return ingesta
+
+    def _archivos(self):
+        """Rutas de los audios (ordenadas) y de la portada del álbum, extrayendo el ZIP si lo hay."""
+        pistas_dir = self.directorio / 'pistas'
+        portada = next(iter(sorted(self.directorio.glob('portada.*'))), None)
+        zip_path = self.directorio / 'album.zip'
+        if zip_path.exists():
+            portada_zip = self._extraer(zip_path, pistas_dir)
+            portada = portada or portada_zip
+        pistas = sorted(p for p in pistas_dir.glob('*') if p.suffix.lower() in EXTENSIONES_AUDIO)
+        return pistas, portada
+
+    def _extraer(self, zip_path, destino):
+        try:
+            zf = zipfile.ZipFile(zip_path)
+        except zipfile.BadZipFile:
+            raise ErrorIngesta('El archivo no es un ZIP válido.')
+        portada = None
+        with zf:
+            miembros = []
+            for miembro in zf.infolist():
+                ruta = PurePosixPath(miembro.filename.replace('\\', '/'))
+                if miembro.is_dir() or '__MACOSX' in ruta.parts or ruta.name.startswith('.'):
+                    continue
+                if ruta.suffix.lower() in EXTENSIONES_AUDIO or _es_portada(ruta.name):
+                    miembros.append(miembro)
+            audios = [m for m in miembros if not _es_portada(m.filename)]
+            if len(audios) > _config('MAX_PISTAS'):
+                raise ErrorIngesta(f'Como máximo {_config("MAX_PISTAS")} archivos por álbum.')
+            # Tamaño declarado sin descomprimir: evita llenar el disco con un ZIP malicioso
+            if sum(m.file_size for m in miembros) > _config('TAMANO_MAXIMO'):
+                raise ErrorIngesta('El álbum supera el tamaño máximo permitido.')
+            destino.mkdir(parents=True, exist_ok=True)
+            for miembro in miembros:
+                nombre = _nombre_pista(miembro.filename)
+                if _es_portada(nombre):
+                    if portada is not None:
+                        continue
+                    portada = destino.parent / f'portada_zip{Path(nombre).suffix.lower()}'
+                    salida = portada
+                else:
+                    salida = destino / nombre
+                    if salida.exists():
+                        raise ErrorIngesta(f'Archivo repetido en el ZIP: {miembro.filename}')
+                with zf.open(miembro) as origen, open(salida, 'wb') as archivo:
+                    shutil.copyfileobj(origen, archivo, 1024 * 1024)
+        return portada
+
+    def _sondear(self, pistas):
+        """Metadatos de cada pista (pool de procesos), guardando el avance en la ingesta."""
+        rutas = [str(p) for p in pistas]
+        procesos = min(self.procesos, len(rutas))
+        resultados = {}
+        if procesos <= 1:
+            for n, ruta in enumerate(rutas, start=1):
+                resultados[ruta] = sondeo.sondear(ruta)
+                self._avance(n)
+            return [resultados[r] for r in rutas]
+        with ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context('spawn')) as pool:
+            futuros = [pool.submit(sondeo.sondear, ruta) for ruta in rutas]
+            for n, futuro in enumerate(as_completed(futuros), start=1):
+                datos = futuro.result()
+                resultados[datos['ruta']] = datos
+                self._avance(n)
+        return [resultados[r] for r in rutas]
+
+    def _avance(self, procesadas):
+        self.ingesta.procesadas = procesadas
+        IngestaAlbum.objects.filter(pk=self.ingesta.pk).update(procesadas=procesadas, actualizado_en=timezone.now())
+
+    def _colocar(self, origen, espacio, sha256):
+        ruta = almacenamiento_media().ubicar(str(origen), espacio, sha256, extension_de(str(origen)))
+        self.colocadas.append(ruta)
+        return ruta
+
+    def _crear(self, usuario, datos, portada):
+        ingesta = self.ingesta
+        manifiesto = ingesta.manifiesto
+        por_archivo = {_nombre_pista(c['archivo']): c for c in manifiesto.get('canciones', [])}
+        nombres = {Path(d['ruta']).name for d in datos}
+        errores = [
+            {'archivo': c['archivo'], 'error': 'No está entre los archivos recibidos.'}
+            for nombre, c in por_archivo.items() if nombre not in nombres
+        ]
+
+        pistas = []
+        for d in datos:
+            entrada = por_archivo.get(Path(d['ruta']).name, {})
+            numero = entrada.get('numero_pista') or d['pista']
+            pistas.append({
+                **d,
+                'titulo': str(entrada.get('title') or d['titulo'] or Path(d['ruta']).stem)[:200],
+                'pista': numero if isinstance(numero, int) and 0 < numero < 2 ** 15 else None,
+                'genero': str(entrada.get('genre') or d['genero'] or manifiesto.get('genre') or '')[:64],
+            })
+        # Las pistas sin número toman los primeros libres, en orden de archivo
+        usados = {p['pista'] for p in pistas if p['pista']}
+        siguiente = 1
+        for p in pistas:
+            if not p['pista']:
+                while siguiente in usados:
+                    siguiente += 1
+                p['pista'] = siguiente
+                usados.add(siguiente)
+
+        nombres_genero = {p['genero'] for p in pistas if p['genero']}
+        Genero.objects.bulk_create([Genero(name=n) for n in nombres_genero], ignore_conflicts=True)
+        generos = {g.name: g for g in Genero.objects.filter(name__in=nombres_genero)}
+
+        ruta_portada = None
+        if portada is not None:
+            with open(portada, 'rb') as archivo:
+                ruta_portada = self._colocar(portada, 'portadas', hashlib.file_digest(archivo, 'sha256').hexdigest())
+        for p in pistas:
+            p['archivo'] = self._colocar(p['ruta'], 'canciones', p['sha256'])
+            p['cover'] = self._colocar(p['portada'], 'portadas', p['portada_sha256']) if p['portada'] else None
+        ruta_portada = ruta_portada or next((p['cover'] for p in pistas if p['cover']), None)
+
+        # Con save(): las señales cuentan la referencia y programan las variantes de la portada
+        album = Album.objects.create(
+            title=manifiesto['title'].strip()[:200],
+            artist=usuario,
+            release_date=parse_date(str(manifiesto['release_date'])) if manifiesto.get('release_date') else None,
+            cover=ruta_portada,
+        )
+        variantes = {ruta: portadas.programar_ruta(ruta) for ruta in {p['cover'] for p in pistas if p['cover']}}
+        # bulk_create no emite señales: las referencias se cuentan aquí
+        Cancion.objects.bulk_create([
+            Cancion(
+                title=p['titulo'],
+                album=album,
+                genre=generos.get(p['genero']),
+                duration=p['duracion'],
+                numero_pista=p['pista'],
+                file=p['archivo'],
+                cover=p['cover'],
+                cover_variantes=variantes.get(p['cover'], {}),
+                uploaded_by=usuario,
+            )
+            for p in pistas
+        ])
+        usos = Counter(p['archivo'] for p in pistas) + Counter(p['cover'] for p in pistas if p['cover'])
+        for ruta, n in usos.items():
+            ArchivoMedia.objects.referenciar(ruta, n)
+
+        ingesta.album = album
+        ingesta.errores = errores[:MAX_ERRORES]
+
+
+def ingerir(ingesta, **kwargs):
+    return Ingestor(ingesta, **kwargs).ejecutar()
+
+
+def ingerir_en_segundo_plano(ingesta, **kwargs):
+    """Procesa la ingesta en un hilo; el avance se consulta en el modelo."""
+    def trabajo():
+        try:
+            ingerir(ingesta, **kwargs)
+        except Exception:
+            pass  # ya registrado y guardado como estado ERROR
+        finally:
+            connection.close()
+
+    # Tras el commit: el hilo debe ver la fila de la ingesta
+    transaction.on_commit(lambda: threading.Thread(
+        target=trabajo, name=f'ingesta-album-{ingesta.pk}', daemon=True
+    ).start())
@@ -0,0 +1,255 @@
+"""Purga de canciones y álbumes eliminados y conciliación de MEDIA_ROOT.
+
+`eliminar()` (borrado suave) solo fija `eliminado_en`: la fila desaparece de
+`objects` al momento y su media sigue en disco. `purgar_eliminados()` borra
+por lotes las filas eliminadas hace más de BORRADO['GRACIA'] segundos (las
+señales liberan sus archivos) y después recolecta los archivos sin uso.
+
+`escanear()` recorre MEDIA_ROOT en paralelo, un hilo por prefijo de dos
+caracteres, y lo compara con `ArchivoMedia` rango a rango. No borra nada que
+pueda estar usando una subida en curso: los archivos sin fila se registran
+sin uso (y los borra recolectar(), con su protocolo), y solo toca los que
+llevan más del margen sin modificarse.
+"""
+import os
+import re
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .almacenamiento import _PAPELERA, _TEMPORALES, almacenamiento_media, sha256_de_ruta
+from .models import Album, ArchivoMedia, Cancion
+
+CONFIG = {
+    'GRACIA': 7 * 86400,
+    'MARGEN_MEDIA': 3600,
+    'LOTE': 500,
+    'HILOS': 8,
+}
+# Campos de archivo que cuentan como referencia en ArchivoMedia (ver signals.py)
+CAMPOS_REFERENCIA = ((Cancion, 'file'), (Cancion, 'cover'), (Album, 'cover'))
+ESPACIOS = ('canciones', 'portadas')
+_RUTA_DERIVADO = re.compile(r'^[\w-]+/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}-[^/]+$')
+
+
+def config():
+    return {**CONFIG, **getattr(settings, 'BORRADO', {})}
+
+
+def purgar_eliminados(gracia=None, lote=None):
+    """Borra las canciones y álbumes eliminados hace más de `gracia` (timedelta). Devuelve {modelo: filas}."""
+    ajustes = config()
+    gracia = timedelta(seconds=ajustes['GRACIA']) if gracia is None else gracia
+    lote = lote or ajustes['LOTE']
+    limite = timezone.now() - gracia
+    purgadas = Counter()
+    # Canciones antes que álbumes: así el SET_NULL de los álbumes no toca canciones que se van a borrar
+    for modelo in (Cancion, Album):
+        while True:
+            # En el orden del índice parcial de eliminadas: cada lote es un rango de él
+            ids = list(
+                modelo.todos.filter(eliminado_en__lt=limite).order_by('eliminado_en', 'pk')
+                .values_list('pk', flat=True)[:lote]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                # Se vuelve a comprobar: pudo restaurarse entre la lectura y el borrado
+                borradas, _ = modelo.todos.filter(pk__in=ids, eliminado_en__lt=limite).delete()
+            purgadas[modelo._meta.model_name] += borradas
+            if len(ids) < lote:
+                break
+    return purgadas
+
+
+@dataclass
+class Informe:
+    archivos: int = 0
+    registrados: list = field(default_factory=list)
+    derivados_borrados: list = field(default_factory=list)
+    temporales_borrados: list = field(default_factory=list)
+    filas_borradas: list = field(default_factory=list)
+    rotos: list = field(default_factory=list)
+    sin_direccionar: int = 0
+    referencias_corregidas: list = field(default_factory=list)
+    referencias_de_mas: list = field(default_factory=list)
+
+    def sumar(self, otro):
+        for nombre, valor in vars(otro).items():
+            setattr(self, nombre, getattr(self, nombre) + valor)
+
+
+def _base(ruta):
+    return ruta.rsplit('/', 1)[1].split('.', 1)[0].split('-', 1)[0]
+
+
+def _original_existe(derivado):
+    directorio = os.path.dirname(almacenamiento_media().path(derivado))
+    base = _base(derivado)
+    try:
+        return any(nombre.split('.', 1)[0] == base for nombre in os.listdir(directorio))
+    except FileNotFoundError:
+        return False
+
+
+def _listar(directorio, fecha='st_mtime'):
+    """Archivos bajo `directorio` como {ruta relativa: fecha}."""
+    raiz = almacenamiento_media().location
+    archivos = {}
+    pendientes = [directorio]
+    while pendientes:
+        actual = pendientes.pop()
+        try:
+            entradas = list(os.scandir(actual))
+        except FileNotFoundError:
+            continue
+        for entrada in entradas:
+            if entrada.is_dir(follow_symlinks=False):
+                pendientes.append(entrada.path)
+            elif entrada.is_file(follow_symlinks=False):
+                try:
+                    mtime = getattr(entrada.stat(), fecha)
+                except FileNotFoundError:
+                    continue
+                archivos[os.path.relpath(entrada.path, raiz).replace(os.sep, '/')] = mtime
+    return archivos
+
+
+def _escanear_prefijo(espacio, prefijo, margen, corregir):
+    informe = Informe()
+    almacenamiento = almacenamiento_media()
+    antiguo = time.time() - margen
+    try:
+        en_disco = _listar(os.path.join(almacenamiento.location, espacio, prefijo))
+        desde = f'{espacio}/{prefijo}/'
+        # Rango sobre el índice único de `ruta` (un LIKE no lo usaría en SQLite)
+        filas = dict(
+            ArchivoMedia.objects.filter(ruta__gte=desde, ruta__lt=desde + '\uffff')
+            .values_list('ruta', 'referencias')
+        )
+        bases = {_base(ruta) for ruta in en_disco if sha256_de_ruta(ruta)}
+        informe.archivos = len(en_disco)
+        for ruta, mtime in en_disco.items():
+            if sha256_de_ruta(ruta):
+                if ruta not in filas and mtime < antiguo:
+                    informe.registrados.append(ruta)
+                    if corregir:
+                        ArchivoMedia.objects.registrar_sin_uso(ruta)
+            elif _RUTA_DERIVADO.match(ruta):
+                # Variante de portada cuyo original ya no está (se comprueba otra vez antes de borrar)
+                if _base(ruta) not in bases and mtime < antiguo and not _original_existe(ruta):
+                    informe.derivados_borrados.append(ruta)
+                    if corregir:
+                        almacenamiento.delete(ruta)
+            else:
+                informe.sin_direccionar += 1
+        limite = timezone.now() - timedelta(seconds=margen)
+        for ruta, referencias in filas.items():
+            if ruta in en_disco or almacenamiento.exists(ruta):
+                continue
+            if referencias:
+                informe.rotos.append(ruta)
+            else:
+                informe.filas_borradas.append(ruta)
+                if corregir:
+                    ArchivoMedia.objects.filter(ruta=ruta, referencias=0, actualizado_en__lt=limite).delete()
+    finally:
+        close_old_connections()
+    return informe
+
+
+def _limpiar_temporales(margen, corregir):
+    """Restos de subidas y recolecciones interrumpidas (.tmp y papelera)."""
+    raiz = almacenamiento_media().location
+    antiguo = time.time() - margen
+    borrados = []
+    # En la papelera cuenta el cambio de estado (el rename al retirar), no la modificación
+    for directorio, fecha in ((_TEMPORALES, 'st_mtime'), (_PAPELERA, 'st_ctime')):
+        for ruta, mtime in _listar(os.path.join(raiz, directorio), fecha).items():
+            if mtime < antiguo:
+                borrados.append(ruta)
+                if corregir:
+                    try:
+                        os.unlink(os.path.join(raiz, ruta))
+                    except FileNotFoundError:
+                        pass
+    return borrados
+
+
+def _referencias_esperadas():
+    """Filas (incluidas las eliminadas sin purgar) que usan cada ruta direccionada por contenido."""
+    esperadas = Counter()
+    for modelo, campo in CAMPOS_REFERENCIA:
+        conteo = modelo.todos.exclude(**{campo: ''}).exclude(**{f'{campo}__isnull': True})
+        for ruta, n in conteo.values_list(campo).annotate(n=Count('pk')).order_by():
+            if sha256_de_ruta(ruta):
+                esperadas[ruta] += n
+    return esperadas
+
+
+def _contar_referencias(ruta):
+    return sum(
+        modelo.todos.filter(**{campo: ruta}).count() for modelo, campo in CAMPOS_REFERENCIA
+    )
+
+
+def conciliar_referencias(corregir):
+    """Compara `ArchivoMedia.referencias` con las filas que usan cada archivo.
+
+    Solo se corrigen las que se quedaron cortas (con ellas recolectar() podría
+    borrar un archivo en uso); las de más se informan: bajar una cuenta
+    mientras se guarda una canción podría dejarla por debajo de lo real.
+    """
+    esperadas = _referencias_esperadas()
+    corregidas, de_mas = [], []
+    actuales = ArchivoMedia.objects.values_list('ruta', 'referencias').iterator(chunk_size=5000)
+    for ruta, referencias in actuales:
+        esperada = esperadas.pop(ruta, 0)
+        if referencias > esperada:
+            de_mas.append(ruta)
+        elif referencias < esperada:
+            corregidas.append(ruta)
+    # Rutas usadas sin fila en ArchivoMedia
+    corregidas.extend(esperadas)
+    if corregir:
+        for ruta in corregidas:
+            with transaction.atomic():
+                ArchivoMedia.objects.filter(ruta=ruta).select_for_update().first()
+                faltan = _contar_referencias(ruta) - (
+                    ArchivoMedia.objects.filter(ruta=ruta).values_list('referencias', flat=True).first() or 0
+                )
+                if faltan > 0:
+                    ArchivoMedia.objects.referenciar(ruta, faltan)
+    return corregidas, de_mas
+
+
+def escanear(margen=None, hilos=None, corregir=False, referencias=False):
+    """Concilia MEDIA_ROOT con ArchivoMedia (y, con `referencias`, las cuentas con las filas)."""
+    ajustes = config()
+    margen = ajustes['MARGEN_MEDIA'] if margen is None else margen
+    hilos = hilos or ajustes['HILOS']
+    raiz = almacenamiento_media().location
+    tareas = []
+    for espacio in ESPACIOS:
+        # Todos los prefijos, existan o no en disco: también hay que ver las filas cuyo directorio falta
+        prefijos = {f'{i:02x}' for i in range(256)}
+        try:
+            prefijos.update(e.name for e in os.scandir(os.path.join(raiz, espacio)) if e.is_dir(follow_symlinks=False))
+        except FileNotFoundError:
+            pass
+        tareas.extend((espacio, prefijo) for prefijo in sorted(prefijos))
+    informe = Informe()
+    with ThreadPoolExecutor(max_workers=hilos) as ejecutor:
+        for parcial in ejecutor.map(lambda t: _escanear_prefijo(*t, margen, corregir), tareas):
+            informe.sumar(parcial)
+    informe.temporales_borrados = _limpiar_temporales(margen, corregir)
+    if referencias:
+        informe.referencias_corregidas, informe.referencias_de_mas = conciliar_referencias(corregir)
+    return informe
@@ -0,0 +1,148 @@
+import random
+import time
+from datetime import timedelta
+
+from django.contrib import admin
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.autenticacion.models import Usuario
+from apps.musica.admin import CancionAdmin, HistorialReproduccionAdmin
+from apps.musica.models import Album, Cancion, Genero, HistorialReproduccion
+
+
+class _Rollback(Exception):
+    pass
+
+
+class _CancionAntes(admin.ModelAdmin):
+    """Configuración anterior del listado de canciones, como referencia."""
+    list_display = CancionAdmin.list_display
+    list_filter = ('genre', 'created_at')
+    search_fields = CancionAdmin.search_fields
+    get_artista_nombre = CancionAdmin.get_artista_nombre
+    get_album_title = CancionAdmin.get_album_title
+
+
+class _HistorialAntes(admin.ModelAdmin):
+    list_display = ('id', 'usuario', 'cancion', 'played_at')
+    list_filter = ('played_at',)
+    search_fields = ('usuario__email', 'cancion__title')
+
+
+def _insertar(modelo, columnas, filas, lote=5000):
+    """INSERT directo por lotes: bulk_create no permite fijar campos auto_now_add."""
+    campos = [modelo._meta.get_field(c) for c in columnas]
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        modelo._meta.db_table, ', '.join(f.column for f in campos), ', '.join(['%s'] * len(campos))
+    )
+    with connection.cursor() as cursor:
+        pendientes = []
+        for fila in filas:
+            pendientes.append([f.get_db_prep_save(v, connection) for f, v in zip(campos, fila)])
+            if len(pendientes) >= lote:
+                cursor.executemany(sql, pendientes)
+                pendientes = []
+        if pendientes:
+            cursor.executemany(sql, pendientes)
+
+
+class Command(BaseCommand):
+    help = (
+        'Siembra canciones e historial (dentro de una transacción que se revierte) y mide el tiempo de '
+        'render y las consultas de los listados del admin de Cancion e HistorialReproduccion: '
+        'configuración anterior vs actual.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=1000000, help='Canciones y reproducciones a sembrar (cada una).')
+        parser.add_argument('--usuarios', type=int, default=10000)
+        parser.add_argument('--repeticiones', type=int, default=3)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                t0 = time.perf_counter()
+                superusuario = self._sembrar(options['filas'], options['usuarios'])
+                self.stdout.write(f'Sembrado en {time.perf_counter() - t0:.1f} s')
+                hoy = timezone.localdate()
+                # Los mismos parámetros que genera DateFieldListFilter para "Últimos 7 días"
+                medianoche = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+                antes_7d = {
+                    'played_at__gte': str(medianoche - timedelta(days=6)),
+                    'played_at__lt': str(medianoche + timedelta(days=1)),
+                }
+                escenarios = [
+                    ('canciones', Cancion, _CancionAntes, CancionAdmin, {}, {}),
+                    ('canciones por año', Cancion, _CancionAntes, CancionAdmin,
+                     {'created_at__year': str(hoy.year)}, {'created_at_periodo': str(hoy.year)}),
+                    ('historial', HistorialReproduccion, _HistorialAntes, HistorialReproduccionAdmin, {}, {}),
+                    ('historial 7 días', HistorialReproduccion, _HistorialAntes, HistorialReproduccionAdmin,
+                     antes_7d, {'played_at_periodo': '7d'}),
+                ]
+                for nombre, modelo, antes, actual, params_antes, params_actual in escenarios:
+                    self.stdout.write(self.style.MIGRATE_HEADING(nombre))
+                    for etiqueta, clase, params in (('antes', antes, params_antes), ('ahora', actual, params_actual)):
+                        segundos, consultas = self._medir(modelo, clase, params, superusuario, options['repeticiones'])
+                        self.stdout.write(f'  {etiqueta:<6} {segundos * 1000:9.1f} ms  {consultas} consultas')
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _medir(self, modelo, clase, params, usuario, repeticiones):
+        modelo_admin = clase(modelo, admin.site)
+        mejor, consultas = float('inf'), 0
+        for _ in range(repeticiones):
+            request = RequestFactory().get('/admin/', params)
+            request.user = usuario
+            with CaptureQueriesContext(connection) as capturadas:
+                t0 = time.perf_counter()
+                respuesta = modelo_admin.changelist_view(request)
+                respuesta.render()
+                mejor = min(mejor, time.perf_counter() - t0)
+            assert respuesta.status_code == 200, respuesta.status_code
+            consultas = len(capturadas)
+        return mejor, consultas
+
+    def _sembrar(self, filas, n_usuarios):
+        rng = random.Random(7)
+        prefijo = f'benchadmin{rng.randrange(10 ** 6)}'
+        usuarios = [
+            Usuario(username=f'{prefijo}_{i}', email=f'{prefijo}_{i}@example.com', password='!',
+                    nombres=f'Nombre {i}', apellidos=f'Apellido {i}')
+            for i in range(n_usuarios)
+        ]
+        for usuario in usuarios:
+            usuario.normalizar_busqueda()
+        Usuario.objects.bulk_create(usuarios, batch_size=1000)
+        usuarios = list(Usuario.objects.filter(username__startswith=prefijo).values_list('id', flat=True))
+        superusuario = Usuario.objects.create_superuser(f'{prefijo}_admin', f'{prefijo}_admin@example.com', '!')
+        generos = [Genero.objects.get_or_create(name=f'{prefijo} {i}')[0].pk for i in range(20)]
+        Album.objects.bulk_create(
+            [Album(title=f'{prefijo} {i}', artist_id=rng.choice(usuarios)) for i in range(max(1, filas // 200))],
+            batch_size=1000,
+        )
+        albumes = list(Album.objects.filter(title__startswith=prefijo).values_list('id', flat=True))
+
+        ahora = timezone.now()
+        hace = lambda: ahora - timedelta(seconds=rng.randrange(3 * 365 * 86400))  # noqa: E731
+        _insertar(
+            Cancion,
+            ['title', 'uploaded_by', 'album', 'genre', 'duration', 'play_count', 'fragmentos_contador',
+             'cover_variantes', 'created_at'],
+            (
+                (f'{prefijo} {i}', rng.choice(usuarios), rng.choice(albumes), rng.choice(generos),
+                 rng.randrange(60, 400), rng.randrange(100000), 0, {}, hace())
+                for i in range(filas)
+            ),
+        )
+        primera = Cancion.objects.filter(title=f'{prefijo} 0').values_list('pk', flat=True).get()
+        _insertar(
+            HistorialReproduccion,
+            ['usuario', 'cancion', 'played_at'],
+            ((rng.choice(usuarios), primera + rng.randrange(filas), hace()) for _ in range(filas)),
+        )
+        return superusuario
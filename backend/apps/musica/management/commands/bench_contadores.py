@@ -0,0 +1,94 @@
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, transaction
+from django.test.utils import override_settings
+
+from apps.autenticacion.models import Usuario
+from apps.musica import contadores
+from apps.musica.models import Cancion
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Lanza N incrementos concurrentes sobre una sola canción contra la base de datos configurada: '
+        'sumando en su fila vs repartidos en fragmentos. Crea un usuario y una canción temporales y los borra al final. '
+        'En SQLite todo escritor bloquea la base entera, así que el reparto solo se nota con bloqueo por fila (PostgreSQL).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--incrementos', type=int, default=500)
+        parser.add_argument('--hilos', type=int, default=50)
+        parser.add_argument('--fragmentos', type=int, default=contadores.config()['FRAGMENTOS'])
+        parser.add_argument(
+            '--retencion', type=float, default=2.0, metavar='MS',
+            help='Milisegundos que cada transacción mantiene el bloqueo tras sumar (trabajo del resto de la petición).',
+        )
+
+    def handle(self, *args, **options):
+        sufijo = uuid.uuid4().hex[:10]
+        usuario = Usuario.objects.create(username=f'bench_{sufijo}', email=f'bench_{sufijo}@example.com', password='!')
+        try:
+            for repartida in (False, True):
+                cancion = Cancion.objects.bulk_create([Cancion(title=f'bench {sufijo}', uploaded_by=usuario)])[0]
+                if repartida:
+                    contadores.repartir(cancion.pk, options['fragmentos'])
+                latencias, errores, duracion = self._escenario(cancion.pk, options)
+                contadores.plegar()
+                final = contadores.reproducciones([cancion.pk])[cancion.pk]
+                nombre = f'{options["fragmentos"]} fragmentos' if repartida else 'fila única'
+                self.stdout.write(self.style.MIGRATE_HEADING(nombre))
+                self.stdout.write(
+                    f'  {len(latencias) + errores} incrementos en {duracion:.2f} s '
+                    f'({len(latencias) / duracion:.0f}/s) errores={errores} '
+                    f'p50={_percentil(latencias, 0.5) * 1000:.2f} ms p99={_percentil(latencias, 0.99) * 1000:.2f} ms '
+                    f'total={final} ({"correcto" if final == len(latencias) else "INCORRECTO"})'
+                )
+                cancion.delete()
+        finally:
+            usuario.delete()
+
+    def _escenario(self, cancion_id, options):
+        hilos = options['hilos']
+        por_hilo = [options['incrementos'] // hilos + (i < options['incrementos'] % hilos) for i in range(hilos)]
+        retencion = options['retencion'] / 1000
+        latencias, errores = [], [0]
+        lock = threading.Lock()
+        inicio = threading.Barrier(hilos + 1)
+        contadores._repartidas.invalidar()
+
+        def trabajador(n):
+            inicio.wait()
+            for _ in range(n):
+                t0 = time.perf_counter()
+                try:
+                    with transaction.atomic():
+                        contadores.sumar(cancion_id)
+                        time.sleep(retencion)
+                    with lock:
+                        latencias.append(time.perf_counter() - t0)
+                except OperationalError:
+                    with lock:
+                        errores[0] += 1
+            connection.close()
+
+        trabajadores = [threading.Thread(target=trabajador, args=(n,)) for n in por_hilo]
+        # La canción ya está decidida (fila o fragmentos): que el umbral no la cambie a mitad
+        with override_settings(CONTADORES={**contadores.config(), 'UMBRAL': float('inf')}):
+            for hilo in trabajadores:
+                hilo.start()
+            inicio.wait()
+            t0 = time.perf_counter()
+            for hilo in trabajadores:
+                hilo.join()
+            duracion = time.perf_counter() - t0
+        return latencias, errores[0], duracion
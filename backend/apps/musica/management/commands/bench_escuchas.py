@@ -0,0 +1,57 @@
+import json
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from apps.musica import escuchas, views
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide cuántos latidos por segundo absorbe un proceso: directamente en el coalescedor y a través '
+        'de la vista (sin red). Las sesiones son sintéticas y no se guardan.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sesiones', type=int, default=5000)
+        parser.add_argument('--latidos', type=int, default=200000)
+        parser.add_argument('--lote', type=int, default=10, help='Eventos por petición en la prueba de la vista.')
+
+    def handle(self, *args, **options):
+        sesiones = [uuid.uuid4() for _ in range(options['sesiones'])]
+        identificar = lambda: (1, None, 'h0')  # noqa: E731 - la firma se verifica solo al abrir la sesión
+
+        coalescedor = escuchas.Coalescedor()
+        t0 = time.perf_counter()
+        for i in range(options['latidos']):
+            coalescedor.registrar(sesiones[i % len(sesiones)], i // len(sesiones) * 15, escuchas.REPRODUCIENDO, identificar)
+        duracion = time.perf_counter() - t0
+        self.stdout.write(f'Coalescedor: {options["latidos"] / duracion:,.0f} latidos/s ({len(coalescedor)} sesiones abiertas)')
+
+        # La vista con sesiones ya abiertas (el caso habitual): solo JSON y el coalescedor
+        fabrica = RequestFactory()
+        for sesion in sesiones:
+            escuchas._coalescedor.registrar(sesion, 0, escuchas.REPRODUCIENDO, identificar)
+        lote = options['lote']
+        peticiones = max(1, options['latidos'] // 10 // lote)
+        cuerpos = [
+            json.dumps({'eventos': [
+                {'sesion': str(sesiones[(i * lote + j) % len(sesiones)]), 'posicion': 15, 'estado': escuchas.PAUSA}
+                for j in range(lote)
+            ]})
+            for i in range(min(peticiones, 1000))
+        ]
+        t0 = time.perf_counter()
+        for i in range(peticiones):
+            respuesta = views.latidos_escucha(
+                fabrica.post('/api/musica/escuchas/latidos/', cuerpos[i % len(cuerpos)], content_type='text/plain')
+            )
+            assert respuesta.status_code == 204, respuesta.content
+        duracion = time.perf_counter() - t0
+        self.stdout.write(
+            f'Vista ({lote} eventos por petición): {peticiones / duracion:,.0f} peticiones/s, '
+            f'{peticiones * lote / duracion:,.0f} latidos/s'
+        )
+        escuchas._coalescedor.extraer(None)
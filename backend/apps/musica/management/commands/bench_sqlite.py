@@ -0,0 +1,174 @@
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError
+
+from backend.escritura import EscritorSerializado
+
+CANCIONES = 1000
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def _crear_esquema(ruta):
+    conn = sqlite3.connect(ruta)
+    conn.executescript(
+        """
+        CREATE TABLE cancion (id INTEGER PRIMARY KEY, play_count INTEGER NOT NULL DEFAULT 0);
+        CREATE TABLE historial (
+            id INTEGER PRIMARY KEY, usuario INTEGER NOT NULL, cancion INTEGER NOT NULL, played_at REAL NOT NULL
+        );
+        CREATE INDEX historial_usuario ON historial (usuario, played_at);
+        """
+    )
+    conn.executemany('INSERT INTO cancion (id) VALUES (?)', [(i,) for i in range(1, CANCIONES + 1)])
+    conn.commit()
+    conn.close()
+
+
+def _conectar(ruta, produccion):
+    conn = sqlite3.connect(ruta, timeout=settings.SQLITE_ESPERA_BLOQUEO if produccion else 5, isolation_level=None, check_same_thread=False)
+    if produccion:
+        for pragma in settings.SQLITE_PRAGMAS_PRODUCCION:
+            conn.execute(pragma)
+    return conn
+
+
+def _escribir(conn, usuario, cancion, modo='DEFERRED'):
+    conn.execute(f'BEGIN {modo}')
+    try:
+        conn.execute('UPDATE cancion SET play_count = play_count + 1 WHERE id = ?', (cancion,))
+        conn.execute(
+            'INSERT INTO historial (usuario, cancion, played_at) VALUES (?, ?, ?)', (usuario, cancion, time.time())
+        )
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+
+
+def _leer(conn, usuario):
+    conn.execute(
+        'SELECT c.id, c.play_count FROM historial h JOIN cancion c ON c.id = h.cancion '
+        'WHERE h.usuario = ? ORDER BY h.played_at DESC LIMIT 50',
+        (usuario,),
+    ).fetchall()
+    conn.execute('SELECT id, play_count FROM cancion ORDER BY play_count DESC LIMIT 10').fetchall()
+
+
+class _LoteSqlite:
+    """Ejecutor de lotes para EscritorSerializado sobre una conexión sqlite3 propia del hilo escritor."""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.conn = None
+
+    def __call__(self, tareas):
+        if self.conn is None:
+            self.conn = _conectar(self.ruta, produccion=True)
+        try:
+            self.conn.execute('BEGIN IMMEDIATE')
+            resultados = [(True, funcion(self.conn, *args, **kwargs)) for funcion, args, kwargs in tareas]
+            self.conn.execute('COMMIT')
+            return resultados
+        except sqlite3.OperationalError as exc:
+            if self.conn.in_transaction:
+                self.conn.execute('ROLLBACK')
+            raise OperationalError(str(exc))
+
+
+def _escritura_en_lote(conn, usuario, cancion):
+    conn.execute('UPDATE cancion SET play_count = play_count + 1 WHERE id = ?', (cancion,))
+    conn.execute(
+        'INSERT INTO historial (usuario, cancion, played_at) VALUES (?, ?, ?)', (usuario, cancion, time.time())
+    )
+
+
+class Command(BaseCommand):
+    help = 'Compara errores y latencia p99 de SQLite con N lectores y M escritores: perfil por defecto vs producción.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lectores', type=int, default=16)
+        parser.add_argument('--escritores', type=int, default=16)
+        parser.add_argument('--operaciones', type=int, default=300, help='Operaciones por hilo.')
+
+    def handle(self, *args, **options):
+        for produccion in (False, True):
+            with tempfile.TemporaryDirectory() as directorio:
+                ruta = str(Path(directorio) / 'bench.sqlite3')
+                _crear_esquema(ruta)
+                resultado = self._escenario(ruta, produccion, options)
+            nombre = 'producción (WAL + escritor único)' if produccion else 'por defecto'
+            self.stdout.write(self.style.MIGRATE_HEADING(nombre))
+            for tipo, (latencias, errores, total) in resultado.items():
+                self.stdout.write(
+                    f'  {tipo:<10} ops={total:<6} errores={errores / total:6.2%} '
+                    f'p50={_percentil(latencias, 0.5) * 1000:7.2f} ms p99={_percentil(latencias, 0.99) * 1000:8.2f} ms'
+                )
+
+    def _escenario(self, ruta, produccion, options):
+        metricas = {'lecturas': ([], [0]), 'escrituras': ([], [0])}
+        lock = threading.Lock()
+        escritor = EscritorSerializado(ejecutar_lote=_LoteSqlite(ruta)) if produccion else None
+        inicio = threading.Barrier(options['lectores'] + options['escritores'])
+
+        def registrar(tipo, latencia, error):
+            with lock:
+                if error:
+                    metricas[tipo][1][0] += 1
+                else:
+                    metricas[tipo][0].append(latencia)
+
+        def lector(n):
+            conn = _conectar(ruta, produccion)
+            rng = random.Random(n)
+            inicio.wait()
+            for _ in range(options['operaciones']):
+                t0 = time.perf_counter()
+                try:
+                    _leer(conn, rng.randrange(1000))
+                    registrar('lecturas', time.perf_counter() - t0, False)
+                except sqlite3.OperationalError:
+                    registrar('lecturas', 0, True)
+            conn.close()
+
+        def escritor_hilo(n):
+            conn = None if produccion else _conectar(ruta, produccion)
+            rng = random.Random(1000 + n)
+            inicio.wait()
+            for _ in range(options['operaciones']):
+                usuario, cancion = rng.randrange(1000), rng.randrange(1, CANCIONES + 1)
+                t0 = time.perf_counter()
+                try:
+                    if produccion:
+                        escritor.encolar(_escritura_en_lote, usuario, cancion).result()
+                    else:
+                        _escribir(conn, usuario, cancion)
+                    registrar('escrituras', time.perf_counter() - t0, False)
+                except (sqlite3.OperationalError, OperationalError):
+                    registrar('escrituras', 0, True)
+            if conn is not None:
+                conn.close()
+
+        hilos = [threading.Thread(target=lector, args=(i,)) for i in range(options['lectores'])]
+        hilos += [threading.Thread(target=escritor_hilo, args=(i,)) for i in range(options['escritores'])]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        return {
+            tipo: (latencias, errores[0], len(latencias) + errores[0])
+            for tipo, (latencias, errores) in metricas.items()
+        }
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+
+from apps.musica import prefijos
+from apps.musica.models import Cancion
+
+
+class Command(BaseCommand):
+    help = (
+        'Carga en la caché compartida de prefijos el comienzo de las canciones más escuchadas '
+        '(CACHE_PREFIJOS["COMPARTIDA"]). Con --liberar elimina el segmento de memoria compartida.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=None, help='Canciones a cargar (por defecto, las que quepan).')
+        parser.add_argument('--liberar', action='store_true')
+
+    def handle(self, *args, **options):
+        cache = prefijos.cache()
+        if cache.modo != 'compartida':
+            self.stdout.write(self.style.WARNING(
+                'La caché es local a cada proceso; solo la compartida se puede precargar desde un comando.'
+            ))
+            return
+        if options['liberar']:
+            cache.liberar()
+            self.stdout.write(self.style.SUCCESS(f'Segmento {cache.nombre} eliminado.'))
+            return
+
+        top = min(options['top'] or cache.capacidad, cache.capacidad)
+        rutas = (
+            Cancion.objects.exclude(file='').exclude(file__isnull=True)
+            .order_by('-play_count').values_list('file', flat=True)[:top]
+        )
+        almacenamiento = Cancion._meta.get_field('file').storage
+        cargadas = 0
+        for ruta in rutas:
+            try:
+                with almacenamiento.open(ruta, 'rb') as archivo:
+                    prefijo = archivo.read(cache.tamano_prefijo)
+                tamano = almacenamiento.size(ruta)
+            except OSError:
+                self.stdout.write(self.style.WARNING(f'No existe en disco: {ruta}'))
+                continue
+            cargadas += cache.cargar(ruta, tamano, prefijo)
+        ocupacion = cache.metricas()
+        self.stdout.write(self.style.SUCCESS(
+            f'{cargadas} canciones cargadas; {ocupacion["entradas"]}/{cache.capacidad} ranuras ocupadas.'
+        ))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from apps.musica import radio
+from apps.musica.models import PoolRadio
+
+
+class Command(BaseCommand):
+    help = 'Precalcula los pools de candidatos de la radio automática.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tipo',
+            choices=[t for t, _ in PoolRadio.TIPO_CHOICES],
+            action='append',
+            help='Limita el cálculo a un tipo de semilla (repetible).',
+        )
+
+    def handle(self, *args, **options):
+        tipos = options['tipo'] or [t for t, _ in PoolRadio.TIPO_CHOICES]
+        semillas = radio.semillas_existentes()
+        for tipo in tipos:
+            total = 0
+            for semilla_id in semillas[tipo].iterator():
+                radio.construir_pool(tipo, semilla_id)
+                total += 1
+            self.stdout.write(f'{tipo}: {total} pools')
+        self.stdout.write(self.style.SUCCESS('Pools de radio actualizados.'))
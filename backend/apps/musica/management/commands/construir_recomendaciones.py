@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.musica import recomendaciones
+
+
+class Command(BaseCommand):
+    help = (
+        'Calcula los vecinos por similitud coseno de las canciones (incremental por defecto: eventos nuevos '
+        'y bajas de favoritos y playlists).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--completo', action='store_true', help='Recalcula todas las canciones desde cero.')
+        parser.add_argument('--vecinos', type=int, default=recomendaciones.VECINOS, help='Vecinos guardados por canción.')
+
+    def handle(self, *args, **options):
+        try:
+            total = recomendaciones.construir(completo=options['completo'], vecinos=options['vecinos'])
+        except RuntimeError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(f'{total} canciones recalculadas.'))
@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.musica import limpieza
+
+
+class Command(BaseCommand):
+    help = (
+        'Recorre MEDIA_ROOT en paralelo y lo concilia con ArchivoMedia: archivos sin fila, variantes '
+        'huérfanas, restos de subidas y filas sin archivo. Sin --corregir solo informa.'
+    )
+
+    def add_arguments(self, parser):
+        ajustes = limpieza.config()
+        parser.add_argument('--corregir', action='store_true',
+                            help='Registra los huérfanos para purgar_media y borra variantes, restos y filas vacías.')
+        parser.add_argument('--referencias', action='store_true',
+                            help='Compara también las cuentas de referencias con las canciones y álbumes.')
+        parser.add_argument('--margen', type=int, default=ajustes['MARGEN_MEDIA'],
+                            help='Solo se tocan archivos sin modificar en estos segundos.')
+        parser.add_argument('--hilos', type=int, default=ajustes['HILOS'])
+        parser.add_argument('--detalle', action='store_true', help='Lista cada ruta afectada.')
+
+    def handle(self, *args, **options):
+        t0 = time.perf_counter()
+        informe = limpieza.escanear(
+            options['margen'], options['hilos'], corregir=options['corregir'], referencias=options['referencias'],
+        )
+        self.stdout.write(f'{informe.archivos} archivos revisados en {time.perf_counter() - t0:.1f} s.')
+        apartados = [
+            ('Huérfanos registrados sin uso' if options['corregir'] else 'Huérfanos sin registrar', informe.registrados),
+            ('Variantes sin original', informe.derivados_borrados),
+            ('Restos de subidas y papelera', informe.temporales_borrados),
+            ('Filas sin archivo ni referencias', informe.filas_borradas),
+            ('Filas con referencias y sin archivo', informe.rotos),
+        ]
+        if options['referencias']:
+            apartados += [
+                ('Referencias de menos' + (' (corregidas)' if options['corregir'] else ''),
+                 informe.referencias_corregidas),
+                ('Referencias de más (no se corrigen)', informe.referencias_de_mas),
+            ]
+        for titulo, rutas in apartados:
+            estilo = self.style.WARNING if rutas else self.style.SUCCESS
+            self.stdout.write(estilo(f'{titulo}: {len(rutas)}'))
+            if options['detalle']:
+                for ruta in rutas:
+                    self.stdout.write(f'  {ruta}')
+        if informe.sin_direccionar:
+            self.stdout.write(f'{informe.sin_direccionar} archivos con rutas antiguas (ver migrar_media).')
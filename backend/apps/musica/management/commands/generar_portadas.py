@@ -0,0 +1,68 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+
+from apps.musica import imagenes, portadas
+from apps.musica.almacenamiento import almacenamiento_media, sha256_de_ruta
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera las variantes de portada (64/256/640 px, WebP y JPEG) de las portadas existentes '
+        'y guarda el mapa en cover_variantes. Se puede repetir sin riesgo.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--procesos', type=int, default=os.cpu_count() or 1)
+        parser.add_argument(
+            '--forzar', action='store_true',
+            help='Regenera aunque las variantes ya existan (p. ej. tras cambiar la calidad sin cambiar VERSION).',
+        )
+
+    def handle(self, *args, **options):
+        pendientes, sin_contenido = set(), set()
+        for modelo in portadas.MODELOS:
+            filas = modelo.objects.exclude(cover__isnull=True).exclude(cover='')
+            for ruta, mapa in filas.values_list('cover', 'cover_variantes').iterator():
+                if not sha256_de_ruta(ruta):
+                    sin_contenido.add(ruta)
+                elif options['forzar'] or mapa != portadas.variantes(ruta):
+                    pendientes.add(ruta)
+        if sin_contenido:
+            self.stdout.write(self.style.WARNING(
+                f'{len(sin_contenido)} portadas con la ruta anterior omitidas; ejecuta primero migrar_media.'
+            ))
+        self.stdout.write(f'{len(pendientes)} portadas por procesar.')
+        if not pendientes:
+            return
+
+        almacenamiento = almacenamiento_media()
+        if options['forzar']:
+            for ruta in pendientes:
+                for _, _, destino in portadas.destinos(ruta):
+                    if os.path.exists(destino):
+                        os.unlink(destino)
+
+        errores = 0
+        with ProcessPoolExecutor(
+            max_workers=max(1, options['procesos']), mp_context=multiprocessing.get_context('spawn')
+        ) as pool:
+            futuros = {
+                pool.submit(
+                    imagenes.generar_variantes, almacenamiento.path(ruta), portadas.destinos(ruta), portadas.CALIDAD
+                ): ruta
+                for ruta in pendientes
+            }
+            for futuro in as_completed(futuros):
+                ruta = futuros[futuro]
+                try:
+                    futuro.result()
+                except Exception as exc:
+                    errores += 1
+                    self.stdout.write(self.style.ERROR(f'{ruta}: {exc}'))
+                    continue
+                portadas.guardar(ruta, portadas.variantes(ruta))
+
+        self.stdout.write(self.style.SUCCESS(f'{len(pendientes) - errores} portadas procesadas, {errores} errores.'))
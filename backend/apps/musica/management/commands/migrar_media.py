@@ -0,0 +1,106 @@
+import hashlib
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.musica.almacenamiento import almacenamiento_media, extension_de, sha256_de_ruta
+from apps.musica.models import Album, ArchivoMedia, Cancion
+
+CAMPOS = (
+    (Cancion, 'file', 'canciones'),
+    (Cancion, 'cover', 'portadas'),
+    (Album, 'cover', 'portadas'),
+)
+TAMANO_LOTE = 1000
+
+
+def _sha256(ruta):
+    digest = hashlib.sha256()
+    with open(ruta, 'rb') as archivo:
+        for bloque in iter(lambda: archivo.read(1024 * 1024), b''):
+            digest.update(bloque)
+    return digest.hexdigest()
+
+
+class Command(BaseCommand):
+    help = (
+        'Mueve los archivos existentes de canciones y portadas al almacenamiento por contenido '
+        '(hash en paralelo, archivos repetidos guardados una sola vez). Se puede repetir sin riesgo.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hilos', type=int, default=(os.cpu_count() or 1) * 2,
+            help='Archivos procesados a la vez (el hash libera el GIL).',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Solo cuenta los archivos a migrar.')
+
+    def handle(self, *args, **options):
+        almacenamiento = almacenamiento_media()
+        pendientes = {}
+        for modelo, campo, espacio in CAMPOS:
+            rutas = modelo.todos.exclude(**{f'{campo}__isnull': True}).exclude(**{campo: ''})
+            for ruta in rutas.values_list(campo, flat=True).distinct().iterator():
+                if not sha256_de_ruta(ruta):
+                    pendientes.setdefault(ruta, espacio)
+        self.stdout.write(f'{len(pendientes)} archivos con la ruta anterior.')
+        if options['dry_run'] or not pendientes:
+            return
+
+        def relocalizar(elemento):
+            ruta, espacio = elemento
+            origen = almacenamiento.path(ruta)
+            if not os.path.exists(origen):
+                return ruta, None
+            # Enlace (no movimiento): el original se borra cuando la BD ya apunta a la nueva ruta
+            return ruta, almacenamiento.enlazar(origen, espacio, _sha256(origen), extension_de(ruta))
+
+        with ThreadPoolExecutor(max_workers=max(1, options['hilos'])) as pool:
+            nuevas = dict(pool.map(relocalizar, pendientes.items()))
+        faltantes = [ruta for ruta, nueva in nuevas.items() if nueva is None]
+        nuevas = {ruta: nueva for ruta, nueva in nuevas.items() if nueva is not None}
+
+        usos = Counter()
+        with transaction.atomic():
+            for modelo, campo, _ in CAMPOS:
+                usos.update(self._actualizar(modelo, campo, nuevas))
+            for ruta, n in usos.items():
+                ArchivoMedia.objects.referenciar(ruta, n)
+
+        for ruta in nuevas:
+            anterior = Path(almacenamiento.path(ruta))
+            anterior.unlink(missing_ok=True)
+            try:
+                anterior.parent.rmdir()  # directorios antiguos (canciones/new/, canciones/<id>/) ya vacíos
+            except OSError:
+                pass
+
+        distintas = len(set(nuevas.values()))
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(nuevas)} archivos migrados a {distintas} archivos únicos '
+            f'({len(nuevas) - distintas} duplicados eliminados).'
+        ))
+        for ruta in faltantes:
+            self.stdout.write(self.style.WARNING(f'No existe en disco: {ruta}'))
+
+    def _actualizar(self, modelo, campo, nuevas):
+        """Reescribe las rutas por lotes; devuelve cuántas filas usan cada ruta nueva."""
+        usos = Counter()
+        lote = []
+        for pk, ruta in modelo.todos.values_list('pk', campo).iterator(chunk_size=TAMANO_LOTE):
+            if ruta not in nuevas:
+                continue
+            instancia = modelo(pk=pk)
+            setattr(instancia, campo, nuevas[ruta])
+            lote.append(instancia)
+            usos[nuevas[ruta]] += 1
+            if len(lote) >= TAMANO_LOTE:
+                modelo.todos.bulk_update(lote, [campo])
+                lote = []
+        if lote:
+            modelo.todos.bulk_update(lote, [campo])
+        return usos
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.musica import contadores
+
+
+class Command(BaseCommand):
+    help = 'Pasa los contadores repartidos en fragmentos a Cancion.play_count (ejecutar periódicamente).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cada', type=int, default=0, metavar='SEGUNDOS', help='Repite el pliegue sin terminar.')
+
+    def handle(self, *args, **options):
+        while True:
+            plegadas, reproducciones, devueltas = contadores.plegar()
+            self.stdout.write(
+                f'{reproducciones} reproducciones plegadas de {plegadas} canciones; '
+                f'{devueltas} canciones vuelven a contar en su fila.'
+            )
+            if not options['cada']:
+                return
+            time.sleep(options['cada'])
@@ -0,0 +1,35 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from apps.musica import limpieza
+from apps.musica.models import ArchivoMedia
+
+
+class Command(BaseCommand):
+    help = (
+        'Borra las canciones y álbumes eliminados (borrado suave) hace más de BORRADO["GRACIA"] y, '
+        'después, los archivos que dejaron sin uso (ejecutar periódicamente o con --cada).'
+    )
+
+    def add_arguments(self, parser):
+        ajustes = limpieza.config()
+        parser.add_argument('--gracia', type=int, default=ajustes['GRACIA'],
+                            help='Segundos desde el borrado suave hasta el borrado definitivo.')
+        parser.add_argument('--margen-media', type=int, default=ajustes['MARGEN_MEDIA'],
+                            help='Segundos que un archivo debe llevar sin referencias antes de borrarlo.')
+        parser.add_argument('--lote', type=int, default=ajustes['LOTE'])
+        parser.add_argument('--cada', type=int, default=0, metavar='SEGUNDOS', help='Repite la purga sin terminar.')
+
+    def handle(self, *args, **options):
+        while True:
+            purgadas = limpieza.purgar_eliminados(timedelta(seconds=options['gracia']), options['lote'])
+            archivos = ArchivoMedia.objects.recolectar(timedelta(seconds=options['margen_media']), options['lote'])
+            self.stdout.write(
+                f"{purgadas['cancion']} canciones y {purgadas['album']} álbumes purgados; "
+                f'{archivos} archivos sin uso eliminados.'
+            )
+            if not options['cada']:
+                return
+            time.sleep(options['cada'])
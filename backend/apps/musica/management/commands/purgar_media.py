@@ -0,0 +1,20 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from apps.musica.models import ArchivoMedia
+
+
+class Command(BaseCommand):
+    help = 'Borra los archivos de audio y portadas que ya no usa ninguna canción ni álbum.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--gracia', type=int, default=3600,
+            help='Segundos que un archivo debe llevar sin referencias antes de borrarlo.',
+        )
+        parser.add_argument('--lote', type=int, default=500)
+
+    def handle(self, *args, **options):
+        borrados = ArchivoMedia.objects.recolectar(timedelta(seconds=options['gracia']), options['lote'])
+        self.stdout.write(self.style.SUCCESS(f'{borrados} archivos sin uso eliminados.'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apps.musica import subidas
+
+
+class Command(BaseCommand):
+    help = 'Elimina las subidas reanudables caducadas y los archivos de las que quedaron incompletas.'
+
+    def handle(self, *args, **options):
+        total, incompletas = subidas.purgar()
+        self.stdout.write(self.style.SUCCESS(f'{total} subidas eliminadas ({incompletas} incompletas).'))
@@ -0,0 +1,59 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from apps.musica.hll import HyperLogLog
+from apps.musica.models import HistorialReproduccion, OyentesArtista, OyentesCancion
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los sketches de oyentes únicos a partir del historial de reproducciones.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=30, help='Días hacia atrás con sketch diario (el histórico siempre es completo).')
+        parser.add_argument('--lote', type=int, default=5000, help='Filas del historial leídas por lote.')
+
+    def handle(self, *args, **options):
+        desde = timezone.localdate() - timedelta(days=options['dias'] - 1)
+        canciones = defaultdict(HyperLogLog)
+        artistas = defaultdict(HyperLogLog)
+
+        filas = (
+            HistorialReproduccion.objects
+            .order_by()
+            .values_list('usuario_id', 'cancion_id', 'cancion__uploaded_by_id', 'played_at')
+            .iterator(chunk_size=options['lote'])
+        )
+        total = 0
+        for usuario_id, cancion_id, artista_id, played_at in filas:
+            dia = timezone.localdate(played_at)
+            claves = [None, dia] if dia >= desde else [None]
+            for clave in claves:
+                canciones[(cancion_id, clave)].agregar(usuario_id)
+                artistas[(artista_id, clave)].agregar(usuario_id)
+            total += 1
+
+        with transaction.atomic():
+            OyentesCancion.objects.all().delete()
+            OyentesArtista.objects.all().delete()
+            OyentesCancion.objects.bulk_create(
+                [
+                    OyentesCancion(cancion_id=c, dia=d, registros=h.a_bytes(), estimacion=h.estimar())
+                    for (c, d), h in canciones.items()
+                ],
+                batch_size=500,
+            )
+            OyentesArtista.objects.bulk_create(
+                [
+                    OyentesArtista(artista_id=a, dia=d, registros=h.a_bytes(), estimacion=h.estimar())
+                    for (a, d), h in artistas.items()
+                ],
+                batch_size=500,
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} reproducciones procesadas: {len(canciones)} sketches de canción y {len(artistas)} de artista.'
+        ))
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('musica', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OyentesArtista',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField(blank=True, null=True)),
+                ('registros', models.BinaryField()),
+                ('estimacion', models.PositiveIntegerField(default=0)),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+                ('artista', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sketches_oyentes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Oyentes únicos por artista',
+                'verbose_name_plural': 'Oyentes únicos por artista',
+                'constraints': [models.UniqueConstraint(fields=('artista', 'dia'), name='oyentes_artista_dia_unico'), models.UniqueConstraint(condition=models.Q(('dia__isnull', True)), fields=('artista',), name='oyentes_artista_historico_unico')],
+            },
+        ),
+        migrations.CreateModel(
+            name='OyentesCancion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField(blank=True, null=True)),
+                ('registros', models.BinaryField()),
+                ('estimacion', models.PositiveIntegerField(default=0)),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+                ('cancion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sketches_oyentes', to='musica.cancion')),
+            ],
+            options={
+                'verbose_name': 'Oyentes únicos por canción',
+                'verbose_name_plural': 'Oyentes únicos por canción',
+                'constraints': [models.UniqueConstraint(fields=('cancion', 'dia'), name='oyentes_cancion_dia_unico'), models.UniqueConstraint(condition=models.Q(('dia__isnull', True)), fields=('cancion',), name='oyentes_cancion_historico_unico')],
+            },
+        ),
+    ]
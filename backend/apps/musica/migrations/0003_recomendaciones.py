@@ -0,0 +1,44 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('musica', '0002_oyentes_unicos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadoRecomendaciones',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ultimo_historial_id', models.BigIntegerField(default=0)),
+                ('ultima_ejecucion', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PerfilRecomendacion',
+            fields=[
+                ('cancion', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='perfil_recomendacion', serialize=False, to='musica.cancion')),
+                ('norma', models.FloatField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CancionSimilar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('puntaje', models.FloatField()),
+                ('cancion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similares', to='musica.cancion')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='musica.cancion')),
+            ],
+            options={
+                'verbose_name': 'Canción similar',
+                'verbose_name_plural': 'Canciones similares',
+                'indexes': [models.Index(fields=['cancion', '-puntaje'], name='similar_cancion_puntaje_idx')],
+                'unique_together': {('cancion', 'similar')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('musica', '0003_recomendaciones'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PoolRadio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('cancion', 'Canción'), ('artista', 'Artista'), ('genero', 'Género')], max_length=10)),
+                ('semilla_id', models.BigIntegerField()),
+                ('canciones', models.JSONField(default=list, help_text='Ids de canciones ordenados por afinidad')),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Pool de radio',
+                'verbose_name_plural': 'Pools de radio',
+                'unique_together': {('tipo', 'semilla_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('musica', '0004_radio'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cancion',
+            index=models.Index(fields=['play_count'], name='cancion_play_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cancion',
+            index=models.Index(fields=['uploaded_by', 'play_count'], name='cancion_artista_plays_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cancion',
+            index=models.Index(fields=['created_at'], name='cancion_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cancionfavorita',
+            index=models.Index(fields=['usuario', 'agregada_en'], name='favorita_usuario_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='historialreproduccion',
+            index=models.Index(fields=['usuario', 'played_at'], name='historial_usuario_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:57
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('musica', '0005_indices_consultas'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubidaCancion',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('nombre_archivo', models.CharField(max_length=255)),
+                ('ruta', models.CharField(help_text='Ruta definitiva en el almacenamiento', max_length=255)),
+                ('tamano', models.BigIntegerField(help_text='Tamaño total en bytes')),
+                ('recibido', models.BigIntegerField(default=0, help_text='Bytes escritos (offset del siguiente fragmento)')),
+                ('sha256', models.CharField(blank=True, help_text='Suma esperada (hex); la real tras finalizar', max_length=64)),
+                ('estado', models.CharField(choices=[('en_curso', 'En curso'), ('finalizando', 'Finalizando'), ('completada', 'Completada')], default='en_curso', max_length=12)),
+                ('escribiendo_hasta', models.DateTimeField(blank=True, help_text='Bloqueo del fragmento en escritura', null=True)),
+                ('creado_en', models.DateTimeField(auto_now_add=True)),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+                ('expira_en', models.DateTimeField(db_index=True)),
+                ('cancion', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='subida', to='musica.cancion')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subidas_canciones', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Subida de canción',
+                'verbose_name_plural': 'Subidas de canciones',
+            },
+        ),
+    ]
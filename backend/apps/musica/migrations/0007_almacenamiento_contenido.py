@@ -0,0 +1,52 @@
+# Generated by Django 5.2.5 on 2026-10-19 19:00
+
+import apps.musica.almacenamiento
+import apps.musica.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('musica', '0006_subidas_canciones'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='album',
+            name='cover',
+            field=models.ImageField(blank=True, null=True, storage=apps.musica.almacenamiento.almacenamiento_media, upload_to=apps.musica.models.portada_upload_path),
+        ),
+        migrations.AlterField(
+            model_name='cancion',
+            name='cover',
+            field=models.ImageField(blank=True, null=True, storage=apps.musica.almacenamiento.almacenamiento_media, upload_to=apps.musica.models.portada_upload_path, verbose_name='Portada'),
+        ),
+        migrations.AlterField(
+            model_name='cancion',
+            name='file',
+            field=models.FileField(blank=True, null=True, storage=apps.musica.almacenamiento.almacenamiento_media, upload_to=apps.musica.models.cancion_upload_path),
+        ),
+        migrations.AlterField(
+            model_name='subidacancion',
+            name='ruta',
+            field=models.CharField(help_text='Archivo en curso dentro de MEDIA_ROOT', max_length=255),
+        ),
+        migrations.CreateModel(
+            name='ArchivoMedia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ruta', models.CharField(max_length=255, unique=True)),
+                ('sha256', models.CharField(db_index=True, max_length=64)),
+                ('tamano', models.BigIntegerField(default=0)),
+                ('referencias', models.PositiveIntegerField(default=0)),
+                ('creado_en', models.DateTimeField(auto_now_add=True)),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Archivo multimedia',
+                'verbose_name_plural': 'Archivos multimedia',
+                'indexes': [models.Index(fields=['referencias', 'actualizado_en'], name='archivo_media_libres_idx')],
+            },
+        ),
+    ]
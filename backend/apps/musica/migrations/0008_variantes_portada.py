@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-19 19:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('musica', '0007_almacenamiento_contenido'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='album',
+            name='cover_variantes',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='cancion',
+            name='cover_variantes',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.5 on 2026-10-19 19:07
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('musica', '0008_variantes_portada'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestaAlbum',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('directorio', models.CharField(help_text='Archivos recibidos dentro de MEDIA_ROOT', max_length=255)),
+                ('manifiesto', models.JSONField(blank=True, default=dict)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_curso', 'En curso'), ('completada', 'Completada'), ('error', 'Error')], default='pendiente', max_length=12)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('procesadas', models.PositiveIntegerField(default=0)),
+                ('errores', models.JSONField(blank=True, default=list)),
+                ('mensaje', models.TextField(blank=True)),
+                ('creado_en', models.DateTimeField(auto_now_add=True)),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Ingesta de álbum',
+                'verbose_name_plural': 'Ingestas de álbumes',
+            },
+        ),
+        migrations.AddField(
+            model_name='cancion',
+            name='numero_pista',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Posición en el álbum', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='cancion',
+            index=models.Index(fields=['album', 'numero_pista'], name='cancion_album_pista_idx'),
+        ),
+        migrations.AddField(
+            model_name='ingestaalbum',
+            name='album',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ingestas', to='musica.album'),
+        ),
+        migrations.AddField(
+            model_name='ingestaalbum',
+            name='usuario',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ingestas_albumes', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-19 19:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('musica', '0009_ingesta_albumes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cancion',
+            name='fragmentos_contador',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, help_text='Fragmentos de ContadorFragmento en uso (0: se suma en play_count)'),
+        ),
+        migrations.CreateModel(
+            name='ContadorFragmento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fragmento', models.PositiveSmallIntegerField()),
+                ('cuenta', models.PositiveIntegerField(default=0)),
+                ('cancion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contadores', to='musica.cancion')),
+            ],
+            options={
+                'verbose_name': 'Fragmento de contador',
+                'verbose_name_plural': 'Fragmentos de contador',
+                'unique_together': {('cancion', 'fragmento')},
+            },
+        ),
+    ]
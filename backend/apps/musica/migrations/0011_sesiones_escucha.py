@@ -0,0 +1,34 @@
+# Generated by Django 5.2.5 on 2026-10-19 19:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('musica', '0010_contadores_fragmentados'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SesionEscucha',
+            fields=[
+                ('id', models.UUIDField(editable=False, help_text='Generado por el cliente', primary_key=True, serialize=False)),
+                ('iniciada_en', models.DateTimeField()),
+                ('terminada_en', models.DateTimeField()),
+                ('segundos_escuchados', models.PositiveIntegerField(default=0)),
+                ('posicion_maxima', models.PositiveIntegerField(default=0, help_text='Segundo más avanzado alcanzado')),
+                ('acreditada', models.BooleanField(default=False, help_text='Superó el umbral y sumó una reproducción')),
+                ('cancion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sesiones_escucha', to='musica.cancion')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sesiones_escucha', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Sesión de escucha',
+                'verbose_name_plural': 'Sesiones de escucha',
+                'indexes': [models.Index(fields=['cancion', 'iniciada_en'], name='escucha_cancion_fecha_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-19 19:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('musica', '0011_sesiones_escucha'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cancionfavorita',
+            index=models.Index(fields=['agregada_en'], name='favorita_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='historialreproduccion',
+            index=models.Index(fields=['played_at'], name='historial_fecha_idx'),
+        ),
+    ]
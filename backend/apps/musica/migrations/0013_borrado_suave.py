@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-19 19:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('musica', '0012_indices_admin'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='album',
+            name='eliminado_en',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='cancion',
+            name='eliminado_en',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.5 on 2026-10-19 19:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('musica', '0013_borrado_suave'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InteraccionRetirada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cancion_id', models.BigIntegerField()),
+                ('creada_en', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-19 20:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('musica', '0014_interacciones_retiradas'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='album',
+            name='eliminado_en',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='cancion',
+            name='eliminado_en',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='album',
+            index=models.Index(condition=models.Q(('eliminado_en__isnull', False)), fields=['eliminado_en'], name='album_eliminado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cancion',
+            index=models.Index(condition=models.Q(('eliminado_en__isnull', False)), fields=['eliminado_en'], name='cancion_eliminada_idx'),
+        ),
+    ]
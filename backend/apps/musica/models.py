@@ -1,8 +1,14 @@
 import logging
+import os
+import time
+import uuid
 from pathlib import Path
 
 from django.conf import settings
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
+
+from .almacenamiento import almacenamiento_media, sha256_de_ruta
 
 try:
     from mutagen import File as MutagenFile  # type: ignore
@@ -24,15 +30,168 @@ class Genero(models.Model):
         verbose_name_plural = 'Géneros'
 
 
+# Solo fijan el espacio de nombres y la extensión: la ruta definitiva la decide
+# el contenido (ver almacenamiento.py)
 def cancion_upload_path(instance, filename):
-    return f'canciones/{instance.id or "new"}/{filename}'
+    return f'canciones/{filename}'
 
 
 def portada_upload_path(instance, filename):
-    return f'portadas/{instance.id or "new"}/{filename}'
+    return f'portadas/{filename}'
+
+
+class ArchivoMediaManager(models.Manager):
+    def referenciar(self, ruta, n=1):
+        """Suma `n` usos al archivo direccionado por contenido `ruta` (las demás rutas se ignoran)."""
+        sha256 = sha256_de_ruta(ruta)
+        if not sha256 or n <= 0:
+            return
+        actualizados = self.filter(ruta=ruta).update(referencias=models.F('referencias') + n, actualizado_en=timezone.now())
+        if actualizados:
+            return
+        try:
+            tamano = almacenamiento_media().size(ruta)
+        except OSError:
+            tamano = 0
+        try:
+            with transaction.atomic():
+                self.create(ruta=ruta, sha256=sha256, tamano=tamano, referencias=n)
+        except IntegrityError:
+            self.filter(ruta=ruta).update(referencias=models.F('referencias') + n, actualizado_en=timezone.now())
+
+    def registrar_sin_uso(self, ruta):
+        """Registra un archivo ya escrito que nadie usa (p. ej. tras un fallo) para que lo borre recolectar()."""
+        sha256 = sha256_de_ruta(ruta)
+        if sha256:
+            self.get_or_create(ruta=ruta, defaults={'sha256': sha256, 'referencias': 0})
+
+    def liberar(self, ruta, n=1):
+        if sha256_de_ruta(ruta) and n > 0:
+            self.filter(ruta=ruta, referencias__gte=n).update(
+                referencias=models.F('referencias') - n, actualizado_en=timezone.now()
+            )
+
+    def recolectar(self, gracia, lote=500):
+        """Borra los archivos que llevan más de `gracia` (timedelta) sin referencias, por lotes.
+
+        El margen cubre el intervalo entre que un archivo se escribe (o se reutiliza
+        por tener el mismo contenido) y que la fila que lo usa se guarda. Para no
+        competir con esas subidas, cada archivo se aparta antes a la papelera: si
+        se tocó dentro del margen (el almacenamiento lo toca al reutilizarlo) o su
+        fila volvió a tener referencias, se devuelve a su sitio.
+        """
+        almacenamiento = almacenamiento_media()
+        limite = timezone.now() - gracia
+        borrados, ultimo = 0, 0
+        while True:
+            candidatos = list(
+                self.filter(referencias=0, actualizado_en__lt=limite, pk__gt=ultimo)
+                .order_by('pk').values_list('pk', 'ruta')[:lote]
+            )
+            for pk, ruta in candidatos:
+                borrados += self._recolectar_uno(almacenamiento, pk, ruta, gracia)
+            if len(candidatos) < lote:
+                return borrados
+            ultimo = candidatos[-1][0]
+
+    def _recolectar_uno(self, almacenamiento, pk, ruta, gracia):
+        retirado = almacenamiento.retirar(ruta)
+        if retirado and time.time() - os.stat(retirado).st_mtime < gracia.total_seconds():
+            almacenamiento.restaurar(retirado, ruta)
+            return 0
+        if not self.filter(pk=pk, referencias=0).delete()[0]:
+            if retirado:
+                almacenamiento.restaurar(retirado, ruta)
+            return 0
+        if retirado:
+            os.unlink(retirado)
+        if not almacenamiento.exists(ruta):
+            # Si una subida lo acaba de volver a escribir, sus derivados también son suyos
+            almacenamiento.borrar_derivados(ruta)
+        return 1
+
+
+class ArchivoMedia(models.Model):
+    """Archivo direccionado por contenido y cuántas filas lo usan (audio o portada)."""
+    ruta = models.CharField(max_length=255, unique=True)
+    sha256 = models.CharField(max_length=64, db_index=True)
+    tamano = models.BigIntegerField(default=0)
+    referencias = models.PositiveIntegerField(default=0)
+    creado_en = models.DateTimeField(auto_now_add=True)
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    objects = ArchivoMediaManager()
+
+    class Meta:
+        verbose_name = 'Archivo multimedia'
+        verbose_name_plural = 'Archivos multimedia'
+        indexes = [
+            # Recolección de archivos sin uso (purgar_media)
+            models.Index(fields=['referencias', 'actualizado_en'], name='archivo_media_libres_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.ruta} ({self.referencias})"
+
+
+class ConArchivosMedia(models.Model):
+    """Recuerda las rutas cargadas de los campos de archivo para ajustar las referencias al guardar."""
+    CAMPOS_ARCHIVO = ()
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        instancia._archivos_cargados = instancia.rutas_archivos()
+        return instancia
+
+    def rutas_archivos(self):
+        rutas = {}
+        for campo in self.CAMPOS_ARCHIVO:
+            if campo in self.__dict__:
+                valor = self.__dict__[campo]
+                rutas[campo] = getattr(valor, 'name', valor) or ''
+        return rutas
+
+
+class VisiblesQuerySet(models.QuerySet):
+    def eliminar(self):
+        """Borrado suave: oculta las filas al momento; purgar_eliminados las borra (y libera su media) después."""
+        return self.update(eliminado_en=timezone.now())
+
+
+class VisiblesManager(models.Manager.from_queryset(VisiblesQuerySet)):
+    def get_queryset(self):
+        return super().get_queryset().filter(eliminado_en__isnull=True)
 
 
-class Album(models.Model):
+class BorradoSuave(models.Model):
+    """`objects` solo ve las filas no eliminadas; `todos` las ve todas (purga, recuento de referencias).
+
+    Cada modelo indexa `eliminado_en` con un índice parcial de las filas
+    eliminadas (ver ELIMINADAS): con uno completo, sin estadísticas, SQLite lo
+    elegía para el `IS NULL` de `objects` y ordenaba los listados en memoria.
+    """
+    eliminado_en = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = VisiblesManager()
+    todos = models.Manager.from_queryset(VisiblesQuerySet)()
+
+    class Meta:
+        abstract = True
+
+    def eliminar(self):
+        self.eliminado_en = timezone.now()
+        self.save(update_fields=['eliminado_en'])
+
+
+# Condición del índice parcial de eliminadas (purga y filtros del admin)
+ELIMINADAS = models.Q(eliminado_en__isnull=False)
+
+
+class Album(ConArchivosMedia, BorradoSuave):
     title = models.CharField(max_length=200)
     artist = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -42,14 +201,21 @@ class Album(models.Model):
         related_name='albumes',
         help_text='Artista responsable del álbum',
     )
-    cover = models.ImageField(upload_to=portada_upload_path, null=True, blank=True)
+    cover = models.ImageField(upload_to=portada_upload_path, storage=almacenamiento_media, null=True, blank=True)
+    # {tamaño: {formato: ruta}} de las variantes generadas (ver portadas.py)
+    cover_variantes = models.JSONField(default=dict, blank=True, editable=False)
     release_date = models.DateField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    CAMPOS_ARCHIVO = ('cover',)
+
     class Meta:
         verbose_name = 'Álbum'
         verbose_name_plural = 'Álbumes'
         ordering = ['title']
+        indexes = [
+            models.Index(fields=['eliminado_en'], condition=ELIMINADAS, name='album_eliminado_idx'),
+        ]
 
     def __str__(self):
         if self.artist:
@@ -57,7 +223,7 @@ class Album(models.Model):
         return self.title
 
 
-class Cancion(models.Model):
+class Cancion(ConArchivosMedia, BorradoSuave):
     title = models.CharField(max_length=200)
     album = models.ForeignKey(
         Album,
@@ -69,8 +235,12 @@ class Cancion(models.Model):
     )
     genre = models.ForeignKey(Genero, null=True, blank=True, on_delete=models.SET_NULL)
     duration = models.IntegerField(null=True, blank=True, help_text='Duration in seconds')
-    file = models.FileField(upload_to=cancion_upload_path, null=True, blank=True)
-    cover = models.ImageField(upload_to=portada_upload_path, null=True, blank=True, verbose_name='Portada')
+    numero_pista = models.PositiveSmallIntegerField(null=True, blank=True, help_text='Posición en el álbum')
+    file = models.FileField(upload_to=cancion_upload_path, storage=almacenamiento_media, null=True, blank=True)
+    cover = models.ImageField(
+        upload_to=portada_upload_path, storage=almacenamiento_media, null=True, blank=True, verbose_name='Portada'
+    )
+    cover_variantes = models.JSONField(default=dict, blank=True, editable=False)
     # El artista es el usuario con rol 'artista' que subió la canción
     uploaded_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -79,8 +249,13 @@ class Cancion(models.Model):
         help_text='Usuario con rol de artista que subió la canción'
     )
     play_count = models.PositiveIntegerField(default=0)
+    fragmentos_contador = models.PositiveSmallIntegerField(
+        default=0, editable=False, help_text='Fragmentos de ContadorFragmento en uso (0: se suma en play_count)'
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    CAMPOS_ARCHIVO = ('file', 'cover')
+
     def __str__(self):
         # El artista es el usuario que subió la canción (que debe tener rol artista)
         return f"{self.title} - {self.uploaded_by.get_full_name() or self.uploaded_by.email}"
@@ -88,13 +263,22 @@ class Cancion(models.Model):
     class Meta:
         verbose_name = 'Canción'
         verbose_name_plural = 'Canciones'
+        indexes = [
+            models.Index(fields=['play_count'], name='cancion_play_count_idx'),
+            models.Index(fields=['uploaded_by', 'play_count'], name='cancion_artista_plays_idx'),
+            models.Index(fields=['created_at'], name='cancion_created_at_idx'),
+            models.Index(fields=['album', 'numero_pista'], name='cancion_album_pista_idx'),
+            models.Index(fields=['eliminado_en'], condition=ELIMINADAS, name='cancion_eliminada_idx'),
+        ]
+
+    @staticmethod
+    def puede_subir(user):
+        return bool(getattr(user, 'rol', None)) and user.rol.nombre.lower() == 'artista'
 
     def save(self, *args, **kwargs):
         # Asegurarnos que solo usuarios con rol artista puedan subir canciones
-        if not self.pk and self.uploaded_by:
-            user = self.uploaded_by
-            if not hasattr(user, 'rol') or not user.rol or user.rol.nombre.lower() != 'artista':
-                raise ValueError('Solo usuarios con rol de artista pueden subir canciones')
+        if not self.pk and self.uploaded_by and not Cancion.puede_subir(self.uploaded_by):
+            raise ValueError('Solo usuarios con rol de artista pueden subir canciones')
 
         updating_duration = False
         if self.file and (self._state.adding or not self.duration):
@@ -148,6 +332,11 @@ class CancionFavorita(models.Model):
         verbose_name_plural = 'Canciones Favoritas'
         unique_together = ['usuario', 'cancion']
         ordering = ['-agregada_en']
+        indexes = [
+            models.Index(fields=['usuario', 'agregada_en'], name='favorita_usuario_fecha_idx'),
+            # Orden y filtro por fecha del admin
+            models.Index(fields=['agregada_en'], name='favorita_fecha_idx'),
+        ]
 
     def __str__(self):
         return f"{self.usuario.email} - {self.cancion.title}"
@@ -171,6 +360,280 @@ class HistorialReproduccion(models.Model):
         verbose_name = 'Historial de Reproducción'
         verbose_name_plural = 'Historial de Reproducciones'
         ordering = ['-played_at']
+        indexes = [
+            models.Index(fields=['usuario', 'played_at'], name='historial_usuario_fecha_idx'),
+            # Orden y filtro por fecha del admin
+            models.Index(fields=['played_at'], name='historial_fecha_idx'),
+        ]
 
     def __str__(self):
         return f"{self.usuario.email} - {self.cancion.title} - {self.played_at}"
+
+
+class SesionEscucha(models.Model):
+    """Una escucha de una canción: cuánto se oyó realmente (ver escuchas.py).
+
+    Se escribe una sola fila por sesión, al terminar o tras un rato sin latidos;
+    los latidos intermedios solo viven en memoria.
+    """
+    id = models.UUIDField(primary_key=True, editable=False, help_text='Generado por el cliente')
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='sesiones_escucha'
+    )
+    cancion = models.ForeignKey(Cancion, on_delete=models.CASCADE, related_name='sesiones_escucha')
+    iniciada_en = models.DateTimeField()
+    terminada_en = models.DateTimeField()
+    segundos_escuchados = models.PositiveIntegerField(default=0)
+    posicion_maxima = models.PositiveIntegerField(default=0, help_text='Segundo más avanzado alcanzado')
+    acreditada = models.BooleanField(default=False, help_text='Superó el umbral y sumó una reproducción')
+
+    class Meta:
+        verbose_name = 'Sesión de escucha'
+        verbose_name_plural = 'Sesiones de escucha'
+        indexes = [
+            models.Index(fields=['cancion', 'iniciada_en'], name='escucha_cancion_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.cancion_id}: {self.segundos_escuchados}s"
+
+
+class SketchOyentes(models.Model):
+    """Sketch HyperLogLog de oyentes únicos para un día (dia nulo = histórico)."""
+    dia = models.DateField(null=True, blank=True)
+    registros = models.BinaryField()
+    estimacion = models.PositiveIntegerField(default=0)
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+
+class OyentesCancion(SketchOyentes):
+    cancion = models.ForeignKey(
+        Cancion,
+        on_delete=models.CASCADE,
+        related_name='sketches_oyentes'
+    )
+
+    class Meta:
+        verbose_name = 'Oyentes únicos por canción'
+        verbose_name_plural = 'Oyentes únicos por canción'
+        constraints = [
+            models.UniqueConstraint(fields=['cancion', 'dia'], name='oyentes_cancion_dia_unico'),
+            models.UniqueConstraint(
+                fields=['cancion'],
+                condition=models.Q(dia__isnull=True),
+                name='oyentes_cancion_historico_unico',
+            ),
+        ]
+
+
+class OyentesArtista(SketchOyentes):
+    artista = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='sketches_oyentes'
+    )
+
+    class Meta:
+        verbose_name = 'Oyentes únicos por artista'
+        verbose_name_plural = 'Oyentes únicos por artista'
+        constraints = [
+            models.UniqueConstraint(fields=['artista', 'dia'], name='oyentes_artista_dia_unico'),
+            models.UniqueConstraint(
+                fields=['artista'],
+                condition=models.Q(dia__isnull=True),
+                name='oyentes_artista_historico_unico',
+            ),
+        ]
+
+
+class CancionSimilar(models.Model):
+    """Vecino precalculado (similitud coseno por co-escucha) de una canción."""
+    cancion = models.ForeignKey(
+        Cancion,
+        on_delete=models.CASCADE,
+        related_name='similares'
+    )
+    similar = models.ForeignKey(
+        Cancion,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    puntaje = models.FloatField()
+
+    class Meta:
+        verbose_name = 'Canción similar'
+        verbose_name_plural = 'Canciones similares'
+        unique_together = ['cancion', 'similar']
+        indexes = [
+            models.Index(fields=['cancion', '-puntaje'], name='similar_cancion_puntaje_idx'),
+        ]
+
+
+class PerfilRecomendacion(models.Model):
+    """Norma del vector de oyentes de cada canción, usada en las actualizaciones incrementales."""
+    cancion = models.OneToOneField(
+        Cancion,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='perfil_recomendacion'
+    )
+    norma = models.FloatField(default=0)
+
+
+class ContadorFragmento(models.Model):
+    """Fragmento del contador de reproducciones de una canción muy escuchada (ver contadores.py).
+
+    Cada reproducción suma en un fragmento al azar en lugar de en la fila de la
+    canción; el pliegue periódico pasa los fragmentos a `Cancion.play_count`.
+    """
+    cancion = models.ForeignKey(Cancion, on_delete=models.CASCADE, related_name='contadores')
+    fragmento = models.PositiveSmallIntegerField()
+    cuenta = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Fragmento de contador'
+        verbose_name_plural = 'Fragmentos de contador'
+        unique_together = ['cancion', 'fragmento']
+
+    def __str__(self):
+        return f"{self.cancion_id}#{self.fragmento}: {self.cuenta}"
+
+
+class EstadoRecomendaciones(models.Model):
+    """Marca de agua del último cálculo de recomendaciones (fila única)."""
+    ultimo_historial_id = models.BigIntegerField(default=0)
+    ultima_ejecucion = models.DateTimeField(null=True, blank=True)
+
+    @classmethod
+    def actual(cls):
+        estado, _ = cls.objects.get_or_create(pk=1)
+        return estado
+
+
+class InteraccionRetirada(models.Model):
+    """Canción que perdió un favorito o una entrada de playlist desde el último cálculo de recomendaciones.
+
+    La marca de agua solo ve eventos nuevos; con este registro la siguiente
+    ejecución incremental también recalcula las canciones con bajas.
+    """
+    # Sin FK: la baja puede venir del borrado en cascada de la propia canción
+    cancion_id = models.BigIntegerField()
+    creada_en = models.DateTimeField(auto_now_add=True)
+
+
+class PoolRadio(models.Model):
+    """Candidatos precalculados para la radio automática de una semilla."""
+    CANCION = 'cancion'
+    ARTISTA = 'artista'
+    GENERO = 'genero'
+
+    TIPO_CHOICES = [
+        (CANCION, 'Canción'),
+        (ARTISTA, 'Artista'),
+        (GENERO, 'Género'),
+    ]
+
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES)
+    semilla_id = models.BigIntegerField()
+    canciones = models.JSONField(default=list, help_text='Ids de canciones ordenados por afinidad')
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Pool de radio'
+        verbose_name_plural = 'Pools de radio'
+        unique_together = ['tipo', 'semilla_id']
+
+    def __str__(self):
+        return f"{self.tipo}:{self.semilla_id} ({len(self.canciones)})"
+
+
+class SubidaCancion(models.Model):
+    """Subida reanudable por fragmentos de un archivo de audio (ver subidas.py).
+
+    Los fragmentos se escriben en `ruta`; al finalizar, con el archivo completo y
+    verificado, se enlaza en el almacenamiento por contenido y se crea la `Cancion`.
+    """
+    EN_CURSO = 'en_curso'
+    FINALIZANDO = 'finalizando'
+    COMPLETADA = 'completada'
+
+    ESTADO_CHOICES = [
+        (EN_CURSO, 'En curso'),
+        (FINALIZANDO, 'Finalizando'),
+        (COMPLETADA, 'Completada'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='subidas_canciones'
+    )
+    nombre_archivo = models.CharField(max_length=255)
+    ruta = models.CharField(max_length=255, help_text='Archivo en curso dentro de MEDIA_ROOT')
+    tamano = models.BigIntegerField(help_text='Tamaño total en bytes')
+    recibido = models.BigIntegerField(default=0, help_text='Bytes escritos (offset del siguiente fragmento)')
+    sha256 = models.CharField(max_length=64, blank=True, help_text='Suma esperada (hex); la real tras finalizar')
+    estado = models.CharField(max_length=12, choices=ESTADO_CHOICES, default=EN_CURSO)
+    escribiendo_hasta = models.DateTimeField(null=True, blank=True, help_text='Bloqueo del fragmento en escritura')
+    cancion = models.OneToOneField(Cancion, null=True, blank=True, on_delete=models.SET_NULL, related_name='subida')
+    creado_en = models.DateTimeField(auto_now_add=True)
+    actualizado_en = models.DateTimeField(auto_now=True)
+    expira_en = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = 'Subida de canción'
+        verbose_name_plural = 'Subidas de canciones'
+
+    def __str__(self):
+        return f"{self.nombre_archivo} ({self.recibido}/{self.tamano})"
+
+
+class IngestaAlbum(models.Model):
+    """Ingesta de un álbum completo (ZIP o varios archivos + manifiesto), ver ingesta.py.
+
+    Los archivos se dejan en `directorio` y un hilo los procesa; el cliente
+    consulta el avance (`procesadas` de `total`) hasta `completada` o `error`.
+    """
+    PENDIENTE = 'pendiente'
+    EN_CURSO = 'en_curso'
+    COMPLETADA = 'completada'
+    ERROR = 'error'
+
+    ESTADO_CHOICES = [
+        (PENDIENTE, 'Pendiente'),
+        (EN_CURSO, 'En curso'),
+        (COMPLETADA, 'Completada'),
+        (ERROR, 'Error'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='ingestas_albumes'
+    )
+    directorio = models.CharField(max_length=255, help_text='Archivos recibidos dentro de MEDIA_ROOT')
+    manifiesto = models.JSONField(default=dict, blank=True)
+    estado = models.CharField(max_length=12, choices=ESTADO_CHOICES, default=PENDIENTE)
+    total = models.PositiveIntegerField(default=0)
+    procesadas = models.PositiveIntegerField(default=0)
+    album = models.ForeignKey(Album, null=True, blank=True, on_delete=models.SET_NULL, related_name='ingestas')
+    errores = models.JSONField(default=list, blank=True)
+    mensaje = models.TextField(blank=True)
+    creado_en = models.DateTimeField(auto_now_add=True)
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Ingesta de álbum'
+        verbose_name_plural = 'Ingestas de álbumes'
+
+    def __str__(self):
+        return f"Ingesta {self.pk} ({self.estado})"
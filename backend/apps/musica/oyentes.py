@@ -0,0 +1,88 @@
+"""Conteo aproximado de oyentes únicos por canción y artista.
+
+Cada reproducción registrada actualiza cuatro sketches HyperLogLog: el del día
+y el histórico, tanto de la canción como de su artista. El histórico guarda la
+estimación ya calculada, así que leerla cuesta lo mismo que leer `play_count`.
+Las ventanas de días se resuelven fusionando los sketches diarios.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import consultas
+from .hll import ERROR_ESTANDAR, HyperLogLog
+from .models import OyentesArtista, OyentesCancion
+
+
+def _bloquear(modelo, filtro, dias):
+    return {
+        s.dia: s for s in modelo.objects.select_for_update().filter(
+            Q(dia__in=[d for d in dias if d]) | Q(dia__isnull=True), **filtro
+        )
+    }
+
+
+def _agregar(modelo, filtro, dias, usuario_id):
+    existentes = _bloquear(modelo, filtro, dias)
+    faltan = [dia for dia in dias if dia not in existentes]
+    if faltan:
+        # Sin fila no hay nada que bloquear: dos primeras reproducciones del día la
+        # crearían a la vez. Se insertan vacías (ignorando la que ya exista) y se bloquean.
+        vacio = HyperLogLog().a_bytes()
+        modelo.objects.bulk_create(
+            [modelo(dia=dia, registros=vacio, **filtro) for dia in faltan], ignore_conflicts=True
+        )
+        existentes = _bloquear(modelo, filtro, dias)
+    for dia in dias:
+        sketch = existentes[dia]
+        hll = HyperLogLog.desde_bytes(sketch.registros)
+        if not hll.agregar(usuario_id):
+            continue
+        sketch.registros = hll.a_bytes()
+        sketch.estimacion = hll.estimar()
+        sketch.save(update_fields=['registros', 'estimacion', 'actualizado_en'])
+
+
+def registrar_oyente(cancion, usuario_id, cuando=None):
+    """Añade al usuario a los sketches de la canción y de su artista."""
+    if usuario_id is None:
+        return
+    dias = (timezone.localdate(cuando), None)
+    with transaction.atomic():
+        _agregar(OyentesCancion, {'cancion_id': cancion.id}, dias, usuario_id)
+        if cancion.uploaded_by_id:
+            _agregar(OyentesArtista, {'artista_id': cancion.uploaded_by_id}, dias, usuario_id)
+
+
+def _estimar(modelo, filtro, dias=None):
+    if not dias:
+        return modelo.objects.filter(dia__isnull=True, **filtro).values_list('estimacion', flat=True).first() or 0
+    desde = timezone.localdate() - timedelta(days=dias - 1)
+    hll = HyperLogLog()
+    for registros in modelo.objects.filter(dia__gte=desde, **filtro).values_list('registros', flat=True):
+        hll.fusionar(HyperLogLog.desde_bytes(registros))
+    return hll.estimar()
+
+
+def oyentes_cancion(cancion_id, dias=None):
+    """Oyentes únicos estimados de una canción (histórico o últimos `dias` días)."""
+    return _estimar(OyentesCancion, {'cancion_id': cancion_id}, dias)
+
+
+def oyentes_artista(artista_id, dias=None):
+    """Oyentes únicos estimados de un artista (histórico o últimos `dias` días)."""
+    return _estimar(OyentesArtista, {'artista_id': artista_id}, dias)
+
+
+def oyentes_canciones(ids):
+    """Estimación histórica para varias canciones en una sola consulta."""
+    return dict(
+        consultas.oyentes_historicos(ids).values_list('cancion_id', 'estimacion')
+    )
+
+
+def error_relativo():
+    """Error estándar relativo de las estimaciones."""
+    return round(ERROR_ESTANDAR, 4)
@@ -0,0 +1,149 @@
+"""Variantes de portada (64/256/640 px en WebP y JPEG).
+
+Las variantes se guardan junto a la portada original, que está direccionada
+por contenido (almacenamiento.py), con el hash como huella del nombre:
+
+    portadas/07/c1/07c1...42.jpg          original
+    portadas/07/c1/07c1...42-256-v1.webp  variante
+
+El nombre cambia si cambia la imagen o `VERSION` (parámetros de codificación),
+así que los archivos son inmutables y se pueden servir con caché de larga
+duración. Portadas idénticas comparten variantes.
+
+Al guardar una portada nueva, la generación se encola tras el commit en un
+pool de procesos (`PORTADAS_PROCESOS`) y el mapa de rutas se escribe en
+`cover_variantes` de todas las filas con esa portada. Las portadas anteriores
+a este esquema se procesan con `manage.py generar_portadas`.
+"""
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections, transaction
+
+from backend import escritura
+
+from . import imagenes
+from .almacenamiento import almacenamiento_media, sha256_de_ruta
+from .models import Album, Cancion
+
+logger = logging.getLogger(__name__)
+
+TAMANOS = (64, 256, 640)
+VERSION = 1
+CALIDAD = 82
+MODELOS = (Cancion, Album)
+
+
+def ruta_variante(ruta, tamano, formato):
+    base = ruta.rsplit('.', 1)[0] if '.' in ruta.rsplit('/', 1)[-1] else ruta
+    return f'{base}-{tamano}-v{VERSION}.{formato}'
+
+
+def variantes(ruta):
+    """Mapa {tamaño: {formato: ruta}} de las variantes de la portada `ruta`."""
+    return {
+        str(tamano): {formato: ruta_variante(ruta, tamano, formato) for formato in imagenes.formatos_disponibles()}
+        for tamano in TAMANOS
+    }
+
+
+def destinos(ruta):
+    almacenamiento = almacenamiento_media()
+    return [
+        (int(tamano), formato, almacenamiento.path(relativa))
+        for tamano, formatos in variantes(ruta).items()
+        for formato, relativa in formatos.items()
+    ]
+
+
+def _existen(ruta):
+    return all(Path(destino).exists() for _, _, destino in destinos(ruta))
+
+
+def generar(ruta):
+    """Genera (en este proceso) las variantes que falten y devuelve el mapa."""
+    imagenes.generar_variantes(almacenamiento_media().path(ruta), destinos(ruta), CALIDAD)
+    return variantes(ruta)
+
+
+def guardar(ruta, mapa):
+    for modelo in MODELOS:
+        modelo.objects.filter(cover=ruta).update(cover_variantes=mapa)
+
+
+class _Generador:
+    """Pool de procesos perezoso; los resultados se guardan desde el hilo de callbacks."""
+
+    def __init__(self):
+        self._pool = None
+        self._lock = threading.Lock()
+        self._en_curso = set()
+
+    def _obtener_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=getattr(settings, 'PORTADAS_PROCESOS', 2),
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+            return self._pool
+
+    def encolar(self, ruta):
+        with self._lock:
+            if ruta in self._en_curso:
+                return
+            self._en_curso.add(ruta)
+        try:
+            futuro = self._obtener_pool().submit(
+                imagenes.generar_variantes, almacenamiento_media().path(ruta), destinos(ruta), CALIDAD
+            )
+        except Exception:
+            self._en_curso.discard(ruta)
+            raise
+        origen = threading.get_ident()
+        futuro.add_done_callback(lambda f: self._terminado(ruta, f, origen))
+
+    def _terminado(self, ruta, futuro, hilo_origen):
+        self._en_curso.discard(ruta)
+        try:
+            futuro.result()
+            escritura.encolar(guardar, ruta, variantes(ruta))
+        except Exception:
+            logger.exception('No se pudieron generar las variantes de %s', ruta)
+        finally:
+            # El callback corre en el hilo del pool salvo que el futuro ya hubiera terminado
+            if threading.get_ident() != hilo_origen:
+                connections.close_all()
+
+
+_generador = _Generador()
+
+
+def programar_ruta(ruta):
+    """Mapa de variantes de la portada `ruta` si ya existen; si no, programa su generación y devuelve {}.
+
+    En segundo plano, `guardar` rellena el mapa de las filas con esa portada
+    tras el commit; sin segundo plano se generan aquí y se devuelve el mapa.
+    """
+    if not sha256_de_ruta(ruta):
+        return {}
+    if _existen(ruta):
+        return variantes(ruta)
+    if getattr(settings, 'PORTADAS_EN_SEGUNDO_PLANO', True):
+        transaction.on_commit(lambda: _generador.encolar(ruta))
+        return {}
+    try:
+        return generar(ruta)
+    except Exception:
+        logger.exception('No se pudieron generar las variantes de %s', ruta)
+        return {}
+
+
+def programar(instancia):
+    """Tras cambiar la portada de `instancia`: variantes ya existentes al momento, si no, en segundo plano."""
+    instancia.cover_variantes = programar_ruta(instancia.cover.name if instancia.cover else '')
+    type(instancia).objects.filter(pk=instancia.pk).update(cover_variantes=instancia.cover_variantes)
@@ -0,0 +1,326 @@
+"""Caché en memoria del comienzo de las canciones más escuchadas.
+
+Cada reproducción empieza con `Range: bytes=0-` sobre `transmitir_cancion`;
+servir ese primer tramo desde memoria (sin abrir ni leer el archivo) acorta el
+tiempo hasta el primer audio. El navegador pide el resto con rangos
+posteriores, que siguen saliendo del disco.
+
+- La clave es la ruta del archivo, direccionada por contenido
+  (almacenamiento.py): si la canción cambia de audio cambia la ruta, así que una
+  entrada nunca queda obsoleta y no hace falta invalidar.
+- Admisión por frecuencia (al estilo TinyLFU): se cuentan los inicios de
+  reproducción por ruta, con envejecimiento periódico; una canción entra a
+  partir de `ADMISION` inicios, y solo desplaza a la menos reciente si se
+  reproduce más que ella. Las canciones que suenan una vez no expulsan a las
+  populares.
+- `COMPARTIDA`: en lugar de un LRU por proceso se usa un segmento de memoria
+  compartida (POSIX) común a todos los workers de la máquina, con ranuras de
+  tamaño fijo y asociatividad por conjuntos. Las lecturas no toman locks (un
+  contador de secuencia por ranura detecta escrituras concurrentes); las
+  escrituras se serializan con `flock`. `manage.py calentar_prefijos` lo
+  llena con las canciones más escuchadas.
+
+Los contadores (aciertos, bytes servidos desde memoria...) son por proceso y
+se consultan en /api/reportes/cache-prefijos/.
+"""
+import hashlib
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.conf import settings
+
+try:
+    import fcntl
+    from multiprocessing import resource_tracker, shared_memory
+except ImportError:  # pragma: no cover - sin memoria compartida POSIX (Windows)
+    fcntl = None
+    shared_memory = None
+
+CONFIG = {
+    'TAMANO_PREFIJO': 256 * 1024,
+    'MAX_BYTES': 64 * 1024 * 1024,
+    'ADMISION': 2,
+    'COMPARTIDA': False,
+    'NOMBRE': 'zora-prefijos',
+}
+
+
+def _config():
+    return {**CONFIG, **getattr(settings, 'CACHE_PREFIJOS', {})}
+
+
+class Frecuencias:
+    """Inicios de reproducción por ruta, acotados: cada `ventana` eventos se reducen a la mitad."""
+
+    def __init__(self, ventana):
+        self.ventana = max(ventana, 16)
+        self._conteos = {}
+        self._eventos = 0
+
+    def registrar(self, clave):
+        self._conteos[clave] = self._conteos.get(clave, 0) + 1
+        self._eventos += 1
+        if self._eventos >= self.ventana:
+            self._conteos = {c: n // 2 for c, n in self._conteos.items() if n > 1}
+            self._eventos = 0
+        return self._conteos.get(clave, 0)
+
+    def frecuencia(self, clave):
+        return self._conteos.get(clave, 0)
+
+
+class _CacheBase:
+    def __init__(self, tamano_prefijo, capacidad, admision):
+        self.tamano_prefijo = tamano_prefijo
+        self.capacidad = capacidad
+        self.admision = admision
+        self.frecuencias = Frecuencias(capacidad * 10)
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.bytes_servidos = 0
+        self.admitidas = 0
+        self.rechazadas = 0
+
+    def registrar_inicio(self, ruta):
+        """Cuenta un inicio de reproducción (rango desde el byte 0)."""
+        with self._lock:
+            self.frecuencias.registrar(ruta)
+
+    def obtener(self, ruta):
+        """(tamaño total del archivo, primeros bytes) o None."""
+        entrada = self._leer(ruta)
+        with self._lock:
+            if entrada is None:
+                self.fallos += 1
+            else:
+                self.aciertos += 1
+        return entrada
+
+    def contar_servidos(self, n):
+        with self._lock:
+            self.bytes_servidos += n
+
+    def quiere(self, ruta):
+        """Si merece leer el prefijo para admitirlo (frecuencia suficiente)."""
+        return self.frecuencias.frecuencia(ruta) >= self.admision
+
+    def admitir(self, ruta, tamano_total, datos):
+        datos = bytes(datos[:self.tamano_prefijo])
+        with self._lock:
+            admitida = self.quiere(ruta) and self._escribir(ruta, tamano_total, datos)
+            if admitida:
+                self.admitidas += 1
+            else:
+                self.rechazadas += 1
+        return admitida
+
+    def cargar(self, ruta, tamano_total, datos):
+        """Guarda el prefijo sin pasar por la admisión (precarga de las más escuchadas)."""
+        with self._lock:
+            return self._escribir(ruta, tamano_total, bytes(datos[:self.tamano_prefijo]))
+
+    def metricas(self):
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'modo': self.modo,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'ratio_aciertos': round(self.aciertos / consultas, 4) if consultas else 0.0,
+                'bytes_servidos_memoria': self.bytes_servidos,
+                'admitidas': self.admitidas,
+                'rechazadas': self.rechazadas,
+                'tamano_prefijo': self.tamano_prefijo,
+                'capacidad': self.capacidad,
+                **self._ocupacion(),
+            }
+
+
+class CachePrefijos(_CacheBase):
+    """LRU en memoria del proceso, acotado en bytes."""
+    modo = 'local'
+
+    def __init__(self, tamano_prefijo, max_bytes, admision):
+        super().__init__(tamano_prefijo, max(1, max_bytes // tamano_prefijo), admision)
+        self.max_bytes = max_bytes
+        self._entradas = OrderedDict()
+        self._bytes = 0
+
+    def _leer(self, ruta):
+        with self._lock:
+            entrada = self._entradas.get(ruta)
+            if entrada is not None:
+                self._entradas.move_to_end(ruta)
+            return entrada
+
+    def _escribir(self, ruta, tamano_total, datos):
+        if ruta in self._entradas:
+            return True
+        frecuencia = self.frecuencias.frecuencia(ruta)
+        while self._entradas and self._bytes + len(datos) > self.max_bytes:
+            victima = next(iter(self._entradas))
+            if self.frecuencias.frecuencia(victima) > frecuencia:
+                return False
+            self._bytes -= len(self._entradas.pop(victima)[1])
+        if len(datos) > self.max_bytes:
+            return False
+        self._entradas[ruta] = (tamano_total, datos)
+        self._bytes += len(datos)
+        return True
+
+    def _ocupacion(self):
+        return {'entradas': len(self._entradas), 'bytes_ocupados': self._bytes}
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+
+
+class CachePrefijosCompartida(_CacheBase):
+    """Ranuras de tamaño fijo en memoria compartida, comunes a todos los procesos.
+
+    Cada ranura: secuencia (par = estable), hash de la ruta, tamaño total,
+    longitud del prefijo, último acceso y datos. Una ruta solo puede estar en
+    las `ASOCIATIVIDAD` ranuras siguientes a su hash; al escribir se reemplaza
+    la vacía o la de acceso más antiguo de ese conjunto.
+    """
+    modo = 'compartida'
+    ASOCIATIVIDAD = 8
+    _MAGIA = b'ZORAPRE1'
+    _CABECERA = struct.Struct('<8sII')  # magia, ranuras, tamaño del prefijo
+    _RANURA = struct.Struct('<Q32sQId')  # secuencia, clave, tamaño total, longitud, último acceso
+
+    def __init__(self, tamano_prefijo, max_bytes, admision, nombre):
+        if shared_memory is None:
+            raise RuntimeError('La memoria compartida POSIX no está disponible en esta plataforma.')
+        ranuras = max(self.ASOCIATIVIDAD, max_bytes // tamano_prefijo)
+        super().__init__(tamano_prefijo, ranuras, admision)
+        self.nombre = nombre
+        self._paso = self._RANURA.size + tamano_prefijo
+        tamano = self._CABECERA.size + ranuras * self._paso
+        self._lock_archivo = open(os.path.join(tempfile.gettempdir(), f'{nombre}.lock'), 'a+b')
+        with self._exclusivo():
+            try:
+                self._shm = shared_memory.SharedMemory(name=nombre, create=True, size=tamano)
+                self._CABECERA.pack_into(self._shm.buf, 0, self._MAGIA, ranuras, tamano_prefijo)
+            except FileExistsError:
+                self._shm = shared_memory.SharedMemory(name=nombre)
+                magia, ranuras_seg, prefijo_seg = self._CABECERA.unpack_from(self._shm.buf, 0)
+                if (magia, ranuras_seg, prefijo_seg) != (self._MAGIA, ranuras, tamano_prefijo):
+                    self._shm.close()
+                    raise RuntimeError(
+                        f'El segmento {nombre} tiene otra configuración; libéralo con calentar_prefijos --liberar.'
+                    )
+        # El segmento sobrevive a este proceso: lo comparten los demás workers
+        try:
+            resource_tracker.unregister(self._shm._name, 'shared_memory')
+        except Exception:
+            pass
+
+    @contextmanager
+    def _exclusivo(self):
+        fcntl.flock(self._lock_archivo, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_archivo, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _clave(ruta):
+        return hashlib.sha256(ruta.encode()).digest()
+
+    def _conjunto(self, clave):
+        inicio = int.from_bytes(clave[:8], 'little') % self.capacidad
+        return [(inicio + i) % self.capacidad for i in range(min(self.ASOCIATIVIDAD, self.capacidad))]
+
+    def _posicion(self, indice):
+        return self._CABECERA.size + indice * self._paso
+
+    def _leer(self, ruta):
+        clave = self._clave(ruta)
+        buf = self._shm.buf
+        for indice in self._conjunto(clave):
+            posicion = self._posicion(indice)
+            secuencia, clave_ranura, tamano_total, longitud, _ = self._RANURA.unpack_from(buf, posicion)
+            if secuencia % 2 or clave_ranura != clave or not longitud:
+                continue
+            inicio = posicion + self._RANURA.size
+            datos = bytes(buf[inicio:inicio + longitud])
+            if self._RANURA.unpack_from(buf, posicion)[0] != secuencia:
+                return None  # se reescribió mientras se copiaba
+            # Último acceso sin lock: una carrera solo afecta a qué ranura se reemplaza después
+            struct.pack_into('<d', buf, posicion + self._RANURA.size - 8, time.time())
+            return tamano_total, datos
+        return None
+
+    def _escribir(self, ruta, tamano_total, datos):
+        clave = self._clave(ruta)
+        buf = self._shm.buf
+        with self._exclusivo():
+            elegida, mas_antiguo = None, None
+            for indice in self._conjunto(clave):
+                _, clave_ranura, _, longitud, acceso = self._RANURA.unpack_from(buf, self._posicion(indice))
+                if clave_ranura == clave and longitud:
+                    return True
+                if not longitud:
+                    elegida = indice
+                    break
+                if mas_antiguo is None or acceso < mas_antiguo:
+                    elegida, mas_antiguo = indice, acceso
+            posicion = self._posicion(elegida)
+            secuencia = self._RANURA.unpack_from(buf, posicion)[0]
+            struct.pack_into('<Q', buf, posicion, secuencia + 1)
+            inicio = posicion + self._RANURA.size
+            buf[inicio:inicio + len(datos)] = datos
+            self._RANURA.pack_into(buf, posicion, secuencia + 2, clave, tamano_total, len(datos), time.time())
+        return True
+
+    def _ocupacion(self):
+        buf = self._shm.buf
+        longitudes = [self._RANURA.unpack_from(buf, self._posicion(i))[3] for i in range(self.capacidad)]
+        return {'entradas': sum(1 for n in longitudes if n), 'bytes_ocupados': sum(longitudes)}
+
+    def limpiar(self):
+        with self._exclusivo():
+            for indice in range(self.capacidad):
+                posicion = self._posicion(indice)
+                secuencia = self._RANURA.unpack_from(self._shm.buf, posicion)[0]
+                self._RANURA.pack_into(self._shm.buf, posicion, secuencia + 2 - secuencia % 2, b'', 0, 0, 0.0)
+
+    def liberar(self):
+        """Elimina el segmento del sistema (los procesos que lo tengan abierto siguen usándolo)."""
+        self._shm.close()
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def crear(config=None):
+    config = config or _config()
+    if config['COMPARTIDA'] and shared_memory is not None:
+        return CachePrefijosCompartida(
+            config['TAMANO_PREFIJO'], config['MAX_BYTES'], config['ADMISION'], config['NOMBRE']
+        )
+    return CachePrefijos(config['TAMANO_PREFIJO'], config['MAX_BYTES'], config['ADMISION'])
+
+
+def cache():
+    """Caché del proceso (local o compartida, según CACHE_PREFIJOS)."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = crear()
+    return _cache
@@ -0,0 +1,167 @@
+"""Radio automática: cola de reproducción a partir de una canción, artista o género.
+
+Cada semilla tiene un pool precalculado (`PoolRadio`) que mezcla la similitud
+por co-escucha (`CancionSimilar`), el mismo artista y el mismo género. Servir la
+radio es leer el pool, el historial reciente del usuario y las canciones
+elegidas; el cursor firmado guarda la posición en el pool para extender la cola
+sin repetir canciones.
+
+Los pools los guarda `manage.py construir_radio`; el de una semilla que aún no
+tiene se calcula al pedirlo y se guarda a través del escritor serializado. Las
+semillas que no existen dan SemillaInexistente sin escribir nada.
+"""
+import math
+
+from django.core import signing
+
+from backend import escritura
+
+from . import consultas
+from .models import Cancion, CancionSimilar, HistorialReproduccion, PoolRadio
+
+TAMANO_POOL = 200
+CANDIDATOS_POR_FUENTE = 100
+PESO_COESCUCHA = 0.6
+PESO_ARTISTA = 0.25
+PESO_GENERO = 0.15
+PESO_POPULARIDAD = 0.05
+HISTORIAL_EXCLUIDO = 50
+
+_SAL_CURSOR = 'musica.radio'
+
+
+def _mezclar(puntajes, excluir=()):
+    ordenados = sorted(puntajes.items(), key=lambda x: -x[1])
+    return [cancion_id for cancion_id, _ in ordenados if cancion_id not in excluir][:TAMANO_POOL]
+
+
+def _sumar_catalogo(puntajes, queryset, peso):
+    filas = list(queryset.order_by('-play_count').values_list('id', 'play_count')[:CANDIDATOS_POR_FUENTE])
+    maximo = math.log1p(max((p for _, p in filas), default=0)) or 1
+    for cancion_id, play_count in filas:
+        puntajes[cancion_id] = puntajes.get(cancion_id, 0) + peso + PESO_POPULARIDAD * math.log1p(play_count) / maximo
+
+
+def _sumar_coescucha(puntajes, semillas, peso):
+    vecinos = CancionSimilar.objects.filter(cancion_id__in=semillas).values_list('similar_id', 'puntaje')
+    for similar_id, puntaje in vecinos:
+        puntajes[similar_id] = puntajes.get(similar_id, 0) + peso * puntaje
+
+
+def _pool_cancion(cancion_id):
+    cancion = Cancion.objects.filter(pk=cancion_id).values('uploaded_by_id', 'genre_id').first()
+    if cancion is None:
+        return []
+    puntajes = {}
+    _sumar_coescucha(puntajes, [cancion_id], PESO_COESCUCHA)
+    _sumar_catalogo(puntajes, Cancion.objects.filter(uploaded_by_id=cancion['uploaded_by_id']), PESO_ARTISTA)
+    if cancion['genre_id']:
+        _sumar_catalogo(puntajes, Cancion.objects.filter(genre_id=cancion['genre_id']), PESO_GENERO)
+    return _mezclar(puntajes, excluir={cancion_id})
+
+
+def _pool_artista(artista_id):
+    propias = Cancion.objects.filter(uploaded_by_id=artista_id)
+    puntajes = {}
+    _sumar_catalogo(puntajes, propias, PESO_ARTISTA)
+    principales = list(propias.order_by('-play_count').values_list('id', flat=True)[:10])
+    _sumar_coescucha(puntajes, principales, PESO_COESCUCHA)
+    generos = set(propias.exclude(genre__isnull=True).values_list('genre_id', flat=True)[:CANDIDATOS_POR_FUENTE])
+    if generos:
+        _sumar_catalogo(puntajes, Cancion.objects.filter(genre_id__in=generos), PESO_GENERO)
+    return _mezclar(puntajes)
+
+
+def _pool_genero(genero_id):
+    del_genero = Cancion.objects.filter(genre_id=genero_id)
+    puntajes = {}
+    _sumar_catalogo(puntajes, del_genero, PESO_GENERO + PESO_ARTISTA)
+    principales = list(del_genero.order_by('-play_count').values_list('id', flat=True)[:10])
+    _sumar_coescucha(puntajes, principales, PESO_COESCUCHA)
+    return _mezclar(puntajes)
+
+
+_CONSTRUCTORES = {
+    PoolRadio.CANCION: _pool_cancion,
+    PoolRadio.ARTISTA: _pool_artista,
+    PoolRadio.GENERO: _pool_genero,
+}
+
+# Filtro de canciones que prueba que la semilla existe (una búsqueda en un índice)
+_FILTROS_SEMILLA = {
+    PoolRadio.CANCION: 'pk',
+    PoolRadio.ARTISTA: 'uploaded_by_id',
+    PoolRadio.GENERO: 'genre_id',
+}
+
+
+class SemillaInexistente(Exception):
+    """Ninguna canción (visible) corresponde a la semilla."""
+
+
+def _guardar_pool(tipo, semilla_id, canciones):
+    pool, _ = PoolRadio.objects.update_or_create(
+        tipo=tipo, semilla_id=semilla_id, defaults={'canciones': canciones}
+    )
+    return pool
+
+
+def construir_pool(tipo, semilla_id):
+    return _guardar_pool(tipo, semilla_id, _CONSTRUCTORES[tipo](semilla_id))
+
+
+def obtener_pool(tipo, semilla_id):
+    """Pool de la semilla; si aún no existe se calcula y se encola su guardado."""
+    canciones = consultas.pool_radio(tipo, semilla_id).values_list('canciones', flat=True).first()
+    if canciones is None:
+        if not Cancion.objects.filter(**{_FILTROS_SEMILLA[tipo]: semilla_id}).exists():
+            raise SemillaInexistente
+        canciones = _CONSTRUCTORES[tipo](semilla_id)
+        escritura.encolar(_guardar_pool, tipo, semilla_id, canciones)
+    return canciones
+
+
+def firmar_cursor(tipo, semilla_id, posicion):
+    return signing.dumps([tipo, semilla_id, posicion], salt=_SAL_CURSOR, compress=True)
+
+
+def leer_cursor(cursor):
+    """Devuelve (tipo, semilla_id, posicion) o lanza signing.BadSignature."""
+    tipo, semilla_id, posicion = signing.loads(cursor, salt=_SAL_CURSOR)
+    if tipo not in _CONSTRUCTORES:
+        raise signing.BadSignature('Tipo de semilla inválido')
+    return tipo, int(semilla_id), int(posicion)
+
+
+def siguientes(tipo, semilla_id, usuario_id=None, posicion=0, limite=10):
+    """Siguientes `limite` ids de la cola y la posición desde la que continuar (None si se agotó).
+
+    Lanza SemillaInexistente si la semilla no tiene pool ni existe.
+    """
+    pool = obtener_pool(tipo, semilla_id)
+    recientes = set()
+    if usuario_id is not None:
+        recientes = set(
+            HistorialReproduccion.objects.filter(usuario_id=usuario_id)
+            .order_by('-played_at')
+            .values_list('cancion_id', flat=True)[:HISTORIAL_EXCLUIDO]
+        )
+    elegidas = []
+    while posicion < len(pool) and len(elegidas) < limite:
+        cancion_id = pool[posicion]
+        posicion += 1
+        if cancion_id not in recientes:
+            elegidas.append(cancion_id)
+    return elegidas, (posicion if posicion < len(pool) else None)
+
+
+def semillas_existentes():
+    """Semillas para las que conviene precalcular pool (usado por construir_radio)."""
+    canciones = Cancion.objects.values_list('id', flat=True)
+    artistas = Cancion.objects.order_by().values_list('uploaded_by_id', flat=True).distinct()
+    generos = Cancion.objects.exclude(genre__isnull=True).order_by().values_list('genre_id', flat=True).distinct()
+    return {
+        PoolRadio.CANCION: canciones,
+        PoolRadio.ARTISTA: artistas,
+        PoolRadio.GENERO: generos,
+    }
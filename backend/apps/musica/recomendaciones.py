@@ -0,0 +1,324 @@
+"""Recomendaciones ítem a ítem a partir del historial, favoritos y playlists.
+
+El cálculo se hace fuera de línea (`manage.py construir_recomendaciones`):
+se arma una matriz dispersa usuario x canción con pesos implícitos y se
+guardan los `VECINOS` vecinos por similitud coseno de cada canción en
+`CancionSimilar`. Las ejecuciones incrementales solo recalculan las canciones
+con eventos nuevos desde la última marca de agua, más las que perdieron un
+favorito o una entrada de playlist (`InteraccionRetirada`, lo rellenan las
+señales); las normas del resto se leen de `PerfilRecomendacion`, por lo que no
+hace falta recorrer toda la tabla. El historial no tiene bajas por la API; si
+se borra (p. ej. al eliminar usuarios), `--completo` lo recoge.
+
+Servir `similares` o `para ti` es una consulta indexada sobre la tabla de
+vecinos.
+"""
+import math
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from apps.playlists.models import Playlist
+
+from . import consultas
+from .models import (
+    CancionFavorita,
+    CancionSimilar,
+    EstadoRecomendaciones,
+    HistorialReproduccion,
+    InteraccionRetirada,
+    PerfilRecomendacion,
+)
+
+try:
+    import numpy as np  # type: ignore
+except ImportError:  # pragma: no cover - numpy solo es necesario para el cálculo
+    np = None
+
+
+VECINOS = 50
+PESO_FAVORITO = 2.0
+PESO_PLAYLIST = 1.0
+TAMANO_LOTE = 500
+
+PlaylistCancion = Playlist.songs.through
+
+
+def _lotes(ids, tamano=TAMANO_LOTE):
+    ids = list(ids)
+    for i in range(0, len(ids), tamano):
+        yield ids[i:i + tamano]
+
+
+# ========== CÁLCULO FUERA DE LÍNEA ==========
+
+def _canciones_tocadas(estado, tope_historial, tope_bajas):
+    tocadas = set(
+        InteraccionRetirada.objects.filter(id__lte=tope_bajas).order_by().values_list('cancion_id', flat=True).distinct()
+    )
+    tocadas.update(
+        HistorialReproduccion.objects
+        .filter(id__gt=estado.ultimo_historial_id, id__lte=tope_historial)
+        .order_by()
+        .values_list('cancion_id', flat=True)
+        .distinct()
+    )
+    tocadas.update(
+        CancionFavorita.objects.filter(agregada_en__gt=estado.ultima_ejecucion).values_list('cancion_id', flat=True)
+    )
+    tocadas.update(
+        PlaylistCancion.objects
+        .filter(playlist__updated_at__gt=estado.ultima_ejecucion)
+        .values_list('cancion_id', flat=True)
+    )
+    return tocadas
+
+
+def _todas_las_canciones():
+    canciones = set(HistorialReproduccion.objects.order_by().values_list('cancion_id', flat=True).distinct())
+    canciones.update(CancionFavorita.objects.values_list('cancion_id', flat=True))
+    canciones.update(PlaylistCancion.objects.values_list('cancion_id', flat=True))
+    return canciones
+
+
+def _usuarios_de(canciones):
+    usuarios = set()
+    for lote in _lotes(canciones):
+        usuarios.update(
+            HistorialReproduccion.objects.filter(cancion_id__in=lote)
+            .order_by().values_list('usuario_id', flat=True).distinct()
+        )
+        usuarios.update(CancionFavorita.objects.filter(cancion_id__in=lote).values_list('usuario_id', flat=True))
+        usuarios.update(
+            PlaylistCancion.objects.filter(cancion_id__in=lote)
+            .values_list('playlist__user_id', flat=True).distinct()
+        )
+    return usuarios
+
+
+def _interacciones(usuarios):
+    """Pesos implícitos (usuario, canción): log(1+reproducciones) + favorito + playlist."""
+    pesos = defaultdict(float)
+    for lote in _lotes(sorted(usuarios)):
+        reproducciones = (
+            HistorialReproduccion.objects.filter(usuario_id__in=lote)
+            .order_by()
+            .values('usuario_id', 'cancion_id')
+            .annotate(n=Count('id'))
+            .values_list('usuario_id', 'cancion_id', 'n')
+        )
+        for usuario_id, cancion_id, n in reproducciones:
+            pesos[(usuario_id, cancion_id)] += math.log1p(n)
+        for usuario_id, cancion_id in CancionFavorita.objects.filter(usuario_id__in=lote).values_list('usuario_id', 'cancion_id'):
+            pesos[(usuario_id, cancion_id)] += PESO_FAVORITO
+        en_playlists = (
+            PlaylistCancion.objects.filter(playlist__user_id__in=lote)
+            .values_list('playlist__user_id', 'cancion_id')
+            .distinct()
+        )
+        for usuario_id, cancion_id in en_playlists:
+            pesos[(usuario_id, cancion_id)] += PESO_PLAYLIST
+    return pesos
+
+
+class _Matriz:
+    """Matriz dispersa usuario x canción en formato CSR, con índice por columna."""
+
+    def __init__(self, pesos):
+        claves = np.fromiter(
+            (v for clave in pesos for v in clave), dtype=np.int64, count=2 * len(pesos)
+        ).reshape(-1, 2)
+        valores = np.fromiter(pesos.values(), dtype=np.float64, count=len(pesos))
+        usuarios, filas = np.unique(claves[:, 0], return_inverse=True)
+        self.canciones, columnas = np.unique(claves[:, 1], return_inverse=True)
+
+        orden = np.argsort(filas, kind='stable')
+        self.filas = filas[orden]
+        self.columnas = columnas[orden]
+        self.valores = valores[orden]
+        self.indptr = np.zeros(len(usuarios) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.filas, minlength=len(usuarios)), out=self.indptr[1:])
+
+        self.orden_columnas = np.argsort(self.columnas, kind='stable')
+        self.colptr = np.zeros(len(self.canciones) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.columnas, minlength=len(self.canciones)), out=self.colptr[1:])
+        self.posicion = {int(c): i for i, c in enumerate(self.canciones)}
+
+    def columna(self, j):
+        pos = self.orden_columnas[self.colptr[j]:self.colptr[j + 1]]
+        return self.filas[pos], self.valores[pos]
+
+    def productos(self, j):
+        """Producto punto de la columna j con todas las columnas."""
+        usuarios, pesos = self.columna(j)
+        inicios = self.indptr[usuarios]
+        largos = self.indptr[usuarios + 1] - inicios
+        desplazamientos = np.repeat(inicios - np.concatenate(([0], np.cumsum(largos)[:-1])), largos)
+        idx = desplazamientos + np.arange(largos.sum())
+        return np.bincount(
+            self.columnas[idx],
+            weights=self.valores[idx] * np.repeat(pesos, largos),
+            minlength=len(self.canciones),
+        )
+
+    def normas_locales(self):
+        return np.sqrt(np.bincount(self.columnas, weights=self.valores ** 2, minlength=len(self.canciones)))
+
+
+def _top(similitudes, j, vecinos):
+    similitudes[j] = 0
+    positivos = int(np.count_nonzero(similitudes > 0))
+    k = min(vecinos, positivos)
+    if not k:
+        return []
+    candidatos = np.argpartition(-similitudes, k - 1)[:k]
+    candidatos = candidatos[np.argsort(-similitudes[candidatos])]
+    return [(int(c), float(similitudes[c])) for c in candidatos]
+
+
+def _fusionar_inversos(vecinos_nuevos, tocadas, vecinos):
+    """Actualiza las listas de canciones no tocadas que apuntan a (o deberían apuntar a) una tocada."""
+    inversos = defaultdict(dict)
+    for cancion_id, lista in vecinos_nuevos.items():
+        for similar_id, puntaje in lista:
+            if similar_id not in tocadas:
+                inversos[similar_id][cancion_id] = puntaje
+    afectadas = set(inversos)
+    for lote in _lotes(tocadas):
+        afectadas.update(
+            CancionSimilar.objects.filter(similar_id__in=lote).values_list('cancion_id', flat=True)
+        )
+    afectadas -= tocadas
+
+    actuales = defaultdict(dict)
+    for lote in _lotes(afectadas):
+        for cancion_id, similar_id, puntaje in CancionSimilar.objects.filter(cancion_id__in=lote).values_list(
+            'cancion_id', 'similar_id', 'puntaje'
+        ):
+            if similar_id not in tocadas:
+                actuales[cancion_id][similar_id] = puntaje
+
+    resultado = {}
+    for cancion_id in afectadas:
+        combinados = {**actuales[cancion_id], **inversos.get(cancion_id, {})}
+        resultado[cancion_id] = sorted(combinados.items(), key=lambda x: -x[1])[:vecinos]
+    return resultado
+
+
+def _guardar(listas):
+    for lote in _lotes(listas):
+        CancionSimilar.objects.filter(cancion_id__in=lote).delete()
+    CancionSimilar.objects.bulk_create(
+        [
+            CancionSimilar(cancion_id=cancion_id, similar_id=similar_id, puntaje=puntaje)
+            for cancion_id, lista in listas.items()
+            for similar_id, puntaje in lista
+        ],
+        batch_size=1000,
+    )
+
+
+def construir(completo=False, vecinos=VECINOS):
+    """Recalcula los vecinos de las canciones con eventos nuevos (o de todas si `completo`).
+
+    Devuelve el número de canciones recalculadas.
+    """
+    if np is None:
+        raise RuntimeError('numpy es necesario para calcular las recomendaciones')
+
+    inicio = timezone.now()
+    estado = EstadoRecomendaciones.actual()
+    tope_historial = HistorialReproduccion.objects.aggregate(tope=Max('id'))['tope'] or 0
+    tope_bajas = InteraccionRetirada.objects.aggregate(tope=Max('id'))['tope'] or 0
+    completo = completo or estado.ultima_ejecucion is None
+
+    tocadas = _todas_las_canciones() if completo else _canciones_tocadas(estado, tope_historial, tope_bajas)
+    vecinos_nuevos = {}
+    normas_tocadas = {}
+    if tocadas:
+        pesos = _interacciones(_usuarios_de(tocadas))
+        matriz = _Matriz(pesos)
+        normas = matriz.normas_locales()
+        if not completo:
+            guardadas = {}
+            otras = set(matriz.posicion) - tocadas
+            for lote in _lotes(otras):
+                guardadas.update(
+                    PerfilRecomendacion.objects.filter(cancion_id__in=lote).values_list('cancion_id', 'norma')
+                )
+            for cancion_id, norma in guardadas.items():
+                if norma > 0:
+                    normas[matriz.posicion[cancion_id]] = norma
+
+        divisores = np.where(normas > 0, normas, np.inf)
+        for cancion_id in tocadas:
+            j = matriz.posicion.get(cancion_id)
+            if j is None or not normas[j]:
+                vecinos_nuevos[cancion_id] = []
+                continue
+            similitudes = matriz.productos(j) / (normas[j] * divisores)
+            vecinos_nuevos[cancion_id] = [
+                (int(matriz.canciones[c]), puntaje) for c, puntaje in _top(similitudes, j, vecinos)
+            ]
+            normas_tocadas[cancion_id] = float(normas[j])
+
+    with transaction.atomic():
+        if completo:
+            CancionSimilar.objects.all().delete()
+            PerfilRecomendacion.objects.all().delete()
+            _guardar(vecinos_nuevos)
+        else:
+            _guardar({**vecinos_nuevos, **_fusionar_inversos(vecinos_nuevos, tocadas, vecinos)})
+            for lote in _lotes(tocadas):
+                PerfilRecomendacion.objects.filter(cancion_id__in=lote).delete()
+        PerfilRecomendacion.objects.bulk_create(
+            [PerfilRecomendacion(cancion_id=c, norma=n) for c, n in normas_tocadas.items()],
+            batch_size=1000,
+        )
+        # Las bajas registradas durante el cálculo quedan para la siguiente ejecución
+        InteraccionRetirada.objects.filter(id__lte=tope_bajas).delete()
+        estado.ultimo_historial_id = tope_historial
+        estado.ultima_ejecucion = inicio
+        estado.save()
+    return len(tocadas)
+
+
+# ========== CONSULTAS EN LÍNEA ==========
+
+def similares(cancion_id, limite=20):
+    """Ids de las canciones más parecidas, ordenadas por puntaje."""
+    return list(consultas.similares(cancion_id).values_list('similar_id', flat=True)[:limite])
+
+
+def para_usuario(usuario_id, limite=20, semillas=20):
+    """Ids recomendados a partir de lo último escuchado y de los favoritos recientes."""
+    recientes = list(
+        HistorialReproduccion.objects.filter(usuario_id=usuario_id)
+        .order_by('-played_at')
+        .values_list('cancion_id', flat=True)[:semillas * 3]
+    )
+    favoritas = list(
+        CancionFavorita.objects.filter(usuario_id=usuario_id)
+        .order_by('-agregada_en')
+        .values_list('cancion_id', flat=True)[:semillas]
+    )
+    pesos = {}
+    for posicion, cancion_id in enumerate(dict.fromkeys(recientes)):
+        if len(pesos) >= semillas:
+            break
+        pesos[cancion_id] = 1.0 / (1 + 0.1 * posicion)
+    for cancion_id in favoritas:
+        pesos[cancion_id] = pesos.get(cancion_id, 0) + PESO_FAVORITO / 2
+    if not pesos:
+        return []
+
+    puntajes = defaultdict(float)
+    vecinos = CancionSimilar.objects.filter(cancion_id__in=list(pesos)).values_list('cancion_id', 'similar_id', 'puntaje')
+    for semilla_id, similar_id, puntaje in vecinos:
+        puntajes[similar_id] += pesos[semilla_id] * puntaje
+    escuchadas = set(recientes) | set(favoritas)
+    candidatos = [c for c in puntajes if c not in escuchadas]
+    candidatos.sort(key=lambda c: -puntajes[c])
+    return candidatos[:limite]
@@ -1,12 +1,28 @@
 from rest_framework import serializers
-from django.urls import reverse
 
-from .models import Album, Cancion, Genero, CancionFavorita, HistorialReproduccion
+from . import transmision
+from .models import Album, Cancion, Genero, CancionFavorita, HistorialReproduccion, IngestaAlbum
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
 
+def _urls_portada(obj, request):
+    """{'original': url, '64': {'webp': url, 'jpeg': url}, ...}; sin variantes, solo el original."""
+    if not obj.cover:
+        return None
+    almacenamiento = obj.cover.storage
+
+    def absoluta(ruta):
+        url = almacenamiento.url(ruta)
+        return request.build_absolute_uri(url) if request else url
+
+    urls = {'original': absoluta(obj.cover.name)}
+    for tamano, formatos in (obj.cover_variantes or {}).items():
+        urls[tamano] = {formato: absoluta(ruta) for formato, ruta in formatos.items()}
+    return urls
+
+
 class GeneroSerializer(serializers.ModelSerializer):
     class Meta:
         model = Genero
@@ -30,10 +46,11 @@ class UserBasicSerializer(serializers.ModelSerializer):
 
 class AlbumSerializer(serializers.ModelSerializer):
     cover_url = serializers.SerializerMethodField()
+    cover_urls = serializers.SerializerMethodField()
 
     class Meta:
         model = Album
-        fields = ['id', 'title', 'cover_url', 'release_date', 'artist']
+        fields = ['id', 'title', 'cover_url', 'cover_urls', 'release_date', 'artist']
         read_only_fields = ['artist']
 
     def get_cover_url(self, obj):
@@ -42,22 +59,28 @@ class AlbumSerializer(serializers.ModelSerializer):
             return request.build_absolute_uri(obj.cover.url) if request else obj.cover.url
         return None
 
+    def get_cover_urls(self, obj):
+        return _urls_portada(obj, self.context.get('request'))
+
 
 class CancionSerializer(serializers.ModelSerializer):
     genre = GeneroSerializer(read_only=True)
     artista = UserBasicSerializer(source='uploaded_by', read_only=True)
-    album = AlbumSerializer(read_only=True)
+    album = serializers.SerializerMethodField()
     album_id = serializers.PrimaryKeyRelatedField(
         queryset=Album.objects.all(), source='album', required=False, allow_null=True, write_only=True
     )
     cover_url = serializers.SerializerMethodField()
+    cover_urls = serializers.SerializerMethodField()
     audio_url = serializers.SerializerMethodField()
     is_favorite = serializers.SerializerMethodField()
 
     class Meta:
         model = Cancion
-        fields = ['id', 'title', 'artista', 'album', 'album_id', 'genre', 'duration', 'file', 'cover', 'cover_url', 'audio_url', 'uploaded_by', 'play_count', 'created_at', 'is_favorite']
-        read_only_fields = ['uploaded_by', 'play_count', 'created_at', 'cover_url', 'audio_url', 'is_favorite', 'album']
+        fields = ['id', 'title', 'artista', 'album', 'album_id', 'genre', 'duration', 'numero_pista', 'file', 'cover', 'cover_url', 'cover_urls', 'audio_url', 'uploaded_by', 'play_count', 'created_at', 'is_favorite']
+        read_only_fields = ['uploaded_by', 'play_count', 'created_at', 'cover_url', 'cover_urls', 'audio_url', 'is_favorite', 'album']
+        # La ruta del audio no se expone: se reproduce solo con la URL firmada de audio_url
+        extra_kwargs = {'file': {'write_only': True}}
 
     def get_cover_url(self, obj):
         request = self.context.get('request')
@@ -67,20 +90,32 @@ class CancionSerializer(serializers.ModelSerializer):
             return obj.cover.url
         return None
 
+    def get_cover_urls(self, obj):
+        return _urls_portada(obj, self.context.get('request'))
+
+    def get_album(self, obj):
+        # La FK no pasa por el manager de Album: un álbum eliminado se oculta aquí (la canción queda como single)
+        if obj.album is None or obj.album.eliminado_en is not None:
+            return None
+        return AlbumSerializer(obj.album, context=self.context).data
+
     def get_audio_url(self, obj):
-        request = self.context.get('request')
+        # URL firmada y con caducidad: la sirve el servidor de estáticos sin pasar por Django
         if not obj.file:
             return None
-        try:
-            url = reverse('cancion_transmitir', kwargs={'pk': obj.pk})
-        except Exception:
-            return None
-        return request.build_absolute_uri(url) if request else url
+        request = self.context.get('request')
+        usuario = getattr(request, 'user', None)
+        usuario_id = usuario.id if usuario is not None and usuario.is_authenticated else None
+        return transmision.url_audio(obj.file.name, obj.pk, request, usuario_id)
 
     def get_is_favorite(self, obj):
+        # Las vistas que ya conocen los favoritos del usuario los pasan en el contexto
+        favoritos_ids = self.context.get('favoritos_ids')
+        if favoritos_ids is not None:
+            return obj.id in favoritos_ids
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            return CancionFavorita.objects.filter(usuario=request.user, cancion=obj).exists()
+            return CancionFavorita.objects.filter(usuario_id=request.user.id, cancion=obj).exists()
         return False
 
 
@@ -100,3 +135,12 @@ class HistorialReproduccionSerializer(serializers.ModelSerializer):
         model = HistorialReproduccion
         fields = ['id', 'cancion', 'played_at']
         read_only_fields = ['played_at']
+
+
+class IngestaAlbumSerializer(serializers.ModelSerializer):
+    album = AlbumSerializer(read_only=True)
+
+    class Meta:
+        model = IngestaAlbum
+        fields = ['id', 'estado', 'total', 'procesadas', 'album', 'errores', 'mensaje', 'creado_en', 'actualizado_en']
+        read_only_fields = fields
@@ -0,0 +1,138 @@
+"""Servidor ASGI mínimo para las URLs de audio firmadas: sin Django ni base de datos.
+
+Solo necesita la clave y el directorio de media:
+
+    TRANSMISION_CLAVE=... MEDIA_ROOT=/srv/zora/media \\
+        uvicorn apps.musica.servidor_audio:app --workers 4
+
+y en Django TRANSMISION['URL_BASE'] = 'https://audio.ejemplo.com/audio/' con
+la misma TRANSMISION['CLAVE']. Rutas:
+
+- GET/HEAD /audio/<ruta>?c=&e=&u=&s= sirve el archivo (con Range).
+- GET /verificar comprueba la URL de la cabecera X-Original-URI y responde
+  204 o 403, para el `auth_request` de nginx: así nginx sirve los bytes con
+  sendfile y este proceso solo verifica firmas.
+"""
+import asyncio
+import mimetypes
+import os
+import re
+
+from . import firmas
+
+BLOQUE = 256 * 1024
+# Solo archivos de audio del almacenamiento por contenido
+RUTA_VALIDA = re.compile(r'^canciones/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.\w{1,10})?$')
+
+
+def _rango(cabecera, tamano):
+    """(inicio, fin) de 'bytes=inicio-fin', o None si no es satisfacible."""
+    unidades, _, especificacion = cabecera.strip().lower().partition('=')
+    inicio, _, fin = especificacion.partition('-')
+    try:
+        if unidades != 'bytes':
+            return None
+        inicio = int(inicio) if inicio else 0
+        fin = min(int(fin), tamano - 1) if fin else tamano - 1
+    except ValueError:
+        return None
+    return (inicio, fin) if 0 <= inicio <= fin else None
+
+
+class ServidorAudio:
+    def __init__(self, clave, raiz, prefijo='/audio/'):
+        self.clave = clave
+        self.raiz = os.path.realpath(raiz)
+        self.prefijo = prefijo
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            while True:
+                mensaje = await receive()
+                if mensaje['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                elif mensaje['type'] == 'lifespan.shutdown':
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+        if scope['type'] != 'http':
+            return
+        cabeceras = {k.decode('latin-1').lower(): v.decode('latin-1') for k, v in scope['headers']}
+        if scope['path'] == '/verificar':
+            try:
+                firmas.verificar_url(self.clave, cabeceras.get('x-original-uri', ''), self.prefijo)
+            except firmas.FirmaInvalida:
+                return await self._responder(send, 403)
+            return await self._responder(send, 204)
+        if scope['method'] not in ('GET', 'HEAD'):
+            return await self._responder(send, 405)
+        if not scope['path'].startswith(self.prefijo):
+            return await self._responder(send, 404)
+        ruta = scope['path'][len(self.prefijo):]
+        try:
+            firmas.verificar(self.clave, ruta, scope['query_string'].decode('latin-1'))
+        except firmas.FirmaInvalida as exc:
+            return await self._responder(send, 403, str(exc).encode())
+        if not RUTA_VALIDA.match(ruta):
+            return await self._responder(send, 404)
+        await self._servir(scope, send, os.path.join(self.raiz, ruta), cabeceras.get('range'))
+
+    async def _servir(self, scope, send, archivo, cabecera_rango):
+        try:
+            tamano = os.stat(archivo).st_size
+        except OSError:
+            return await self._responder(send, 404)
+        inicio, fin, estado = 0, tamano - 1, 200
+        cabeceras = [
+            (b'accept-ranges', b'bytes'),
+            (b'content-type', (mimetypes.guess_type(archivo)[0] or 'audio/mpeg').encode()),
+            # El contenido de una ruta no cambia nunca (direccionado por contenido)
+            (b'cache-control', b'private, max-age=86400, immutable'),
+        ]
+        if cabecera_rango:
+            rango = _rango(cabecera_rango, tamano)
+            if rango is None:
+                return await self._responder(send, 416, extra=[(b'content-range', f'bytes */{tamano}'.encode())])
+            (inicio, fin), estado = rango, 206
+            cabeceras.append((b'content-range', f'bytes {inicio}-{fin}/{tamano}'.encode()))
+        cabeceras.append((b'content-length', str(fin - inicio + 1).encode()))
+        await send({'type': 'http.response.start', 'status': estado, 'headers': cabeceras})
+        if scope['method'] == 'HEAD':
+            return await send({'type': 'http.response.body', 'body': b''})
+        with open(archivo, 'rb') as f:
+            f.seek(inicio)
+            restante = fin - inicio + 1
+            while restante > 0:
+                datos = await asyncio.to_thread(f.read, min(BLOQUE, restante))
+                if not datos:
+                    break
+                restante -= len(datos)
+                await send({'type': 'http.response.body', 'body': datos, 'more_body': restante > 0})
+        if restante > 0:
+            await send({'type': 'http.response.body', 'body': b''})
+
+    @staticmethod
+    async def _responder(send, estado, cuerpo=b'', extra=()):
+        await send({
+            'type': 'http.response.start',
+            'status': estado,
+            'headers': [(b'content-type', b'text/plain'), (b'content-length', str(len(cuerpo)).encode()), *extra],
+        })
+        await send({'type': 'http.response.body', 'body': cuerpo})
+
+
+_servidor = None
+
+
+async def app(scope, receive, send):
+    """Aplicación ASGI configurada por variables de entorno (TRANSMISION_CLAVE, MEDIA_ROOT, TRANSMISION_PREFIJO)."""
+    global _servidor
+    if _servidor is None:
+        clave = os.environ.get('TRANSMISION_CLAVE')
+        if not clave:
+            raise RuntimeError('Define TRANSMISION_CLAVE (la misma que TRANSMISION["CLAVE"] en Django).')
+        _servidor = ServidorAudio(
+            clave.encode(),
+            os.environ.get('MEDIA_ROOT', 'media'),
+            os.environ.get('TRANSMISION_PREFIJO', '/audio/'),
+        )
+    await _servidor(scope, receive, send)
@@ -0,0 +1,74 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from apps.playlists.models import Playlist
+
+from . import portadas
+from .models import Album, ArchivoMedia, Cancion, CancionFavorita, InteraccionRetirada
+
+
+@receiver(pre_save, sender=Album)
+@receiver(pre_save, sender=Cancion)
+def cargar_rutas_previas(sender, instance, **kwargs):
+    # Instancias no leídas de la BD (p. ej. construidas con pk): rutas actuales en la fila
+    if instance.pk is None or instance._state.adding or hasattr(instance, '_archivos_cargados'):
+        return
+    fila = sender._base_manager.filter(pk=instance.pk).values(*sender.CAMPOS_ARCHIVO).first()
+    instance._archivos_cargados = {campo: ruta or '' for campo, ruta in (fila or {}).items()}
+
+
+@receiver(post_save, sender=Album)
+@receiver(post_save, sender=Cancion)
+def ajustar_referencias_media(sender, instance, created, update_fields=None, **kwargs):
+    """Cuenta los archivos nuevos y libera los reemplazados (almacenamiento por contenido).
+
+    Si cambia la portada, programa sus variantes.
+    """
+    cargadas = {} if created else getattr(instance, '_archivos_cargados', {})
+    actuales = instance.rutas_archivos()
+    cambiados = []
+    for campo, ruta in actuales.items():
+        if update_fields is not None and campo not in update_fields:
+            actuales[campo] = cargadas.get(campo, '')
+            continue
+        anterior = cargadas.get(campo, '')
+        if ruta != anterior:
+            ArchivoMedia.objects.referenciar(ruta)
+            ArchivoMedia.objects.liberar(anterior)
+            cambiados.append(campo)
+    instance._archivos_cargados = actuales
+    if 'cover' in cambiados:
+        portadas.programar(instance)
+
+
+@receiver(post_delete, sender=Album)
+@receiver(post_delete, sender=Cancion)
+def liberar_media(sender, instance, **kwargs):
+    rutas = getattr(instance, '_archivos_cargados', None) or instance.rutas_archivos()
+    for ruta in rutas.values():
+        ArchivoMedia.objects.liberar(ruta)
+
+
+# Bajas de interacciones para las recomendaciones incrementales (recomendaciones.py)
+
+def _registrar_bajas(canciones):
+    InteraccionRetirada.objects.bulk_create([InteraccionRetirada(cancion_id=c) for c in set(canciones)])
+
+
+@receiver(post_delete, sender=CancionFavorita)
+def favorito_retirado(sender, instance, **kwargs):
+    _registrar_bajas([instance.cancion_id])
+
+
+@receiver(m2m_changed, sender=Playlist.songs.through)
+def canciones_retiradas_de_playlist(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'post_remove' and pk_set:
+        _registrar_bajas([instance.pk] if reverse else pk_set)
+    elif action == 'pre_clear':
+        _registrar_bajas([instance.pk] if reverse else instance.songs.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Playlist)
+def playlist_borrada(sender, instance, **kwargs):
+    # Las filas intermedias se borran sin señales
+    _registrar_bajas(instance.songs.values_list('pk', flat=True))
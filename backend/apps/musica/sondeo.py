@@ -0,0 +1,95 @@
+"""Lectura de metadatos de audio para el pool de procesos de la ingesta de álbumes.
+
+Como imagenes.py, no importa Django: los procesos hijos (spawn) solo
+necesitan mutagen. Por cada archivo se calcula el SHA-256 (para ubicarlo en
+el almacenamiento por contenido con un simple rename), la duración, las
+etiquetas básicas y, si la hay, la portada incrustada, que se escribe junto
+al archivo.
+"""
+import base64
+import hashlib
+import os
+
+try:
+    from mutagen import File as MutagenFile
+    from mutagen.flac import Picture
+except ImportError:  # pragma: no cover - mutagen es opcional
+    MutagenFile = None
+    Picture = None
+
+EXTENSIONES_PORTADA = {'image/jpeg': '.jpg', 'image/jpg': '.jpg', 'image/png': '.png', 'image/webp': '.webp'}
+
+
+def _sha256(ruta):
+    digest = hashlib.sha256()
+    with open(ruta, 'rb') as archivo:
+        for bloque in iter(lambda: archivo.read(1024 * 1024), b''):
+            digest.update(bloque)
+    return digest.hexdigest()
+
+
+def _primera(etiquetas, clave):
+    valores = etiquetas.get(clave) if etiquetas else None
+    return str(valores[0]).strip() if valores else ''
+
+
+def _pista(texto):
+    """'3/12' -> 3."""
+    try:
+        return int(texto.split('/', 1)[0])
+    except (AttributeError, ValueError):
+        return None
+
+
+def _portada_incrustada(audio):
+    """(bytes, mime) de la primera imagen incrustada (ID3, FLAC, MP4 u Ogg), o None."""
+    if getattr(audio, 'pictures', None):  # FLAC
+        imagen = audio.pictures[0]
+        return imagen.data, imagen.mime
+    etiquetas = audio.tags
+    if etiquetas is None:
+        return None
+    if hasattr(etiquetas, 'getall'):  # ID3
+        marcos = etiquetas.getall('APIC')
+        if marcos:
+            return marcos[0].data, marcos[0].mime
+        return None
+    if 'covr' in etiquetas:  # MP4
+        imagen = etiquetas['covr'][0]
+        return bytes(imagen), 'image/png' if getattr(imagen, 'imageformat', None) == 14 else 'image/jpeg'
+    bloques = etiquetas.get('metadata_block_picture') if hasattr(etiquetas, 'get') else None
+    if bloques and Picture is not None:  # Vorbis/Opus
+        try:
+            imagen = Picture(base64.b64decode(bloques[0]))
+            return imagen.data, imagen.mime
+        except Exception:
+            return None
+    return None
+
+
+def sondear(ruta):
+    """Metadatos de `ruta`: sha256, duracion, titulo, pista, genero y portada (archivo extraído y su hash)."""
+    datos = {'ruta': ruta, 'sha256': _sha256(ruta), 'duracion': None, 'titulo': '', 'pista': None,
+             'genero': '', 'portada': None, 'portada_sha256': None}
+    if MutagenFile is None:
+        return datos
+    try:
+        etiquetas = MutagenFile(ruta, easy=True)
+        audio = MutagenFile(ruta)
+    except Exception:
+        return datos
+    if audio is not None and audio.info and getattr(audio.info, 'length', None):
+        datos['duracion'] = int(audio.info.length) or None
+    if etiquetas is not None:
+        datos['titulo'] = _primera(etiquetas.tags, 'title')[:200]
+        datos['pista'] = _pista(_primera(etiquetas.tags, 'tracknumber'))
+        datos['genero'] = _primera(etiquetas.tags, 'genre')[:64]
+    incrustada = _portada_incrustada(audio) if audio is not None else None
+    if incrustada:
+        contenido, mime = incrustada
+        destino = f'{os.path.splitext(ruta)[0]}.portada{EXTENSIONES_PORTADA.get(mime, ".jpg")}'
+        with open(destino, 'wb') as archivo:
+            archivo.write(contenido)
+        datos['portada'] = destino
+        datos['portada_sha256'] = hashlib.sha256(contenido).hexdigest()
+    return datos
@@ -0,0 +1,247 @@
+"""Subidas reanudables de canciones por fragmentos.
+
+Protocolo (bajo /api/musica/subidas/):
+- POST   subidas/                  {nombre_archivo, tamano, sha256?} -> id y offset 0
+- GET    subidas/<id>/             offset actual (también en la cabecera Upload-Offset)
+- PATCH  subidas/<id>/             cuerpo binario; cabeceras Upload-Offset y, opcional,
+                                   Upload-Checksum: sha256 <base64> del fragmento
+- POST   subidas/<id>/finalizar/   title, genre, album_id, cover, sha256? -> canción creada
+- DELETE subidas/<id>/             cancela y borra el archivo
+
+Cada fragmento es una petición corta de como máximo `TAMANO_FRAGMENTO` bytes
+que se escribe directamente en un archivo en disco, así que ningún
+worker queda ocupado durante toda la subida y una conexión caída solo obliga a
+repetir el último fragmento (el cliente consulta el offset y continúa). Al
+finalizar se comprueba el tamaño y la suma SHA-256 del archivo completo, el
+archivo se enlaza en su ruta por contenido (almacenamiento.py; sin copiarlo, en
+el mismo volumen) y solo entonces se crea la `Cancion`.
+
+Requiere un almacenamiento con rutas locales (`FileSystemStorage`, el de este
+proyecto); los fragmentos se añaden en su sitio, bajo `subidas/`.
+"""
+import base64
+import hashlib
+import shutil
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from .almacenamiento import almacenamiento_media, extension_de
+from .models import ArchivoMedia, SubidaCancion
+
+TAMANO_BLOQUE = 1024 * 1024
+_MAX_RUTA = 255  # max_length de SubidaCancion.ruta
+
+
+class ErrorSubida(Exception):
+    def __init__(self, mensaje, estado=400, offset=None):
+        super().__init__(mensaje)
+        self.estado = estado
+        self.offset = offset
+
+
+def _ajuste(nombre):
+    defecto = {
+        'TAMANO_FRAGMENTO': 8 * 1024 * 1024,
+        'TAMANO_MAXIMO': 1024 * 1024 * 1024,
+        'EXPIRACION': 24 * 3600,
+        'BLOQUEO': 300,
+    }
+    return getattr(settings, 'SUBIDAS_CANCIONES', {}).get(nombre, defecto[nombre])
+
+
+def tamano_fragmento():
+    return _ajuste('TAMANO_FRAGMENTO')
+
+
+def _ruta_local(ruta):
+    try:
+        return Path(default_storage.path(ruta))
+    except NotImplementedError:
+        raise ErrorSubida('El almacenamiento configurado no admite subidas reanudables.', estado=501)
+
+
+def _ruta_subida(subida_id, nombre_archivo):
+    nombre = get_valid_filename(Path(nombre_archivo).name) or 'audio'
+    prefijo = f'subidas/{subida_id.hex}/'
+    if len(prefijo) + len(nombre) > _MAX_RUTA:
+        extension = Path(nombre).suffix[:10]
+        nombre = Path(nombre).stem[: _MAX_RUTA - len(prefijo) - len(extension)] + extension
+    return prefijo + nombre
+
+
+def iniciar(usuario_id, nombre_archivo, tamano, sha256=''):
+    if tamano <= 0 or tamano > _ajuste('TAMANO_MAXIMO'):
+        raise ErrorSubida(f'El tamaño debe estar entre 1 y {_ajuste("TAMANO_MAXIMO")} bytes.', estado=413)
+    sha256 = (sha256 or '').lower()
+    if sha256 and (len(sha256) != 64 or any(c not in '0123456789abcdef' for c in sha256)):
+        raise ErrorSubida('sha256 debe ser una suma SHA-256 en hexadecimal.')
+    subida = SubidaCancion(
+        usuario_id=usuario_id,
+        nombre_archivo=nombre_archivo[:255],
+        tamano=tamano,
+        sha256=sha256,
+        expira_en=timezone.now() + timedelta(seconds=_ajuste('EXPIRACION')),
+    )
+    subida.ruta = _ruta_subida(subida.id, nombre_archivo)
+    ruta = _ruta_local(subida.ruta)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    ruta.touch()
+    subida.save()
+    return subida
+
+
+def _leer_checksum(cabecera):
+    if not cabecera:
+        return None
+    algoritmo, _, valor = cabecera.strip().partition(' ')
+    if algoritmo.lower() != 'sha256':
+        raise ErrorSubida('Solo se admite Upload-Checksum sha256.')
+    try:
+        return base64.b64decode(valor, validate=True)
+    except ValueError:
+        raise ErrorSubida('Upload-Checksum no es base64 válido.')
+
+
+def anexar(subida, offset, flujo, longitud, checksum=None):
+    """Escribe `longitud` bytes de `flujo` en `offset`; devuelve el nuevo offset.
+
+    El fragmento se reserva con una actualización condicional (offset esperado y
+    sin otra escritura en curso), de modo que dos peticiones concurrentes no
+    pueden escribir el mismo tramo.
+    """
+    if subida.estado != SubidaCancion.EN_CURSO:
+        raise ErrorSubida('La subida ya no admite fragmentos.', estado=409, offset=subida.recibido)
+    if offset != subida.recibido:
+        raise ErrorSubida('El offset no coincide con los bytes recibidos.', estado=409, offset=subida.recibido)
+    if longitud <= 0 or longitud > _ajuste('TAMANO_FRAGMENTO'):
+        raise ErrorSubida(f'El fragmento debe tener entre 1 y {_ajuste("TAMANO_FRAGMENTO")} bytes.', estado=413)
+    if offset + longitud > subida.tamano:
+        raise ErrorSubida('El fragmento excede el tamaño declarado.', estado=413, offset=subida.recibido)
+    esperado = _leer_checksum(checksum)
+
+    ahora = timezone.now()
+    reservada = SubidaCancion.objects.filter(
+        Q(escribiendo_hasta__isnull=True) | Q(escribiendo_hasta__lt=ahora),
+        pk=subida.pk, estado=SubidaCancion.EN_CURSO, recibido=offset,
+    ).update(escribiendo_hasta=ahora + timedelta(seconds=_ajuste('BLOQUEO')))
+    if not reservada:
+        subida.refresh_from_db(fields=['recibido'])
+        raise ErrorSubida('Otro fragmento se está escribiendo.', estado=409, offset=subida.recibido)
+
+    escritos = 0
+    try:
+        digest = hashlib.sha256()
+        with open(_ruta_local(subida.ruta), 'r+b') as archivo:
+            # Descarta restos de un intento anterior interrumpido
+            archivo.seek(offset)
+            archivo.truncate()
+            while escritos < longitud:
+                bloque = flujo.read(min(TAMANO_BLOQUE, longitud - escritos))
+                if not bloque:
+                    break
+                archivo.write(bloque)
+                digest.update(bloque)
+                escritos += len(bloque)
+            if escritos != longitud:
+                raise ErrorSubida('El fragmento llegó incompleto.', offset=offset)
+            if esperado is not None and digest.digest() != esperado:
+                raise ErrorSubida('La suma del fragmento no coincide.', offset=offset)
+    except BaseException:
+        SubidaCancion.objects.filter(pk=subida.pk).update(escribiendo_hasta=None)
+        raise
+
+    subida.recibido = offset + escritos
+    subida.escribiendo_hasta = None
+    subida.expira_en = timezone.now() + timedelta(seconds=_ajuste('EXPIRACION'))
+    subida.save(update_fields=['recibido', 'escribiendo_hasta', 'expira_en', 'actualizado_en'])
+    return subida.recibido
+
+
+def _sha256_archivo(ruta):
+    digest = hashlib.sha256()
+    with open(ruta, 'rb') as archivo:
+        for bloque in iter(lambda: archivo.read(TAMANO_BLOQUE), b''):
+            digest.update(bloque)
+    return digest.hexdigest()
+
+
+def finalizar(subida, crear_cancion, sha256=''):
+    """Verifica el archivo completo y crea la canción con `crear_cancion(ruta)`.
+
+    Si la suma no coincide el archivo se descarta y la subida vuelve al offset 0.
+    Repetir la finalización de una subida completada devuelve la misma canción.
+    """
+    if subida.estado == SubidaCancion.COMPLETADA and subida.cancion_id:
+        return subida.cancion
+    reservada = SubidaCancion.objects.filter(
+        Q(escribiendo_hasta__isnull=True) | Q(escribiendo_hasta__lt=timezone.now()),
+        pk=subida.pk, estado=SubidaCancion.EN_CURSO, recibido=F('tamano'),
+    ).update(estado=SubidaCancion.FINALIZANDO)
+    if not reservada:
+        subida.refresh_from_db(fields=['recibido', 'estado'])
+        if subida.estado == SubidaCancion.EN_CURSO and subida.recibido != subida.tamano:
+            raise ErrorSubida('Faltan fragmentos por subir.', estado=409, offset=subida.recibido)
+        raise ErrorSubida('La subida se está escribiendo o finalizando.', estado=409, offset=subida.recibido)
+
+    ruta_final = None
+    try:
+        ruta = _ruta_local(subida.ruta)
+        esperado = (sha256 or subida.sha256 or '').lower()
+        real = _sha256_archivo(ruta)
+        if ruta.stat().st_size != subida.tamano or (esperado and real != esperado):
+            with open(ruta, 'r+b') as archivo:
+                archivo.truncate(0)
+            SubidaCancion.objects.filter(pk=subida.pk).update(estado=SubidaCancion.EN_CURSO, recibido=0)
+            raise ErrorSubida(
+                'La suma de verificación no coincide; el archivo debe enviarse de nuevo.', estado=422, offset=0
+            )
+        ruta_final = almacenamiento_media().enlazar(ruta, 'canciones', real, extension_de(subida.nombre_archivo))
+        with transaction.atomic():
+            cancion = crear_cancion(ruta_final)
+            subida.estado = SubidaCancion.COMPLETADA
+            subida.sha256 = real
+            subida.cancion = cancion
+            subida.save(update_fields=['estado', 'sha256', 'cancion', 'actualizado_en'])
+    except BaseException:
+        if ruta_final is not None:
+            # Ya enlazado en canciones/ pero sin canción: que lo borre recolectar() si nadie más lo usa
+            ArchivoMedia.objects.registrar_sin_uso(ruta_final)
+        SubidaCancion.objects.filter(pk=subida.pk, estado=SubidaCancion.FINALIZANDO).update(
+            estado=SubidaCancion.EN_CURSO
+        )
+        raise
+    _borrar_archivo(subida)
+    return cancion
+
+
+def cancelar(subida):
+    if subida.estado == SubidaCancion.COMPLETADA:
+        raise ErrorSubida('La subida ya está completada.', estado=409)
+    _borrar_archivo(subida)
+    subida.delete()
+
+
+def _borrar_archivo(subida):
+    try:
+        ruta = _ruta_local(subida.ruta)
+    except ErrorSubida:
+        return
+    shutil.rmtree(ruta.parent, ignore_errors=True)
+
+
+def purgar():
+    """Elimina las subidas caducadas; borra el archivo de las que no llegaron a completarse."""
+    caducadas = SubidaCancion.objects.filter(expira_en__lt=timezone.now())
+    incompletas = 0
+    for subida in caducadas.exclude(estado=SubidaCancion.COMPLETADA).iterator():
+        _borrar_archivo(subida)
+        incompletas += 1
+    total, _ = caducadas.delete()
+    return total, incompletas
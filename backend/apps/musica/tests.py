@@ -0,0 +1,278 @@
+import base64
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from datetime import timedelta
+from unittest import mock
+from urllib.parse import urlencode
+
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.autenticacion import roles
+from apps.autenticacion.models import Rol, Usuario
+from apps.autenticacion.tokens import RefreshConRol
+
+from . import escuchas, ingesta, subidas, transmision
+from .almacenamiento import almacenamiento_media
+from .models import ArchivoMedia, Cancion, SesionEscucha, SubidaCancion
+
+AUDIO = b'audio de prueba ' * 64
+
+
+def _artista(username='artista'):
+    return Usuario.objects.create_user(
+        username=username, email=f'{username}@example.com', password='Clave-123456', rol=roles.obtener(Rol.ARTIST)
+    )
+
+
+def _cliente(usuario):
+    cliente = APIClient()
+    cliente.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshConRol.for_user(usuario).access_token}')
+    return cliente
+
+
+def _referencias(ruta):
+    return ArchivoMedia.objects.values_list('referencias', flat=True).get(ruta=ruta)
+
+
+class ConMediaTemporal(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        ajustes = override_settings(MEDIA_ROOT=media, PORTADAS_EN_SEGUNDO_PLANO=True)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.artista = _artista()
+
+    def _cancion(self, contenido=AUDIO, **campos):
+        cancion = Cancion(title='Canción', uploaded_by=self.artista, **campos)
+        cancion.file.save('pista.mp3', ContentFile(contenido), save=False)
+        cancion.save()
+        return cancion
+
+    def _envejecer(self, ruta):
+        """Como si el archivo llevara dos horas sin usarse."""
+        antes = time.time() - 7200
+        os.utime(almacenamiento_media().path(ruta), (antes, antes))
+        ArchivoMedia.objects.filter(ruta=ruta).update(actualizado_en=timezone.now() - timedelta(hours=2))
+
+
+class ReferenciasMediaTests(ConMediaTemporal):
+    def test_subida_duplicada_y_un_borrado_conserva_el_archivo(self):
+        primera = self._cancion()
+        segunda = self._cancion()
+        self.assertEqual(primera.file.name, segunda.file.name)
+        self.assertEqual(_referencias(primera.file.name), 2)
+
+        primera.delete()
+        self._envejecer(segunda.file.name)
+
+        self.assertEqual(_referencias(segunda.file.name), 1)
+        self.assertEqual(ArchivoMedia.objects.recolectar(timedelta(hours=1)), 0)
+        self.assertTrue(almacenamiento_media().exists(segunda.file.name))
+
+    def test_reemplazar_portada_libera_la_anterior(self):
+        cancion = self._cancion()
+        cancion.cover.save('a.png', ContentFile(b'portada-a'), save=True)
+        anterior = cancion.cover.name
+        self.assertEqual(_referencias(anterior), 1)
+
+        cancion = Cancion.objects.get(pk=cancion.pk)
+        cancion.cover.save('b.png', ContentFile(b'portada-b'), save=True)
+
+        self.assertEqual(_referencias(anterior), 0)
+        self.assertEqual(_referencias(cancion.cover.name), 1)
+
+    def test_ingesta_con_bulk_create_cuenta_referencias(self):
+        nueva = ingesta.preparar(
+            self.artista.id,
+            {'title': 'Disco'},
+            archivos=[SimpleUploadedFile('01.mp3', AUDIO), SimpleUploadedFile('02.mp3', AUDIO)],
+        )
+        ingesta.ingerir(nueva, procesos=1)
+
+        rutas = set(Cancion.objects.filter(album__title='Disco').values_list('file', flat=True))
+        self.assertEqual(len(rutas), 1)
+        self.assertEqual(_referencias(rutas.pop()), 2)
+
+    def test_recolectar_restaura_un_archivo_reutilizado_dentro_del_margen(self):
+        cancion = self._cancion()
+        ruta = cancion.file.name
+        cancion.delete()
+        self._envejecer(ruta)
+        # Una subida idéntica reutiliza el archivo antes de guardar su fila
+        self.assertEqual(almacenamiento_media().save('canciones/otra.mp3', ContentFile(AUDIO)), ruta)
+
+        self.assertEqual(ArchivoMedia.objects.recolectar(timedelta(hours=1)), 0)
+        self.assertTrue(almacenamiento_media().exists(ruta))
+
+    def test_recolectar_borra_un_archivo_sin_uso_pasado_el_margen(self):
+        cancion = self._cancion()
+        ruta = cancion.file.name
+        cancion.delete()
+        self._envejecer(ruta)
+
+        self.assertEqual(ArchivoMedia.objects.recolectar(timedelta(hours=1)), 1)
+        self.assertFalse(almacenamiento_media().exists(ruta))
+        self.assertFalse(ArchivoMedia.objects.filter(ruta=ruta).exists())
+
+
+class SubidasTests(ConMediaTemporal):
+    def setUp(self):
+        super().setUp()
+        self.cliente = _cliente(self.artista)
+
+    def _iniciar(self, contenido=AUDIO, **datos):
+        respuesta = self.cliente.post(
+            '/api/musica/subidas/', {'nombre_archivo': 'pista.mp3', 'tamano': len(contenido), **datos}, format='json'
+        )
+        self.assertEqual(respuesta.status_code, 201)
+        return respuesta.data['id']
+
+    def _anexar(self, id_subida, fragmento, offset, checksum=None):
+        cabeceras = {'HTTP_UPLOAD_OFFSET': str(offset)}
+        if checksum is not None:
+            cabeceras['HTTP_UPLOAD_CHECKSUM'] = f'sha256 {base64.b64encode(checksum).decode()}'
+        return self.cliente.generic(
+            'PATCH', f'/api/musica/subidas/{id_subida}/', fragmento,
+            content_type='application/offset+octet-stream', **cabeceras,
+        )
+
+    def _finalizar(self, id_subida, **datos):
+        return self.cliente.post(
+            f'/api/musica/subidas/{id_subida}/finalizar/', {'title': 'Subida', **datos}, format='json'
+        )
+
+    def test_solo_artistas_inician_subidas(self):
+        admin = Usuario.objects.create_user(
+            username='admin', email='admin@example.com', password='Clave-123456', rol=roles.obtener(Rol.ADMIN)
+        )
+        respuesta = _cliente(admin).post(
+            '/api/musica/subidas/', {'nombre_archivo': 'pista.mp3', 'tamano': 10}, format='json'
+        )
+        self.assertEqual(respuesta.status_code, 403)
+        self.assertFalse(SubidaCancion.objects.exists())
+
+    def test_subida_por_fragmentos_crea_la_cancion(self):
+        id_subida = self._iniciar(sha256=hashlib.sha256(AUDIO).hexdigest())
+        mitad = len(AUDIO) // 2
+        self.assertEqual(self._anexar(id_subida, AUDIO[:mitad], 0)['Upload-Offset'], str(mitad))
+        respuesta = self._anexar(id_subida, AUDIO[mitad:], mitad, hashlib.sha256(AUDIO[mitad:]).digest())
+        self.assertEqual(respuesta.status_code, 200)
+
+        respuesta = self._finalizar(id_subida)
+
+        self.assertEqual(respuesta.status_code, 201)
+        cancion = Cancion.objects.get(pk=respuesta.data['id'])
+        self.assertEqual(_referencias(cancion.file.name), 1)
+        # Repetir la finalización devuelve la misma canción
+        self.assertEqual(self._finalizar(id_subida).data['id'], cancion.pk)
+
+    def test_offset_distinto_del_recibido_da_409(self):
+        id_subida = self._iniciar()
+        self._anexar(id_subida, AUDIO[:100], 0)
+
+        respuesta = self._anexar(id_subida, AUDIO[200:300], 200)
+
+        self.assertEqual(respuesta.status_code, 409)
+        self.assertEqual(respuesta.data['offset'], 100)
+        self.assertEqual(respuesta['Upload-Offset'], '100')
+
+    def test_checksum_de_fragmento_erroneo_no_avanza(self):
+        id_subida = self._iniciar()
+
+        respuesta = self._anexar(id_subida, AUDIO[:100], 0, hashlib.sha256(b'otro').digest())
+
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(SubidaCancion.objects.get(pk=id_subida).recibido, 0)
+        self.assertEqual(self._anexar(id_subida, AUDIO[:100], 0).status_code, 200)
+
+    def test_finalizar_incompleta_da_409(self):
+        id_subida = self._iniciar()
+        self._anexar(id_subida, AUDIO[:100], 0)
+
+        respuesta = self._finalizar(id_subida)
+
+        self.assertEqual(respuesta.status_code, 409)
+        self.assertEqual(respuesta.data['offset'], 100)
+
+    def test_suma_del_archivo_erronea_reinicia_la_subida(self):
+        id_subida = self._iniciar()
+        self._anexar(id_subida, AUDIO, 0)
+
+        respuesta = self._finalizar(id_subida, sha256=hashlib.sha256(b'otro').hexdigest())
+
+        self.assertEqual(respuesta.status_code, 422)
+        self.assertEqual(respuesta.data['offset'], 0)
+        subida = SubidaCancion.objects.get(pk=id_subida)
+        self.assertEqual((subida.estado, subida.recibido), (SubidaCancion.EN_CURSO, 0))
+        self.assertFalse(Cancion.objects.exists())
+
+    def test_fallo_al_crear_la_cancion_registra_el_archivo_sin_uso(self):
+        subida = subidas.iniciar(self.artista.id, 'pista.mp3', len(AUDIO))
+        subidas.anexar(subida, 0, io.BytesIO(AUDIO), len(AUDIO))
+
+        def fallar(ruta):
+            raise RuntimeError('fallo al guardar')
+
+        with self.assertRaises(RuntimeError):
+            subidas.finalizar(subida, fallar)
+
+        ruta = f'canciones/{hashlib.sha256(AUDIO).hexdigest()[:2]}'
+        archivo = ArchivoMedia.objects.get(ruta__startswith=ruta)
+        self.assertEqual(archivo.referencias, 0)
+        self.assertEqual(SubidaCancion.objects.get(pk=subida.pk).estado, SubidaCancion.EN_CURSO)
+
+
+class BalizaReproduccionTests(ConMediaTemporal):
+    def setUp(self):
+        super().setUp()
+        self.url = transmision.url_audio(self._cancion().file.name, 1)
+
+    def test_admite_lo_que_envia_send_beacon(self):
+        cliente = APIClient()
+        for datos, formato in (
+            (json.dumps({'url': self.url}), 'text/plain'),
+            (json.dumps({'url': self.url}), 'application/json'),
+            (urlencode({'url': self.url}), 'application/x-www-form-urlencoded'),
+        ):
+            with self.subTest(formato=formato):
+                respuesta = cliente.generic('POST', '/api/musica/reproducciones/baliza/', datos, content_type=formato)
+                self.assertEqual(respuesta.status_code, 204)
+        respuesta = cliente.post('/api/musica/reproducciones/baliza/', {'url': self.url}, format='multipart')
+        self.assertEqual(respuesta.status_code, 204)
+
+    def test_url_sin_firma_valida_da_400(self):
+        respuesta = APIClient().generic(
+            'POST', '/api/musica/reproducciones/baliza/', json.dumps({'url': self.url + 'x'}), content_type='text/plain'
+        )
+        self.assertEqual(respuesta.status_code, 400)
+
+
+class EscuchasTests(ConMediaTemporal):
+    def test_reintentar_un_lote_revertido_no_pierde_la_reproduccion(self):
+        cancion = self._cancion(duration=200)
+        ahora = time.time()
+        filas = [(uuid.uuid4(), cancion.pk, None, ahora - 60, ahora, 60.0, 60.0, f'h{uuid.uuid4().hex}')]
+
+        with mock.patch.object(escuchas.escritura, 'encolar', side_effect=lambda funcion, *args: funcion(*args)):
+            with self.captureOnCommitCallbacks(execute=True):
+                # Primer intento del lote, revertido (p. ej. base de datos bloqueada)
+                with self.assertRaises(RuntimeError), transaction.atomic():
+                    escuchas.guardar(filas)
+                    raise RuntimeError('lote revertido')
+                escuchas.guardar(filas)
+
+        self.assertTrue(SesionEscucha.objects.get().acreditada)
+        cancion.refresh_from_db()
+        self.assertEqual(cancion.play_count, 1)
@@ -0,0 +1,51 @@
+"""URLs de audio firmadas desde Django (ver firmas.py y servidor_audio.py)."""
+import hashlib
+import hmac
+import time
+from urllib.parse import quote
+
+from django.conf import settings
+from django.urls import reverse
+
+from . import firmas
+
+CONFIG = {
+    'URL_BASE': '',
+    'CLAVE': '',
+    'DURACION': 6 * 3600,
+    # Firma el usuario en `u` para atribuirle la escucha; no restringe quién puede reproducir la URL
+    'ATRIBUIR_USUARIO': True,
+    'GRACIA_BALIZA': 3600,
+}
+
+
+def config():
+    return {**CONFIG, **getattr(settings, 'TRANSMISION', {})}
+
+
+def clave():
+    """Clave HMAC: TRANSMISION['CLAVE'] o, si no se define, una derivada de SECRET_KEY."""
+    propia = config()['CLAVE']
+    if propia:
+        return propia.encode()
+    return hmac.new(settings.SECRET_KEY.encode(), b'zora.musica.transmision', hashlib.sha256).digest()
+
+
+def prefijo():
+    """Prefijo bajo el que se sirven los archivos firmados (servidor de estáticos o la vista de Django)."""
+    return config()['URL_BASE'] or reverse('cancion_audio_firmado', kwargs={'ruta': '-'})[:-1]
+
+
+def url_audio(ruta, cancion_id, request=None, usuario_id=None):
+    """URL firmada de `ruta`.
+
+    La caducidad se redondea a tramos de DURACION (válida entre una y dos
+    duraciones), así que la misma canción da la misma URL durante un tramo y el
+    navegador puede reutilizar lo ya descargado.
+    """
+    ajustes = config()
+    duracion = ajustes['DURACION']
+    expira = (int(time.time()) // duracion + 2) * duracion
+    usuario = usuario_id if ajustes['ATRIBUIR_USUARIO'] and usuario_id else ''
+    url = f'{prefijo()}{quote(ruta)}?{firmas.parametros(clave(), ruta, cancion_id, expira, usuario)}'
+    return request.build_absolute_uri(url) if request and url.startswith('/') else url
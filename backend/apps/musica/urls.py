@@ -6,7 +6,25 @@ urlpatterns = [
     path('<int:pk>/', views.CancionRetrieveUpdateDestroyView.as_view(), name='cancion_detalle'),
     path('buscar/', views.buscar_canciones, name='cancion_buscar'),
     path('transmitir/<int:pk>/', views.transmitir_cancion, name='cancion_transmitir'),
+    path('audio/<path:ruta>', views.audio_firmado, name='cancion_audio_firmado'),
+    path('reproducciones/baliza/', views.baliza_reproduccion, name='cancion_baliza_reproduccion'),
+    path('escuchas/latidos/', views.latidos_escucha, name='escucha_latidos'),
+    path('<int:pk>/similares/', views.canciones_similares, name='cancion_similares'),
+    path('para-ti/', views.para_ti, name='cancion_para_ti'),
+    path('radio/', views.radio_automatica, name='cancion_radio'),
     path('generos/', views.GeneroListView.as_view(), name='genero_list'),
+
+    # Subidas reanudables
+    path('subidas/', views.SubidaCancionCreateView.as_view(), name='subida_crear'),
+    path('subidas/<uuid:pk>/', views.SubidaCancionView.as_view(), name='subida_detalle'),
+    path('subidas/<uuid:pk>/finalizar/', views.FinalizarSubidaView.as_view(), name='subida_finalizar'),
+
+    # Álbumes
+    path('albumes/<int:pk>/', views.AlbumDestroyView.as_view(), name='album_eliminar'),
+
+    # Ingesta de álbumes completos
+    path('albumes/ingestas/', views.IngestaAlbumCreateView.as_view(), name='ingesta_album_crear'),
+    path('albumes/ingestas/<uuid:pk>/', views.IngestaAlbumDetailView.as_view(), name='ingesta_album_detalle'),
     
     # Favoritos
     path('favoritos/', views.listar_favoritos, name='favoritos_list'),
@@ -1,19 +1,30 @@
+import json
+from urllib.parse import urlsplit
+
+from django.core import signing
 from django.db.models import Q
-from django.http import FileResponse, Http404, StreamingHttpResponse
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
 from rest_framework import generics, permissions, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from .models import Cancion, Genero, CancionFavorita, HistorialReproduccion
-from .serializers import CancionSerializer, GeneroSerializer, CancionFavoritaSerializer, HistorialReproduccionSerializer
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.views import APIView
+from .models import Album, Cancion, Genero, CancionFavorita, HistorialReproduccion, IngestaAlbum, PoolRadio, SubidaCancion
+from .serializers import (
+    CancionSerializer, GeneroSerializer, CancionFavoritaSerializer, HistorialReproduccionSerializer, IngestaAlbumSerializer,
+)
+from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
 from django.shortcuts import get_object_or_404
+from django.views.decorators.csrf import csrf_exempt
 from rest_framework.exceptions import PermissionDenied
-from apps.autenticacion.permissions import IsArtistaOrAdmin
+from apps.autenticacion.permissions import IsArtistaOrAdmin, rol_de
+from .oyentes import error_relativo, oyentes_cancion, oyentes_canciones, registrar_oyente
+from . import consultas, contadores, deduplicacion, escuchas, firmas, ingesta, prefijos, radio, recomendaciones, subidas, transmision
+from backend import escritura
 
 
 class CancionListCreateView(generics.ListCreateAPIView):
     """Lista y creación de canciones. Solo artistas o administradores pueden subir archivos."""
-    queryset = Cancion.objects.all().order_by('-created_at')
+    queryset = consultas.canciones_recientes()
     serializer_class = CancionSerializer
     # permitir lectura a cualquiera; crear/editar/eliminar solo artistas o administradores
     permission_classes = [IsArtistaOrAdmin]
@@ -23,12 +34,151 @@ class CancionListCreateView(generics.ListCreateAPIView):
         user = self.request.user
         # la verificación de rol se realiza en el permission class IsArtistaOrAdmin
         # y también en el modelo Cancion.save()
-        genre_name = self.request.data.get('genre')
-        genre = None
-        if genre_name:
-            genre, _ = Genero.objects.get_or_create(name=genre_name)
         # Usar uploaded_by_id para compatibilidad cuando request.user es TokenUser (SimpleJWT)
-        serializer.save(uploaded_by_id=getattr(user, 'id', None), genre=genre)
+        serializer.save(uploaded_by_id=getattr(user, 'id', None), genre=_genero(self.request))
+
+
+def _genero(request):
+    genre_name = request.data.get('genre')
+    if not genre_name:
+        return None
+    genre, _ = Genero.objects.get_or_create(name=genre_name)
+    return genre
+
+
+# ========== SUBIDAS REANUDABLES (ver subidas.py) ==========
+
+def _estado_subida(subida, status_code=200):
+    response = Response({
+        'id': str(subida.id),
+        'offset': subida.recibido,
+        'tamano': subida.tamano,
+        'estado': subida.estado,
+        'tamano_fragmento': subidas.tamano_fragmento(),
+    }, status=status_code)
+    response['Upload-Offset'] = str(subida.recibido)
+    return response
+
+
+def _error_subida(exc):
+    cuerpo = {'detail': str(exc)}
+    if exc.offset is not None:
+        cuerpo['offset'] = exc.offset
+    response = Response(cuerpo, status=exc.estado)
+    if exc.offset is not None:
+        response['Upload-Offset'] = str(exc.offset)
+    return response
+
+
+class SubidaCancionCreateView(APIView):
+    """Inicia una subida reanudable: {nombre_archivo, tamano, sha256?}."""
+    permission_classes = [permissions.IsAuthenticated, IsArtistaOrAdmin]
+
+    def post(self, request):
+        # Misma regla que Cancion.save() (rol del token), antes de reservar la subida
+        if rol_de(request) not in IsArtistaOrAdmin.ARTIST_NAMES:
+            return Response({'detail': 'Solo usuarios con rol de artista pueden subir canciones'}, status=403)
+        nombre_archivo = request.data.get('nombre_archivo')
+        try:
+            tamano = int(request.data.get('tamano'))
+        except (TypeError, ValueError):
+            return Response({'detail': 'tamano debe ser un entero.'}, status=400)
+        if not nombre_archivo or not isinstance(nombre_archivo, str):
+            return Response({'detail': 'nombre_archivo es requerido.'}, status=400)
+        try:
+            subida = subidas.iniciar(request.user.id, nombre_archivo, tamano, request.data.get('sha256') or '')
+        except subidas.ErrorSubida as exc:
+            return _error_subida(exc)
+        return _estado_subida(subida, status.HTTP_201_CREATED)
+
+
+class SubidaCancionView(APIView):
+    """GET: offset actual. PATCH: añade un fragmento en Upload-Offset. DELETE: cancela."""
+    permission_classes = [permissions.IsAuthenticated, IsArtistaOrAdmin]
+
+    def get_object(self, request, pk):
+        return get_object_or_404(SubidaCancion, pk=pk, usuario_id=request.user.id)
+
+    def get(self, request, pk):
+        return _estado_subida(self.get_object(request, pk))
+
+    def patch(self, request, pk):
+        subida = self.get_object(request, pk)
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+            longitud = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return Response({'detail': 'Upload-Offset y Content-Length son requeridos.'}, status=400)
+        try:
+            # El cuerpo se lee por bloques del flujo de la petición, sin pasar por los parsers
+            subidas.anexar(subida, offset, request.stream, longitud, request.headers.get('Upload-Checksum'))
+        except subidas.ErrorSubida as exc:
+            return _error_subida(exc)
+        return _estado_subida(subida)
+
+    def delete(self, request, pk):
+        try:
+            subidas.cancelar(self.get_object(request, pk))
+        except subidas.ErrorSubida as exc:
+            return _error_subida(exc)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class FinalizarSubidaView(APIView):
+    """Verifica el archivo y crea la canción con los datos del formulario (title, genre, album_id, cover)."""
+    permission_classes = [permissions.IsAuthenticated, IsArtistaOrAdmin]
+    parser_classes = [JSONParser, MultiPartParser, FormParser]
+
+    def post(self, request, pk):
+        subida = get_object_or_404(SubidaCancion, pk=pk, usuario_id=request.user.id)
+        serializer = CancionSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        genero = _genero(request)
+
+        def crear_cancion(ruta):
+            # El archivo ya está en su ubicación definitiva: solo se guarda la ruta
+            return serializer.save(uploaded_by_id=request.user.id, genre=genero, file=ruta)
+
+        try:
+            cancion = subidas.finalizar(subida, crear_cancion, request.data.get('sha256') or '')
+        except subidas.ErrorSubida as exc:
+            return _error_subida(exc)
+        except ValueError as exc:
+            return Response({'detail': str(exc)}, status=403)
+        return Response(CancionSerializer(cancion, context={'request': request}).data, status=status.HTTP_201_CREATED)
+
+
+# ========== INGESTA DE ÁLBUMES (ver ingesta.py) ==========
+
+class IngestaAlbumCreateView(APIView):
+    """Recibe un álbum: `archivo` (ZIP) o `archivos` (varios), `manifiesto` (JSON) y `cover` opcional."""
+    permission_classes = [permissions.IsAuthenticated, IsArtistaOrAdmin]
+    parser_classes = [MultiPartParser, FormParser]
+
+    def post(self, request):
+        # Misma regla que Cancion.save() (rol del token), antes de guardar los archivos
+        if rol_de(request) not in IsArtistaOrAdmin.ARTIST_NAMES:
+            return Response({'detail': 'Solo usuarios con rol de artista pueden subir canciones'}, status=403)
+        try:
+            nueva = ingesta.preparar(
+                request.user.id,
+                request.data.get('manifiesto') or '{}',
+                archivo_zip=request.FILES.get('archivo'),
+                archivos=request.FILES.getlist('archivos'),
+                portada=request.FILES.get('cover'),
+            )
+        except ingesta.ErrorIngesta as exc:
+            return Response({'detail': str(exc)}, status=400)
+        ingesta.ingerir_en_segundo_plano(nueva)
+        return Response(IngestaAlbumSerializer(nueva, context={'request': request}).data, status=status.HTTP_202_ACCEPTED)
+
+
+class IngestaAlbumDetailView(generics.RetrieveAPIView):
+    serializer_class = IngestaAlbumSerializer
+    permission_classes = [permissions.IsAuthenticated, IsArtistaOrAdmin]
+
+    def get_queryset(self):
+        return IngestaAlbum.objects.filter(usuario_id=self.request.user.id).select_related('album')
 
 
 class CancionRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
@@ -37,6 +187,23 @@ class CancionRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     # permitir GET para cualquiera; operaciones que modifican/eliminan requieren artista/admin
     permission_classes = [IsArtistaOrAdmin]
 
+    def perform_destroy(self, instance):
+        # Se oculta al momento; la fila y su media se borran en segundo plano (purgar_eliminados)
+        instance.eliminar()
+
+
+class AlbumDestroyView(generics.DestroyAPIView):
+    """Borrado suave de un álbum: sus canciones siguen publicadas, como singles."""
+    permission_classes = [permissions.IsAuthenticated, IsArtistaOrAdmin]
+
+    def get_queryset(self):
+        if rol_de(self.request) in IsArtistaOrAdmin.ADMIN_NAMES:
+            return Album.objects.all()
+        return Album.objects.filter(artist_id=self.request.user.id)
+
+    def perform_destroy(self, instance):
+        instance.eliminar()
+
 
 @api_view(['GET'])
 def buscar_canciones(request):
@@ -54,71 +221,207 @@ def buscar_canciones(request):
     return Response(serializer.data)
 
 
+def _sumar_reproduccion(cancion_id):
+    contadores.sumar(cancion_id)
+
+
+def _iterar_archivo(file_obj, length, chunk=1024 * 64):
+    remaining = length
+    try:
+        while remaining > 0:
+            data = file_obj.read(min(chunk, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+    finally:
+        file_obj.close()
+
+
+def _prefijo_y_resto(prefijo, almacenamiento, ruta):
+    """Respuesta completa: el prefijo desde memoria y el resto desde el disco."""
+    yield prefijo
+    audio_file = almacenamiento.open(ruta, 'rb')
+    audio_file.seek(len(prefijo))
+    yield from _iterar_archivo(audio_file, float('inf'))
+
+
 @api_view(['GET'])
 def transmitir_cancion(request, pk):
-    """Devuelve el archivo de audio con soporte para solicitudes parciales (Range)."""
-    song = get_object_or_404(Cancion, pk=pk)
-    if not song.file:
+    """Devuelve el archivo de audio con soporte para solicitudes parciales (Range).
+
+    Ruta anterior a las URLs firmadas (`audio_url` ya no apunta aquí): cuenta la
+    reproducción al servir el primer byte.
+    """
+    ruta = Cancion.objects.filter(pk=pk).values_list('file', flat=True).first()
+    if ruta is None:
+        raise Http404('Canción no encontrada')
+    if not ruta:
         raise Http404('Archivo de audio no encontrado')
+    return _servir_audio(request, ruta, pk)
 
-    audio_file = song.file.open('rb')
-    file_size = song.file.size
-    range_header = request.headers.get('Range')
-    response = None
 
-    should_increment_playcount = True
+def audio_firmado(request, ruta):
+    """Sirve una URL firmada (transmision.py) sin consultar la base de datos.
+
+    Es la alternativa al servidor de estáticos cuando TRANSMISION['URL_BASE'] no
+    está definida; la reproducción se cuenta con la baliza.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponse(status=405)
+    try:
+        firmas.verificar(transmision.clave(), ruta, request.GET.dict())
+    except firmas.FirmaInvalida as exc:
+        return HttpResponse(str(exc), status=403, content_type='text/plain')
+    return _servir_audio(request, ruta)
+
+
+def _servir_audio(request, ruta, cancion_id=None):
+    """Respuesta (completa o parcial) del archivo `ruta`; con `cancion_id`, cuenta la reproducción.
+
+    Los inicios de reproducción de las canciones frecuentes salen de la caché
+    de prefijos (prefijos.py) sin tocar el disco; el rango se recorta al
+    prefijo y el navegador pide el resto después.
+    """
+    almacenamiento = Cancion._meta.get_field('file').storage
+    cache = prefijos.cache()
 
+    range_header = request.headers.get('Range')
+    start, end, rango_valido = 0, None, True
     if range_header:
         # Formato esperado: "bytes=start-end"
         try:
-            range_value = range_header.strip().lower()
-            units, _, range_spec = range_value.partition('=')
+            units, _, range_spec = range_header.strip().lower().partition('=')
             if units != 'bytes':
                 raise ValueError('Unidad de rango no soportada')
             start_str, _, end_str = range_spec.partition('-')
             start = int(start_str) if start_str else 0
-            end = int(end_str) if end_str else file_size - 1
-            end = min(end, file_size - 1)
-            if start > end or start < 0:
-                raise ValueError('Rango inválido')
+            end = int(end_str) if end_str else None
         except (ValueError, IndexError):
-            audio_file.close()
-            response_416 = Response(status=416)
+            rango_valido = False
+
+    should_increment_playcount = rango_valido and start == 0
+    entrada = None
+    if should_increment_playcount:
+        cache.registrar_inicio(ruta)
+        entrada = cache.obtener(ruta)
+    try:
+        file_size = entrada[0] if entrada else almacenamiento.size(ruta)
+    except OSError:
+        raise Http404('Archivo de audio no encontrado')
+
+    if range_header:
+        end = file_size - 1 if end is None else min(end, file_size - 1)
+        if not rango_valido or start > end or start < 0:
+            response_416 = HttpResponse(status=416)
             response_416['Content-Range'] = f'bytes */{file_size}'
             return response_416
 
+    if should_increment_playcount and entrada is None and cache.quiere(ruta):
+        with almacenamiento.open(ruta, 'rb') as audio_file:
+            prefijo = audio_file.read(cache.tamano_prefijo)
+        if cache.admitir(ruta, file_size, prefijo):
+            entrada = (file_size, prefijo)
+
+    if entrada is not None and range_header:
+        prefijo = entrada[1]
+        end = min(end, len(prefijo) - 1)
+        response = HttpResponse(prefijo[start:end + 1], status=206, content_type='audio/mpeg')
+        response['Content-Range'] = f'bytes {start}-{end}/{file_size}'
+        response['Content-Length'] = str(end - start + 1)
+        cache.contar_servidos(end - start + 1)
+    elif entrada is not None:
+        response = StreamingHttpResponse(
+            _prefijo_y_resto(entrada[1], almacenamiento, ruta), content_type='audio/mpeg'
+        )
+        response['Content-Length'] = str(file_size)
+        cache.contar_servidos(len(entrada[1]))
+    elif range_header:
         chunk_size = (end - start) + 1
-        should_increment_playcount = start == 0
+        audio_file = almacenamiento.open(ruta, 'rb')
         audio_file.seek(start)
-
-        def file_iterator(file_obj, length):
-            remaining = length
-            chunk = 1024 * 64
-            try:
-                while remaining > 0:
-                    read_length = min(chunk, remaining)
-                    data = file_obj.read(read_length)
-                    if not data:
-                        break
-                    remaining -= len(data)
-                    yield data
-            finally:
-                file_obj.close()
-
-        response = StreamingHttpResponse(file_iterator(audio_file, chunk_size), status=206, content_type='audio/mpeg')
+        response = StreamingHttpResponse(_iterar_archivo(audio_file, chunk_size), status=206, content_type='audio/mpeg')
         response['Content-Range'] = f'bytes {start}-{end}/{file_size}'
         response['Content-Length'] = str(chunk_size)
     else:
-        response = FileResponse(audio_file, content_type='audio/mpeg')
+        response = FileResponse(almacenamiento.open(ruta, 'rb'), content_type='audio/mpeg')
         response['Content-Length'] = str(file_size)
 
     response['Accept-Ranges'] = 'bytes'
-    if should_increment_playcount:
-        song.play_count = (song.play_count or 0) + 1
-        song.save(update_fields=['play_count'])
+    if should_increment_playcount and cancion_id is not None:
+        # Un solo incremento por escucha aunque el navegador repita `bytes=0-`
+        if deduplicacion.nueva('reproduccion', cancion_id, request):
+            escritura.encolar(_sumar_reproduccion, cancion_id)
     return response
 
 
+def _url_baliza(request):
+    if request.content_type in ('application/x-www-form-urlencoded', 'multipart/form-data'):
+        return request.POST.get('url')
+    datos = json.loads(request.body)
+    return datos.get('url') if isinstance(datos, dict) else None
+
+
+@csrf_exempt
+def baliza_reproduccion(request):
+    """Cuenta una reproducción servida con URL firmada: {url: audio_url}.
+
+    Pensada para navigator.sendBeacon (sin cabecera de autorización): la firma
+    de la URL identifica canción y usuario. Vista de Django sin DRF, como
+    latidos_escucha, para admitir lo que envía sendBeacon sin preflight CORS:
+    formulario, FormData o JSON como text/plain.
+    """
+    if request.method != 'POST':
+        return HttpResponse(status=405)
+    try:
+        cancion_id, usuario = firmas.verificar_url(
+            transmision.clave(), _url_baliza(request) or '', urlsplit(transmision.prefijo()).path,
+            gracia=transmision.config()['GRACIA_BALIZA'],
+        )
+        cancion_id = int(cancion_id)
+    except (firmas.FirmaInvalida, ValueError, AttributeError):
+        return HttpResponse('URL de audio inválida o caducada', status=400, content_type='text/plain')
+    # Con latidos (escuchas.py) la reproducción se acredita al superar el umbral de escucha
+    if not escuchas.config()['ACREDITAR'] and deduplicacion.nueva('reproduccion', cancion_id, request, usuario):
+        escritura.encolar(_sumar_reproduccion, cancion_id)
+    return HttpResponse(status=204)
+
+
+def _identificador_url(url, request):
+    def identificar():
+        cancion_id, usuario = firmas.verificar_url(
+            transmision.clave(), url or '', urlsplit(transmision.prefijo()).path,
+            gracia=transmision.config()['GRACIA_BALIZA'],
+        )
+        usuario = int(usuario) if usuario else None
+        return int(cancion_id), usuario, deduplicacion.oyente(request, usuario)
+    return identificar
+
+
+@csrf_exempt
+def latidos_escucha(request):
+    """Recibe latidos del reproductor: {sesion, posicion, estado, url} o {eventos: [...]}.
+
+    Vista de Django sin DRF ni base de datos (es la ruta más frecuente de la
+    API); `url` es la audio_url firmada y solo se verifica al abrir la sesión.
+    Admite text/plain para que sendBeacon no necesite preflight CORS.
+    """
+    if request.method != 'POST':
+        return HttpResponse(status=405)
+    try:
+        datos = json.loads(request.body)
+        eventos = datos['eventos'] if isinstance(datos, dict) and 'eventos' in datos else [datos]
+        for evento in eventos:
+            escuchas.registrar(
+                evento['sesion'], evento['posicion'], evento['estado'], _identificador_url(evento.get('url'), request)
+            )
+    except escuchas.Saturado:
+        return HttpResponse('Demasiadas sesiones abiertas', status=429, content_type='text/plain')
+    except (ValueError, KeyError, TypeError, firmas.FirmaInvalida):
+        return HttpResponse('Latido no válido', status=400, content_type='text/plain')
+    return HttpResponse(status=204)
+
+
 class GeneroListView(generics.ListAPIView):
     queryset = Genero.objects.all()
     serializer_class = GeneroSerializer
@@ -131,7 +434,7 @@ class GeneroListView(generics.ListAPIView):
 @permission_classes([permissions.IsAuthenticated])
 def listar_favoritos(request):
     """Lista todas las canciones favoritas del usuario autenticado"""
-    favoritos = CancionFavorita.objects.filter(usuario_id=getattr(request.user, 'id', None)).select_related('cancion')
+    favoritos = consultas.favoritos(getattr(request.user, 'id', None))
     canciones = [fav.cancion for fav in favoritos]
     serializer = CancionSerializer(canciones, many=True, context={'request': request})
     return Response(serializer.data)
@@ -177,7 +480,7 @@ def verificar_favorito(request, cancion_id):
 @permission_classes([permissions.IsAuthenticated])
 def listar_historial(request):
     """Lista el historial de reproducciones del usuario (últimas 50)"""
-    historial = HistorialReproduccion.objects.filter(usuario_id=getattr(request.user, 'id', None)).select_related('cancion')[:50]
+    historial = consultas.historial(getattr(request.user, 'id', None))[:50]
     # Obtener canciones únicas (sin duplicados)
     canciones_ids = []
     canciones_unicas = []
@@ -190,25 +493,40 @@ def listar_historial(request):
     return Response(serializer.data)
 
 
+def _guardar_reproduccion(cancion, usuario_id):
+    HistorialReproduccion.objects.create(usuario_id=usuario_id, cancion=cancion)
+    registrar_oyente(cancion, usuario_id)
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def registrar_reproduccion(request, cancion_id):
     """Registra una reproducción en el historial"""
     cancion = get_object_or_404(Cancion, pk=cancion_id)
-    HistorialReproduccion.objects.create(
-        usuario_id=getattr(request.user, 'id', None),
-        cancion=cancion
-    )
+    if deduplicacion.nueva('historial', cancion.pk, request):
+        escritura.encolar(_guardar_reproduccion, cancion, getattr(request.user, 'id', None))
     return Response({'message': 'Reproducción registrada'}, status=status.HTTP_201_CREATED)
 
 
 # ========== ENDPOINTS DE ESTADÍSTICAS EN TIEMPO CASI REAL ==========
 
+def _parse_dias(request):
+    dias = request.query_params.get('dias', '')
+    return int(dias) if dias.isdigit() and int(dias) > 0 else None
+
+
 @api_view(['GET'])
 def reproducciones_cancion(request, pk: int):
-    """Devuelve el contador de reproducciones de una canción."""
-    song = get_object_or_404(Cancion, pk=pk)
-    return Response({'id': song.id, 'play_count': song.play_count})
+    """Devuelve el contador de reproducciones y los oyentes únicos estimados (?dias=N para una ventana)."""
+    totales = contadores.reproducciones([pk])
+    if pk not in totales:
+        raise Http404
+    return Response({
+        'id': pk,
+        'play_count': totales[pk],
+        'oyentes_unicos': oyentes_cancion(pk, _parse_dias(request)),
+        'oyentes_error_relativo': error_relativo(),
+    })
 
 
 @api_view(['GET'])
@@ -221,5 +539,77 @@ def reproducciones_multiples(request):
         ids = []
     if not ids:
         return Response({'detail': 'Parámetro ids requerido'}, status=status.HTTP_400_BAD_REQUEST)
-    qs = Cancion.objects.filter(id__in=ids).values('id', 'play_count')
-    return Response({'results': list(qs)})
+    totales = contadores.reproducciones(ids)
+    oyentes = oyentes_canciones(ids)
+    qs = [
+        {'id': cancion_id, 'play_count': play_count, 'oyentes_unicos': oyentes.get(cancion_id, 0)}
+        for cancion_id, play_count in totales.items()
+    ]
+    return Response({'results': qs, 'oyentes_error_relativo': error_relativo()})
+
+
+# ========== ENDPOINTS DE RECOMENDACIONES ==========
+
+def _serializar_en_orden(request, ids):
+    """Serializa canciones por id conservando el orden recibido, con favoritos resueltos en una consulta."""
+    canciones = Cancion.objects.select_related('uploaded_by__rol', 'album', 'genre').in_bulk(ids)
+    favoritos_ids = set()
+    if request.user.is_authenticated and canciones:
+        favoritos_ids = set(
+            CancionFavorita.objects.filter(usuario_id=getattr(request.user, 'id', None), cancion_id__in=ids)
+            .values_list('cancion_id', flat=True)
+        )
+    contexto = {'request': request, 'favoritos_ids': favoritos_ids}
+    return CancionSerializer([canciones[i] for i in ids if i in canciones], many=True, context=contexto).data
+
+
+def _parse_limite(request, defecto=20, maximo=100):
+    limite = request.query_params.get('limite', '')
+    return min(int(limite), maximo) if limite.isdigit() and int(limite) > 0 else defecto
+
+
+@api_view(['GET'])
+def canciones_similares(request, pk: int):
+    """Canciones más parecidas por co-escucha (precalculadas por construir_recomendaciones)."""
+    ids = recomendaciones.similares(pk, _parse_limite(request))
+    return Response(_serializar_en_orden(request, ids))
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def para_ti(request):
+    """Recomendaciones personalizadas a partir del historial y favoritos del usuario."""
+    ids = recomendaciones.para_usuario(getattr(request.user, 'id', None), _parse_limite(request))
+    return Response(_serializar_en_orden(request, ids))
+
+
+@api_view(['GET'])
+def radio_automatica(request):
+    """Cola de radio a partir de ?cancion=, ?artista= o ?genero= (o de un ?cursor= previo)."""
+    cursor = request.query_params.get('cursor')
+    if cursor:
+        try:
+            tipo, semilla_id, posicion = radio.leer_cursor(cursor)
+        except (signing.BadSignature, ValueError, TypeError):
+            return Response({'detail': 'Cursor inválido'}, status=status.HTTP_400_BAD_REQUEST)
+    else:
+        posicion = 0
+        for tipo in (PoolRadio.CANCION, PoolRadio.ARTISTA, PoolRadio.GENERO):
+            valor = request.query_params.get(tipo, '')
+            if valor.isdigit():
+                semilla_id = int(valor)
+                break
+        else:
+            return Response({'detail': 'Parámetro cancion, artista o genero requerido'}, status=status.HTTP_400_BAD_REQUEST)
+
+    usuario_id = getattr(request.user, 'id', None) if request.user.is_authenticated else None
+    try:
+        ids, siguiente = radio.siguientes(
+            tipo, semilla_id, usuario_id, posicion, _parse_limite(request, defecto=10, maximo=50)
+        )
+    except radio.SemillaInexistente:
+        return Response({'detail': 'Semilla no encontrada'}, status=status.HTTP_404_NOT_FOUND)
+    return Response({
+        'canciones': _serializar_en_orden(request, ids),
+        'cursor': radio.firmar_cursor(tipo, semilla_id, siguiente) if siguiente is not None else None,
+    })
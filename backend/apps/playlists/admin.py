@@ -1,13 +1,28 @@
 from django.contrib import admin
+
+from backend.admin_escala import AdminEscalable, filtro_fecha
+
 from .models import Playlist, Favorite
 
 
 @admin.register(Playlist)
-class PlaylistAdmin(admin.ModelAdmin):
+class PlaylistAdmin(AdminEscalable):
     list_display = ('id', 'name', 'user', 'is_public', 'created_at')
+    list_select_related = ('user',)
+    list_filter = ('is_public',)
     search_fields = ('name', 'user__username')
+    autocomplete_fields = ('user', 'songs')
 
 
 @admin.register(Favorite)
-class FavoriteAdmin(admin.ModelAdmin):
-    list_display = ('id', 'user', 'song', 'added_at')
+class FavoriteAdmin(AdminEscalable):
+    list_display = ('id', 'user', 'get_song_title', 'added_at')
+    list_select_related = ('user', 'song')
+    list_filter = (filtro_fecha('added_at'),)
+    search_fields = ('user__username', 'song__title')
+    autocomplete_fields = ('user', 'song')
+
+    def get_song_title(self, obj):
+        return obj.song.title
+
+    get_song_title.short_description = 'Canción'
@@ -0,0 +1,6 @@
+"""Forma de las consultas calientes de playlists (ver apps.musica.consultas)."""
+from .models import Playlist
+
+
+def playlists_de(usuario_id):
+    return Playlist.objects.filter(user_id=usuario_id).order_by('-updated_at')
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('musica', '0005_indices_consultas'),
+        ('playlists', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='playlist',
+            index=models.Index(fields=['user', 'updated_at'], name='playlist_usuario_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-19 19:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('musica', '0012_indices_admin'),
+        ('playlists', '0002_indices_consultas'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='favorite',
+            index=models.Index(fields=['added_at'], name='favorito_fecha_idx'),
+        ),
+    ]
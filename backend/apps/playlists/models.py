@@ -18,6 +18,9 @@ class Playlist(models.Model):
     class Meta:
         verbose_name = 'Lista de reproducción'
         verbose_name_plural = 'Listas de reproducción'
+        indexes = [
+            models.Index(fields=['user', 'updated_at'], name='playlist_usuario_fecha_idx'),
+        ]
 
 
 class Favorite(models.Model):
@@ -34,3 +37,6 @@ class Favorite(models.Model):
     class Meta:
         verbose_name = 'Favorito'
         verbose_name_plural = 'Favoritos'
+        indexes = [
+            models.Index(fields=['added_at'], name='favorito_fecha_idx'),
+        ]
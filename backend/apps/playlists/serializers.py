@@ -25,6 +25,8 @@ class FavoriteSerializer(serializers.ModelSerializer):
         read_only_fields = ['user', 'added_at']
 
     def get_song(self, obj):
+        if obj.song.eliminado_en is not None:
+            return None
         serializer = CancionSerializer(obj.song, context=self.context)
         return serializer.data
 
@@ -3,6 +3,7 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
+from . import consultas
 from .models import Playlist, Favorite
 from .serializers import PlaylistSerializer, FavoriteSerializer
 from apps.musica.models import Cancion
@@ -54,7 +55,7 @@ class PlaylistListCreateView(generics.ListCreateAPIView):
 
     def get_queryset(self):
         user_id = _get_request_user_id(self.request)
-        return Playlist.objects.filter(user_id=user_id).prefetch_related(
+        return consultas.playlists_de(user_id).prefetch_related(
             'songs__uploaded_by',
             'songs__genre'
         )
@@ -95,6 +96,8 @@ def agregar_cancion_a_lista(request, pk):
         return Response({'detail': 'song_id requerido'}, status=status.HTTP_400_BAD_REQUEST)
     song = get_object_or_404(Cancion, pk=song_id)
     playlist.songs.add(song)
+    # Marca la playlist como modificada (el cálculo incremental de recomendaciones usa updated_at)
+    playlist.save(update_fields=['updated_at'])
     # Retornar el playlist actualizado
     serializer = PlaylistSerializer(playlist, context={'request': request})
     return Response(serializer.data, status=status.HTTP_200_OK)
@@ -110,6 +113,7 @@ def quitar_cancion_de_lista(request, pk):
         return Response({'detail': 'song_id requerido'}, status=status.HTTP_400_BAD_REQUEST)
     song = get_object_or_404(Cancion, pk=song_id)
     playlist.songs.remove(song)
+    playlist.save(update_fields=['updated_at'])
     # Retornar el playlist actualizado
     serializer = PlaylistSerializer(playlist, context={'request': request})
     return Response(serializer.data, status=status.HTTP_200_OK)
@@ -120,7 +124,7 @@ class FavoriteListCreateView(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Favorite.objects.filter(user_id=_get_request_user_id(self.request))
+        return Favorite.objects.filter(user_id=_get_request_user_id(self.request), song__eliminado_en__isnull=True)
 
     def perform_create(self, serializer):
         song_id = self.request.data.get('song_id')
@@ -0,0 +1,68 @@
+"""Consultas calientes de cada app y el índice que debe usar cada una.
+
+Las consultas se construyen con las mismas funciones que llaman las vistas
+(`consultas.py` de cada app, los métodos de `UsuarioManager` y
+`busqueda.listado`), así que lo que se comprueba con EXPLAIN es lo que se
+ejecuta. Lo usan el comando `verificar_indices` y los tests de reports.
+"""
+from dataclasses import dataclass
+
+from django.db.models import QuerySet
+
+from apps.autenticacion import busqueda
+from apps.autenticacion.models import Usuario
+from apps.musica import consultas as musica
+from apps.musica.models import PoolRadio
+from apps.playlists import consultas as playlists
+
+
+@dataclass
+class Consulta:
+    app: str
+    nombre: str
+    queryset: QuerySet
+    indice: str
+    # La ordenación en memoria se admite cuando el índice no puede dar el orden
+    ordena_en_memoria: bool = False
+
+    @property
+    def tabla(self):
+        return self.queryset.model._meta.db_table
+
+
+def consultas_calientes(usuario_id, artista_id, cancion_id, email):
+    return [
+        Consulta('musica', 'listado de canciones', musica.canciones_recientes()[:20], 'cancion_created_at_idx'),
+        Consulta('musica', 'historial del usuario', musica.historial(usuario_id)[:50], 'historial_usuario_fecha_idx'),
+        Consulta('musica', 'favoritos del usuario', musica.favoritos(usuario_id), 'favorita_usuario_fecha_idx'),
+        # Las restricciones únicas sobre campos se crean con la tabla: SQLite las llama sqlite_autoindex_*
+        Consulta('musica', 'oyentes únicos históricos', musica.oyentes_historicos([cancion_id]),
+                 'sqlite_autoindex_musica_oyentescancion_1'),
+        Consulta('musica', 'canciones similares', musica.similares(cancion_id)[:20], 'similar_cancion_puntaje_idx'),
+        Consulta('musica', 'pool de radio', musica.pool_radio(PoolRadio.CANCION, cancion_id),
+                 'musica_poolradio_tipo_semilla_id_729bbc0e_uniq'),
+        Consulta('playlists', 'playlists del usuario', playlists.playlists_de(usuario_id),
+                 'playlist_usuario_fecha_idx'),
+        Consulta('reports', 'top canciones', musica.mas_reproducidas()[:10], 'cancion_play_count_idx'),
+        Consulta('reports', 'resumen de artista', musica.canciones_de_artista(artista_id),
+                 'cancion_artista_plays_idx'),
+        Consulta('autenticacion', 'login por email', Usuario.objects.por_email(email), 'usuario_email_lower_uniq'),
+        # Un índice por campo (MULTI-INDEX OR): solo las coincidencias del prefijo se ordenan por -id
+        Consulta('autenticacion', 'búsqueda de usuarios', busqueda.listado(email.split('_')[0])[:50],
+                 'usuario_username_norm_idx', ordena_en_memoria=True),
+        Consulta('autenticacion', 'usuarios por rol', busqueda.listado(rol_id=1)[:50], 'usuario_rol_id_idx'),
+    ]
+
+
+def problemas(consulta, plan):
+    """Líneas del plan que indican recorrido completo de la tabla u ordenación en memoria, o que no usa su índice."""
+    encontrados = [] if consulta.indice in plan else [f'No usa el índice {consulta.indice}']
+    tabla = consulta.tabla.upper()
+    for linea in plan.splitlines():
+        texto = linea.upper()
+        if 'TEMP B-TREE' in texto or 'SORT KEY' in texto:
+            if not consulta.ordena_en_memoria:
+                encontrados.append(linea.strip())
+        elif tabla in texto and (('SCAN' in texto and 'USING' not in texto) or 'SEQ SCAN' in texto):
+            encontrados.append(linea.strip())
+    return encontrados
@@ -0,0 +1,109 @@
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from apps.autenticacion.models import Usuario
+from apps.musica.models import Cancion, CancionFavorita, CancionSimilar, HistorialReproduccion
+from apps.playlists.models import Playlist
+from apps.reports.indices import consultas_calientes, problemas
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Siembra un conjunto de datos grande (dentro de una transacción que se revierte) y '
+        'verifica con EXPLAIN que las consultas calientes usan índices.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=5000)
+        parser.add_argument('--canciones', type=int, default=20000)
+        parser.add_argument('--reproducciones', type=int, default=200000)
+        parser.add_argument('--sin-datos', action='store_true', help='Usa los datos actuales sin sembrar.')
+
+    def handle(self, *args, **options):
+        fallos = []
+        try:
+            with transaction.atomic():
+                if options['sin_datos']:
+                    ids = self._ids_existentes()
+                else:
+                    ids = self._sembrar(options['usuarios'], options['canciones'], options['reproducciones'])
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+                for consulta in consultas_calientes(*ids):
+                    plan = consulta.queryset.explain()
+                    encontrados = problemas(consulta, plan)
+                    estado = self.style.ERROR('SIN ÍNDICE') if encontrados else self.style.SUCCESS('ok')
+                    self.stdout.write(f'[{consulta.app}] {consulta.nombre}: {estado}')
+                    if options['verbosity'] > 1 or encontrados:
+                        for linea in plan.splitlines():
+                            self.stdout.write(f'    {linea}')
+                    if encontrados:
+                        fallos.append(f'{consulta.app}/{consulta.nombre}')
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        if fallos:
+            raise CommandError(f'Consultas sin índice: {", ".join(fallos)}')
+        self.stdout.write(self.style.SUCCESS('Todas las consultas calientes usan índices.'))
+
+    def _ids_existentes(self):
+        usuario = Usuario.objects.order_by('id').values_list('id', 'email').first() or (0, '')
+        cancion = Cancion.objects.order_by('id').values_list('id', 'uploaded_by_id').first() or (0, 0)
+        return usuario[0], cancion[1], cancion[0], usuario[1]
+
+    def _sembrar(self, n_usuarios, n_canciones, n_reproducciones):
+        rng = random.Random(42)
+        prefijo = f'explain{rng.randrange(10 ** 6)}'
+        usuarios = [
+            Usuario(username=f'{prefijo}_{i}', email=f'{prefijo}_{i}@example.com', password='!')
+            for i in range(n_usuarios)
+        ]
+        for usuario in usuarios:
+            usuario.normalizar_busqueda()
+        Usuario.objects.bulk_create(usuarios, batch_size=1000)
+        usuarios = list(Usuario.objects.filter(username__startswith=prefijo).values_list('id', flat=True))
+        artistas = usuarios[: max(1, len(usuarios) // 20)]
+        Cancion.objects.bulk_create(
+            [
+                Cancion(title=f'{prefijo} {i}', uploaded_by_id=rng.choice(artistas), play_count=rng.randrange(100000))
+                for i in range(n_canciones)
+            ],
+            batch_size=1000,
+        )
+        canciones = list(Cancion.objects.filter(title__startswith=prefijo).values_list('id', flat=True))
+        HistorialReproduccion.objects.bulk_create(
+            [
+                HistorialReproduccion(usuario_id=rng.choice(usuarios), cancion_id=rng.choice(canciones))
+                for _ in range(n_reproducciones)
+            ],
+            batch_size=2000,
+        )
+        CancionFavorita.objects.bulk_create(
+            [
+                CancionFavorita(usuario_id=rng.choice(usuarios), cancion_id=rng.choice(canciones))
+                for _ in range(n_reproducciones // 10)
+            ],
+            batch_size=2000,
+            ignore_conflicts=True,
+        )
+        Playlist.objects.bulk_create(
+            [Playlist(name=f'{prefijo} {i}', user_id=rng.choice(usuarios)) for i in range(n_usuarios)],
+            batch_size=1000,
+        )
+        CancionSimilar.objects.bulk_create(
+            [
+                CancionSimilar(cancion_id=c, similar_id=rng.choice(canciones), puntaje=rng.random())
+                for c in canciones[:1000]
+                for _ in range(10)
+            ],
+            batch_size=2000,
+            ignore_conflicts=True,
+        )
+        return usuarios[0], artistas[0], canciones[0], f'{prefijo}_0@example.com'
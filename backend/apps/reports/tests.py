@@ -0,0 +1,31 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from apps.autenticacion import roles
+from apps.autenticacion.models import Rol, Usuario
+from apps.musica.models import Cancion
+
+from .indices import consultas_calientes, problemas
+
+
+class IndicesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.artista = Usuario.objects.create_user(
+            username='artista_0', email='artista_0@example.com', password='Clave-123456',
+            rol=roles.obtener(Rol.ARTIST),
+        )
+        cls.cancion = Cancion.objects.create(title='Canción', uploaded_by=cls.artista)
+
+    def test_las_consultas_de_las_vistas_usan_sus_indices(self):
+        for consulta in consultas_calientes(self.artista.id, self.artista.id, self.cancion.id, self.artista.email):
+            with self.subTest(consulta=f'{consulta.app}/{consulta.nombre}'):
+                plan = consulta.queryset.explain()
+                self.assertIn(consulta.indice, plan)
+                self.assertEqual(problemas(consulta, plan), [])
+
+    def test_verificar_indices_con_datos_sembrados(self):
+        # Con estadísticas (ANALYZE) de un conjunto sembrado; falla con CommandError si alguna no usa su índice
+        call_command('verificar_indices', usuarios=200, canciones=500, reproducciones=2000, stdout=StringIO())
@@ -6,4 +6,5 @@ urlpatterns = [
     path('resumen/', views.resumen_estadisticas, name='resumen_estadisticas'),
     path('artista/resumen/', views.resumen_artista, name='resumen_artista'),
     path('admin/resumen-live/', views.resumen_admin_live, name='resumen_admin_live'),
+    path('cache-prefijos/', views.cache_prefijos, name='cache_prefijos'),
 ]
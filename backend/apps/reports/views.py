@@ -1,7 +1,10 @@
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
+from apps.autenticacion.permissions import IsAdminRole, rol_de
+from apps.musica import consultas, prefijos
 from apps.musica.models import Cancion
+from apps.musica.oyentes import error_relativo, oyentes_artista, oyentes_canciones
 from django.db import models
 
 
@@ -9,8 +12,8 @@ from django.db import models
 @permission_classes([IsAdminUser])
 def top_canciones(request):
     """Devuelve el top 10 de canciones por reproducciones."""
-    qs = Cancion.objects.all().order_by('-play_count')[:10]
-    data = [{'id': s.id, 'titulo': s.title, 'artista': str(s.artist), 'reproducciones': s.play_count} for s in qs]
+    qs = consultas.mas_reproducidas().select_related('uploaded_by')[:10]
+    data = [{'id': s.id, 'titulo': s.title, 'artista': str(s.uploaded_by), 'reproducciones': s.play_count} for s in qs]
     return Response({'top_canciones': data})
 
 
@@ -26,19 +29,25 @@ def resumen_estadisticas(request):
 @permission_classes([IsAuthenticated])
 def resumen_artista(request):
     """Resumen en tiempo real para el artista autenticado (o admin)."""
-    user = request.user
+    artista_id = getattr(request.user, 'id', None)
     # Admin puede pasar ?user_id= para consultar otro artista
     user_id = request.query_params.get('user_id')
-    if user_id and getattr(user, 'rol', None) and user.rol and user.rol.nombre in ('Administrador',):
-        try:
-            from apps.autenticacion.models import Usuario
-            user = Usuario.objects.get(pk=int(user_id))
-        except Exception:
-            pass
-    qs = Cancion.objects.filter(uploaded_by=user)
+    if user_id and user_id.isdigit() and rol_de(request) in ('administrador',):
+        artista_id = int(user_id)
+    dias = request.query_params.get('dias', '')
+    dias = int(dias) if dias.isdigit() and int(dias) > 0 else None
+    qs = consultas.canciones_de_artista(artista_id)
     total_reproducciones = qs.aggregate(total=models.Sum('play_count'))['total'] or 0
-    canciones = list(qs.values('id', 'title', 'play_count').order_by('-play_count'))
-    return Response({'total_reproducciones': total_reproducciones, 'canciones': canciones})
+    canciones = list(qs.values('id', 'title', 'play_count'))
+    oyentes = oyentes_canciones([c['id'] for c in canciones])
+    for cancion in canciones:
+        cancion['oyentes_unicos'] = oyentes.get(cancion['id'], 0)
+    return Response({
+        'total_reproducciones': total_reproducciones,
+        'oyentes_unicos': oyentes_artista(artista_id, dias),
+        'oyentes_error_relativo': error_relativo(),
+        'canciones': canciones,
+    })
 
 
 @api_view(['GET'])
@@ -47,5 +56,12 @@ def resumen_admin_live(request):
     """Resumen detallado para administrador en tiempo real."""
     total_canciones = Cancion.objects.count()
     total_reproducciones = Cancion.objects.aggregate(total=models.Sum('play_count'))['total'] or 0
-    top = list(Cancion.objects.all().order_by('-play_count').values('id', 'title', 'play_count')[:10])
+    top = list(consultas.mas_reproducidas().values('id', 'title', 'play_count')[:10])
     return Response({'total_canciones': total_canciones, 'total_reproducciones': total_reproducciones, 'top': top})
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdminRole])
+def cache_prefijos(request):
+    """Aciertos y bytes servidos desde memoria por la caché de inicios de canción (este proceso)."""
+    return Response(prefijos.cache().metricas())
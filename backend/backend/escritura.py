@@ -0,0 +1,138 @@
+"""Serialización de escrituras para SQLite.
+
+SQLite admite un único escritor a la vez; con muchos oyentes concurrentes las
+escrituras de reproducciones e historial compiten por el bloqueo y terminan en
+`database is locked`. `EscritorSerializado` las encola y las ejecuta desde un
+solo hilo, agrupando las pendientes en una misma transacción (un único commit
+por lote) y reintentando el lote si otro proceso mantiene el bloqueo.
+
+Con `ESCRITURA_SERIALIZADA = False` (valor por defecto en desarrollo) las
+tareas se ejecutan en línea, de modo que el comportamiento es el de siempre.
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import OperationalError, close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+MAX_LOTE = 200
+MAX_PENDIENTES = 10000
+REINTENTOS = 8
+
+
+def _bloqueada(exc):
+    return 'locked' in str(exc).lower() or 'busy' in str(exc).lower()
+
+
+def _lote_django(tareas):
+    """Ejecuta las tareas en una transacción, cada una en su propio savepoint."""
+    resultados = []
+    with transaction.atomic():
+        for funcion, args, kwargs in tareas:
+            try:
+                with transaction.atomic():
+                    resultados.append((True, funcion(*args, **kwargs)))
+            except OperationalError as exc:
+                if _bloqueada(exc):
+                    raise
+                resultados.append((False, exc))
+            except Exception as exc:
+                resultados.append((False, exc))
+    return resultados
+
+
+class EscritorSerializado:
+    def __init__(self, ejecutar_lote=None, max_lote=MAX_LOTE, max_pendientes=MAX_PENDIENTES):
+        self._ejecutar_lote = ejecutar_lote or _lote_django
+        self._max_lote = max_lote
+        self._cola = queue.Queue(maxsize=max_pendientes)
+        self._hilo = None
+        self._lock = threading.Lock()
+
+    def _iniciar(self):
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._bucle, name='escritor-serializado', daemon=True)
+                self._hilo.start()
+
+    def encolar(self, funcion, *args, **kwargs):
+        """Programa una escritura. Devuelve un Future con su resultado."""
+        futuro = Future()
+        try:
+            self._iniciar()
+            self._cola.put((futuro, funcion, args, kwargs), timeout=1)
+        except queue.Full:
+            logger.warning('Cola de escritura llena; se ejecuta la tarea en línea')
+            self._resolver([futuro], self._con_reintentos([(funcion, args, kwargs)]))
+        return futuro
+
+    def esperar(self, timeout=None):
+        """Bloquea hasta que se hayan procesado las tareas encoladas."""
+        fin = None if timeout is None else time.monotonic() + timeout
+        while self._cola.unfinished_tasks:
+            if fin is not None and time.monotonic() >= fin:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def _con_reintentos(self, tareas):
+        espera = 0.01
+        for intento in range(REINTENTOS):
+            try:
+                return self._ejecutar_lote(tareas)
+            except OperationalError as exc:
+                if not _bloqueada(exc) or intento == REINTENTOS - 1:
+                    return [(False, exc)] * len(tareas)
+                time.sleep(espera)
+                espera = min(espera * 2, 1.0)
+            except Exception as exc:  # pragma: no cover - error inesperado del lote completo
+                return [(False, exc)] * len(tareas)
+
+    @staticmethod
+    def _resolver(futuros, resultados):
+        for futuro, (ok, valor) in zip(futuros, resultados):
+            if ok:
+                futuro.set_result(valor)
+            else:
+                futuro.set_exception(valor)
+
+    def _bucle(self):
+        while True:
+            pendientes = [self._cola.get()]
+            while len(pendientes) < self._max_lote:
+                try:
+                    pendientes.append(self._cola.get_nowait())
+                except queue.Empty:
+                    break
+            futuros = [p[0] for p in pendientes]
+            resultados = self._con_reintentos([p[1:] for p in pendientes])
+            for futuro, (ok, valor) in zip(futuros, resultados):
+                if not ok:
+                    logger.error('Escritura serializada fallida: %s', valor)
+            self._resolver(futuros, resultados)
+            close_old_connections()
+            for _ in pendientes:
+                self._cola.task_done()
+
+
+_escritor = EscritorSerializado()
+atexit.register(_escritor.esperar, 5)
+
+
+def encolar(funcion, *args, **kwargs):
+    """Ejecuta `funcion` a través del escritor único (o en línea si está desactivado)."""
+    if getattr(settings, 'ESCRITURA_SERIALIZADA', False):
+        return _escritor.encolar(funcion, *args, **kwargs)
+    futuro = Future()
+    futuro.set_result(funcion(*args, **kwargs))
+    return futuro
+
+
+def esperar(timeout=None):
+    return _escritor.esperar(timeout)
@@ -89,6 +89,35 @@ DATABASES = {
     }
 }
 
+# Perfil de producción para SQLite (DB_PERFIL=produccion). Se aplica al abrir
+# cada conexión: WAL para que los lectores no esperen al escritor, mmap y caché
+# de páginas grandes. La espera por el bloqueo (en lugar de fallar) es solo
+# SQLITE_ESPERA_BLOQUEO, que el driver aplica como busy_timeout: un PRAGMA
+# busy_timeout en init_command la sustituiría sin avisar.
+SQLITE_ESPERA_BLOQUEO = 20  # segundos
+SQLITE_PRAGMAS_PRODUCCION = [
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA mmap_size=268435456',  # 256 MiB
+    'PRAGMA cache_size=-65536',  # 64 MiB
+    'PRAGMA temp_store=MEMORY',
+]
+DB_PERFIL = os.environ.get('DB_PERFIL', 'desarrollo')
+if DB_PERFIL == 'produccion':
+    DATABASES['default']['OPTIONS'] = {
+        'init_command': '; '.join(SQLITE_PRAGMAS_PRODUCCION),
+        # Toma el bloqueo de escritura al iniciar la transacción para evitar
+        # interbloqueos al promocionar lecturas a escrituras
+        'transaction_mode': 'IMMEDIATE',
+        'timeout': SQLITE_ESPERA_BLOQUEO,
+    }
+
+# Escrituras de reproducciones e historial a través de un único hilo escritor
+# (backend.escritura). Activado por defecto con el perfil de producción.
+ESCRITURA_SERIALIZADA = os.environ.get(
+    'ESCRITURA_SERIALIZADA', '1' if DB_PERFIL == 'produccion' else '0'
+) == '1'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -135,6 +164,10 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Archivos de importación de usuarios subidos por la API (pueden llevar
+# contraseñas): fuera de MEDIA_ROOT para que nunca se sirvan
+IMPORTACIONES_DIR = os.environ.get('IMPORTACIONES_DIR', str(BASE_DIR / 'privado' / 'importaciones'))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -143,9 +176,16 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Usuario personalizado
 AUTH_USER_MODEL = 'autenticacion.Usuario'
 
+# Login por email (CookieLoginView); el admin de Django sigue entrando por username
+AUTHENTICATION_BACKENDS = [
+    'apps.autenticacion.backends.EmailBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # El rol viaja como claim del token: las vistas que solo necesitan id y rol no consultan Usuario
+        'apps.autenticacion.authentication.JWTRolAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.AllowAny',
@@ -166,8 +206,25 @@ SIMPLE_JWT = {
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
     'JTI_CLAIM': 'jti',
-    'TOKEN_USER_CLASS': 'rest_framework_simplejwt.models.TokenUser',
-    'UPDATE_LAST_LOGIN': True,
+    'TOKEN_USER_CLASS': 'apps.autenticacion.tokens.UsuarioToken',
+    'TOKEN_REFRESH_SERIALIZER': 'apps.autenticacion.serializers.TokenRefreshConRolSerializer',
+    # last_login lo registra CookieLoginView en lote (apps.autenticacion.accesos)
+    'UPDATE_LAST_LOGIN': False,
+}
+
+# Caché en proceso de usuarios autenticados (apps.autenticacion.cache). TTL en
+# segundos; 0 la desactiva.
+CACHE_USUARIOS = {
+    'MAX_ENTRADAS': int(os.environ.get('CACHE_USUARIOS_MAX', '1024')),
+    'TTL': int(os.environ.get('CACHE_USUARIOS_TTL', '60')),
+}
+
+# Revocación de tokens (apps.autenticacion.revocacion): cada proceso sincroniza
+# su filtro de Bloom con la tabla TokenRevocado como mucho cada INTERVALO segundos.
+REVOCACION_TOKENS = {
+    'INTERVALO': int(os.environ.get('REVOCACION_INTERVALO', '5')),
+    'CAPACIDAD': 100000,
+    'ERROR': 0.001,
 }
 
 # Configuración de CORS
@@ -194,9 +251,109 @@ CORS_ALLOW_HEADERS = [
     "user-agent",
     "x-csrftoken",
     "x-requested-with",
+    # Subidas reanudables de canciones (apps.musica.subidas)
+    "upload-offset",
+    "upload-checksum",
 ]
+CORS_EXPOSE_HEADERS = ["upload-offset"]
+
+# Subidas reanudables: fragmentos cortos escritos en la ruta definitiva del archivo
+SUBIDAS_CANCIONES = {
+    'TAMANO_FRAGMENTO': 8 * 1024 * 1024,
+    'TAMANO_MAXIMO': 1024 * 1024 * 1024,
+    'EXPIRACION': 24 * 3600,  # segundos sin actividad antes de purgar una subida
+    'BLOQUEO': 300,  # segundos que un fragmento en escritura bloquea la subida
+}
+
+# URLs de audio firmadas (apps.musica.transmision). Con URL_BASE apuntando a
+# apps.musica.servidor_audio (o a nginx con auth_request) el audio no pasa por
+# Django; ese servidor necesita la misma CLAVE (vacía: derivada de SECRET_KEY,
+# solo válida para la vista de Django /api/musica/audio/). ATRIBUIR_USUARIO
+# firma el usuario en la URL para atribuirle la escucha: no es control de
+# acceso, una URL filtrada vale para cualquiera hasta que caduca (DURACION).
+TRANSMISION = {
+    'URL_BASE': os.environ.get('TRANSMISION_URL_BASE', ''),
+    'CLAVE': os.environ.get('TRANSMISION_CLAVE', ''),
+    'DURACION': 6 * 3600,  # segundos; cada URL vale entre una y dos duraciones
+    'ATRIBUIR_USUARIO': True,
+    'GRACIA_BALIZA': 3600,
+}
+
+# Caché de inicios de canción (apps.musica.prefijos). COMPARTIDA usa un segmento
+# de memoria compartida común a todos los workers (solo POSIX)
+CACHE_PREFIJOS = {
+    'TAMANO_PREFIJO': 256 * 1024,
+    'MAX_BYTES': int(os.environ.get('CACHE_PREFIJOS_MB', '64')) * 1024 * 1024,
+    'ADMISION': 2,
+    'COMPARTIDA': os.environ.get('CACHE_PREFIJOS_COMPARTIDA', '0') == '1',
+}
+
+# Contadores de reproducciones repartidos para canciones muy escuchadas
+# (apps.musica.contadores): a partir de UMBRAL reproducciones en VENTANA
+# segundos la canción suma en FRAGMENTOS filas; `manage.py plegar_contadores`
+# (periódico) las pasa a play_count.
+CONTADORES = {
+    'FRAGMENTOS': 16,
+    'UMBRAL': int(os.environ.get('CONTADORES_UMBRAL', '50')),
+    'VENTANA': 10,
+    'REFRESCO': 30,
+}
+
+# Deduplicación de inicios de reproducción (apps.musica.deduplicacion): una
+# escucha cuenta una vez por ventana. Con varios procesos, CACHE debe nombrar
+# una caché compartida de CACHES.
+DEDUPLICACION = {
+    'VENTANA': int(os.environ.get('DEDUPLICACION_VENTANA', '300')),
+    'MAX_ENTRADAS': 200000,
+    'CACHE': os.environ.get('DEDUPLICACION_CACHE') or None,
+}
+
+# Latidos del reproductor (apps.musica.escuchas): una fila de SesionEscucha
+# por escucha; la reproducción se acredita a partir de UMBRAL_SEGUNDOS
+# escuchados (o UMBRAL_FRACCION de la duración en canciones cortas), una vez
+# por oyente y canción en la ventana de DEDUPLICACION. MAX_SESIONES acota las
+# sesiones abiertas por proceso.
+ESCUCHAS = {
+    'UMBRAL_SEGUNDOS': int(os.environ.get('ESCUCHAS_UMBRAL_SEGUNDOS', '30')),
+    'UMBRAL_FRACCION': 0.5,
+    'INACTIVIDAD': 120,
+    'BARRIDO': 10,
+    'ACREDITAR': True,
+    'MAX_SESIONES': 200000,
+}
+
+# Borrado suave de canciones y álbumes (apps.musica.limpieza): `manage.py
+# purgar_eliminados` los borra GRACIA segundos después y recolecta los archivos
+# que llevan MARGEN_MEDIA sin uso; `escanear_media` concilia MEDIA_ROOT.
+BORRADO = {
+    'GRACIA': int(os.environ.get('BORRADO_GRACIA', str(7 * 86400))),
+    'MARGEN_MEDIA': 3600,
+    'LOTE': 500,
+    'HILOS': 8,
+}
+
+# Ingesta de álbumes completos (apps.musica.ingesta)
+INGESTA_ALBUMES = {
+    'MAX_PISTAS': 100,
+    'TAMANO_MAXIMO': 2 * 1024 * 1024 * 1024,
+    'PROCESOS': int(os.environ.get('INGESTA_PROCESOS', os.cpu_count() or 1)),
+}
+
+# Variantes de portada (apps.musica.portadas): procesos que las generan y si se
+# hace en segundo plano (False: en la misma petición, útil en desarrollo)
+PORTADAS_PROCESOS = int(os.environ.get('PORTADAS_PROCESOS', '2'))
+PORTADAS_EN_SEGUNDO_PLANO = os.environ.get('PORTADAS_EN_SEGUNDO_PLANO', '1') == '1'
 
 # Seguridad: reCAPTCHA
 # Configurar la clave secreta vía variable de entorno
 RECAPTCHA_SECRET_KEY = os.environ.get('RECAPTCHA_SECRET_KEY')
 RECAPTCHA_ENABLED = bool(RECAPTCHA_SECRET_KEY)
+# Verificación (apps.autenticacion.captcha). La URL puede apuntar a un verificador
+# local (`manage.py stub_recaptcha`) en desarrollo.
+RECAPTCHA_VERIFY_URL = os.environ.get('RECAPTCHA_VERIFY_URL', 'https://www.google.com/recaptcha/api/siteverify')
+RECAPTCHA_TIMEOUT = float(os.environ.get('RECAPTCHA_TIMEOUT', '3'))
+# Si el verificador no responde: True deja pasar el registro, False lo rechaza (503)
+RECAPTCHA_FAIL_OPEN = os.environ.get('RECAPTCHA_FAIL_OPEN', '0') == '1'
+RECAPTCHA_CACHE_TTL = 120
+RECAPTCHA_CIRCUITO_FALLOS = 5
+RECAPTCHA_CIRCUITO_ESPERA = 30
@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useRef, useState, useEffect } from 'react';
 import { Users, Music, TrendingUp, Shield, UserCog, Trash2, Edit, Plus } from 'lucide-react';
 import { Song, User as UserType } from '../types';
 import { usersAPI, statsAPI } from '../lib/api';
@@ -258,6 +258,12 @@ export function AdminDashboard({ songs }: AdminDashboardProps) {
   const [isLoading, setIsLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const [searchTerm, setSearchTerm] = useState('');
+  const [usersCursor, setUsersCursor] = useState<string | null>(null);
+  const [usersTotal, setUsersTotal] = useState<{ total: number; minimo: boolean } | null>(null);
+  const [artistsTotal, setArtistsTotal] = useState<{ total: number; minimo: boolean } | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  // Descarta respuestas de búsquedas anteriores que lleguen tarde
+  const searchSeq = useRef(0);
   const [activeTab, setActiveTab] = useState('users');
   const [showUserModal, setShowUserModal] = useState(false);
   const [editUserId, setEditUserId] = useState<string | null>(null);
@@ -281,8 +287,14 @@ export function AdminDashboard({ songs }: AdminDashboardProps) {
       setIsLoading(true);
       setError(null);
       try {
-        const usersData = await usersAPI.getAll();
-        setUsers(Array.isArray(usersData) ? usersData : []);
+        const [page, artists] = await Promise.all([
+          usersAPI.list(),
+          usersAPI.list({ rol: 'artist', limite: 1 }),
+        ]);
+        setUsers(page.results);
+        setUsersCursor(page.cursor);
+        if (page.totalEstimado !== undefined) setUsersTotal({ total: page.totalEstimado, minimo: !!page.totalMinimo });
+        if (artists.totalEstimado !== undefined) setArtistsTotal({ total: artists.totalEstimado, minimo: !!artists.totalMinimo });
       } catch (err) {
         console.error('Error loading users:', err);
         setError(err instanceof Error ? err.message : 'Error al cargar usuarios. Por favor, verifica tu conexión y permisos.');
@@ -345,18 +357,13 @@ export function AdminDashboard({ songs }: AdminDashboardProps) {
     loadRoles();
   }, []);
 
-  const filteredUsers = searchTerm 
-    ? users.filter(user => {
-        const searchLower = searchTerm.toLowerCase();
-        return (user.email || '').toLowerCase().includes(searchLower) ||
-          (user.nombres || '').toLowerCase().includes(searchLower) ||
-          (user.apellidos || '').toLowerCase().includes(searchLower) ||
-          (user.username || '').toLowerCase().includes(searchLower);
-      })
-    : users;
-
-  const totalUsers = users.length;
-  const totalArtists = users.filter(u => (u.role || '').toLowerCase() === 'artist').length;
+  // La búsqueda se resuelve en el servidor (prefijo, sin acentos)
+  const filteredUsers = users;
+
+  const formatTotal = (t: { total: number; minimo: boolean } | null, fallback: number) =>
+    t ? `${t.total.toLocaleString()}${t.minimo ? '+' : ''}` : String(fallback);
+  const totalUsers = formatTotal(usersTotal, users.length);
+  const totalArtists = formatTotal(artistsTotal, users.filter(u => (u.role || '').toLowerCase() === 'artist').length);
   const totalSongs = songs.length;
   const totalPlays = liveTotalPlays;
 
@@ -383,22 +390,37 @@ export function AdminDashboard({ songs }: AdminDashboardProps) {
 
   const handleSearch = async (value: string) => {
     setSearchTerm(value);
-    if (!value.trim()) {
-      const allUsers = await usersAPI.getAll();
-      setUsers(allUsers);
-      return;
-    }
-
+    const seq = ++searchSeq.current;
     try {
-      const results = await usersAPI.search(value);
-      setUsers(results);
+      const page = await usersAPI.list({ search: value.trim() || undefined });
+      if (seq !== searchSeq.current) return;
+      setUsers(page.results);
+      setUsersCursor(page.cursor);
       setError(null);
     } catch (err) {
+      if (seq !== searchSeq.current) return;
       console.error('Error searching users:', err);
       setError('Error al buscar usuarios');
     }
   };
 
+  const loadMoreUsers = async () => {
+    if (!usersCursor || loadingMore) return;
+    const seq = searchSeq.current;
+    setLoadingMore(true);
+    try {
+      const page = await usersAPI.list({ search: searchTerm.trim() || undefined, cursor: usersCursor });
+      if (seq !== searchSeq.current) return;
+      setUsers(prev => [...prev, ...page.results]);
+      setUsersCursor(page.cursor);
+    } catch (err) {
+      console.error('Error loading users:', err);
+      setError('Error al cargar usuarios');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const getRoleBadgeStyle = (role: string) => {
     switch (role) {
       case 'admin':
@@ -661,6 +683,17 @@ export function AdminDashboard({ songs }: AdminDashboardProps) {
                   </div>
                 </div>
               ); })}
+              {!isLoading && !error && usersCursor && (
+                <div style={{ textAlign: 'center', padding: '12px' }}>
+                  <button
+                    onClick={loadMoreUsers}
+                    disabled={loadingMore}
+                    style={{ ...styles.button, background: 'rgba(74, 159, 184, 0.2)', color: '#5BC0DE', margin: '0 auto' }}
+                  >
+                    {loadingMore ? 'Cargando...' : 'Cargar más'}
+                  </button>
+                </div>
+              )}
             </div>
           </div>
         )}
@@ -2,8 +2,20 @@ import { useState, useEffect, useRef, useCallback, useMemo } from 'react';
 import { Play, Pause, SkipBack, SkipForward, Volume2, VolumeX, Heart, Shuffle, Repeat, ListMusic } from 'lucide-react';
 import { Slider } from './ui/slider';
 import { Song } from '../types';
+import { historyAPI } from '../lib/api';
 import { ImageWithFallback } from './figma/ImageWithFallback';
 
+const newSessionId = (): string => {
+  if (typeof crypto !== 'undefined' && typeof crypto.randomUUID === 'function') {
+    return crypto.randomUUID();
+  }
+  // Contextos no seguros (http fuera de localhost) no tienen randomUUID
+  return 'xxxxxxxx-xxxx-4xxx-yxxx-xxxxxxxxxxxx'.replace(/[xy]/g, (c) => {
+    const r = (Math.random() * 16) | 0;
+    return (c === 'x' ? r : (r & 0x3) | 0x8).toString(16);
+  });
+};
+
 interface MusicPlayerProps {
   currentSong: Song | null;
   isPlaying: boolean;
@@ -54,8 +66,10 @@ export function MusicPlayer({
   const resumePositionRef = useRef<number | null>(null);
   const resumeAppliedRef = useRef<(() => void) | null>(null);
   const currentSongRef = useRef<Song | null>(null);
+  const listenSessionRef = useRef<{ id: string; audioUrl: string } | null>(null);
 
   const VOLUME_STORAGE_KEY = 'zora_player_volume';
+  const HEARTBEAT_INTERVAL_MS = 15000;
 
   useEffect(() => {
     resumeAppliedRef.current = onResumeApplied || null;
@@ -172,6 +186,56 @@ export function MusicPlayer({
     }
   }, [volume, isMuted]);
 
+  // Latidos de escucha: una sesión por cada vez que se escucha una canción
+  const startListenSession = useCallback(() => {
+    const song = currentSongRef.current;
+    listenSessionRef.current = song?.audioUrl
+      ? { id: newSessionId(), audioUrl: song.audioUrl }
+      : null;
+  }, []);
+
+  const sendHeartbeat = useCallback(
+    (state: 'reproduciendo' | 'pausa' | 'fin') => {
+      const session = listenSessionRef.current;
+      if (!session || !audioElement) return;
+      historyAPI.heartbeat(session.id, session.audioUrl, audioElement.currentTime, state);
+      if (state === 'fin') {
+        listenSessionRef.current = null;
+      }
+    },
+    [audioElement]
+  );
+
+  useEffect(() => {
+    if (!audioElement) return;
+
+    const handlePlay = () => {
+      if (!listenSessionRef.current) startListenSession();
+      sendHeartbeat('reproduciendo');
+    };
+    const handlePause = () => {
+      if (!audioElement.ended) sendHeartbeat('pausa');
+    };
+    const handleEnded = () => sendHeartbeat('fin');
+    const handlePageHide = () => sendHeartbeat('pausa');
+    const timer = window.setInterval(() => {
+      if (!audioElement.paused) sendHeartbeat('reproduciendo');
+    }, HEARTBEAT_INTERVAL_MS);
+
+    audioElement.addEventListener('play', handlePlay);
+    audioElement.addEventListener('pause', handlePause);
+    audioElement.addEventListener('ended', handleEnded);
+    window.addEventListener('pagehide', handlePageHide);
+
+    return () => {
+      window.clearInterval(timer);
+      audioElement.removeEventListener('play', handlePlay);
+      audioElement.removeEventListener('pause', handlePause);
+      audioElement.removeEventListener('ended', handleEnded);
+      window.removeEventListener('pagehide', handlePageHide);
+    };
+  }, [audioElement, sendHeartbeat, startListenSession]);
+
   // Manejar el evento ended del audio con repeatMode actualizado
   useEffect(() => {
     if (!audioElement) return;
@@ -202,10 +266,13 @@ export function MusicPlayer({
     const resumeValue = typeof resumeFrom === 'number' && resumeFrom >= 0 ? resumeFrom : null;
 
     if (isNewSong) {
+      // Cierra la escucha de la canción anterior antes de cambiar la fuente
+      sendHeartbeat('fin');
       previousSongIdRef.current = currentSong.id;
       resumePositionRef.current = resumeValue;
       audioElement.src = currentSong.audioUrl;
       audioElement.load();
+      startListenSession();
 
       if (resumeValue != null) {
         setCurrentTime(resumeValue);
@@ -232,7 +299,7 @@ export function MusicPlayer({
         resumePositionRef.current = resumeValue;
       }
     }
-  }, [currentSong, audioElement, isPlaying, resumeFrom, attemptPlay, applyResumePosition, resolveDuration]);
+  }, [currentSong, audioElement, isPlaying, resumeFrom, attemptPlay, applyResumePosition, resolveDuration, sendHeartbeat, startListenSession]);
 
   useEffect(() => {
     if (!currentSong) {
@@ -104,7 +104,7 @@ export function QueuePanel({
                   
                   <div className="flex-shrink-0">
                     <ImageWithFallback
-                      src={song.coverUrl}
+                      src={song.coverThumbUrl || song.coverUrl}
                       alt={song.title}
                       className="w-12 h-12 rounded object-cover"
                     />
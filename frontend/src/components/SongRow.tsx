@@ -46,7 +46,7 @@ export function SongRow({
 
       <div className="flex items-center gap-3 min-w-0">
         <ImageWithFallback
-          src={song.coverUrl}
+          src={song.coverThumbUrl || song.coverUrl}
           alt={song.title}
           className="w-10 h-10 rounded object-cover"
         />
@@ -64,6 +64,9 @@ const fetchAPI = async (endpoint: string, options: RequestInit = {}) => {
           if (refreshResponse.ok) {
             const tokens = await refreshResponse.json();
             localStorage.setItem('accessToken', tokens.access);
+            if (tokens.refresh) {
+              localStorage.setItem('refreshToken', tokens.refresh);
+            }
             
             requestOptions.headers = {
               ...requestOptions.headers,
@@ -166,6 +169,10 @@ export const authAPI = {
   },
 };
 
+// Variante de portada de un tamaño (64, 256 o 640) del mapa `cover_urls`; WebP si existe
+const coverVariant = (coverUrls: any, size: string): string | undefined =>
+  coverUrls?.[size]?.webp || coverUrls?.[size]?.jpeg;
+
 export const songsAPI = {
   mapBackendSong: (cancion: any): Song => ({
     id: cancion.id.toString(),
@@ -176,7 +183,10 @@ export const songsAPI = {
     albumName: cancion.album?.title ?? 'Single',
     duration: typeof cancion.duration === 'number' ? cancion.duration : 0,
     genre: cancion.genre?.name || 'Varios',
-    coverUrl: cancion.cover_url || cancion.album?.cover_url || 'https://via.placeholder.com/300',
+    coverUrl: coverVariant(cancion.cover_urls, '640') || cancion.cover_url
+      || coverVariant(cancion.album?.cover_urls, '640') || cancion.album?.cover_url
+      || 'https://via.placeholder.com/300',
+    coverThumbUrl: coverVariant(cancion.cover_urls, '64') || coverVariant(cancion.album?.cover_urls, '64'),
     audioUrl: cancion.audio_url || '',
     plays: cancion.play_count || 0,
     createdAt: new Date(cancion.created_at),
@@ -233,7 +243,100 @@ export const songsAPI = {
     return data.map(songsAPI.mapBackendSong);
   },
 
-  upload: async (formData: FormData): Promise<Song> => {
+  // Subida reanudable por fragmentos: el archivo de audio se envía en trozos
+  // (reintentando desde el último offset confirmado) y el resto del formulario
+  // se envía al finalizar. Si se recarga la página, la misma subida se retoma.
+  upload: async (formData: FormData, onProgress?: (fraction: number) => void): Promise<Song> => {
+    const file = formData.get('file');
+    if (!(file instanceof File)) return songsAPI.uploadMultipart(formData);
+
+    const token = localStorage.getItem('accessToken');
+    const auth = { 'Authorization': token ? `Bearer ${token}` : '' };
+    const resumeKey = `upload:${file.name}:${file.size}:${file.lastModified}`;
+    const readError = async (response: Response, fallback: string) => {
+      const data = await response.json().catch(() => null);
+      return new Error(data?.detail || fallback);
+    };
+
+    let uploadId = localStorage.getItem(resumeKey);
+    let offset = 0;
+    let chunkSize = 8 * 1024 * 1024;
+    if (uploadId) {
+      const status = await fetch(`${API_BASE_URL}/musica/subidas/${uploadId}/`, { headers: auth });
+      if (status.ok) {
+        const data = await status.json();
+        offset = data.offset;
+        chunkSize = data.tamano_fragmento;
+      } else {
+        uploadId = null;
+      }
+    }
+    if (!uploadId) {
+      const started = await fetch(`${API_BASE_URL}/musica/subidas/`, {
+        method: 'POST',
+        headers: { ...auth, 'Content-Type': 'application/json' },
+        body: JSON.stringify({ nombre_archivo: file.name, tamano: file.size }),
+      });
+      if (!started.ok) throw await readError(started, 'Error al iniciar la subida');
+      const data = await started.json();
+      uploadId = data.id as string;
+      chunkSize = data.tamano_fragmento;
+      localStorage.setItem(resumeKey, uploadId);
+    }
+
+    const toBase64 = (buffer: ArrayBuffer) => btoa(String.fromCharCode(...new Uint8Array(buffer)));
+    let failures = 0;
+    while (offset < file.size) {
+      const chunk = await file.slice(offset, offset + chunkSize).arrayBuffer();
+      const digest = await crypto.subtle.digest('SHA-256', chunk);
+      let response: Response;
+      try {
+        response = await fetch(`${API_BASE_URL}/musica/subidas/${uploadId}/`, {
+          method: 'PATCH',
+          headers: {
+            ...auth,
+            'Content-Type': 'application/offset+octet-stream',
+            'Upload-Offset': String(offset),
+            'Upload-Checksum': `sha256 ${toBase64(digest)}`,
+          },
+          body: chunk,
+        });
+      } catch (err) {
+        // Conexión caída: esperar y continuar desde el offset que confirme el servidor
+        if (++failures > 5) throw err;
+        await new Promise(resolve => setTimeout(resolve, 1000 * failures));
+        const status = await fetch(`${API_BASE_URL}/musica/subidas/${uploadId}/`, { headers: auth }).catch(() => null);
+        if (status?.ok) offset = (await status.json()).offset;
+        continue;
+      }
+      const serverOffset = response.headers.get('Upload-Offset');
+      if (!response.ok && (response.status !== 409 || serverOffset === null)) {
+        throw await readError(response, 'Error al subir el archivo');
+      }
+      failures = 0;
+      offset = Number(serverOffset ?? offset + chunk.byteLength);
+      onProgress?.(offset / file.size);
+    }
+
+    const fields = new FormData();
+    formData.forEach((value, key) => {
+      if (key !== 'file') fields.append(key, value);
+    });
+    const finished = await fetch(`${API_BASE_URL}/musica/subidas/${uploadId}/finalizar/`, {
+      method: 'POST',
+      headers: auth,
+      body: fields,
+    });
+    if (!finished.ok) {
+      // Con 422 el servidor descartó el archivo: la próxima vez se empieza de cero
+      if (finished.status === 422) localStorage.removeItem(resumeKey);
+      throw await readError(finished, 'Error al subir canción');
+    }
+    localStorage.removeItem(resumeKey);
+    return songsAPI.mapBackendSong(await finished.json());
+  },
+
+  uploadMultipart: async (formData: FormData): Promise<Song> => {
     const token = localStorage.getItem('accessToken');
     const response = await fetch(`${API_BASE_URL}/musica/`, {
       method: 'POST',
@@ -252,6 +355,44 @@ export const songsAPI = {
     return songsAPI.mapBackendSong(cancion);
   },
 
+  // Álbum completo en una petición: un ZIP o varios archivos + manifiesto
+  // ({title, release_date?, genre?, canciones?: [{archivo, title?, numero_pista?}]}).
+  // Resuelve con el id del álbum cuando el servidor termina de procesarlo.
+  uploadAlbum: async (
+    files: File[] | File,
+    manifest: { title: string; release_date?: string; genre?: string; canciones?: any[] },
+    cover?: File,
+    onProgress?: (processed: number, total: number) => void,
+  ): Promise<string> => {
+    const token = localStorage.getItem('accessToken');
+    const auth = { 'Authorization': token ? `Bearer ${token}` : '' };
+    const formData = new FormData();
+    if (Array.isArray(files)) files.forEach(file => formData.append('archivos', file));
+    else formData.append('archivo', files);
+    formData.append('manifiesto', JSON.stringify(manifest));
+    if (cover) formData.append('cover', cover);
+
+    const response = await fetch(`${API_BASE_URL}/musica/albumes/ingestas/`, {
+      method: 'POST',
+      headers: auth,
+      body: formData,
+    });
+    if (!response.ok) {
+      const errorData = await response.json().catch(() => null);
+      throw new Error(errorData?.detail || 'Error al subir el álbum');
+    }
+    let job = await response.json();
+    while (job.estado !== 'completada' && job.estado !== 'error') {
+      await new Promise(resolve => setTimeout(resolve, 1000));
+      const status = await fetch(`${API_BASE_URL}/musica/albumes/ingestas/${job.id}/`, { headers: auth });
+      if (!status.ok) throw new Error('Error al consultar el progreso del álbum');
+      job = await status.json();
+      onProgress?.(job.procesadas, job.total);
+    }
+    if (job.estado === 'error') throw new Error(job.mensaje || 'Error al procesar el álbum');
+    return job.album.id.toString();
+  },
+
   update: async (id: string, formData: FormData): Promise<Song> => {
     const token = localStorage.getItem('accessToken');
     const response = await fetch(`${API_BASE_URL}/musica/${id}/`, {
@@ -388,6 +529,26 @@ export const historyAPI = {
     return data.map(songsAPI.mapBackendSong);
   },
 
+  // Latido del reproductor: el servidor acumula lo escuchado por sesión y
+  // acredita la reproducción al superar el umbral. text/plain evita el
+  // preflight CORS y sendBeacon sobrevive al cierre de la página.
+  heartbeat: (
+    sessionId: string,
+    audioUrl: string,
+    position: number,
+    state: 'reproduciendo' | 'pausa' | 'fin'
+  ): void => {
+    if (!audioUrl || !new URL(audioUrl, window.location.href).searchParams.has('s')) return;
+    const body = new Blob(
+      [JSON.stringify({ sesion: sessionId, posicion: Math.max(0, position), estado: state, url: audioUrl })],
+      { type: 'text/plain' }
+    );
+    const url = `${API_BASE_URL}/musica/escuchas/latidos/`;
+    if (!navigator.sendBeacon?.(url, body)) {
+      fetch(url, { method: 'POST', body, keepalive: true }).catch(() => {});
+    }
+  },
+
   register: async (songId: string): Promise<void> => {
     const token = localStorage.getItem('accessToken');
     await fetch(`${API_BASE_URL}/musica/historial/${songId}/registrar/`, {
@@ -490,10 +651,37 @@ export const artistsAPI = {
   },
 };
 
+export interface UsersPage {
+  results: User[];
+  // Cursor de la página siguiente (null si no hay más)
+  cursor: string | null;
+  // Solo en la primera página; con totalMinimo el total es "al menos"
+  totalEstimado?: number;
+  totalMinimo?: boolean;
+}
+
 export const usersAPI = {
+  // Listado paginado por cursor; search busca por prefijo sin distinguir acentos
+  list: async (params: { search?: string; rol?: string; cursor?: string; limite?: number } = {}): Promise<UsersPage> => {
+    const query = new URLSearchParams();
+    if (params.search) query.set('search', params.search);
+    if (params.rol) query.set('rol', params.rol);
+    if (params.cursor) query.set('cursor', params.cursor);
+    if (params.limite) query.set('limite', String(params.limite));
+    const qs = query.toString();
+    const response = await fetchAPI(`/auth/usuarios/${qs ? `?${qs}` : ''}`);
+    const next: string | null = response?.next ?? null;
+    return {
+      results: response?.results || [],
+      cursor: next ? new URL(next).searchParams.get('cursor') : null,
+      totalEstimado: response?.total_estimado,
+      totalMinimo: response?.total_minimo,
+    };
+  },
+
   getAll: async (): Promise<User[]> => {
-    const response = await fetchAPI('/auth/usuarios/');
-    return response;
+    const page = await usersAPI.list();
+    return page.results;
   },
 
   create: async (data: {
@@ -530,8 +718,8 @@ export const usersAPI = {
   },
 
   search: async (query: string): Promise<User[]> => {
-    const response = await fetchAPI(`/auth/usuarios/?search=${encodeURIComponent(query)}`);
-    return response;
+    const page = await usersAPI.list({ search: query });
+    return page.results;
   },
 
   setPassword: async (id: string, newPassword: string): Promise<void> => {
@@ -45,13 +45,16 @@ axiosInstance.interceptors.response.use(
           withCredentials: true // Importante para las cookies
         });
 
-        const { access } = response.data;
+        const { access, refresh } = response.data;
         if (!access) {
           return Promise.reject(new Error('No se recibió el token de acceso'));
         }
 
-        // Guardamos nuevo access token
+        // Guardamos nuevo access token (y el refresh rotado: el anterior queda revocado)
         localStorage.setItem('accessToken', access);
+        if (refresh) {
+          localStorage.setItem('refreshToken', refresh);
+        }
 
         // Reintentamos la petición original con el nuevo token
         originalRequest.headers.Authorization = `Bearer ${access}`;
@@ -129,7 +129,7 @@ export const useAuthStore = create<AuthStore>((set) => ({
 
   logout: async () => {
     try {
-      await axiosInstance.post('/auth/logout/');
+      await axiosInstance.post('/auth/logout/', { refresh: localStorage.getItem('refreshToken') });
     } catch (error) {
       console.error('Error during logout:', error);
     } finally {
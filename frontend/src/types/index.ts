@@ -21,6 +21,7 @@ export interface Song {
   duration: number; // en segundos
   genre: string;
   coverUrl: string;
+  coverThumbUrl?: string; // variante de 64 px para listas
   audioUrl: string;
   plays: number;
   createdAt: Date;